@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from zimx.app import config, indexer
+from zimx.app.agenda import (
+    AgendaRange,
+    from_julian_day,
+    julian_day,
+    month_grid_range,
+    overdue_range,
+    week_range,
+    year_range,
+)
+
+
+@pytest.fixture
+def vault(tmp_path):
+    config.set_active_vault(str(tmp_path))
+    pages = {
+        "/Work.md": "- [ ] Ship release <2030-03-02\n- [ ] Plan next >2030-03-04\n- [x] Old chore <2030-03-02\n",
+        "/Home.md": "- [ ] Pay bills <2030-02-20\n- [ ] Taxes <2030-03-02 >2030-03-01\n",
+    }
+    for path, content in pages.items():
+        config.update_page_index(path, path, [], [], indexer.extract_tasks(path, content))
+    yield
+    config.set_active_vault(None)
+
+
+def _rebuilt_counts(agenda_range: AgendaRange) -> dict[int, tuple[int, int]]:
+    config._reset_agenda_counts()
+    return config.task_day_counts(agenda_range)
+
+
+def test_julian_days_and_ranges() -> None:
+    assert julian_day("2024-01-01") == 2460311  # QDate(2024, 1, 1).toJulianDay()
+    assert julian_day("not a date") is None
+    assert from_julian_day(julian_day(date(2030, 3, 2))) == date(2030, 3, 2)
+    week = week_range(date(2030, 3, 6))  # a Wednesday
+    assert (week.first_date, week.last_date) == (date(2030, 3, 4), date(2030, 3, 10))
+    grid = month_grid_range(2030, 3, week_start=6)
+    assert grid.first_date == date(2030, 2, 24)
+    assert grid.end - grid.start == 41
+    assert len(range(year_range(2024).start, year_range(2024).end + 1)) == 366
+    overdue = overdue_range(date(2030, 3, 2))
+    assert overdue.overdue and julian_day("2030-03-02") not in overdue
+
+
+def test_fetch_agenda_tasks(vault) -> None:
+    march_2 = AgendaRange.for_dates(date(2030, 3, 2), date(2030, 3, 2))
+    assert [t["text"] for t in config.fetch_agenda_tasks(march_2)] == ["Taxes", "Ship release"]
+    assert len(config.fetch_agenda_tasks(march_2, include_done=True)) == 3
+    with_overdue = AgendaRange(march_2.start, march_2.end, overdue=True)
+    assert [t["text"] for t in config.fetch_agenda_tasks(with_overdue)] == ["Pay bills", "Taxes", "Ship release"]
+    week = week_range(date(2030, 3, 4))
+    assert [t["text"] for t in config.fetch_agenda_tasks(week)] == ["Plan next"]
+    assert config.fetch_agenda_tasks(week, include_starts=False) == []
+    assert [t["text"] for t in config.fetch_agenda_tasks(overdue_range(date(2030, 3, 1)))] == ["Pay bills"]
+
+
+def test_day_counts_follow_page_saves(vault) -> None:
+    year = year_range(2030)
+    counts = config.task_day_counts(year)
+    assert counts[julian_day("2030-03-02")] == (2, 0)
+    assert counts[julian_day("2030-03-01")] == (0, 1)
+    assert counts[julian_day("2030-03-04")] == (0, 1)
+
+    # Completing one task and moving another updates the cached counts in place.
+    edited = "- [x] Ship release <2030-03-02\n- [ ] Plan next >2030-03-05\n- [x] Old chore <2030-03-02\n"
+    config.update_page_index("/Work.md", "/Work.md", [], [], indexer.extract_tasks("/Work.md", edited))
+    counts = config.task_day_counts(year)
+    assert counts[julian_day("2030-03-02")] == (1, 0)
+    assert julian_day("2030-03-04") not in counts
+    assert counts == _rebuilt_counts(year)
+
+    config.delete_page_index("/Home.md")
+    assert config.task_day_counts(year) == {julian_day("2030-03-05"): (0, 1)}
+
+
+def test_agenda_columns_are_indexed(vault) -> None:
+    conn = config._get_conn()
+    plan = " ".join(
+        str(row[-1])
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT task_id FROM tasks t WHERE t.due_jd BETWEEN ? AND ? OR t.starts_jd BETWEEN ? AND ?",
+            (1, 2, 1, 2),
+        )
+    )
+    assert "idx_tasks_due_jd" in plan and "idx_tasks_starts_jd" in plan
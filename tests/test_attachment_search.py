@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from zimx.app import config
+from zimx.rag.attachment_text import AttachmentTextService
+from zimx.server import search_index
+from zimx.server.attachment_index import AttachmentSearchIndexer
+
+
+def _vault(tmp_path: Path) -> sqlite3.Connection:
+    (tmp_path / ".zimx").mkdir()
+    conn = sqlite3.connect(tmp_path / ".zimx" / "settings.db")
+    conn.execute(
+        "CREATE TABLE attachments (attachment_path TEXT PRIMARY KEY, page_path TEXT, stored_path TEXT, updated REAL)"
+    )
+    config._ensure_attachments_search_fts(conn)
+    return conn
+
+
+def _attach(conn: sqlite3.Connection, root: Path, page: str, name: str, text: str) -> str:
+    attachment = f"{page.rsplit('/', 1)[0]}/{name}"
+    target = root / attachment.lstrip("/")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text, encoding="utf-8")
+    conn.execute("INSERT OR REPLACE INTO attachments VALUES (?, ?, ?, 0)", (attachment, page, str(target)))
+    conn.commit()
+    return attachment
+
+
+def test_attachment_text_is_indexed_searchable_and_reconciled(tmp_path: Path) -> None:
+    conn = _vault(tmp_path)
+    receipt = _attach(conn, tmp_path, "/Trips/Trips.md", "receipt.txt", "Hotel Zermatt invoice, two nights")
+    _attach(conn, tmp_path, "/Home/Home.md", "song.mp3", "not text")
+    indexer = AttachmentSearchIndexer(tmp_path, AttachmentTextService(tmp_path / ".zimx" / "attachment_text"))
+
+    assert indexer.stale_attachments() == [receipt]
+    indexer.process(receipt)
+    indexer.process(receipt)
+    assert (indexer.indexed, indexer.unchanged) == (1, 1)
+
+    hits = search_index.search_attachments(conn, "zerm")
+    assert [(hit["path"], hit["attachment"]) for hit in hits] == [("/Trips/Trips.md", receipt)]
+    assert "[Zermatt]" in hits[0]["snippet"]
+    assert search_index.search_attachments(conn, "zermatt", subtree="/Home") == []
+
+    # Files whose mtime and size match the index are not re-hashed.
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(indexer._text, "cache_key", lambda path: pytest.fail(f"{path} was hashed"))
+        assert indexer.stale_attachments() == []
+
+    (tmp_path / receipt.lstrip("/")).write_text("Hotel Geneva invoice", encoding="utf-8")
+    assert indexer.stale_attachments() == [receipt]
+    indexer.process(receipt)
+    assert search_index.search_attachments(conn, "zermatt") == []
+
+    conn.execute("DELETE FROM attachments WHERE attachment_path = ?", (receipt,))
+    conn.commit()
+    assert indexer.stale_attachments() == []
+    assert search_index.indexed_attachments(conn) == {}
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+
+from zimx.rag.attachment_text import AttachmentTextService, ExtractionError, ExtractionLimits
+
+
+def _write_pdf(path: Path, pages: list[str]) -> None:
+    """Minimal uncompressed PDF with one line of Helvetica text per page."""
+    count = len(pages)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{3 + 2 * i} 0 R" for i in range(count)), count
+        ),
+    ]
+    font_id = 3 + 2 * count
+    for index, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * index} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(body)
+
+
+def test_pdf_pages_stream_in_order_and_are_cached(tmp_path: Path, monkeypatch) -> None:
+    pdf = tmp_path / "menu.pdf"
+    _write_pdf(pdf, [f"Page {n} of the Riches menu" for n in range(1, 12)])
+    service = AttachmentTextService(tmp_path / "cache", max_workers=2)
+    try:
+        pages = list(service.iter_pages(pdf))
+        assert len(pages) == 11
+        assert all(f"Page {n} of the Riches menu" in page for n, page in enumerate(pages, 1))
+        assert service.cached_text(pdf) == service.extract(pdf)
+
+        # A copy elsewhere hits the same content-addressed entry without touching the pool.
+        copy = tmp_path / "copy.pdf"
+        copy.write_bytes(pdf.read_bytes())
+        monkeypatch.setattr(service, "_executor", lambda: pytest.fail("cached text was re-extracted"))
+        assert list(service.iter_pages(copy)) == pages
+    finally:
+        service.close()
+
+
+def test_limits_cut_extraction_short_without_caching(tmp_path: Path) -> None:
+    pdf = tmp_path / "long.pdf"
+    _write_pdf(pdf, [f"Chapter {n}" for n in range(1, 6)])
+    service = AttachmentTextService(tmp_path / "cache", max_workers=1, limits=ExtractionLimits(max_pages=2))
+    try:
+        pages = list(service.iter_pages(pdf))
+        assert len(pages) == 2 and "Chapter 2" in pages[1]
+        assert service.cached_text(pdf) is None
+    finally:
+        service.close()
+
+    notes = tmp_path / "notes.txt"
+    notes.write_text("x" * 50, encoding="utf-8")
+    small = AttachmentTextService(None, limits=ExtractionLimits(max_chars=10, max_bytes=100))
+    assert small.extract(notes) == "x" * 10
+    notes.write_text("x" * 500, encoding="utf-8")
+    assert small.extract(notes) == ""
+
+
+def test_failed_extraction_raises_and_is_not_cached(tmp_path: Path) -> None:
+    broken = tmp_path / "broken.docx"
+    broken.write_bytes(b"not a zip archive")
+    service = AttachmentTextService(tmp_path / "cache", max_workers=1)
+    try:
+        with pytest.raises(ExtractionError):
+            service.extract(broken)
+        assert service.cached_text(broken) is None
+        assert service.extract_many([broken]) == {broken: ""}
+        assert service.cached_text(broken) is None
+    finally:
+        service.close()
+
+
+def test_timeout_terminates_the_worker(tmp_path: Path) -> None:
+    service = AttachmentTextService(tmp_path / "cache", max_workers=1)
+    try:
+        pool = service._executor()
+        future = pool.submit(time.sleep, 60)
+        deadline = time.monotonic() + 30
+        while not pool._processes and time.monotonic() < deadline:
+            time.sleep(0.05)
+        workers = list(pool._processes.values())
+        assert service._await(future, tmp_path / "hung.pdf", time.monotonic() + 0.5) is None
+        for worker in workers:
+            worker.join(10)
+            assert not worker.is_alive()
+        assert service._executor() is not pool
+    finally:
+        service.close()
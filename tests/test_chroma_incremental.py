@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from zimx.rag.chroma import ChromaRAG, QueryScope
+
+
+class _CountingEmbedding(EmbeddingFunction[Documents]):
+    """Deterministic letter-frequency vectors; records every document it embeds."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def __call__(self, input: Documents) -> Embeddings:
+        self.calls.extend(input)
+        return [[float(doc.lower().count(letter)) + 0.1 for letter in "abcdefghijklmnopqrstuvwxyz"] for doc in input]
+
+
+def _paragraphs(*words: str) -> str:
+    return "\n\n".join((word + " ") * 300 for word in words)
+
+
+def test_index_text_embeds_only_changed_chunks(tmp_path) -> None:
+    embedder = _CountingEmbedding()
+    rag = ChromaRAG(str(tmp_path), embedding_function=embedder)
+    first = rag.index_text("/Page.md", _paragraphs("alpha", "bravo", "charlie"), kind="page")
+    assert first.embedded == first.chunks and first.kept == 0 and not first.skipped
+    embedder.calls.clear()
+
+    assert rag.index_text("/Page.md", _paragraphs("alpha", "bravo", "charlie"), kind="page").skipped
+    assert embedder.calls == []
+
+    second = rag.index_text("/Page.md", _paragraphs("alpha", "bravo", "delta"), kind="page")
+    assert 0 < second.embedded < second.chunks
+    assert second.kept + second.embedded == second.chunks
+    assert second.removed == first.chunks - second.kept
+    assert all("charlie" not in doc or "delta" in doc for doc in embedder.calls)
+    stored = rag.collection.get(where={"page_ref": "/Page.md"}, include=["documents", "metadatas"])
+    assert len(stored["ids"]) == second.chunks
+    assert sorted(meta["chunk_index"] for meta in stored["metadatas"]) == list(range(second.chunks))
+    assert not any("charlie" in doc for doc in stored["documents"])
+
+    # A fresh instance finds the digest in chunk metadata and skips without embedding.
+    embedder.calls.clear()
+    reopened = ChromaRAG(str(tmp_path), embedding_function=embedder)
+    assert reopened.index_text("/Page.md", _paragraphs("alpha", "bravo", "delta"), kind="page").skipped
+    assert embedder.calls == []
+
+    reopened.delete_text("/Page.md", kind="page")
+    assert reopened.collection.get(where={"page_ref": "/Page.md"})["ids"] == []
+    assert reopened.index_text("/Page.md", _paragraphs("alpha"), kind="page").embedded > 0
+
+
+def test_retrieve_embeds_query_once_and_merges_scopes(tmp_path) -> None:
+    embedder = _CountingEmbedding()
+    rag = ChromaRAG(str(tmp_path), embedding_function=embedder)
+    rag.index_text("/Notes.md", _paragraphs("kiwi", "mango"), kind="page")
+    rag.index_text("/Notes.md", "kiwi attachment notes", kind="attachment", attachment="kiwi.pdf")
+    rag.index_text("/Other.md", "kiwi elsewhere", kind="page")
+    embedder.calls.clear()
+
+    scopes = [
+        QueryScope(kind="attachment", attachment_names=["kiwi.pdf"], limit=4),
+        QueryScope(kind="page", page_refs=["/Notes.md", "/Other.md"], limit=8),
+        QueryScope(kind="page", page_refs=["/Notes.md"], limit=8),
+    ]
+    chunks = rag.retrieve("  retrieve   kiwi ", scopes)
+    assert embedder.calls == ["retrieve kiwi"]
+    assert chunks[0].attachment_name == "kiwi.pdf"
+    assert {chunk.page_ref for chunk in chunks[1:]} == {"/Notes.md", "/Other.md"}
+    assert len({chunk.content for chunk in chunks}) == len(chunks)
+
+    one_each = rag.retrieve("retrieve kiwi", scopes, one_per_source=True)
+    assert [(chunk.page_ref, chunk.attachment_name) for chunk in one_each][0] == ("/Notes.md", "kiwi.pdf")
+    assert len(one_each) == 3
+    assert len(rag.retrieve("retrieve kiwi", scopes, limit=2)) == 2
+    # Whitespace-normalized repeats come from the query cache, across store instances too.
+    assert ChromaRAG(str(tmp_path), embedding_function=embedder).query("retrieve kiwi", limit=1)
+    assert embedder.calls == ["retrieve kiwi"]
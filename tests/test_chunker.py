@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from zimx.rag.chunker import chunk_markdown, estimate_tokens
+
+
+def _section(title: str, paragraphs: int) -> str:
+    body = "\n\n".join(f"{title} paragraph {n} " + "lorem ipsum dolor sit amet " * 6 for n in range(paragraphs))
+    return f"## {title}\n\n{body}"
+
+
+def test_headings_lists_and_code_fences() -> None:
+    text = """# Project
+
+Intro line.
+
+## Tasks
+- [ ] Write report @work
+    - [ ] Collect numbers
+- [x] Send invoice
+
+```python
+def f():
+
+    return 1
+```
+
+## Notes
+Closing words."""
+    chunks = chunk_markdown(text, max_tokens=40, min_tokens=1000)
+    assert [chunk.heading_path for chunk in chunks] == [("Project",), ("Project", "Tasks"), ("Project", "Notes")]
+    tasks = chunks[1]
+    assert tasks.line == 4
+    assert "- [ ] Write report @work\n    - [ ] Collect numbers\n- [x] Send invoice" in tasks.text
+    assert "def f():\n\n    return 1\n```" in tasks.text
+    assert chunks[2].heading == "Project > Notes"
+
+
+def test_chunks_respect_token_limit() -> None:
+    text = _section("Big", 30) + "\n\n" + "word " * 500
+    chunks = chunk_markdown(text, max_tokens=64)
+    assert len(chunks) > 5
+    assert all(estimate_tokens(chunk.text) <= 64 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks).count("word") == 500
+
+
+def test_boundaries_survive_local_edits() -> None:
+    sections = [_section(name, 12) for name in ("Alpha", "Beta", "Gamma")]
+    before = {chunk.text for chunk in chunk_markdown("\n\n".join(sections))}
+    edited = sections[:]
+    edited[0] = edited[0].replace("## Alpha\n\n", "## Alpha\n\nA freshly inserted opening paragraph.\n\n")
+    after = {chunk.text for chunk in chunk_markdown("\n\n".join(edited))}
+    changed = after - before
+    # Only chunks of the edited section up to its next content-defined boundary differ.
+    assert 0 < len(changed) <= 2
+    assert all("Alpha" in chunk for chunk in changed)
+    assert len(after & before) >= len(before) - 2
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from zimx.app.ui.code_token_cache import CodeTokenizer, code_block_key, tokenize_code
+
+
+def test_code_block_key_depends_on_language_and_content() -> None:
+    assert code_block_key("Python", "x = 1") == code_block_key("python", "x = 1")
+    assert code_block_key("python", "x = 1") != code_block_key("python", "x = 2")
+    assert code_block_key("python", "x = 1") != code_block_key("bash", "x = 1")
+
+
+def test_tokenize_code_splits_spans_per_line() -> None:
+    code = "def f(x):\n    return x"
+    lines = tokenize_code(code, "python")
+    assert len(lines) == 2
+    for text, spans in zip(code.split("\n"), lines):
+        covered = "".join(text[col : col + length] for col, length, _ in spans)
+        assert covered == text
+
+
+def test_tokenizer_cache_is_bounded_lru() -> None:
+    tokenizer = CodeTokenizer(max_entries=2)
+    keys = [code_block_key("python", f"x = {i}") for i in range(3)]
+    for key in keys:
+        tokenizer._store(key, ((),))
+    assert tokenizer.lookup(keys[0]) is None
+    assert tokenizer.lookup(keys[2]) == ((),)
+    assert tokenizer.request(keys[2], "x = 2") is False
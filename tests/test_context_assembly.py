@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+
+from zimx.rag.context import (
+    MIN_FRAGMENT_TOKENS,
+    PageTextCache,
+    assemble_context,
+    get_tokenizer,
+    register_tokenizer,
+)
+from zimx.rag.index import RetrievedChunk
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_assemble_context_packs_ranked_chunks_into_budget() -> None:
+    chunks = [
+        RetrievedChunk(page_ref="/A.md", content="alpha " * 40),
+        RetrievedChunk(page_ref="/B.md", content="bravo " * 300),
+        RetrievedChunk(page_ref="/C.md", content="charlie " * 20, attachment_name="c.pdf"),
+        RetrievedChunk(page_ref="/A.md", content="   "),
+    ]
+    context = assemble_context(chunks, budget=150, tokenizer=_words, header="Context:")
+    assert context.tokens <= 150
+    assert context.tokens == _words(context.text)
+    lines = context.text.splitlines()
+    assert lines[0] == "Context:"
+    assert lines[1].startswith("/A.md: alpha")
+    # B does not fit whole but enough room is left to cut it at a word; C then no longer fits.
+    assert lines[2].startswith("/B.md: bravo") and lines[2].endswith("…")
+    by_label = {source.label: source for source in context.sources}
+    assert by_label["/A.md"].tokens == 41 and by_label["/A.md"].chunks == 1
+    assert by_label["/B.md"].truncated == 1
+    assert by_label["/C.md (c.pdf)"].dropped == 1
+    assert "/A.md=41" in context.summary()
+
+
+def test_assemble_context_drops_chunks_without_room_and_keeps_smaller_ones() -> None:
+    room = MIN_FRAGMENT_TOKENS - 10
+    chunks = [
+        RetrievedChunk(page_ref="/Big.md", content="big " * 500),
+        RetrievedChunk(page_ref="/Small.md", content="small " * 5),
+    ]
+    context = assemble_context(chunks, budget=room, tokenizer=_words, header="Context:")
+    assert "/Big.md" not in context.text
+    assert "/Small.md: small" in context.text
+    assert context.dropped == 1
+
+    empty = assemble_context(chunks[:1], budget=room, tokenizer=_words)
+    assert empty.text == "" and empty.tokens == 0
+
+
+def test_tokenizers_are_pluggable() -> None:
+    register_tokenizer("chars", len)
+    assert get_tokenizer("chars")("abcd") == 4
+    assert get_tokenizer("no-such-tokenizer")("two words") == 2
+    assert get_tokenizer()("one, two") == 3
+
+
+def test_page_text_cache_rereads_only_changed_files(tmp_path) -> None:
+    page = tmp_path / "Page.md"
+    page.write_text("first", encoding="utf-8")
+    cache = PageTextCache(max_entries=1)
+    assert cache.read(page) == "first"
+    assert cache.read(page) == "first"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    page.write_text("second version", encoding="utf-8")
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.read(page) == "second version"
+    assert cache.read(tmp_path / "Missing.md") == ""
+
+
+def test_assemble_context_skips_repeated_chunks_and_caps_sources() -> None:
+    chunks = [
+        RetrievedChunk(page_ref="/A.md", content="alpha one"),
+        RetrievedChunk(page_ref="/A.md", content="alpha  one "),
+        RetrievedChunk(page_ref="/A.md", content="alpha two"),
+        RetrievedChunk(page_ref="/A.md", content="alpha three"),
+        RetrievedChunk(page_ref="/B.md", content="alpha one"),
+    ]
+    context = assemble_context(chunks, budget=1000, tokenizer=_words, max_per_source=2)
+    by_label = {source.label: source for source in context.sources}
+    assert (by_label["/A.md"].chunks, by_label["/A.md"].duplicates, by_label["/A.md"].dropped) == (2, 1, 1)
+    assert by_label["/B.md"].chunks == 1
+    assert "alpha three" not in context.text
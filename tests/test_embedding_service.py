@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from zimx.rag.chroma import IndexTextStats
+from zimx.server.embedding import EmbeddingQueue, EmbeddingService, iter_page_refs
+
+
+class _RecordingVectors:
+    """Stands in for VectorIndexManager; records what the service sends."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.deleted: list[str] = []
+
+    def index_texts(self, root, items):
+        self.batches.append([page_ref for page_ref, _text, _kind, _attachment in items])
+        return [IndexTextStats(chunks=2, embedded=2, embed_cpu=0.01) for _ in items]
+
+    def delete_text(self, root, page_ref, kind, attachment=None):
+        self.deleted.append(page_ref)
+
+
+def _vault(tmp_path):
+    for name in ("A", "B", "C"):
+        folder = tmp_path / "Notes" / name
+        folder.mkdir(parents=True)
+        (folder / f"{name}.md").write_text(f"# {name}\n\nbody {name}\n", encoding="utf-8")
+    (tmp_path / ".zimx").mkdir()
+    (tmp_path / ".zimx" / "ignored.md").write_text("x", encoding="utf-8")
+    return tmp_path
+
+
+def test_queue_persists_and_keeps_requeued_pages(tmp_path) -> None:
+    queue = EmbeddingQueue(tmp_path / "queue.db")
+    assert queue.enqueue(["/a.md", "/b.md", "/a.md"]) == 2
+    jobs = queue.take(10)
+    assert [page for page, _ in jobs] == ["/a.md", "/b.md"]
+    time.sleep(0.01)
+    queue.enqueue(["/a.md"])  # saved again while its batch was running
+    queue.complete(jobs)
+    queue.close()
+    reopened = EmbeddingQueue(tmp_path / "queue.db")
+    assert [page for page, _ in reopened.take(10)] == ["/a.md"]
+    reopened.fail(reopened.take(10), "boom")
+    reopened.fail(reopened.take(10), "boom")
+    reopened.fail(reopened.take(10), "boom")
+    assert reopened.take(10) == [] and reopened.counts() == (0, 1)
+
+
+def test_service_batches_follows_changes_and_resumes(tmp_path) -> None:
+    root = _vault(tmp_path)
+    assert list(iter_page_refs(root)) == ["/Notes/A/A.md", "/Notes/B/B.md", "/Notes/C/C.md"]
+    vectors = _RecordingVectors()
+    service = EmbeddingService(root, vectors, batch_size=2, cpu_share=1.0)
+    # Saves are ignored until the vault is embedded once.
+    assert service.notify_changed(["/Notes/A/A.md"]) == 0
+    service.queue.set_meta("enabled", "1")
+    service.queue.enqueue(iter_page_refs(root))
+    service.process(service.queue.take(service.batch_size))
+    assert vectors.batches == [["/Notes/A/A.md", "/Notes/B/B.md"]]
+    service.stop()
+
+    # A new service over the same vault resumes from the persisted queue.
+    (root / "Notes" / "C" / "C.md").unlink()
+    resumed = EmbeddingService(root, vectors, batch_size=2, cpu_share=1.0)
+    assert resumed.enabled and resumed.status()["pending"] == 1
+    resumed.notify_changed(["/Notes/B/B.md", "/Notes/B/image.png"])
+    resumed.start()
+    deadline = time.time() + 5
+    while resumed.status()["pending"] and time.time() < deadline:
+        time.sleep(0.02)
+    status = resumed.status()
+    resumed.stop()
+    assert vectors.deleted == ["/Notes/C/C.md"]
+    assert vectors.batches[-1] == ["/Notes/B/B.md"]
+    assert status["pending"] == 0
+    assert status["pages_indexed"] == 1 and status["pages_removed"] == 1
+    assert status["chunks_embedded"] == 2 and status["pages_per_minute"] == 2.0
+
+
+class _ThreadPoolVectors(_RecordingVectors):
+    """Burns CPU on a helper thread, the way the ONNX embedder runs inference."""
+
+    def index_texts(self, root, items):
+        def spin() -> None:
+            started = time.process_time()
+            while time.process_time() - started < 0.1:
+                pass
+
+        worker = threading.Thread(target=spin)
+        worker.start()
+        worker.join()
+        return super().index_texts(root, items)
+
+
+def test_throttle_counts_cpu_spent_on_other_threads(tmp_path) -> None:
+    root = _vault(tmp_path)
+    service = EmbeddingService(root, _ThreadPoolVectors(), batch_size=3, cpu_share=0.5)
+    service.queue.set_meta("enabled", "1")
+    service.queue.enqueue(iter_page_refs(root))
+    service.start()
+    deadline = time.time() + 5
+    while not service.metrics.throttle_sleep and time.time() < deadline:
+        time.sleep(0.02)
+    service.stop()
+    assert service.metrics.throttle_sleep >= 0.05
+
+
+def test_server_shutdown_stops_background_services(monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    from zimx.server import api
+
+    stopped: list[str] = []
+    monkeypatch.setattr(api.embedding_services, "stop_all", lambda: stopped.append("embedding"))
+    monkeypatch.setattr(api.attachment_indexers, "stop_all", lambda: stopped.append("attachments"))
+    with TestClient(api.app):
+        assert stopped == []
+    assert stopped == ["embedding", "attachments"]
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import json
+
+from zimx.app.ui.highlight_profiler import HighlightProfiler
+
+
+def test_report_orders_rules_by_cost_and_counts_matches() -> None:
+    profiler = HighlightProfiler()
+    profiler.record("bold", 0.002, 3)
+    profiler.record("bold", 0.001, 1)
+    profiler.record("tags", 0.0005, 2)
+    profiler.record_block(0, "x" * 10, 0.003)
+    profiler.record_block(1, "y" * 300, 0.0005)
+
+    report = profiler.report()
+    assert [r["rule"] for r in report["rules"]] == ["bold", "tags"]
+    bold = report["rules"][0]
+    assert bold["calls"] == 2
+    assert bold["matches"] == 4
+    assert report["blocks"] == 2
+    assert report["block_length_histogram"] == {"<=16": 1, "<=512": 1}
+    assert report["worst_blocks"][0]["block"] == 0
+
+
+def test_worst_blocks_are_bounded(tmp_path) -> None:
+    profiler = HighlightProfiler(worst_blocks=3)
+    for i in range(10):
+        profiler.record_block(i, "line", i / 1000.0)
+    worst = profiler.report()["worst_blocks"]
+    assert [w["block"] for w in worst] == [9, 8, 7]
+
+    target = tmp_path / "profile" / "page.json"
+    profiler.dump(target, extra={"path": "/Page/Page.md"})
+    payload = json.loads(target.read_text(encoding="utf-8"))
+    assert payload["path"] == "/Page/Page.md"
+    assert payload["blocks"] == 10
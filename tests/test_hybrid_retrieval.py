@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import sqlite3
+
+from zimx.rag.hybrid import fuse_ranked
+from zimx.rag.index import RetrievedChunk
+from zimx.server import search_index
+
+
+def _search_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE pages_search_index (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime INTEGER)")
+    conn.execute("CREATE VIRTUAL TABLE pages_search_fts USING fts5(content, content_rowid='id')")
+    search_index.upsert_page(conn, "/Garden/Garden.txt", 1, "Plant the kiwi vines along the south fence.")
+    search_index.upsert_page(conn, "/Kitchen/Kitchen.txt", 1, "Kiwi jam recipe.\nKiwi, sugar and lemon.")
+    search_index.upsert_page(conn, "/Other/Other.txt", 1, "Kiwi everywhere, but out of scope.")
+    return conn
+
+
+def test_page_snippets_rank_any_query_word_within_page_set() -> None:
+    conn = _search_db()
+    hits = search_index.search_page_snippets(
+        conn, "how do I make kiwi jam?", ["/Garden/Garden.txt", "/Kitchen/Kitchen.txt"]
+    )
+    assert [hit["path"] for hit in hits] == ["/Kitchen/Kitchen.txt", "/Garden/Garden.txt"]
+    assert "jam" in hits[0]["snippet"]
+    assert search_index.search_page_snippets(conn, "kiwi", []) == []
+    assert search_index.search_page_snippets(conn, "?!", ["/Garden/Garden.txt"]) == []
+
+
+def test_fusion_boosts_lexical_pages_and_adds_uncovered_snippets() -> None:
+    vector = [
+        RetrievedChunk("/A.txt", "fruit growing notes", 0.2),
+        RetrievedChunk("/B.txt", "all about kiwi", 0.3),
+        RetrievedChunk("/C.txt", "orchard", 0.4),
+    ]
+    lexical = [RetrievedChunk("/B.txt", "kiwi"), RetrievedChunk("/D.txt", "the kiwi term")]
+    fused = fuse_ranked("kiwi", vector, lexical)
+    assert [chunk.page_ref for chunk in fused] == ["/B.txt", "/A.txt", "/D.txt", "/C.txt"]
+    # /B.txt's vector chunk already contains the word, so its snippet is not added twice.
+    assert sum(chunk.page_ref == "/B.txt" for chunk in fused) == 1
+    assert len(fuse_ranked("kiwi", vector, lexical, limit=2)) == 2
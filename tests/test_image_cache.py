@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from PySide6.QtGui import QColor, QImage
+
+from zimx.app.ui.image_cache import (
+    ImagePipeline,
+    decode_image,
+    image_key,
+    read_image_size,
+    thumbnail_path,
+)
+
+
+def _write_png(path, width: int, height: int) -> None:
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor("steelblue"))
+    assert image.save(str(path), "PNG")
+
+
+def test_header_size_and_key(tmp_path) -> None:
+    src = tmp_path / "shot.png"
+    _write_png(src, 640, 320)
+    size = read_image_size(src)
+    assert (size.width(), size.height()) == (640, 320)
+    key = image_key(src, 100)
+    assert key is not None and key[0] == str(src) and key[2] == 100
+    assert image_key(tmp_path / "missing.png") is None
+    assert read_image_size(tmp_path / "missing.png").isValid() is False
+
+
+def test_decode_scales_and_writes_thumbnail(tmp_path) -> None:
+    src = tmp_path / "shot.png"
+    _write_png(src, 640, 320)
+    cache_dir = tmp_path / ".zimx" / "thumbnails"
+    key = image_key(src, 160)
+    image = decode_image(key, cache_dir)
+    assert (image.width(), image.height()) == (160, 80)
+    thumb = thumbnail_path(cache_dir, key)
+    assert thumb.exists()
+    assert list(cache_dir.iterdir()) == [thumb]
+    # Full-size decodes are not written to the thumbnail cache.
+    full = decode_image(image_key(src, 0), cache_dir)
+    assert full.width() == 640
+    assert list(cache_dir.iterdir()) == [thumb]
+
+
+def test_pipeline_lru_is_memory_bounded() -> None:
+    one = QImage(10, 10, QImage.Format_RGB32)
+    pipeline = ImagePipeline(max_bytes=one.sizeInBytes() * 2)
+    keys = [(f"/img{i}.png", 1, 0) for i in range(3)]
+    for key in keys:
+        pipeline._store(key, QImage(10, 10, QImage.Format_RGB32))
+    assert pipeline.lookup(keys[0]) is None
+    assert pipeline.lookup(keys[2]) is not None
+    assert pipeline.cached_bytes == one.sizeInBytes() * 2
+    assert pipeline.request(keys[2]) is False
+    # Oversized images are never retained.
+    pipeline._store(("/huge.png", 1, 0), QImage(100, 100, QImage.Format_RGB32))
+    assert pipeline.lookup(("/huge.png", 1, 0)) is None
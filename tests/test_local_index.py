@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import numpy as np
+
+from zimx.rag.index import QueryScope
+from zimx.rag.local_index import LocalVaultIndex
+from zimx.server.vector import VectorIndexManager
+
+
+class _LetterEmbedding:
+    """Deterministic letter-frequency vectors; records every document it embeds."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def __call__(self, input: list[str]) -> list[list[float]]:
+        self.calls.extend(input)
+        return [[float(doc.lower().count(letter)) + 0.1 for letter in "abcdefghijklmnopqrstuvwxyz"] for doc in input]
+
+
+def _paragraphs(*words: str) -> str:
+    return "\n\n".join((word + " ") * 300 for word in words)
+
+
+def test_local_index_embeds_only_changed_chunks_and_persists(tmp_path) -> None:
+    embedder = _LetterEmbedding()
+    index = LocalVaultIndex(str(tmp_path), embedding_function=embedder)
+    first = index.index_text("/Page.md", _paragraphs("alpha", "bravo", "charlie"), kind="page")
+    assert first.embedded == first.chunks and not first.skipped
+    embedder.calls.clear()
+
+    assert index.index_text("/Page.md", _paragraphs("alpha", "bravo", "charlie"), kind="page").skipped
+    second = index.index_text("/Page.md", _paragraphs("alpha", "bravo", "delta"), kind="page")
+    assert 0 < second.embedded < second.chunks
+    assert second.kept + second.embedded == second.chunks
+    assert all("charlie" not in doc for doc in embedder.calls)
+    # The removed chunk's row is reused rather than growing the matrix.
+    assert index._high_water == first.chunks
+    index.close()
+
+    embedder.calls.clear()
+    reopened = LocalVaultIndex(str(tmp_path), embedding_function=embedder)
+    assert reopened.index_text("/Page.md", _paragraphs("alpha", "bravo", "delta"), kind="page").skipped
+    assert embedder.calls == []
+    hits = reopened.query({"kind": "page"}, "delta delta", limit=1)
+    assert hits and "delta" in hits[0].content and hits[0].page_ref == "/Page.md"
+
+    reopened.delete_page("/Page.md")
+    assert reopened.query({"kind": "page"}, "delta", limit=4) == []
+
+
+def test_local_index_retrieve_filters_scopes_like_chroma(tmp_path) -> None:
+    index = LocalVaultIndex(str(tmp_path), embedding_function=_LetterEmbedding())
+    index.index_text("/Notes.md", _paragraphs("kiwi", "mango"), kind="page")
+    index.index_text("/Notes.md", "kiwi attachment notes", kind="attachment", attachment="kiwi.pdf")
+    index.index_text("/Other.md", "kiwi elsewhere", kind="page")
+
+    chunks = index.retrieve(
+        "kiwi",
+        [
+            QueryScope(kind="attachment", attachment_names=["kiwi.pdf"], limit=2),
+            QueryScope(kind="page", page_refs=["/Notes.md"], limit=4),
+        ],
+    )
+    assert chunks[0].attachment_name == "kiwi.pdf"
+    assert {chunk.page_ref for chunk in chunks} == {"/Notes.md"}
+    assert "kiwi" in chunks[1].content
+    assert [chunk.score for chunk in chunks[1:]] == sorted(chunk.score for chunk in chunks[1:])
+
+    one_each = index.retrieve("kiwi", [QueryScope(kind="page", limit=8)], one_per_source=True)
+    assert sorted(chunk.page_ref for chunk in one_each) == ["/Notes.md", "/Other.md"]
+
+
+def test_local_index_ivf_finds_nearest_chunks(tmp_path) -> None:
+    index = LocalVaultIndex(str(tmp_path), embedding_function=_LetterEmbedding(), ivf_threshold=40, nprobe=4)
+    words = ["apple", "berry", "cocoa", "dates", "elder", "figgy", "grape", "hazel", "igloo", "jujube"]
+    index.index_texts([(f"/{word}{n}.md", f"{word} " * (n + 1), "page", None) for word in words for n in range(5)])
+    assert index._centroids is not None
+    assert (np.asarray(index._lists[: index._high_water]) >= 0).all()
+
+    hits = index.retrieve("grape grape", [QueryScope(kind=None, limit=3)])
+    assert hits and all(chunk.page_ref.startswith("/grape") for chunk in hits)
+
+    # Chunks added after training are assigned to a list straight away.
+    index.index_text("/late.md", "kiwi kiwi", kind="page")
+    assert index.retrieve("kiwi", [QueryScope(limit=1)])[0].page_ref == "/late.md"
+
+
+def test_manager_selects_local_backend(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("ZIMX_VECTOR_BACKEND", "local")
+    manager = VectorIndexManager()
+    assert manager.backend == "local"
+    store = manager._get(tmp_path)
+    assert isinstance(store, LocalVaultIndex)
+    store._embedding_function = _LetterEmbedding()
+    manager.index_text(tmp_path, "/Page.md", "plum pudding", kind="page")
+    assert manager.query(tmp_path, "plum", kind="page")[0].page_ref == "/Page.md"
+    manager.close_all()
+
+
+def test_local_index_filtered_query_uses_ivf_above_threshold(tmp_path) -> None:
+    index = LocalVaultIndex(str(tmp_path), embedding_function=_LetterEmbedding(), ivf_threshold=40, nprobe=2)
+    words = ["apple", "berry", "cocoa", "dates", "elder", "figgy", "grape", "hazel", "igloo", "jujube"]
+    items = [(f"/{word}{n}.md", f"{word} " * (n + 1), "page", None) for word in words for n in range(5)]
+    items += [(f"/{word}0.md", f"{word} notes", "attachment", f"{word}.pdf") for word in words]
+    index.index_texts(items)
+    assert index._centroids is not None
+
+    scope = QueryScope(kind="page", limit=3)
+    candidates = index._candidates(np.asarray(index.embed_query("grape grape"), dtype=np.float32), scope)
+    assert 3 <= len(candidates) < 50
+    assert set(index._row_kinds[candidates]) == {index._kind_codes["page"]}
+    hits = index.retrieve("grape grape", [scope])
+    assert hits and all(chunk.page_ref.startswith("/grape") and chunk.attachment_name is None for chunk in hits)
+
+    many_pages = [f"/{word}{n}.md" for word in words for n in range(5)]
+    attachment_hits = index.retrieve(
+        "grape", [QueryScope(kind="attachment", page_refs=many_pages, attachment_names=["grape.pdf"], limit=2)]
+    )
+    assert [chunk.attachment_name for chunk in attachment_hits] == ["grape.pdf"]
+
+    # Codes survive a reopen.
+    index.close()
+    reopened = LocalVaultIndex(str(tmp_path), embedding_function=_LetterEmbedding(), ivf_threshold=40, nprobe=2)
+    hits = reopened.retrieve("grape", [QueryScope(kind="attachment", page_refs=["/grape0.md"], limit=2)])
+    assert [chunk.attachment_name for chunk in hits] == ["grape.pdf"]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+
+from zimx.app.ui import page_load_logger
+from zimx.app.ui.page_load_logger import (
+    PageLoadLogger,
+    chrome_trace,
+    clear_traces,
+    export_chrome_trace,
+    parse_server_timing,
+    stage_summary,
+)
+
+
+def test_spans_feed_stage_percentiles() -> None:
+    clear_traces()
+    for ms in range(1, 21):
+        tracer = PageLoadLogger(f"/page{ms}.md")
+        tracer.add_span("display conversion", 0.0, ms / 1000.0)
+        with tracer.span("toc"):
+            pass
+        tracer.end()
+    summary = stage_summary()
+    assert summary["display conversion"]["count"] == 20
+    assert summary["display conversion"]["p50_ms"] == 10.0
+    assert summary["display conversion"]["p95_ms"] == 19.0
+    assert summary["display conversion"]["max_ms"] == 20.0
+    assert summary["toc"]["count"] == 20
+    assert summary["total"]["count"] == 20
+
+
+def test_ring_buffer_drops_oldest_traces() -> None:
+    clear_traces()
+    for idx in range(page_load_logger.PAGE_TRACE_CAPACITY + 5):
+        PageLoadLogger(f"/p{idx}.md")
+    traces = page_load_logger.recent_traces()
+    assert len(traces) == page_load_logger.PAGE_TRACE_CAPACITY
+    assert traces[0].path == "/p5.md"
+
+
+def test_chrome_trace_export(tmp_path) -> None:
+    clear_traces()
+    tracer = PageLoadLogger("/Home.md")
+    with tracer.span("http /api/file/read", bytes=12):
+        pass
+    tracer.end("ready")
+    target = export_chrome_trace(tmp_path / "trace.json")
+    data = json.loads(target.read_text(encoding="utf-8"))
+    assert data == json.loads(json.dumps(chrome_trace()))
+    spans = [e for e in data["traceEvents"] if e["ph"] == "X"]
+    assert {e["name"] for e in spans} == {"http /api/file/read", "total"}
+    http = next(e for e in spans if e["name"] == "http /api/file/read")
+    assert http["args"]["bytes"] == 12
+    assert http["args"]["path"] == "/Home.md"
+    assert any(e["ph"] == "i" and e["name"] == "ready" for e in data["traceEvents"])
+
+
+def test_parse_server_timing() -> None:
+    assert parse_server_timing("file-read;dur=1.5, rev-lookup;desc=\"db\";dur=0.25") == [
+        ("file-read", 1.5),
+        ("rev-lookup", 0.25),
+    ]
+    assert parse_server_timing(None) == []
+    assert parse_server_timing("miss") == [("miss", 0.0)]
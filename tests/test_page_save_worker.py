@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+
+import httpx
+
+from zimx.app.ui.page_save_worker import PageSaveJob, PageSaveWorker
+
+
+class _FakeServer:
+    def __init__(self, status: int = 200) -> None:
+        self.status = status
+        self.writes: list[tuple[str, str]] = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def post(self, url: str, json: dict, headers=None) -> httpx.Response:
+        self.started.set()
+        self.gate.wait(5)
+        self.writes.append((json["path"], json["content"]))
+        body = {"rev": len(self.writes)}
+        if self.status == 409:
+            body = {"detail": {"current_content": "remote", "current_rev": 7}}
+        return httpx.Response(self.status, json=body, request=httpx.Request("POST", url))
+
+
+def _job(path: str, text: str) -> PageSaveJob:
+    return PageSaveJob(path=path, snapshot=text, serialize=str.upper)
+
+
+def test_queued_saves_for_a_page_are_coalesced() -> None:
+    server = _FakeServer()
+    worker = PageSaveWorker(server.post)
+    server.gate.clear()
+    worker.submit(_job("/A.md", "first"))
+    assert server.started.wait(5)
+    # While the first write is in flight, later snapshots collapse into one write.
+    worker.submit(_job("/A.md", "second"))
+    worker.submit(_job("/A.md", "third"))
+    worker.submit(_job("/B.md", "other"))
+    assert worker.is_pending("/A.md")
+    server.gate.set()
+    results = worker.flush()
+    assert server.writes == [("/A.md", "FIRST"), ("/A.md", "THIRD"), ("/B.md", "OTHER")]
+    assert [r.status for r in results] == ["saved", "saved", "saved"]
+    assert results[1].job.coalesced == 1
+    assert results[1].payload == {"rev": 2}
+    assert not worker.is_pending()
+    # Results returned by flush are owned by the caller; signal handlers must skip them.
+    assert all(not worker.claim(r) for r in results)
+
+
+def test_conflict_and_failures_are_reported() -> None:
+    server = _FakeServer(status=409)
+    worker = PageSaveWorker(server.post)
+    worker.submit(_job("/A.md", "local"))
+    (result,) = worker.flush("/A.md")
+    assert result.status == "conflict"
+    assert result.content == "LOCAL"
+    assert result.payload["detail"]["current_rev"] == 7
+
+    def broken(_snapshot):
+        raise ValueError("boom")
+
+    worker.submit(PageSaveJob(path="/B.md", snapshot="x", serialize=broken))
+    (failed,) = worker.shutdown()
+    assert failed.status == "failed"
+    assert "boom" in failed.error
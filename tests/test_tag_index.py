@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from zimx.app import config
+from zimx.app.tag_index import TagIndex
+
+
+def _brute(pages: dict[str, set[str]], all_of=(), any_of=()) -> list[str]:
+    return sorted(
+        path
+        for path, tags in pages.items()
+        if set(all_of) <= tags and (not any_of or tags & set(any_of))
+    )
+
+
+def test_index_matches_brute_force_through_updates() -> None:
+    rng = random.Random(7)
+    tags = [f"t{n}" for n in range(8)]
+    pages = {f"/P{n}.md": set(rng.sample(tags, rng.randint(0, 4))) for n in range(60)}
+    index = TagIndex((path, tag) for path, page_tags in pages.items() for tag in page_tags)
+    for step in range(200):
+        path = f"/P{rng.randrange(80)}.md"
+        new_tags = set(rng.sample(tags, rng.randint(0, 4)))
+        index.set_page_tags(path, new_tags)
+        if new_tags:
+            pages[path] = new_tags
+        else:
+            pages.pop(path, None)
+        if step % 50 == 0:
+            assert index.tag_counts() == sorted(
+                (tag, sum(tag in t for t in pages.values())) for tag in tags if any(tag in t for t in pages.values())
+            )
+    for query in (("t1",), ("t1", "t2"), ("t3", "t4", "t5")):
+        assert index.query(all_of=query) == _brute(pages, all_of=query)
+        assert index.query(any_of=query) == _brute(pages, any_of=query)
+        assert index.query(all_of=query[:1], any_of=query[1:]) == _brute(pages, query[:1], query[1:])
+    both = _brute(pages, all_of=("t1", "t2"))
+    expected = sorted(
+        ((tag, sum(tag in pages[p] for p in both)) for tag in tags if tag not in ("t1", "t2")),
+        key=lambda item: (-item[1], item[0]),
+    )
+    assert index.related_tags(all_of=("t1", "t2"), k=3) == [item for item in expected if item[1]][:3]
+    shared = {tag: len(_brute(pages, all_of=("t0", tag))) for tag in tags if tag != "t0"}
+    assert dict(index.cooccurring("t0", k=10)) == {tag: n for tag, n in shared.items() if n}
+
+
+def test_rename_and_remove() -> None:
+    index = TagIndex([("/A.md", "x"), ("/A.md", "y"), ("/B.md", "x")])
+    index.rename_page("/A.md", "/C.md")
+    assert index.query(all_of=("x", "y")) == ["/C.md"]
+    index.remove_page("/C.md")
+    assert index.tag_counts() == [("x", 1)]
+    assert index.cooccurring("x") == []
+
+
+@pytest.fixture
+def vault(tmp_path):
+    config.set_active_vault(str(tmp_path))
+    yield
+    config.set_active_vault(None)
+
+
+def test_config_tag_queries_follow_page_index(vault) -> None:
+    config.update_page_index("/A.md", "A", ["@work", "@urgent"], [], [])
+    config.update_page_index("/B.md", "B", ["@work"], [], [])
+    assert config.fetch_tag_summary() == [("@urgent", 1), ("@work", 2)]
+    assert config.query_tagged_pages(all_of=["@work", "@urgent"]) == ["/A.md"]
+    assert config.fetch_related_tags(all_of=["@work"]) == [("@urgent", 1)]
+
+    config.update_page_index("/B.md", "B", ["@work", "@urgent", "@home"], [], [])
+    assert config.query_tagged_pages(all_of=["@work", "@urgent"]) == ["/A.md", "/B.md"]
+    assert config.query_tagged_pages(any_of=["@home", "@missing"]) == ["/B.md"]
+    assert config.fetch_related_tags(all_of=["@work"]) == [("@urgent", 2), ("@home", 1)]
+
+    config.delete_page_index("/A.md")
+    assert config.fetch_tag_summary() == [("@home", 1), ("@urgent", 1), ("@work", 1)]
+    config._reset_tag_index()
+    assert config.fetch_tag_summary() == [("@home", 1), ("@urgent", 1), ("@work", 1)]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from zimx.app import config, indexer
+from zimx.app.task_context import TaskContextCache
+
+
+@pytest.fixture
+def vault(tmp_path):
+    config.set_active_vault(str(tmp_path))
+    pages = {
+        "/Alpha.md": "- [ ] Plan alpha @work <2030-01-10 !!\n- [x] Done thing\n",
+        "/Beta.md": "- [ ] Beta kickoff @work\n",
+        "/Gamma.md": "- [ ] Gamma task >2030-02-01\n",
+    }
+    for path, content in pages.items():
+        config.update_page_index(path, path, [], [], indexer.extract_tasks(path, content))
+    yield
+    config.set_active_vault(None)
+
+
+def test_sections_and_insight_input(vault) -> None:
+    cache = TaskContextCache()
+    universe = config.load_task_universe()
+    sections = cache.sections(universe)
+    assert list(sections) == ["/Alpha.md", "/Beta.md", "/Gamma.md"]
+    assert sections["/Alpha.md"].splitlines() == [
+        "- [ ] Plan alpha !! work <2030-01-10 :: /Alpha.md",
+        "- [x] Done thing :: /Alpha.md",
+    ]
+    text = cache.insight_input(universe, today=date(2030, 1, 12))
+    assert "Total tasks: 4 (open: 3, done: 1)" in text
+    assert "Overdue open tasks: 1" in text
+    assert "Future start tasks: 1" in text
+    assert "work: 2" in text
+    assert text.endswith("- [ ] Gamma task >2030-02-01 :: /Gamma.md")
+    assert cache.insight_input(universe, today=date(2030, 1, 12)) is text
+    assert cache.insight_input(universe, max_lines=1, today=date(2030, 1, 12)).endswith("[truncated]")
+
+
+def test_only_changed_pages_are_synced(vault) -> None:
+    cache = TaskContextCache()
+    first = cache.pending_sync(config.load_task_universe(), {})
+    assert first.full and sorted(first.upload) == ["/Alpha.md", "/Beta.md", "/Gamma.md"]
+    uploaded = dict(first.digests)
+
+    config.update_page_index("/Beta.md", "/Beta.md", [], [], indexer.extract_tasks("/Beta.md", "- [x] Beta kickoff @work\n"))
+    config.delete_page_index("/Gamma.md")
+    universe = config.load_task_universe()
+    sync = cache.pending_sync(universe, uploaded)
+    assert not sync.full
+    assert list(sync.upload) == ["/Beta.md"]
+    assert sync.upload["/Beta.md"] == "- [x] Beta kickoff work :: /Beta.md"
+    assert sync.remove == ["/Gamma.md"]
+    # The incrementally patched sections match a from-scratch build.
+    assert cache.sections(universe) == TaskContextCache().sections(universe)
+
+    uploaded.update(sync.digests)
+    uploaded.pop("/Gamma.md")
+    assert not cache.pending_sync(universe, uploaded)
+
+
+def test_uploaded_digests_round_trip(vault) -> None:
+    config.save_task_context_digests({"/A.md": "abc", "/B.md": "def"})
+    config.save_task_context_digests({"/B.md": None})
+    assert config.load_task_context_digests() == {"/A.md": "abc"}
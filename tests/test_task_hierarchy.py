@@ -128,3 +128,61 @@ def test_actionable_filter_respects_non_actionable_tags(temp_db, monkeypatch) ->
 
     assert "waiting around" not in names_actionable
     assert "do now" in names_actionable
+
+
+def test_fetch_tasks_returns_deep_ancestors_and_tags_in_one_pass(temp_db) -> None:
+    path = "/Deep/Deep.md"
+    content = "\n".join(f"{'    ' * depth}- [ ] level {depth} @l{depth}" for depth in range(8))
+    tasks = indexer.extract_tasks(path, content)
+    config.update_page_index(path=path, title="Deep", tags=[], links=[], tasks=tasks)
+
+    fetched = config.fetch_tasks(query="level 7", include_done=False, include_ancestors=True)
+    assert [t["text"] for t in fetched] == [f"level {depth}" for depth in range(8)]
+    # Tags are inherited from every ancestor and come back with the row.
+    assert set(fetched[-1]["tags"]) == {f"l{depth}" for depth in range(8)}
+    assert isinstance(fetched[-1]["tags"], tuple)
+
+    again = config.fetch_tasks(query="level 7", include_done=False, include_ancestors=True)
+    assert again == fetched and again[0] is fetched[0]
+    # Cached rows are shared, so callers get read-only views.
+    with pytest.raises(TypeError):
+        fetched[-1]["text"] = "changed"
+    assert config.fetch_tasks(query="level 7", include_done=False, include_ancestors=True)[-1]["text"] == "level 7"
+
+
+def test_reindex_diffs_tasks_by_stable_id(temp_db) -> None:
+    path = "/Plan.md"
+    original = "- [ ] Write spec @work\n- [ ] Review spec\n- [ ] Review spec\n"
+    config.update_page_index(path, "Plan", [], [], indexer.extract_tasks(path, original))
+    before = {t["text"] + str(t["line"]): t["id"] for t in config.fetch_tasks(include_done=True)}
+    assert len(set(before.values())) == 3
+    version = config.get_task_index_version()
+
+    # A line inserted above shifts every task but only adds one new identity.
+    edited = "Intro\n- [ ] New task\n- [x] Write spec @work @urgent\n- [ ] Review spec\n- [ ] Review spec\n"
+    config.update_page_index(path, "Plan", [], [], indexer.extract_tasks(path, edited))
+    after = config.fetch_tasks(include_done=True)
+    by_text = {t["text"]: t for t in after}
+    assert by_text["Write spec"]["id"] == before["Write spec1"]
+    assert by_text["Write spec"]["line"] == 3
+    assert by_text["Write spec"]["tags"] == ("urgent", "work")
+    assert config.fetch_tasks("spec", include_done=True)
+
+    changed = config.task_changes_since(version)
+    review_ids = {t["id"] for t in after if t["text"] == "Review spec"}
+    assert by_text["New task"]["id"] in changed
+    assert by_text["Write spec"]["id"] in changed
+    assert review_ids <= changed  # their line numbers moved
+
+    # Re-indexing identical content touches nothing and keeps the version.
+    version = config.get_task_index_version()
+    config.update_page_index(path, "Plan", [], [], indexer.extract_tasks(path, edited))
+    assert config.get_task_index_version() == version
+    assert config.task_changes_since(version) == set()
+
+    config.delete_page_index(path)
+    assert config.task_changes_since(version) == {t["id"] for t in after}
+    assert config.task_pages_changed_since(version) == {path}
+    config.bump_task_index_version()
+    assert config.task_changes_since(version) is None
+    assert config.task_pages_changed_since(version) is None
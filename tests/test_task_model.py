@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtTest import QAbstractItemModelTester
+
+from zimx.app.ui.task_model import (
+    COLUMN_DUE,
+    COLUMN_PRIORITY,
+    COLUMN_TASK,
+    TaskRowFormatter,
+    TaskTreeModel,
+    display_spans,
+)
+from zimx.app.task_universe import TaskTextMatch, TaskUniverse
+
+def _task(tid: str, path: str, line: int, text: str, parent: str | None = None, **extra) -> dict:
+    task = {
+        "id": tid,
+        "path": path,
+        "line": line,
+        "text": text,
+        "status": "todo",
+        "priority": 0,
+        "due": None,
+        "starts": None,
+        "parent": parent,
+        "level": 1 if parent else 0,
+        "actionable": True,
+        "tags": [],
+    }
+    task.update(extra)
+    return task
+
+
+def _model() -> tuple[TaskTreeModel, list[tuple]]:
+    model = TaskTreeModel()
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal, model)
+    model.set_columns((COLUMN_PRIORITY, COLUMN_TASK, COLUMN_DUE))
+    events: list[tuple] = []
+    model.modelReset.connect(lambda: events.append(("reset",)))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("remove", first, last)))
+    model.dataChanged.connect(lambda tl, br, roles: events.append(("changed", tl.row())))
+    return model, events
+
+
+def _texts(model: TaskTreeModel, parent: QModelIndex = QModelIndex()) -> list[str]:
+    return [model.index(row, 1, parent).data() for row in range(model.rowCount(parent))]
+
+
+def test_hierarchy_and_sorting() -> None:
+    model, _events = _model()
+    tasks = [
+        _task("a:1", "/A.md", 1, "beta"),
+        _task("a:2", "/A.md", 2, "child", parent="a:1"),
+        _task("b:1", "/B.md", 1, "alpha"),
+    ]
+    assert model.set_tasks(tasks) is True
+    model.sort(1, Qt.AscendingOrder)
+    assert _texts(model) == ["alpha", "beta"]
+    beta = model.index(1, 0)
+    assert _texts(model, beta) == ["child"]
+    assert model.parent(model.index(0, 0, beta)) == beta
+    model.sort(1, Qt.DescendingOrder)
+    assert _texts(model) == ["beta", "alpha"]
+    assert model.index_for_task("a:2").data(Qt.UserRole)["text"] == "child"
+
+
+def test_saving_one_page_only_touches_its_rows() -> None:
+    model, events = _model()
+    tasks = [_task(f"p{n}:1", f"/P{n}.md", 1, f"task {n:02d}") for n in range(40)]
+    model.set_tasks(tasks)
+    model.sort(1, Qt.AscendingOrder)
+    events.clear()
+
+    updated = list(tasks)
+    updated[5] = _task("p5:1", "/P5.md", 1, "task 05", priority=2)
+    updated.insert(6, _task("p5:2", "/P5.md", 2, "task 05 b"))
+    assert model.set_tasks(updated) is False
+    assert events == [("changed", 5), ("insert", 6, 6)]
+    assert model.index(5, 0).data() == "!!"
+
+    events.clear()
+    assert model.set_tasks(tasks) is False
+    assert events == [("changed", 5), ("remove", 6, 6)]
+    assert model.task_count() == 40
+
+
+def test_reparenting_moves_subtree() -> None:
+    model, _events = _model()
+    parent = _task("a:1", "/A.md", 1, "parent")
+    child = _task("a:2", "/A.md", 2, "child", parent="a:1")
+    grandchild = _task("a:3", "/A.md", 3, "grandchild", parent="a:2")
+    filler = [_task(f"f{n}", "/F.md", n, f"filler {n}") for n in range(10)]
+    model.set_tasks([parent, child, grandchild, *filler])
+    # Outdenting the child takes its own subtree along with it.
+    model.set_tasks([parent, dict(child, parent=None, level=0), grandchild, *filler])
+    assert model.rowCount(model.index_for_task("a:1")) == 0
+    moved = model.index_for_task("a:2")
+    assert moved.parent() == QModelIndex()
+    assert _texts(model, moved) == ["grandchild"]
+
+
+def test_row_formatting() -> None:
+    today = date(2024, 5, 10)
+    formatter = TaskRowFormatter((COLUMN_PRIORITY, COLUMN_TASK, COLUMN_DUE), today=today)
+    overdue = formatter.format(
+        _task("x", "/X.md", 1, "see [docs](https://example.com)", priority=3, due=str(today - timedelta(days=1)))
+    )
+    assert overdue.texts == ("OD !!!", "see docs", "2024-05-09")
+    assert overdue.background[0].name() == "#cc0000"
+    assert overdue.fonts[0].underline()
+    assert overdue.tooltip == "see [docs](https://example.com)"
+    done = formatter.format(_task("y", "/Y.md", 1, "done", status="done", due=str(today + timedelta(days=20))))
+    assert done.texts[0] == "3w"
+    assert all(font.strikeOut() for font in done.fonts)
+    muted = formatter.format(_task("z", "/Z.md", 1, "blocked", actionable=False, starts=str(today + timedelta(days=3))))
+    assert muted.texts[0] == ">3d"
+    assert {color.name() for color in muted.foreground} == {"#666666"}
+
+
+def test_formatter_reads_precomputed_day_columns() -> None:
+    today = date(2024, 5, 10)
+    formatter = TaskRowFormatter((COLUMN_PRIORITY, COLUMN_DUE), today=today)
+    tomorrow = today + timedelta(days=1)
+    parsed = formatter.format(_task("x", "/X.md", 1, "x", due=str(tomorrow)))
+    # Universe tasks carry the parsed ordinal; it wins over the ISO text.
+    precomputed = formatter.format(_task("y", "/Y.md", 1, "y", due="2024-05-11", due_day=tomorrow.toordinal()))
+    assert parsed.texts == precomputed.texts == ("1d", "2024-05-11")
+    assert precomputed.background[1].name() == "#fdd835"
+    invalid = formatter.format(_task("z", "/Z.md", 1, "z", priority=1, due="someday"))
+    assert invalid.texts[0] == "!"
+    assert invalid.background[1] is None
+
+
+def test_changed_ids_limit_comparison() -> None:
+    model, events = _model()
+    tasks = [_task(f"p{n}:1", f"/P{n}.md", 1, f"task {n:02d}") for n in range(10)]
+    model.set_tasks(tasks)
+    events.clear()
+    fresh = [dict(task) for task in tasks]
+    fresh[3]["actionable"] = False
+    fresh[4]["actionable"] = False
+    assert model.set_tasks(fresh, changed_ids={"p3:1"}) is False
+    assert events == [("changed", 3)]
+    # Untouched rows still hand out the newest task dicts.
+    assert model.task_at(model.index_for_task("p0:1")) is fresh[0]
+
+
+def test_highlight_spans_follow_display_text() -> None:
+    raw = "read [docs](https://example.com/docs) today"
+    assert display_spans(raw, "read docs today", [(6, 10), (38, 43)]) == ((5, 9), (10, 15))
+    assert display_spans(raw, "read docs today", [(12, 17)]) == ()  # inside the hidden URL
+    model, _events = _model()
+    model.set_tasks([_task("a:1", "/A.md", 1, raw)])
+    model.set_highlights({"a:1": TaskTextMatch(-1.0, ((6, 10),))})
+    assert model.index(0, 1).data(TaskTreeModel.HighlightRole) == ((5, 9),)
+    assert model.index(0, 0).data(TaskTreeModel.HighlightRole) is None
+
+
+def test_sorting_reads_universe_ranks() -> None:
+    today = date.today()
+    tasks = [
+        _task("a:1", "/A.md", 1, "later", due=str(today + timedelta(days=9))),
+        _task("b:1", "/B.md", 1, "undated", priority=3),
+        _task("c:1", "/C.md", 1, "overdue", due=str(today - timedelta(days=2)), priority=1),
+        _task("d:1", "/D.md", 1, "today", due=str(today), priority=2),
+    ]
+    universe = TaskUniverse(tasks)
+    model, events = _model()
+    model.set_tasks(universe.tasks, universe=universe)
+    model.sort(2, Qt.AscendingOrder)
+    assert _texts(model) == ["undated", "overdue", "today", "later"]
+    assert model.index(1, 2).data(Qt.BackgroundRole).name() == "#cc0000"
+    assert model.index(2, 0).data() == "0d !!"
+    model.sort(0, Qt.DescendingOrder)
+    assert _texts(model) == ["later", "today", "overdue", "undated"]
+
+    # A new snapshot with one task moved to tomorrow relocates just that row.
+    events.clear()
+    moved = [dict(task) for task in tasks]
+    moved[0]["due"] = str(today + timedelta(days=1))
+    fresh = TaskUniverse(moved)
+    assert model.set_tasks(fresh.tasks, universe=fresh) is False
+    assert events == [("remove", 0, 0), ("insert", 0, 0)]
+    assert _texts(model) == ["later", "today", "overdue", "undated"]
+    assert model.index(0, 2).data(Qt.BackgroundRole).name() == "#fdd835"
+    model.sort(2, Qt.AscendingOrder)
+    assert _texts(model) == ["undated", "overdue", "today", "later"]
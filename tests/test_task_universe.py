@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from zimx.app import config, indexer
+from zimx.app.task_universe import DUE_LATER, DUE_NONE, DUE_OVERDUE, DUE_TODAY, DUE_TOMORROW, TaskUniverse
+
+
+@pytest.fixture
+def vault(tmp_path):
+    config.set_active_vault(str(tmp_path))
+    pages = {
+        "/Projects/Alpha.md": """
+- [ ] Plan alpha @work <2030-01-10
+    - [ ] Draft outline @writing
+    - [x] Book room @work
+- [ ] Start later @work >2999-01-01
+""".strip(),
+        "/Projects/Beta/Beta.md": "- [ ] Beta kickoff @work !!\n- [ ] Waiting on vendor @waiting\n",
+        "/Journal/2024/01/01.md": "- [ ] Journal follow-up @home\n",
+        "/Home.md": "- [ ] Buy milk @home\n- [x] Pay rent\n",
+    }
+    for path, content in pages.items():
+        config.update_page_index(path, path, [], [], indexer.extract_tasks(path, content))
+    yield
+    config.set_active_vault(None)
+
+
+def _ids(tasks) -> list[str]:
+    return [task["id"] for task in tasks]
+
+
+@pytest.mark.parametrize(
+    "query, tags, include_done, actionable_only",
+    [
+        ("", (), False, False),
+        ("", (), True, False),
+        ("", (), False, True),
+        ("", ("work",), True, False),
+        ("beta", (), False, True),
+        ("", ("work", "writing"), False, False),
+    ],
+)
+def test_select_matches_fetch_tasks(vault, query, tags, include_done, actionable_only) -> None:
+    universe = config.load_task_universe()
+    expected = config.fetch_tasks(
+        query, list(tags), include_done=include_done, include_ancestors=True, actionable_only=actionable_only
+    )
+    mask = universe.select(
+        query, tags, include_done=include_done, include_ancestors=True, actionable_only=actionable_only
+    )
+    selected = universe.tasks_for(mask)
+    assert _ids(selected) == _ids(expected)
+    assert [t["actionable"] for t in selected] == [t["actionable"] for t in expected]
+    assert config.load_task_universe() is universe
+
+
+def test_path_journal_date_masks_and_tag_counts(vault) -> None:
+    universe = config.load_task_universe()
+    projects = universe.tasks_for(universe.path_mask("/Projects"))
+    assert {task["path"] for task in projects} == {"/Projects/Alpha.md", "/Projects/Beta/Beta.md"}
+    assert {t["path"] for t in universe.tasks_for(universe.path_mask("/Projects/Alpha.md"))} == {"/Projects/Alpha.md"}
+    assert {t["path"] for t in universe.tasks_for(universe.journal_mask())} == {"/Journal/2024/01/01.md"}
+    assert [t["text"] for t in universe.tasks_for(universe.starts_mask(start="2100-01-01"))] == ["Start later"]
+    due = universe.tasks_for(universe.due_mask("2030-01-10", "2030-01-10"))
+    assert "Plan alpha" in [t["text"] for t in due]
+
+    counts = dict(universe.tag_counts(universe.all_mask, include_done=False))
+    assert counts["work"] == 4  # inherited by "Draft outline"; done "Book room" is excluded
+    assert counts["home"] == 2
+    assert dict(universe.tag_counts(universe.all_mask))["work"] == 5
+
+
+def test_attribute_columns(vault) -> None:
+    universe = config.load_task_universe()
+    for pos, task in enumerate(universe.tasks):
+        expected_due = date.fromisoformat(task["due"]).toordinal() if task["due"] else 0
+        expected_start = date.fromisoformat(task["starts"]).toordinal() if task["starts"] else 0
+        assert universe.due_day[pos] == task["due_day"] == expected_due
+        assert universe.start_day[pos] == task["start_day"] == expected_start
+        assert universe.priority[pos] == (task["priority"] or 0)
+        assert universe.position(task["id"]) == pos
+    beta = universe.position(next(task["id"] for task in universe.tasks if task["text"] == "Beta kickoff"))
+    assert universe.priority[beta] == 2
+
+
+def test_due_classes_and_ranks() -> None:
+    today = date(2024, 5, 10).toordinal()
+    dues = {"a": "2024-05-09", "b": "2024-05-10", "c": "2024-05-11", "d": "2024-06-01", "e": None}
+    universe = TaskUniverse(
+        {"id": tid, "path": f"/{tid}.md", "line": 1, "text": tid, "due": due} for tid, due in dues.items()
+    )
+    classes = universe.due_classes(today)
+    assert [classes[universe.position(tid)] for tid in "abcde"] == [
+        DUE_OVERDUE, DUE_TODAY, DUE_TOMORROW, DUE_LATER, DUE_NONE
+    ]
+    assert universe.due_classes(today) is classes
+
+    ranks = universe.ranks("due-desc", lambda pos: -universe.due_day[pos])
+    assert sorted("abcde", key=lambda tid: ranks[universe.position(tid)]) == list("dcbae")
+    assert universe.ranks("due-desc", lambda pos: 0) is ranks
+
+
+def test_universe_rebuilds_after_index_change(vault) -> None:
+    before = config.load_task_universe()
+    config.update_page_index("/Home.md", "Home", [], [], indexer.extract_tasks("/Home.md", "- [ ] Only task\n"))
+    after = config.load_task_universe()
+    assert after is not before
+    assert [t["text"] for t in after.tasks_for(after.path_mask("/Home.md"))] == ["Only task"]
+
+
+@pytest.mark.parametrize("prefix", ["/Projects", "/Projects/", "/Projects/Beta", "/Projects/Alpha.md", "/Home", "/Nope"])
+def test_fetch_tasks_path_prefix_matches_universe(vault, prefix) -> None:
+    universe = config.load_task_universe()
+    expected = universe.tasks_for(universe.select(include_done=True) & universe.path_mask(prefix))
+    assert _ids(config.fetch_tasks(include_done=True, path_prefix=prefix)) == _ids(expected)
+
+
+def test_fetch_tasks_excludes_journal(vault) -> None:
+    paths = {t["path"] for t in config.fetch_tasks(include_done=True, exclude_journal=True)}
+    assert "/Journal/2024/01/01.md" not in paths
+    assert "/Home.md" in paths
+    conn = config._get_conn()
+    plan = " ".join(
+        str(row[-1])
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT task_id FROM tasks t WHERE t.folder >= ? AND t.folder < ?",
+            ("/Projects/", "/Projects0"),
+        )
+    )
+    assert "idx_tasks_folder" in plan
+
+
+def test_normalize_fts_query() -> None:
+    assert config._normalize_fts_query("beta kick") == '"beta"* "kick"*'
+    assert config._normalize_fts_query('"waiting on" vendor') == '"waiting on" "vendor"*'
+    assert config._normalize_fts_query("follow-up now") == '"follow up"* "now"*'
+    # Tags stay substring matches: FTS would also match the bare word.
+    assert config._normalize_fts_query("follow-up @home") == ""
+    assert config._normalize_fts_query("@ !!") == ""
+
+
+def test_task_text_search_ranks_and_highlights(vault) -> None:
+    matches = config.match_task_text("kick")
+    beta = next(task for task in config.fetch_tasks(include_done=True) if task["text"] == "Beta kickoff")
+    assert list(matches) == [beta["id"]]
+    match = matches[beta["id"]]
+    assert [beta["text"][start:end] for start, end in match.spans] == ["kickoff"]
+
+    assert [t["text"] for t in config.fetch_tasks('"waiting on"')] == ["Waiting on vendor"]
+    assert config.fetch_tasks('"on waiting"') == []
+    hit = config.fetch_tasks("vendor")[0]
+    assert hit["highlights"] == ((11, 17),) and hit["rank"] < 0
+
+    universe = config.load_task_universe()
+    assert universe.text_matches("kick") == matches
+    assert [t["text"] for t in universe.tasks_for(universe.text_mask("plan alp"))] == ["Plan alpha"]
+    # Nothing indexable: substring matching.
+    assert universe.text_matches("@") is None
+    assert universe.text_mask("@") == 0
+    assert [t["text"] for t in config.fetch_tasks("vendor")] == ["Waiting on vendor"]
+    assert config.fetch_tasks("@vendor") == []
+
+
+def test_tasks_fts_rebuilt_when_out_of_step(vault, tmp_path) -> None:
+    conn = config._get_conn()
+    conn.execute("DELETE FROM tasks_fts WHERE rowid IN (SELECT rowid FROM tasks_fts LIMIT 2)")
+    conn.commit()
+    config.set_active_vault(str(tmp_path))
+    conn = config._get_conn()
+    assert conn.execute("SELECT COUNT(*) FROM tasks_fts").fetchone()[0] == conn.execute(
+        "SELECT COUNT(*) FROM tasks"
+    ).fetchone()[0]
+    assert [t["text"] for t in config.fetch_tasks("milk")] == ["Buy milk"]
+
+
+def test_tasks_fts_rows_follow_edits_deletes_and_moves(vault, tmp_path) -> None:
+    conn = config._get_conn()
+
+    def assert_in_step() -> None:
+        fts = conn.execute("SELECT rowid, task_id FROM tasks_fts ORDER BY rowid").fetchall()
+        mapped = conn.execute("SELECT fts_rowid, task_id FROM tasks_fts_rows ORDER BY fts_rowid").fetchall()
+        assert fts == mapped
+        assert {task_id for _rowid, task_id in fts} == {row[0] for row in conn.execute("SELECT task_id FROM tasks")}
+
+    assert_in_step()
+    config.update_page_index(
+        "/Home.md", "Home", [], [], indexer.extract_tasks("/Home.md", "- [ ] Buy oat milk\n- [x] Pay rent\n")
+    )
+    assert_in_step()
+    assert [t["text"] for t in config.fetch_tasks("oat")] == ["Buy oat milk"]
+    config.delete_page_index("/Home.md")
+    assert_in_step()
+    assert config.fetch_tasks("milk") == []
+    config.move_tree_index("/Projects/Beta", "/Projects/Gamma", tmp_path)
+    assert_in_step()
+    assert [t["id"].rsplit(":", 1)[0] for t in config.fetch_tasks("kickoff")] == ["/Projects/Gamma/Gamma.md"]
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+from zimx.rag.chroma import shared_embedding_function
+from zimx.server.vector import VectorIndexManager
+
+
+def test_server_import_does_not_load_chromadb() -> None:
+    code = "import sys, zimx.server.api; print('chromadb' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_stores_share_the_embedding_function_and_idle_ones_are_closed(tmp_path: Path) -> None:
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    manager = VectorIndexManager(idle_timeout=3600)
+    try:
+        store = manager._get(first)
+        assert manager._get(second).embedding_function is store.embedding_function is shared_embedding_function()
+        assert manager._get(first) is store
+
+        manager.idle_timeout = 0.0
+        manager._get(second)
+        assert not manager.is_loaded(first) and manager.is_loaded(second)
+        assert manager._get(first) is not store
+    finally:
+        manager.close_all()
+    assert not manager.is_loaded(first) and not manager.is_loaded(second)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark MarkdownHighlighter per rule and flag regressions.
+
+Usage:
+  python tools/highlighter_bench.py [page.md ...] [--out report.json] [--baseline old.json] [--tolerance 0.25]
+
+Without page arguments a synthetic page (headings, lists, tasks, links, tags, tables and
+code fences) is used. With --baseline the script exits non-zero when the total or any rule
+is slower than the baseline by more than the tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QTextDocument  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from zimx.app.ui.markdown_editor import MarkdownHighlighter  # noqa: E402
+
+
+def synthetic_page(sections: int = 200) -> str:
+    lines: list[str] = []
+    for i in range(sections):
+        lines.append(f"# Heading {i}")
+        lines.append(f"Some **bold** and *italic* text with `code` and ==marks== @tag{i % 7}. " * 3)
+        lines.append(f"- [ ] Task {i} @work <2025-01-{(i % 28) + 1:02d}")
+        lines.append(f"* Bullet with [:Projects:Page{i}|Page {i}] and https://example.com/{i}")
+        lines.append("| a | b | c |")
+        lines.append("> quoted ~~old~~ text +CamelPage")
+        if i % 10 == 0:
+            lines.append("```python")
+            lines.extend(f"def f{i}_{j}(x):\n    return x * {j}" for j in range(5))
+            lines.append("```")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def profile_text(text: str, rounds: int) -> dict:
+    doc = QTextDocument()
+    highlighter = MarkdownHighlighter(doc)
+    doc.setPlainText(text)
+    highlighter.reset_profiling()
+    highlighter.enable_profiling(True)
+    for _ in range(rounds):
+        highlighter.rehighlight()
+    highlighter.enable_profiling(False)
+    return highlighter.profile_report()
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems: list[str] = []
+    base_total = float(baseline.get("total_ms") or 0.0)
+    if base_total and report["total_ms"] > base_total * (1.0 + tolerance):
+        problems.append(f"total {report['total_ms']:.1f}ms > baseline {base_total:.1f}ms")
+    base_rules = {r["rule"]: r for r in baseline.get("rules", [])}
+    for rule in report["rules"]:
+        base = base_rules.get(rule["rule"])
+        if not base or base["total_ms"] < 1.0:
+            continue
+        if rule["total_ms"] > base["total_ms"] * (1.0 + tolerance):
+            problems.append(f"{rule['rule']} {rule['total_ms']:.1f}ms > baseline {base['total_ms']:.1f}ms")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="Markdown files to highlight (default: synthetic page)")
+    parser.add_argument("--rounds", type=int, default=3, help="Full rehighlight passes per page")
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown ratio vs baseline")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    texts = [Path(p).read_text(encoding="utf-8") for p in args.pages] or [synthetic_page()]
+    report = profile_text("\n".join(texts), max(1, args.rounds))
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(payload, encoding="utf-8")
+    print(payload)
+
+    status = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        problems = compare(report, baseline, args.tolerance)
+        for problem in problems:
+            print(f"[REGRESSION] {problem}", file=sys.stderr)
+        status = 1 if problems else 0
+    del app
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Measure server startup cost with and without AI (vector) features.
+
+Usage:
+  python tools/startup_bench.py [--runs 3] [--vaults 2] [--model] [--out report.json]
+
+Each run starts a fresh interpreter. The "core" run only imports the API
+module (what every server start pays). The "ai" run then opens the vector
+store of ``--vaults`` temporary vaults, which imports chromadb and builds one
+client per vault. With ``--model`` it also embeds a query, loading the ONNX
+model once for all vaults (needs the model downloaded or network access).
+The report has the median wall time per phase and peak RSS per mode.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def child(mode: str, vaults: int, model: bool) -> dict:
+    sys.path.insert(0, str(ROOT))
+    phases: dict[str, float] = {}
+    started = time.perf_counter()
+    # Imported for its side effects (the cost being timed), hence import_module.
+    importlib.import_module("zimx.server.api")
+
+    phases["import_api"] = time.perf_counter() - started
+    if mode == "ai":
+        from zimx.server.vector import vector_manager
+
+        with tempfile.TemporaryDirectory() as tmp:
+            roots = [Path(tmp) / f"vault{i}" for i in range(vaults)]
+            started = time.perf_counter()
+            for root in roots:
+                root.mkdir()
+                vector_manager._get(root)
+            phases["open_stores"] = time.perf_counter() - started
+            if model:
+                started = time.perf_counter()
+                for root in roots:
+                    vector_manager.query(root, "startup benchmark query")
+                phases["load_model"] = time.perf_counter() - started
+            vector_manager.close_all()
+    phases["chromadb_imported"] = float("chromadb" in sys.modules)
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    phases["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return phases
+
+
+def run(mode: str, runs: int, vaults: int, model: bool) -> dict:
+    samples: list[dict] = []
+    for _ in range(runs):
+        cmd = [sys.executable, __file__, "--child", mode, "--vaults", str(vaults)]
+        if model:
+            cmd.append("--model")
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT, check=True)
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {key: round(statistics.median(sample[key] for sample in samples), 3) for key in samples[0]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per mode (median is reported)")
+    parser.add_argument("--vaults", type=int, default=2, help="Vaults whose vector store the ai run opens")
+    parser.add_argument("--model", action="store_true", help="Also load the embedding model in the ai run")
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    parser.add_argument("--child", choices=("core", "ai"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.vaults, args.model)))
+        return 0
+
+    runs = max(1, args.runs)
+    report = {mode: run(mode, runs, args.vaults, args.model) for mode in ("core", "ai")}
+    report["ai_overhead"] = {
+        "seconds": round(
+            sum(report["ai"].get(key, 0.0) for key in ("import_api", "open_stores", "load_model"))
+            - report["core"]["import_api"],
+            3,
+        ),
+        "rss_mb": round(report["ai"]["peak_rss_mb"] - report["core"]["peak_rss_mb"], 1),
+    }
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload, encoding="utf-8")
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
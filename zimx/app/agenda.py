@@ -0,0 +1,92 @@
+"""Agenda date ranges over the indexed task dates.
+
+Task due/start dates are stored twice: as ISO text (``tasks.due``/``starts``)
+and as Julian Day Numbers (``tasks.due_jd``/``starts_jd``, the numbering used
+by ``QDate.toJulianDay``). Range questions — overdue, today, this week, a month
+grid — become integer range scans on those indexed columns via
+``config.fetch_agenda_tasks`` and ``config.task_day_counts``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional, Union
+
+# date.toordinal() of 0001-01-01 is 1; its Julian Day Number is 1721426.
+_JD_OFFSET = 1721425
+
+
+def julian_day(value: Union[date, str, None]) -> Optional[int]:
+    """Julian Day Number for a date or ISO date string; None when missing or invalid."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = date.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    return value.toordinal() + _JD_OFFSET
+
+
+def from_julian_day(jd: int) -> date:
+    return date.fromordinal(jd - _JD_OFFSET)
+
+
+@dataclass(frozen=True)
+class AgendaRange:
+    """Inclusive range of Julian days; ``overdue`` also takes tasks due before ``start``."""
+
+    start: int
+    end: int
+    overdue: bool = False
+
+    @classmethod
+    def for_dates(cls, start: date, end: date, overdue: bool = False) -> "AgendaRange":
+        return cls(julian_day(start), julian_day(end), overdue)
+
+    @property
+    def first_date(self) -> date:
+        return from_julian_day(self.start)
+
+    @property
+    def last_date(self) -> date:
+        return from_julian_day(self.end)
+
+    def __contains__(self, jd: object) -> bool:
+        return isinstance(jd, int) and self.start <= jd <= self.end
+
+
+def overdue_range(today: Optional[date] = None) -> AgendaRange:
+    """Tasks due before today (an empty day range plus the overdue flag)."""
+    jd = julian_day(today or date.today())
+    return AgendaRange(jd, jd - 1, overdue=True)
+
+
+def today_range(today: Optional[date] = None, overdue: bool = False) -> AgendaRange:
+    day = today or date.today()
+    return AgendaRange.for_dates(day, day, overdue)
+
+
+def week_range(today: Optional[date] = None, week_start: int = 0, overdue: bool = False) -> AgendaRange:
+    """The week containing ``today``; ``week_start`` is a weekday number (0 = Monday)."""
+    day = today or date.today()
+    first = day - timedelta(days=(day.weekday() - week_start) % 7)
+    return AgendaRange.for_dates(first, first + timedelta(days=6), overdue)
+
+
+def month_range(year: int, month: int) -> AgendaRange:
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return AgendaRange.for_dates(first, following - timedelta(days=1))
+
+
+def month_grid_range(year: int, month: int, week_start: int = 0) -> AgendaRange:
+    """The six weeks a month calendar shows, starting on ``week_start``."""
+    first = date(year, month, 1)
+    grid_start = first - timedelta(days=(first.weekday() - week_start) % 7)
+    return AgendaRange.for_dates(grid_start, grid_start + timedelta(days=41))
+
+
+def year_range(year: int) -> AgendaRange:
+    return AgendaRange.for_dates(date(year, 1, 1), date(year, 12, 31))
@@ -6,24 +6,48 @@ import platform
 import sqlite3
 import re
 import time
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from pathlib import Path
 from threading import RLock
-from typing import Iterable, Optional, Sequence
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
 
-from zimx.server.adapters.files import PAGE_SUFFIX, PAGE_SUFFIXES, strip_page_suffix
+from zimx.server import search_index
+from zimx.server.adapters.files import LEGACY_SUFFIX, PAGE_SUFFIX, PAGE_SUFFIXES, strip_page_suffix
+from zimx.app.agenda import AgendaRange, julian_day
+from zimx.app.tag_index import TagIndex
+from zimx.app.task_universe import JOURNAL_ROOT, TaskTextMatch, TaskUniverse, normalize_task_path, task_folder
 
 GLOBAL_CONFIG = Path.home() / ".zimx_config.json"
 
 _ACTIVE_CONN: Optional[sqlite3.Connection] = None
 _ACTIVE_ROOT: Optional[Path] = None
-_TASK_FETCH_CACHE: OrderedDict[tuple, list[dict]] = OrderedDict()
+_TASK_FETCH_CACHE: OrderedDict[tuple, tuple[Mapping[str, Any], ...]] = OrderedDict()
 
 _TASK_FETCH_CACHE_SIZE = 32
+# Snapshot of all tasks answering the task panel's views; rebuilt when the task index changes.
+_TASK_UNIVERSE: Optional[TaskUniverse] = None
 _TASKS_FTS_ENABLED = False
-_TASKS_FTS_THRESHOLD = 500
+# tasks_fts results per (task index version, FTS query).
+_TASK_MATCH_CACHE: OrderedDict[tuple[int, str], dict[str, TaskTextMatch]] = OrderedDict()
+_TASK_MATCH_CACHE_SIZE = 32
+AttachmentListener = Callable[[str, str, bool], None]
+# Called with (vault root, attachment path, removed) after the attachments table changes.
+_ATTACHMENT_LISTENERS: list[AttachmentListener] = []
+# Markers passed to FTS5 highlight(); control characters never appear in task text.
+_HIGHLIGHT_OPEN = "\x02"
+_HIGHLIGHT_CLOSE = "\x03"
 _TASK_INDEX_VERSION = 0
 _TASK_VERSION_LOCK = RLock()
+# (version, task ids and page paths changed by that bump, or None when untracked), newest last.
+_TASK_CHANGE_LOG: deque[tuple[int, Optional[tuple[frozenset[str], frozenset[str]]]]] = deque(maxlen=64)
+# Open-task counts per julian day ({jd: [due, starts]}); built lazily, then kept
+# current by the deltas update_page_index computes.
+_AGENDA_COUNTS: Optional[dict[int, list[int]]] = None
+_AGENDA_LOCK = RLock()
+# Page tag postings, built on first use and kept current by update_page_index.
+_TAG_INDEX: Optional[TagIndex] = None
+_TAG_INDEX_LOCK = RLock()
 
 _PAGE_CACHE_ROWS: list[dict] = []
 _PAGE_RESULT_CACHE: OrderedDict[str, list[dict]] = OrderedDict()
@@ -810,6 +834,37 @@ def save_default_ai_model(model: Optional[str]) -> None:
     _update_global_config({"default_ai_model": model})
 
 
+def load_ai_context_token_budget(default: int = 3000) -> int:
+    """Return the token budget for vault context added to AI chat prompts."""
+    payload = _read_global_config()
+    try:
+        val = int(payload.get("ai_context_token_budget", default))
+        return max(256, min(200_000, val))
+    except Exception:
+        return default
+
+
+def save_ai_context_token_budget(tokens: int) -> None:
+    """Persist the token budget for vault context in AI chat prompts."""
+    try:
+        val = max(256, min(200_000, int(tokens)))
+    except Exception:
+        val = 3000
+    _update_global_config({"ai_context_token_budget": val})
+
+
+def load_ai_context_tokenizer() -> Optional[str]:
+    """Load the tokenizer name used to count AI chat context tokens (None = built-in estimate)."""
+    payload = _read_global_config()
+    name = payload.get("ai_context_tokenizer")
+    return str(name) if name else None
+
+
+def save_ai_context_tokenizer(name: Optional[str]) -> None:
+    """Persist the tokenizer name used to count AI chat context tokens."""
+    _update_global_config({"ai_context_tokenizer": name or None})
+
+
 def load_toc_collapsed() -> bool:
     """Return whether the table-of-contents panel should start collapsed."""
     if not GLOBAL_CONFIG.exists():
@@ -1593,7 +1648,6 @@ def update_page_index(
     conn = _get_conn()
     if not conn:
         return
-    _invalidate_task_cache()
     now = time.time()
     modified_ts = last_modified if last_modified is not None else now
     parent_path = _parent_folder_for_page(path)
@@ -1609,102 +1663,198 @@ def update_page_index(
             display_order = existing_order
         else:
             display_order = _next_display_order(conn, parent_path)
-    with conn:
-        unique_tags = list(dict.fromkeys(tags))
-        unique_links = list(dict.fromkeys(links))
+    # Held through the commit so a concurrent day-count rebuild cannot see the
+    # new rows and then also receive their delta.
+    with _AGENDA_LOCK:
+        with conn:
+            unique_tags = list(dict.fromkeys(tags))
+            unique_links = list(dict.fromkeys(links))
         
-        # Check if page exists and get current rev
-        row = conn.execute("SELECT rev, page_id FROM pages WHERE path = ?", (path,)).fetchone()
-        current_rev = row[0] if row and row[0] is not None else 0
-        current_page_id = row[1] if row and row[1] else None
-        new_rev = current_rev + 1
+            # Check if page exists and get current rev
+            row = conn.execute("SELECT rev, page_id FROM pages WHERE path = ?", (path,)).fetchone()
+            current_rev = row[0] if row and row[0] is not None else 0
+            current_page_id = row[1] if row and row[1] else None
+            new_rev = current_rev + 1
         
-        # Generate page_id if creating new page
-        if not current_page_id:
-            import uuid
-            current_page_id = str(uuid.uuid4())
+            # Generate page_id if creating new page
+            if not current_page_id:
+                import uuid
+                current_page_id = str(uuid.uuid4())
         
-        conn.execute(
-            """
-            INSERT INTO pages(path, title, updated, parent_path, display_order, path_ci, title_ci, page_id, rev)
-            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(path) DO UPDATE SET
-                title = excluded.title,
-                updated = excluded.updated,
-                last_modified = excluded.updated,
-                parent_path = excluded.parent_path,
-                display_order = COALESCE(excluded.display_order, pages.display_order),
-                path_ci = excluded.path_ci,
-                title_ci = excluded.title_ci,
-                rev = excluded.rev
-            """,
-            (
-                path,
-                title,
-                modified_ts,
-                parent_path,
-                display_order,
-                path.lower(),
-                (title or "").lower(),
-                current_page_id,
-                new_rev,
-            ),
-        )
+            conn.execute(
+                """
+                INSERT INTO pages(path, title, updated, parent_path, display_order, path_ci, title_ci, page_id, rev)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    title = excluded.title,
+                    updated = excluded.updated,
+                    last_modified = excluded.updated,
+                    parent_path = excluded.parent_path,
+                    display_order = COALESCE(excluded.display_order, pages.display_order),
+                    path_ci = excluded.path_ci,
+                    title_ci = excluded.title_ci,
+                    rev = excluded.rev
+                """,
+                (
+                    path,
+                    title,
+                    modified_ts,
+                    parent_path,
+                    display_order,
+                    path.lower(),
+                    (title or "").lower(),
+                    current_page_id,
+                    new_rev,
+                ),
+            )
         
-        # Bump global sync revision
-        bump_sync_revision()
+            # Bump global sync revision
+            bump_sync_revision()
         
-        conn.execute("DELETE FROM page_tags WHERE page = ?", (path,))
-        conn.executemany(
-            "INSERT INTO page_tags(page, tag) VALUES(?, ?)",
-            ((path, tag) for tag in unique_tags),
+            conn.execute("DELETE FROM page_tags WHERE page = ?", (path,))
+            conn.executemany(
+                "INSERT INTO page_tags(page, tag) VALUES(?, ?)",
+                ((path, tag) for tag in unique_tags),
+            )
+            conn.execute("DELETE FROM links WHERE from_path = ?", (path,))
+            conn.executemany(
+                "INSERT INTO links(from_path, to_path) VALUES(?, ?)",
+                ((path, link) for link in unique_links),
+            )
+            changed_task_ids, agenda_delta = _write_page_tasks(conn, path, tasks)
+        _apply_agenda_delta(agenda_delta)
+    with _TAG_INDEX_LOCK:
+        if _TAG_INDEX is not None:
+            _TAG_INDEX.set_page_tags(path, unique_tags)
+    _invalidate_page_cache()
+    if changed_task_ids:
+        _invalidate_task_cache()
+        bump_task_index_version(changed_task_ids, pages=(path,))
+
+
+def _delete_task_fts_rows(conn: sqlite3.Connection, task_ids: Sequence[str]) -> None:
+    """Drop the tasks_fts rows of ``task_ids`` by rowid (task_id is UNINDEXED there)."""
+    if not task_ids:
+        return
+    ids = json.dumps(list(task_ids))
+    rowids = conn.execute(
+        "SELECT fts_rowid FROM tasks_fts_rows WHERE task_id IN (SELECT value FROM json_each(?))", (ids,)
+    ).fetchall()
+    conn.executemany("DELETE FROM tasks_fts WHERE rowid = ?", rowids)
+    conn.execute("DELETE FROM tasks_fts_rows WHERE task_id IN (SELECT value FROM json_each(?))", (ids,))
+
+
+def _insert_task_fts_rows(conn: sqlite3.Connection, rows: Iterable[tuple[str, str]]) -> None:
+    """Index (task_id, text) rows in tasks_fts and record their rowids in tasks_fts_rows."""
+    for task_id, text in rows:
+        cursor = conn.execute("INSERT INTO tasks_fts(task_id, text) VALUES(?, ?)", (task_id, text))
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks_fts_rows(task_id, fts_rowid) VALUES(?, ?)", (task_id, cursor.lastrowid)
         )
-        conn.execute("DELETE FROM links WHERE from_path = ?", (path,))
-        conn.executemany(
-            "INSERT INTO links(from_path, to_path) VALUES(?, ?)",
-            ((path, link) for link in unique_links),
+
+
+def _write_page_tasks(
+    conn: sqlite3.Connection, path: str, tasks: Sequence[dict]
+) -> tuple[set[str], dict[tuple[int, int], int]]:
+    """Apply a page's parsed tasks as a per-row diff.
+
+    Returns the inserted/updated/deleted task ids and the change in open-task
+    day counts, keyed by (julian day, 0 for due / 1 for start).
+    """
+    folder = task_folder(path)
+    new_rows: dict[str, tuple] = {}
+    new_tags: dict[str, tuple[str, ...]] = {}
+    for task in tasks:
+        new_rows[task["id"]] = (
+            task.get("line"),
+            task.get("text"),
+            task.get("status"),
+            task.get("priority"),
+            task.get("due"),
+            task.get("start"),
+            task.get("parent"),
+            task.get("level"),
+            1 if task.get("actionable", task.get("status") != "done") else 0,
+            folder,
+            julian_day(task.get("due")),
+            julian_day(task.get("start")),
         )
-        conn.execute("DELETE FROM tasks WHERE path = ?", (path,))
-        conn.execute("DELETE FROM task_tags WHERE task_id LIKE ?", (f"{path}:%",))
-        if _TASKS_FTS_ENABLED:
-            conn.execute("DELETE FROM tasks_fts WHERE task_id LIKE ?", (f"{path}:%",))
-        conn.executemany(
+        new_tags[task["id"]] = tuple(sorted(set(task.get("tags", []))))
+    old_rows = {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(
             """
-            INSERT INTO tasks(task_id, path, line, text, status, priority, due, starts, parent_id, level, actionable)
-            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            SELECT task_id, line, text, status, priority, due, starts, parent_id, level, actionable, folder,
+                due_jd, starts_jd
+            FROM tasks WHERE path = ?
             """,
-            (
-                (
-                    task["id"],
-                    path,
-                    task.get("line"),
-                    task.get("text"),
-                    task.get("status"),
-                    task.get("priority"),
-                    task.get("due"),
-                    task.get("start"),
-                    task.get("parent"),
-                    task.get("level"),
-                    1
-                    if task.get("actionable", task.get("status") != "done")
-                    else 0,
-                )
-                for task in tasks
-            ),
+            (path,),
         )
-        all_tags = []
-        for task in tasks:
-            for tag in task.get("tags", []):
-                all_tags.append((task["id"], tag))
-        if all_tags:
-            conn.executemany("INSERT INTO task_tags(task_id, tag) VALUES(?, ?)", all_tags)
-        if _TASKS_FTS_ENABLED and tasks:
-            conn.executemany(
-                "INSERT INTO tasks_fts(task_id, text) VALUES(?, ?)",
-                ((task["id"], task.get("text") or "") for task in tasks),
-            )
-    _invalidate_page_cache()
-    bump_task_index_version()
+    }
+    old_tag_lists: dict[str, list[str]] = {}
+    for task_id, tag in conn.execute(
+        "SELECT tt.task_id, tt.tag FROM task_tags tt JOIN tasks t ON t.task_id = tt.task_id WHERE t.path = ?",
+        (path,),
+    ):
+        old_tag_lists.setdefault(task_id, []).append(tag)
+    old_tags = {task_id: tuple(sorted(set(tags))) for task_id, tags in old_tag_lists.items()}
+
+    removed = [task_id for task_id in old_rows if task_id not in new_rows]
+    added = [task_id for task_id in new_rows if task_id not in old_rows]
+    updated = [
+        task_id for task_id, row in new_rows.items() if task_id in old_rows and old_rows[task_id] != row
+    ]
+    retagged = [
+        task_id
+        for task_id, tags in new_tags.items()
+        if task_id in old_rows and old_tags.get(task_id, ()) != tags
+    ]
+    # Text is the second column; only those rows need their FTS entry rewritten.
+    reworded = [task_id for task_id in updated if old_rows[task_id][1] != new_rows[task_id][1]]
+
+    conn.executemany("DELETE FROM tasks WHERE task_id = ?", ((task_id,) for task_id in removed))
+    conn.executemany(
+        "DELETE FROM task_tags WHERE task_id = ?", ((task_id,) for task_id in removed + retagged)
+    )
+    conn.executemany(
+        """
+        INSERT INTO tasks(task_id, path, line, text, status, priority, due, starts, parent_id, level, actionable,
+            folder, due_jd, starts_jd)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        ((task_id, path, *new_rows[task_id]) for task_id in added),
+    )
+    conn.executemany(
+        """
+        UPDATE tasks SET line = ?, text = ?, status = ?, priority = ?, due = ?, starts = ?,
+            parent_id = ?, level = ?, actionable = ?, folder = ?, due_jd = ?, starts_jd = ?
+        WHERE task_id = ?
+        """,
+        ((*new_rows[task_id], task_id) for task_id in updated),
+    )
+    conn.executemany(
+        "INSERT INTO task_tags(task_id, tag) VALUES(?, ?)",
+        ((task_id, tag) for task_id in added + retagged for tag in new_tags[task_id]),
+    )
+    if _TASKS_FTS_ENABLED:
+        _delete_task_fts_rows(conn, removed + reworded)
+        _insert_task_fts_rows(conn, ((task_id, new_rows[task_id][1] or "") for task_id in added + reworded))
+    agenda_delta: dict[tuple[int, int], int] = {}
+    for task_id in removed + updated:
+        _count_agenda_row(agenda_delta, old_rows[task_id], -1)
+    for task_id in added + updated:
+        _count_agenda_row(agenda_delta, new_rows[task_id], 1)
+    return set(removed) | set(added) | set(updated) | set(retagged), agenda_delta
+
+
+def _count_agenda_row(delta: dict[tuple[int, int], int], row: tuple, sign: int) -> None:
+    """Add ``sign`` for an open task row (as diffed by ``_write_page_tasks``) to its due/start days."""
+    status, due_jd, starts_jd = row[2], row[10], row[11]
+    if status == "done":
+        return
+    for kind, jd in ((0, due_jd), (1, starts_jd)):
+        if jd is not None:
+            delta[(jd, kind)] = delta.get((jd, kind), 0) + sign
 
 
 def delete_page_index(path: str) -> None:
@@ -1713,17 +1863,21 @@ def delete_page_index(path: str) -> None:
     if not conn:
         return
     _invalidate_task_cache()
-    like = f"{path}:%"
+    removed_ids = [row[0] for row in conn.execute("SELECT task_id FROM tasks WHERE path = ?", (path,))]
     with conn:
         conn.execute("DELETE FROM pages WHERE path = ?", (path,))
         conn.execute("DELETE FROM page_tags WHERE page = ?", (path,))
         conn.execute("DELETE FROM links WHERE from_path = ? OR to_path = ?", (path, path))
         conn.execute("DELETE FROM tasks WHERE path = ?", (path,))
-        conn.execute("DELETE FROM task_tags WHERE task_id LIKE ?", (like,))
+        conn.executemany("DELETE FROM task_tags WHERE task_id = ?", ((task_id,) for task_id in removed_ids))
         if _TASKS_FTS_ENABLED:
-            conn.execute("DELETE FROM tasks_fts WHERE task_id LIKE ?", (like,))
+            _delete_task_fts_rows(conn, removed_ids)
     _invalidate_page_cache()
-    bump_task_index_version()
+    _reset_agenda_counts()
+    with _TAG_INDEX_LOCK:
+        if _TAG_INDEX is not None:
+            _TAG_INDEX.remove_page(path)
+    bump_task_index_version(removed_ids, pages=(path,))
 
 
 def delete_folder_index(folder_path: str) -> None:
@@ -1782,10 +1936,13 @@ def _delete_index_for_prefix(conn: sqlite3.Connection, folder_prefix: str) -> No
         # Remove related data (tags, links, tasks, etc.) - these can be hard deleted
         conn.execute("DELETE FROM page_tags WHERE page LIKE ?", (like_pattern,))
         conn.execute("DELETE FROM links WHERE from_path LIKE ? OR to_path LIKE ?", (like_pattern, like_pattern))
+        removed_ids = [
+            row[0] for row in conn.execute("SELECT task_id FROM tasks WHERE path LIKE ?", (like_pattern,))
+        ]
         conn.execute("DELETE FROM tasks WHERE path LIKE ?", (like_pattern,))
-        conn.execute("DELETE FROM task_tags WHERE task_id LIKE ?", (f"{folder_prefix}/%:%",))
+        conn.executemany("DELETE FROM task_tags WHERE task_id = ?", ((task_id,) for task_id in removed_ids))
         if _TASKS_FTS_ENABLED:
-            conn.execute("DELETE FROM tasks_fts WHERE task_id LIKE ?", (f"{folder_prefix}/%:%",))
+            _delete_task_fts_rows(conn, removed_ids)
         conn.execute("DELETE FROM bookmarks WHERE path LIKE ?", (like_pattern,))
         conn.execute("DELETE FROM cursor_positions WHERE path LIKE ?", (like_pattern,))
         conn.execute("DELETE FROM attachments WHERE page_path LIKE ?", (like_pattern,))
@@ -1793,6 +1950,7 @@ def _delete_index_for_prefix(conn: sqlite3.Connection, folder_prefix: str) -> No
         conn.execute("DELETE FROM kv WHERE key LIKE ?", (f"hash:{folder_prefix}/%",))
     
     _invalidate_page_cache()
+    _reset_tag_index()
     bump_task_index_version()
 
 
@@ -1911,19 +2069,31 @@ def move_tree_index(old_folder_path: str, new_folder_path: str, root: Path, *, s
                     conn.execute("UPDATE pages_search_index SET path = ? WHERE path = ?", (new_path, old_path))
                 except sqlite3.OperationalError:
                     pass
+                # Move the task's tag and FTS rows first, while tasks still finds them under the old path.
                 conn.execute(
-                    "UPDATE tasks SET path = ?, task_id = REPLACE(task_id, ?, ?) WHERE path = ?",
-                    (new_path, f"{old_path}:", f"{new_path}:", old_path),
-                )
-                conn.execute(
-                    "UPDATE task_tags SET task_id = REPLACE(task_id, ?, ?) WHERE task_id LIKE ?",
-                    (f"{old_path}:", f"{new_path}:", f"{old_path}:%"),
+                    "UPDATE task_tags SET task_id = REPLACE(task_id, ?, ?) "
+                    "WHERE task_id IN (SELECT task_id FROM tasks WHERE path = ?)",
+                    (f"{old_path}:", f"{new_path}:", old_path),
                 )
                 if _TASKS_FTS_ENABLED:
+                    moved = conn.execute(
+                        "SELECT fts_rowid FROM tasks_fts_rows "
+                        "WHERE task_id IN (SELECT task_id FROM tasks WHERE path = ?)",
+                        (old_path,),
+                    ).fetchall()
+                    conn.executemany(
+                        "UPDATE tasks_fts SET task_id = REPLACE(task_id, ?, ?) WHERE rowid = ?",
+                        ((f"{old_path}:", f"{new_path}:", rowid) for (rowid,) in moved),
+                    )
                     conn.execute(
-                        "UPDATE tasks_fts SET task_id = REPLACE(task_id, ?, ?) WHERE task_id LIKE ?",
-                        (f"{old_path}:", f"{new_path}:", f"{old_path}:%"),
+                        "UPDATE tasks_fts_rows SET task_id = REPLACE(task_id, ?, ?) "
+                        "WHERE task_id IN (SELECT task_id FROM tasks WHERE path = ?)",
+                        (f"{old_path}:", f"{new_path}:", old_path),
                     )
+                conn.execute(
+                    "UPDATE tasks SET path = ?, folder = ?, task_id = REPLACE(task_id, ?, ?) WHERE path = ?",
+                    (new_path, task_folder(new_path), f"{old_path}:", f"{new_path}:", old_path),
+                )
                 conn.execute("UPDATE bookmarks SET path = ? WHERE path = ?", (new_path, old_path))
                 conn.execute("UPDATE cursor_positions SET path = ? WHERE path = ?", (new_path, old_path))
                 conn.execute("UPDATE attachments SET page_path = ? WHERE page_path = ?", (new_path, old_path))
@@ -1946,6 +2116,10 @@ def move_tree_index(old_folder_path: str, new_folder_path: str, root: Path, *, s
                 (f"hash:{old_prefix}", f"hash:{new_prefix}", f"hash:{old_prefix}/%"),
             )
         _invalidate_page_cache()
+        with _TAG_INDEX_LOCK:
+            if _TAG_INDEX is not None:
+                for old_path, new_path in path_map.items():
+                    _TAG_INDEX.rename_page(old_path, new_path)
         return {"path_map": path_map, "orders": orders}
     finally:
         conn.close()
@@ -2345,20 +2519,70 @@ def search_pages(term: str, limit: int = 50) -> list[dict]:
     return [{"path": row["path"], "title": row.get("title")} for row in results[:limit]]
 
 
+def load_tag_index() -> TagIndex:
+    """Return the page tag index for the active vault, building it on first use."""
+    global _TAG_INDEX
+    with _TAG_INDEX_LOCK:
+        if _TAG_INDEX is None:
+            conn = _get_conn()
+            if not conn:
+                return TagIndex()
+            _TAG_INDEX = TagIndex(conn.execute("SELECT page, tag FROM page_tags").fetchall())
+        return _TAG_INDEX
+
+
+def _reset_tag_index() -> None:
+    global _TAG_INDEX
+    with _TAG_INDEX_LOCK:
+        _TAG_INDEX = None
+
+
 def fetch_tag_summary() -> list[tuple[str, int]]:
-    conn = _get_conn()
-    if not conn:
-        return []
-    cur = conn.execute("SELECT tag, COUNT(DISTINCT page) FROM page_tags GROUP BY tag ORDER BY tag")
-    return [(row[0], row[1]) for row in cur.fetchall()]
+    with _TAG_INDEX_LOCK:
+        return load_tag_index().tag_counts()
+
+
+def query_tagged_pages(all_of: Sequence[str] = (), any_of: Sequence[str] = ()) -> list[str]:
+    """Pages carrying every tag in ``all_of`` and at least one in ``any_of``, sorted by path."""
+    with _TAG_INDEX_LOCK:
+        return load_tag_index().query(all_of, any_of)
+
+
+def fetch_related_tags(
+    all_of: Sequence[str] = (), any_of: Sequence[str] = (), limit: int = 10
+) -> list[tuple[str, int]]:
+    """Other tags on the pages matching the tag query, most frequent first."""
+    with _TAG_INDEX_LOCK:
+        return load_tag_index().related_tags(all_of, any_of, limit)
 
 
 def fetch_task_tags() -> list[tuple[str, int]]:
+    return load_task_universe().stored_tag_counts()
+
+
+def load_task_context_digests() -> dict[str, str]:
+    """Digests of the per-page task context sections last sent to the vector store."""
     conn = _get_conn()
     if not conn:
-        return []
-    cur = conn.execute("SELECT tag, COUNT(DISTINCT task_id) FROM task_tags GROUP BY tag ORDER BY tag")
-    return [(row[0], row[1]) for row in cur.fetchall()]
+        return {}
+    rows = conn.execute("SELECT key, value FROM kv WHERE key LIKE 'task_context:%'").fetchall()
+    return {str(key)[len("task_context:") :]: str(value) for key, value in rows}
+
+
+def save_task_context_digests(digests: dict[str, Optional[str]]) -> None:
+    """Record uploaded task context sections; a None digest forgets that page."""
+    conn = _get_conn()
+    if not conn or not digests:
+        return
+    with conn:
+        conn.executemany(
+            "REPLACE INTO kv(key, value) VALUES(?, ?)",
+            ((f"task_context:{path}", digest) for path, digest in digests.items() if digest is not None),
+        )
+        conn.executemany(
+            "DELETE FROM kv WHERE key = ?",
+            ((f"task_context:{path}",) for path, digest in digests.items() if digest is None),
+        )
 
 
 def load_task_ai_summary() -> Optional[str]:
@@ -2406,12 +2630,51 @@ def delete_task_ai_summary() -> None:
         return
 
 
-def bump_task_index_version() -> int:
-    """Increment the in-memory task index version used for cache invalidation."""
+def bump_task_index_version(changed_ids: Optional[Iterable[str]] = None, pages: Iterable[str] = ()) -> int:
+    """Increment the in-memory task index version used for cache invalidation.
+
+    ``changed_ids`` are the task ids inserted, updated or deleted by this change
+    and ``pages`` the page paths they belong to; None means the change is not
+    tracked per task (bulk moves/deletes).
+    """
     global _TASK_INDEX_VERSION
     with _TASK_VERSION_LOCK:
         _TASK_INDEX_VERSION += 1
-        return _TASK_INDEX_VERSION
+        _TASK_CHANGE_LOG.append(
+            (
+                _TASK_INDEX_VERSION,
+                (frozenset(changed_ids), frozenset(pages)) if changed_ids is not None else None,
+            )
+        )
+        version = _TASK_INDEX_VERSION
+    if changed_ids is None:
+        _reset_agenda_counts()
+    return version
+
+
+def _task_changes_since(version: int, field: int) -> Optional[set[str]]:
+    with _TASK_VERSION_LOCK:
+        if version == _TASK_INDEX_VERSION:
+            return set()
+        entries = [change for logged, change in _TASK_CHANGE_LOG if logged > version]
+        if version > _TASK_INDEX_VERSION or len(entries) != _TASK_INDEX_VERSION - version:
+            return None
+        changed: set[str] = set()
+        for change in entries:
+            if change is None:
+                return None
+            changed.update(change[field])
+        return changed
+
+
+def task_changes_since(version: int) -> Optional[set[str]]:
+    """Return the task ids changed after ``version``, or None if that is not known."""
+    return _task_changes_since(version, 0)
+
+
+def task_pages_changed_since(version: int) -> Optional[set[str]]:
+    """Return the page paths whose tasks changed after ``version``, or None if that is not known."""
+    return _task_changes_since(version, 1)
 
 
 def get_task_index_version() -> int:
@@ -2420,13 +2683,172 @@ def get_task_index_version() -> int:
         return _TASK_INDEX_VERSION
 
 
+def load_task_universe() -> TaskUniverse:
+    """Return every task (with tags) indexed in memory for the current task index version."""
+    global _TASK_UNIVERSE
+    non_actionable_tags = load_non_actionable_task_tags_list()
+    version = get_task_index_version()
+    universe = _TASK_UNIVERSE
+    if (
+        universe is not None
+        and universe.version == version
+        and universe.non_actionable_tags == frozenset(tag.lower() for tag in non_actionable_tags)
+    ):
+        return universe
+    conn = _get_conn()
+    if not conn:
+        return TaskUniverse((), version)
+    rows = conn.execute(f"SELECT {_TASK_SELECT_COLS} FROM tasks t").fetchall()
+    tasks = [_task_row_to_dict(row) for row in rows]
+    universe = TaskUniverse(tasks, version, non_actionable_tags, text_matcher=match_task_text)
+    _TASK_UNIVERSE = universe
+    return universe
+
+
+def _reset_agenda_counts() -> None:
+    global _AGENDA_COUNTS
+    with _AGENDA_LOCK:
+        _AGENDA_COUNTS = None
+
+
+def _apply_agenda_delta(delta: dict[tuple[int, int], int]) -> None:
+    with _AGENDA_LOCK:
+        if _AGENDA_COUNTS is None:
+            return
+        for (jd, kind), change in delta.items():
+            if not change:
+                continue
+            counts = _AGENDA_COUNTS.setdefault(jd, [0, 0])
+            counts[kind] += change
+            if not counts[0] and not counts[1]:
+                del _AGENDA_COUNTS[jd]
+
+
+def _load_agenda_counts(conn: sqlite3.Connection) -> dict[int, list[int]]:
+    global _AGENDA_COUNTS
+    with _AGENDA_LOCK:
+        if _AGENDA_COUNTS is None:
+            counts: dict[int, list[int]] = {}
+            for kind, column in ((0, "due_jd"), (1, "starts_jd")):
+                for jd, count in conn.execute(
+                    f"SELECT {column}, COUNT(*) FROM tasks WHERE {column} IS NOT NULL AND status != 'done' GROUP BY {column}"
+                ):
+                    counts.setdefault(jd, [0, 0])[kind] = count
+            _AGENDA_COUNTS = counts
+        return _AGENDA_COUNTS
+
+
+def task_day_counts(agenda_range: AgendaRange) -> dict[int, tuple[int, int]]:
+    """Open tasks (due, starting) per julian day within ``agenda_range``.
+
+    Days without tasks are omitted. The counts are computed once per vault and
+    updated incrementally on page saves, so asking for a whole year is cheap.
+    """
+    conn = _get_conn()
+    if not conn:
+        return {}
+    with _AGENDA_LOCK:
+        counts = _load_agenda_counts(conn)
+        if agenda_range.end - agenda_range.start < len(counts):
+            days = (jd for jd in range(agenda_range.start, agenda_range.end + 1) if jd in counts)
+        else:
+            days = (jd for jd in counts if jd in agenda_range)
+        return {jd: (counts[jd][0], counts[jd][1]) for jd in sorted(days)}
+
+
+def fetch_agenda_tasks(
+    agenda_range: AgendaRange,
+    include_starts: bool = True,
+    include_done: bool = False,
+) -> list[dict]:
+    """Tasks due (or, with ``include_starts``, starting) within ``agenda_range``.
+
+    With ``agenda_range.overdue`` tasks due before the range are included too.
+    Results are ordered by due date, then page and line.
+    """
+    conn = _get_conn()
+    if not conn:
+        return []
+    terms = ["t.due_jd BETWEEN ? AND ?"]
+    params: list = [agenda_range.start, agenda_range.end]
+    if include_starts:
+        terms.append("t.starts_jd BETWEEN ? AND ?")
+        params.extend([agenda_range.start, agenda_range.end])
+    if agenda_range.overdue:
+        terms.append("t.due_jd < ?")
+        params.append(agenda_range.start)
+    sql = f"SELECT {_TASK_SELECT_COLS} FROM tasks t WHERE ({' OR '.join(terms)})"
+    if not include_done:
+        sql += " AND t.status != 'done'"
+    sql += " ORDER BY COALESCE(t.due, ''), t.path, t.line"
+    return [_task_row_to_dict(row) for row in conn.execute(sql, params).fetchall()]
+
+
+# Task columns plus the task's tags folded into one value (unit-separator delimited).
+_TASK_SELECT_COLS = """
+    t.task_id,
+    t.path,
+    t.line,
+    t.text,
+    t.status,
+    t.priority,
+    t.due,
+    t.starts,
+    t.parent_id,
+    t.level,
+    COALESCE(t.actionable, CASE WHEN t.status = 'done' THEN 0 ELSE 1 END) AS actionable,
+    (SELECT group_concat(tg.tag, char(31)) FROM task_tags tg WHERE tg.task_id = t.task_id) AS tags
+"""
+
+
+def _task_row_to_dict(row: tuple) -> dict:
+    (
+        task_id,
+        path,
+        line,
+        text,
+        status,
+        priority,
+        due,
+        starts,
+        parent_id,
+        level,
+        actionable,
+        tags,
+    ) = row
+    return {
+        "id": task_id,
+        "path": path,
+        "line": line,
+        "text": text,
+        "status": status,
+        "priority": priority or 0,
+        "due": due,
+        "starts": starts,
+        "parent": parent_id,
+        "level": level or 0,
+        "actionable": bool(actionable),
+        "tags": tuple(tags.split("\x1f")) if tags else (),
+    }
+
+
 def fetch_tasks(
     query: str = "",
     tags: Sequence[str] = (),
     include_done: bool = False,
     include_ancestors: bool = False,
     actionable_only: bool = False,
-) -> list[dict]:
+    path_prefix: Optional[str] = None,
+    exclude_journal: bool = False,
+) -> list[Mapping[str, Any]]:
+    """Return tasks ordered by (path, line, level).
+
+    ``path_prefix`` limits results to a page or everything below a folder and
+    ``exclude_journal`` drops Journal pages; both are answered from the indexed
+    ``folder`` column so scoped queries only touch that subtree. Tasks are
+    read-only mappings (tags and highlights are tuples) shared with the result
+    cache; copy one with ``dict(task)`` to change it.
+    """
     conn = _get_conn()
     if not conn:
         return []
@@ -2439,131 +2861,75 @@ def fetch_tasks(
         include_ancestors,
         actionable_only,
         non_actionable_tags_list,
-    )
+    ) + (normalize_task_path(path_prefix), bool(exclude_journal))
     cached = _TASK_FETCH_CACHE.get(cache_key)
     if cached is not None:
         _TASK_FETCH_CACHE.move_to_end(cache_key)
-        return _clone_cached_tasks(cached)
-    select_cols = """
-        SELECT
-            t.task_id,
-            t.path,
-            t.line,
-            t.text,
-            t.status,
-            t.priority,
-            t.due,
-            t.starts,
-            t.parent_id,
-            t.level,
-            COALESCE(t.actionable, CASE WHEN t.status = 'done' THEN 0 ELSE 1 END) AS actionable
-    """
-    base = f"{select_cols} FROM tasks t LEFT JOIN task_tags tt ON tt.task_id = t.task_id"
+        return list(cached)
+    match_sql = "SELECT t.task_id FROM tasks t"
     conditions = []
     params: list = []
-    having_clause = ""
-    total_tasks = None
-    use_fts = False
+    text_matches = match_task_text(query) if query else None
     if query:
-        try:
-            total_tasks = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
-        except sqlite3.OperationalError:
-            total_tasks = None
-        fts_query = _normalize_fts_query(query)
-        use_fts = bool(fts_query) and _should_use_task_fts(conn, total_tasks)
-        if use_fts:
-            conditions.append(
-                "t.task_id IN (SELECT task_id FROM tasks_fts WHERE tasks_fts MATCH ?)"
-            )
-            params.append(fts_query)
+        if text_matches is not None:
+            # match_task_text already ran (and cached) the FTS search; filter on its ids.
+            conditions.append("t.task_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(text_matches)))
         else:
             conditions.append("lower(t.text) LIKE ?")
             params.append(f"%{query.lower()}%")
-    if tags:
-        placeholders = ",".join("?" for _ in tags)
-        conditions.append(f"tt.tag IN ({placeholders})")
-        params.extend(tags)
-        # Require that all selected tags are present on the task (AND semantics)
-        having_clause = f"HAVING COUNT(DISTINCT tt.tag) = {len(tags)}"
     if not include_done:
         conditions.append("t.status != 'done'")
     if actionable_only:
         conditions.append("COALESCE(t.actionable, CASE WHEN t.status = 'done' THEN 0 ELSE 1 END) = 1")
-    where = ""
+    scope = _task_scope_condition(path_prefix)
+    if scope:
+        conditions.append(scope[0])
+        params.extend(scope[1])
+    if exclude_journal:
+        journal_sql, journal_params = _task_scope_condition(JOURNAL_ROOT)
+        conditions.append(f"NOT {journal_sql}")
+        params.extend(journal_params)
+    if tags:
+        # Require that all selected tags are present on the task (AND semantics)
+        placeholders = ",".join("?" for _ in tags)
+        match_sql += " JOIN task_tags tt ON tt.task_id = t.task_id"
+        conditions.append(f"tt.tag IN ({placeholders})")
+        params.extend(tags)
     if conditions:
-        where = "WHERE " + " AND ".join(conditions)
+        match_sql += " WHERE " + " AND ".join(conditions)
+    if tags:
+        match_sql += f" GROUP BY t.task_id HAVING COUNT(DISTINCT tt.tag) = {len(tags)}"
+    if include_ancestors:
+        # Walk parent links in SQL so every ancestor comes back in the same round trip.
+        wanted = f"""
+            WITH RECURSIVE matched(task_id) AS ({match_sql}),
+            lineage(task_id) AS (
+                SELECT task_id FROM matched
+                UNION
+                SELECT p.parent_id FROM tasks p JOIN lineage l ON p.task_id = l.task_id
+                WHERE p.parent_id IS NOT NULL
+            )
+            SELECT task_id FROM lineage
+        """
+    else:
+        wanted = match_sql
     sql = (
-        f"{base} {where} GROUP BY t.task_id "
-        f"{having_clause} "
+        f"SELECT {_TASK_SELECT_COLS} FROM tasks t WHERE t.task_id IN ({wanted}) "
         "ORDER BY t.path, COALESCE(t.line, 0), COALESCE(t.level, 0)"
     )
-    cur = conn.execute(sql, params)
-    rows = cur.fetchall()
-
-    def _row_to_task(row: tuple) -> dict:
-        (
-            task_id,
-            path,
-            line,
-            text,
-            status,
-            priority,
-            due,
-            starts,
-            parent_id,
-            level,
-            actionable,
-        ) = row
-        return {
-            "id": task_id,
-            "path": path,
-            "line": line,
-            "text": text,
-            "status": status,
-            "priority": priority or 0,
-            "due": due,
-            "starts": starts,
-            "parent": parent_id,
-            "level": level or 0,
-            "actionable": bool(actionable),
-            "tags": [],
-        }
-
     tasks: dict[str, dict] = {}
-    for row in rows:
-        task = _row_to_task(row)
+    for row in conn.execute(sql, params).fetchall():
+        task = _task_row_to_dict(row)
+        match = text_matches.get(task["id"]) if text_matches else None
+        if match is not None:
+            task["rank"] = match.rank
+            task["highlights"] = match.spans
         tasks[task["id"]] = task
 
-    if include_ancestors:
-        missing_parents = {task["parent"] for task in tasks.values() if task.get("parent")}
-        ancestor_sql_template = f"{select_cols} FROM tasks t WHERE t.task_id IN {{}}"
-        while missing_parents:
-            fetch_ids = [pid for pid in missing_parents if pid and pid not in tasks]
-            if not fetch_ids:
-                break
-            placeholders = ",".join("?" for _ in fetch_ids)
-            ancestor_sql = ancestor_sql_template.format(f"({placeholders})")
-            ancestor_rows = conn.execute(ancestor_sql, fetch_ids).fetchall()
-            for row in ancestor_rows:
-                task = _row_to_task(row)
-                tasks[task["id"]] = task
-                if task.get("parent"):
-                    missing_parents.add(task["parent"])
-            missing_parents = {pid for pid in missing_parents if pid not in tasks}
-
-    if tasks:
-        all_ids = list(tasks.keys())
-        placeholders = ",".join("?" for _ in all_ids)
-        tag_rows = conn.execute(
-            f"SELECT task_id, tag FROM task_tags WHERE task_id IN ({placeholders})", all_ids
-        ).fetchall()
-        for task_id, tag in tag_rows:
-            if task_id in tasks:
-                tasks[task_id]["tags"].append(tag)
-
     if non_actionable_tags:
         for task in tasks.values():
-            tag_set = {t.lower() for t in task.get("tags", [])}
+            tag_set = {t.lower() for t in task["tags"]}
             if tag_set & non_actionable_tags:
                 task["actionable"] = False
 
@@ -2580,10 +2946,13 @@ def fetch_tasks(
             keep_ids = actionable_ids
         tasks = {task_id: task for task_id, task in tasks.items() if task_id in keep_ids}
 
-    result = sorted(
-        tasks.values(),
-        key=lambda t: (t.get("path") or "", t.get("line") or 0, t.get("level") or 0),
-    )
+    result = [
+        MappingProxyType(task)
+        for task in sorted(
+            tasks.values(),
+            key=lambda t: (t.get("path") or "", t.get("line") or 0, t.get("level") or 0),
+        )
+    ]
     _save_task_cache(cache_key, result)
     return result
 
@@ -2698,6 +3067,8 @@ def set_active_vault(root: Optional[str]) -> None:
     _TASKS_FTS_ENABLED = False
     _invalidate_task_cache()
     _invalidate_page_cache()
+    _reset_tag_index()
+    bump_task_index_version()
     if not root:
         _ACTIVE_ROOT = None
         return
@@ -2750,17 +3121,26 @@ def _connect_to_vault_db() -> sqlite3.Connection:
 
 
 def _invalidate_task_cache() -> None:
+    global _TASK_UNIVERSE
     _TASK_FETCH_CACHE.clear()
+    _TASK_MATCH_CACHE.clear()
+    _TASK_UNIVERSE = None
 
 
-def _clone_cached_tasks(tasks: list[dict]) -> list[dict]:
-    return [
-        {
-            **task,
-            "tags": list(task.get("tags", [])),
-        }
-        for task in tasks
-    ]
+def _task_scope_condition(path_prefix: Optional[str]) -> Optional[tuple[str, list[str]]]:
+    """SQL condition for tasks on ``path_prefix`` (a page) or anywhere below it (a folder)."""
+    prefix = normalize_task_path(path_prefix)
+    if not prefix or prefix == "/":
+        return None
+    if prefix.endswith(tuple(PAGE_SUFFIXES)):
+        stem = prefix[: -len(PAGE_SUFFIX)] if prefix.endswith(PAGE_SUFFIX) else prefix[: -len(LEGACY_SUFFIX)]
+        return "t.path IN (?, ?)", [stem + PAGE_SUFFIX, stem + LEGACY_SUFFIX]
+    base = prefix.rstrip("/")
+    # Folder range scan: "/a/" <= folder < "/a0" selects "/a/" and every folder below it.
+    return (
+        "((t.folder >= ? AND t.folder < ?) OR t.path IN (?, ?))",
+        [base + "/", base + "0", base + PAGE_SUFFIX, base + LEGACY_SUFFIX],
+    )
 
 
 def _task_cache_key(
@@ -2784,11 +3164,9 @@ def _task_cache_key(
     )
 
 
-def _save_task_cache(key: tuple, tasks: list[dict]) -> None:
-    if not tasks:
-        _TASK_FETCH_CACHE[key] = []
-    else:
-        _TASK_FETCH_CACHE[key] = _clone_cached_tasks(tasks)
+def _save_task_cache(key: tuple, tasks: list[Mapping[str, Any]]) -> None:
+    # Rows are read-only views, so hits can share them without cloning.
+    _TASK_FETCH_CACHE[key] = tuple(tasks)
     _TASK_FETCH_CACHE.move_to_end(key)
     while len(_TASK_FETCH_CACHE) > _TASK_FETCH_CACHE_SIZE:
         _TASK_FETCH_CACHE.popitem(last=False)
@@ -2804,19 +3182,29 @@ def _tasks_fts_exists(conn: sqlite3.Connection) -> bool:
         return False
 
 
-def _maybe_backfill_tasks_fts(conn: sqlite3.Connection) -> None:
+def _sync_tasks_fts(conn: sqlite3.Connection) -> None:
+    """Rebuild tasks_fts when it is out of step with tasks (new table, or written without FTS).
+
+    ``tasks_fts_rows`` maps each task id to its FTS rowid, so rows can be deleted
+    without scanning the FTS table for an UNINDEXED task_id.
+    """
     global _TASKS_FTS_ENABLED
     if not _TASKS_FTS_ENABLED:
         return
     try:
-        cur = conn.execute("SELECT COUNT(*) FROM tasks_fts")
-        current = cur.fetchone()[0]
-        if current:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks_fts_rows (task_id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL)"
+        )
+        indexed = conn.execute("SELECT COUNT(*) FROM tasks_fts").fetchone()[0]
+        mapped = conn.execute("SELECT COUNT(*) FROM tasks_fts_rows").fetchone()[0]
+        total = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        if indexed == mapped == total:
             return
-        rows = [(task_id, text or "") for task_id, text in conn.execute("SELECT task_id, text FROM tasks").fetchall()]
-        if rows:
-            conn.executemany("INSERT INTO tasks_fts(task_id, text) VALUES(?, ?)", rows)
-            conn.commit()
+        conn.execute("DELETE FROM tasks_fts")
+        conn.execute("DELETE FROM tasks_fts_rows")
+        conn.execute("INSERT INTO tasks_fts(task_id, text) SELECT task_id, COALESCE(text, '') FROM tasks")
+        conn.execute("INSERT INTO tasks_fts_rows(task_id, fts_rowid) SELECT task_id, rowid FROM tasks_fts")
+        conn.commit()
     except sqlite3.OperationalError:
         _TASKS_FTS_ENABLED = False
 
@@ -2828,13 +3216,13 @@ def _ensure_tasks_fts(conn: sqlite3.Connection) -> None:
         # Try with UNINDEXED first (requires SQLite 3.35.0+)
         conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(task_id UNINDEXED, text)")
         _TASKS_FTS_ENABLED = True
-        _maybe_backfill_tasks_fts(conn)
+        _sync_tasks_fts(conn)
     except sqlite3.OperationalError as e:
         # If UNINDEXED fails, try without it (fallback for older SQLite)
         try:
             conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(task_id, text)")
             _TASKS_FTS_ENABLED = True
-            _maybe_backfill_tasks_fts(conn)
+            _sync_tasks_fts(conn)
         except sqlite3.OperationalError as e2:
             # FTS5 not available or other error - disable FTS
             print(f"[Index] FTS5 not available: {e2}")
@@ -2851,29 +3239,109 @@ def _ensure_pages_search_fts(conn: sqlite3.Connection) -> None:
         print(f"[Index] FTS5 for pages search not available: {e}")
 
 
-def _should_use_task_fts(conn: sqlite3.Connection, total_tasks: Optional[int] = None) -> bool:
-    if not _TASKS_FTS_ENABLED:
-        return False
+def _ensure_attachments_search_fts(conn: sqlite3.Connection) -> None:
+    """Create the attachments_search_fts FTS5 table holding extracted attachment text.
+
+    ``attachments_search_state`` keys each indexed attachment to its FTS row, the
+    extraction it came from and the file's mtime/size when it was indexed; FTS5
+    cannot look up an UNINDEXED column without scanning the whole table.
+    """
     try:
-        count = total_tasks
-        if count is None:
-            count = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
-        return (count or 0) >= _TASKS_FTS_THRESHOLD
-    except sqlite3.OperationalError:
-        return False
+        has_state = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attachments_search_state'"
+        ).fetchone()
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS attachments_search_fts USING fts5("
+            "attachment_path UNINDEXED, page_path UNINDEXED, text_key UNINDEXED, content)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS attachments_search_state (
+                attachment_path TEXT PRIMARY KEY,
+                text_key TEXT NOT NULL,
+                fts_rowid INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        if not has_state:
+            # Rows indexed before the state table existed cannot be tracked; reconcile re-adds them.
+            conn.execute("DELETE FROM attachments_search_fts")
+    except sqlite3.OperationalError as e:
+        print(f"[Index] FTS5 for attachment search not available: {e}")
+
+
+_FTS_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+# What the unicode61 tokenizer keeps as a token (letters and digits; "_" and "@" separate).
+_FTS_WORD_PATTERN = re.compile(r"[^\W_]+")
 
 
 def _normalize_fts_query(query: str) -> str:
-    tokens = [tok.strip() for tok in (query or "").split() if tok.strip()]
-    if not tokens:
-        return ""
-    safe = []
-    for tok in tokens:
-        # FTS MATCH is picky; bail out to LIKE if the token has special chars (e.g., "@")
-        if not re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9_.:+-]*", tok):
+    """MATCH expression for a search box query: quoted text is a phrase, other words are prefixes.
+
+    Every term is quoted, so punctuation in the query cannot produce FTS syntax
+    errors; an empty result means the query has nothing the index can match.
+    That includes ``@tag`` words: the tokenizer drops the "@", so they would
+    match plain words, and they are left to substring matching instead.
+    """
+    terms = []
+    for phrase, word in _FTS_TERM_PATTERN.findall(query or ""):
+        if word.startswith("@"):
             return ""
-        safe.append(f"{tok}*")
-    return " ".join(safe)
+        tokens = _FTS_WORD_PATTERN.findall(phrase or word)
+        if not tokens:
+            continue
+        terms.append(f'"{" ".join(tokens)}"' if phrase else f'"{" ".join(tokens)}"*')
+    return " ".join(terms)
+
+
+def _highlight_spans(marked: str) -> tuple[tuple[int, int], ...]:
+    """(start, end) offsets into the unmarked text for each highlight() marker pair."""
+    spans = []
+    offset = 0
+    start = 0
+    for part in re.split(f"([{_HIGHLIGHT_OPEN}{_HIGHLIGHT_CLOSE}])", marked):
+        if part == _HIGHLIGHT_OPEN:
+            start = offset
+        elif part == _HIGHLIGHT_CLOSE:
+            spans.append((start, offset))
+        else:
+            offset += len(part)
+    return tuple(spans)
+
+
+def match_task_text(query: str) -> Optional[dict[str, TaskTextMatch]]:
+    """Tasks whose text matches ``query`` in tasks_fts, best bm25 rank first.
+
+    Returns None when FTS5 is unavailable or the query has no indexable terms,
+    in which case callers fall back to substring matching.
+    """
+    fts_query = _normalize_fts_query(query)
+    if not fts_query or not _TASKS_FTS_ENABLED:
+        return None
+    conn = _get_conn()
+    if not conn:
+        return None
+    key = (get_task_index_version(), fts_query)
+    cached = _TASK_MATCH_CACHE.get(key)
+    if cached is not None:
+        _TASK_MATCH_CACHE.move_to_end(key)
+        return cached
+    try:
+        rows = conn.execute(
+            "SELECT task_id, bm25(tasks_fts), highlight(tasks_fts, 1, ?, ?) FROM tasks_fts "
+            "WHERE tasks_fts MATCH ? ORDER BY bm25(tasks_fts)",
+            (_HIGHLIGHT_OPEN, _HIGHLIGHT_CLOSE, fts_query),
+        ).fetchall()
+    except sqlite3.OperationalError as exc:
+        print(f"[Index] Task FTS query failed for {fts_query!r}: {exc}")
+        return None
+    matches = {task_id: TaskTextMatch(rank, _highlight_spans(marked or "")) for task_id, rank, marked in rows}
+    _TASK_MATCH_CACHE[key] = matches
+    while len(_TASK_MATCH_CACHE) > _TASK_MATCH_CACHE_SIZE:
+        _TASK_MATCH_CACHE.popitem(last=False)
+    return matches
 
 
 def _ensure_task_columns(conn: sqlite3.Connection) -> None:
@@ -2885,6 +3353,25 @@ def _ensure_task_columns(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE tasks ADD COLUMN level INTEGER")
     if "actionable" not in existing:
         conn.execute("ALTER TABLE tasks ADD COLUMN actionable INTEGER")
+    if "folder" not in existing:
+        conn.execute("ALTER TABLE tasks ADD COLUMN folder TEXT")
+        paths = [row[0] for row in conn.execute("SELECT DISTINCT path FROM tasks").fetchall()]
+        conn.executemany(
+            "UPDATE tasks SET folder = ? WHERE path = ?",
+            ((task_folder(path), path) for path in paths),
+        )
+    if "due_jd" not in existing or "starts_jd" not in existing:
+        if "due_jd" not in existing:
+            conn.execute("ALTER TABLE tasks ADD COLUMN due_jd INTEGER")
+        if "starts_jd" not in existing:
+            conn.execute("ALTER TABLE tasks ADD COLUMN starts_jd INTEGER")
+        rows = conn.execute(
+            "SELECT task_id, due, starts FROM tasks WHERE due IS NOT NULL OR starts IS NOT NULL"
+        ).fetchall()
+        conn.executemany(
+            "UPDATE tasks SET due_jd = ?, starts_jd = ? WHERE task_id = ?",
+            ((julian_day(due), julian_day(starts), task_id) for task_id, due, starts in rows),
+        )
 
 
 def _ensure_task_indexes(conn: sqlite3.Connection) -> None:
@@ -2892,6 +3379,9 @@ def _ensure_task_indexes(conn: sqlite3.Connection) -> None:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_actionable ON tasks(actionable)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_path ON tasks(path)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_folder ON tasks(folder)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due_jd ON tasks(due_jd)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_starts_jd ON tasks(starts_jd)")
         conn.execute(
             "CREATE INDEX IF NOT EXISTS idx_task_tags_task_id_tag ON task_tags(task_id, tag)"
         )
@@ -3065,7 +3555,10 @@ def _ensure_schema(conn: sqlite3.Connection) -> None:
             starts TEXT,
             parent_id TEXT,
             level INTEGER,
-            actionable INTEGER
+            actionable INTEGER,
+            folder TEXT,
+            due_jd INTEGER,
+            starts_jd INTEGER
         );
         CREATE TABLE IF NOT EXISTS task_tags (
             task_id TEXT,
@@ -3101,6 +3594,7 @@ def _ensure_schema(conn: sqlite3.Connection) -> None:
     _ensure_page_columns(conn)
     _ensure_tasks_fts(conn)
     _ensure_pages_search_fts(conn)
+    _ensure_attachments_search_fts(conn)
     conn.commit()
 
 
@@ -3131,6 +3625,38 @@ def list_page_attachments(page_path: str) -> list[dict]:
         conn.close()
 
 
+def add_attachment_listener(callback: AttachmentListener) -> None:
+    """Call ``callback(vault_root, attachment_path, removed)`` after every attachment index change."""
+    if callback not in _ATTACHMENT_LISTENERS:
+        _ATTACHMENT_LISTENERS.append(callback)
+
+
+def _notify_attachment_listeners(attachment_path: str, removed: bool) -> None:
+    root = get_active_vault()
+    if not root:
+        return
+    for callback in list(_ATTACHMENT_LISTENERS):
+        try:
+            callback(root, attachment_path, removed)
+        except Exception as exc:
+            print(f"[Index] Attachment listener failed for {attachment_path}: {exc}")
+
+
+def list_attachment_entries() -> list[dict]:
+    """Return every attachment index row of the active vault."""
+    db_path = _vault_db_path()
+    if not db_path:
+        return []
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        rows = conn.execute(
+            "SELECT attachment_path, page_path, stored_path FROM attachments ORDER BY attachment_path"
+        ).fetchall()
+        return [{"attachment_path": row[0], "page_path": row[1], "stored_path": row[2]} for row in rows]
+    finally:
+        conn.close()
+
+
 def upsert_attachment_entry(page_path: str, attachment_path: str, stored_path: str, updated: float | None = None) -> None:
     """Insert or update an attachment index entry."""
     conn = _connect_to_vault_db()
@@ -3152,10 +3678,11 @@ def upsert_attachment_entry(page_path: str, attachment_path: str, stored_path: s
         conn.commit()
     finally:
         conn.close()
+    _notify_attachment_listeners(attachment_key, removed=False)
 
 
 def delete_attachment_entry(attachment_path: str) -> Optional[str]:
-    """Remove an attachment entry from the index and return its page path."""
+    """Remove an attachment entry (and its searchable text) from the index and return its page path."""
     conn = _connect_to_vault_db()
     try:
         attachment_key = _normalize_vault_relative_path(attachment_path)
@@ -3164,7 +3691,12 @@ def delete_attachment_entry(attachment_path: str) -> Optional[str]:
             return None
         page_path = str(row[0])
         conn.execute("DELETE FROM attachments WHERE attachment_path = ?", (attachment_key,))
+        try:
+            search_index._delete_attachment_rows(conn, attachment_key)
+        except sqlite3.OperationalError:
+            pass  # FTS5 unavailable; nothing was indexed
         conn.commit()
-        return page_path
     finally:
         conn.close()
+    _notify_attachment_listeners(attachment_key, removed=True)
+    return page_path
@@ -10,7 +10,7 @@ from zimx.app.ui.path_utils import colon_to_path, normalize_link_target
 from zimx.server.adapters.files import PAGE_SUFFIX, PAGE_SUFFIXES
 
 # Bump this when task parsing logic changes to force re-index even if file hash is unchanged.
-INDEX_SCHEMA_VERSION = "task-parse-v5"
+INDEX_SCHEMA_VERSION = "task-parse-v6"
 
 # Match @tags that are not part of email addresses or similar identifiers.
 TAG_PATTERN = re.compile(r"(?<![\w.+-])@([A-Za-z0-9_]+)")
@@ -204,6 +204,7 @@ def _normalize_page_link(link: str) -> Optional[str]:
 def extract_tasks(path: str, content: str) -> List[dict]:
     tasks: List[dict] = []
     stack: List[tuple[int, dict]] = []
+    seen_digests: Dict[str, int] = {}
 
     for line_no, line in enumerate(content.splitlines(), start=1):
         match = TASK_PATTERN.match(line)
@@ -240,7 +241,12 @@ def extract_tasks(path: str, content: str) -> List[dict]:
         inherited_priority = parent.get("priority", 0) if parent else 0
         effective_priority = explicit_priority if explicit_priority > 0 else inherited_priority
 
-        task_id = f"{path}:{line_no}"
+        # Ids follow the task text rather than its line so that edits elsewhere on the
+        # page do not renumber every task below them; repeated texts get a suffix.
+        digest = hashlib.blake2b(clean_text.encode("utf-8"), digest_size=6).hexdigest()
+        occurrence = seen_digests.get(digest, 0)
+        seen_digests[digest] = occurrence + 1
+        task_id = f"{path}:{digest}" if not occurrence else f"{path}:{digest}.{occurrence}"
         task = {
             "id": task_id,
             "line": line_no,
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import multiprocessing
 import os
 import secrets
 import socket
@@ -35,7 +36,10 @@ from zimx.app.ui.main_window import MainWindow
 # ZIMX_DEBUG_TASKS       - Task panel mouse events and signal emission
 # ZIMX_DEBUG_PLANTUML    - PlantUML rendering operations
 # ZIMX_DETAILED_PAGE_LOG - Detailed page load timing and operations
+# ZIMX_PAGE_TRACE_FILE - Rewrite a Chrome trace (JSON) of recent page opens here after each load
 # ZIMX_DETAILED_LOGGING  - Additional low-level internal logging (various modules)
+# ZIMX_HIGHLIGHT_PROFILE - Per-rule highlighter cost report (JSON) on every page load
+# ZIMX_HIGHLIGHT_PROFILE_DIR - Also write those highlighter reports as JSON files here
 #
 # Examples:
 #   export ZIMX_DEBUG_NAV=1        # Enable navigation debugging
@@ -421,6 +425,8 @@ def _enable_faulthandler_log() -> None:
 
 
 def main() -> None:
+    # Frozen builds re-run this executable for spawned attachment-extraction workers.
+    multiprocessing.freeze_support()
     args = _parse_args(sys.argv[1:])
     
     # Handle webserver mode
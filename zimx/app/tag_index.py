@@ -0,0 +1,169 @@
+"""In-memory inverted index from page tags to pages.
+
+``config.load_tag_index()`` builds it once per vault from ``page_tags`` and
+``update_page_index`` keeps it current. Each page gets a small integer id and a
+tag's posting list is a bitset of those ids (a Python int, as in
+``task_universe``), so page counts are popcounts and multi-tag AND/OR queries
+are integer AND/OR. A co-occurrence table (tag -> {other tag: pages with
+both}) is maintained alongside and backs the "related tags" facet.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Iterable, Optional, Sequence
+
+from zimx.app.task_universe import iter_bits
+
+
+class TagIndex:
+    """Posting lists, page counts and co-occurrence counts for page tags."""
+
+    def __init__(self, page_tags: Iterable[tuple[str, str]] = ()) -> None:
+        self._page_ids: dict[str, int] = {}
+        self._paths: list[Optional[str]] = []
+        self._free_ids: list[int] = []
+        self._tags_by_page: dict[int, frozenset[str]] = {}
+        self._postings: dict[str, int] = {}
+        self._cooccurrence: dict[str, dict[str, int]] = {}
+        grouped: dict[str, set[str]] = {}
+        for page, tag in page_tags:
+            grouped.setdefault(page, set()).add(tag)
+        # Ids follow path order for the initial load, so most result lists come out near-sorted.
+        for page in sorted(grouped):
+            self.set_page_tags(page, grouped[page])
+
+    def __len__(self) -> int:
+        return len(self._tags_by_page)
+
+    # ---------------------------------------------------------------- updates
+    def set_page_tags(self, path: str, tags: Iterable[str]) -> bool:
+        """Replace the tags of ``path``; returns True when they changed."""
+        new_tags = frozenset(tags)
+        page_id = self._page_ids.get(path)
+        old_tags = self._tags_by_page.get(page_id, frozenset()) if page_id is not None else frozenset()
+        if new_tags == old_tags:
+            return False
+        if page_id is None:
+            page_id = self._allocate(path)
+        bit = 1 << page_id
+        for tag in old_tags - new_tags:
+            remaining = self._postings[tag] & ~bit
+            if remaining:
+                self._postings[tag] = remaining
+            else:
+                del self._postings[tag]
+        for tag in new_tags - old_tags:
+            self._postings[tag] = self._postings.get(tag, 0) | bit
+        self._count_pairs(old_tags, -1)
+        self._count_pairs(new_tags, 1)
+        if new_tags:
+            self._tags_by_page[page_id] = new_tags
+        else:
+            self._release(path, page_id)
+        return True
+
+    def remove_page(self, path: str) -> bool:
+        return self.set_page_tags(path, ())
+
+    def rename_page(self, old_path: str, new_path: str) -> None:
+        page_id = self._page_ids.get(old_path)
+        if page_id is None or new_path == old_path:
+            return
+        if new_path in self._page_ids:
+            tags = self._tags_by_page[page_id]
+            self.remove_page(old_path)
+            self.set_page_tags(new_path, tags)
+            return
+        del self._page_ids[old_path]
+        self._page_ids[new_path] = page_id
+        self._paths[page_id] = new_path
+
+    def _allocate(self, path: str) -> int:
+        if self._free_ids:
+            page_id = self._free_ids.pop()
+            self._paths[page_id] = path
+        else:
+            page_id = len(self._paths)
+            self._paths.append(path)
+        self._page_ids[path] = page_id
+        return page_id
+
+    def _release(self, path: str, page_id: int) -> None:
+        self._tags_by_page.pop(page_id, None)
+        del self._page_ids[path]
+        self._paths[page_id] = None
+        self._free_ids.append(page_id)
+
+    def _count_pairs(self, tags: frozenset[str], sign: int) -> None:
+        for tag in tags:
+            neighbours = self._cooccurrence.setdefault(tag, {})
+            for other in tags:
+                if other == tag:
+                    continue
+                count = neighbours.get(other, 0) + sign
+                if count:
+                    neighbours[other] = count
+                else:
+                    neighbours.pop(other, None)
+            if not neighbours:
+                del self._cooccurrence[tag]
+
+    # ---------------------------------------------------------------- queries
+    def tag_counts(self) -> list[tuple[str, int]]:
+        """(tag, page count) for every tag, sorted by tag."""
+        return sorted((tag, mask.bit_count()) for tag, mask in self._postings.items())
+
+    def count(self, tag: str) -> int:
+        return self._postings.get(tag, 0).bit_count()
+
+    def mask(self, all_of: Sequence[str] = (), any_of: Sequence[str] = ()) -> int:
+        """Pages carrying every tag in ``all_of`` and at least one in ``any_of``."""
+        if not all_of and not any_of:
+            return 0
+        mask = -1
+        # Smallest posting list first keeps the intermediate ints short.
+        for tag in sorted(all_of, key=self.count):
+            mask &= self._postings.get(tag, 0)
+            if not mask:
+                return 0
+        if any_of:
+            union = 0
+            for tag in any_of:
+                union |= self._postings.get(tag, 0)
+            mask &= union
+        return mask
+
+    def pages(self, mask: int) -> list[str]:
+        return sorted(self._paths[page_id] for page_id in iter_bits(mask))
+
+    def query(self, all_of: Sequence[str] = (), any_of: Sequence[str] = ()) -> list[str]:
+        """Sorted page paths matching ``all_of`` (AND) and ``any_of`` (OR)."""
+        return self.pages(self.mask(all_of, any_of))
+
+    def cooccurring(self, tag: str, k: int = 10) -> list[tuple[str, int]]:
+        """The ``k`` tags sharing the most pages with ``tag``, most shared first."""
+        neighbours = self._cooccurrence.get(tag, {})
+        return heapq.nsmallest(k, neighbours.items(), key=lambda item: (-item[1], item[0]))
+
+    def related_tags(
+        self, all_of: Sequence[str] = (), any_of: Sequence[str] = (), k: int = 10
+    ) -> list[tuple[str, int]]:
+        """Facet of other tags on the pages matching the query, with their counts in it."""
+        selected = set(all_of) | set(any_of)
+        if len(all_of) == 1 and not any_of:
+            return self.cooccurring(all_of[0], k)
+        mask = self.mask(all_of, any_of)
+        if not mask:
+            return []
+        # Any tag on a result page co-occurs with one of the query's tags.
+        seeds = all_of[:1] if all_of else any_of
+        candidates: set[str] = set()
+        for tag in seeds:
+            candidates.update(self._cooccurrence.get(tag, {}))
+        counts = []
+        for tag in candidates - selected:
+            count = (self._postings[tag] & mask).bit_count()
+            if count:
+                counts.append((tag, count))
+        return heapq.nsmallest(k, counts, key=lambda item: (-item[1], item[0]))
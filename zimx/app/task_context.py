@@ -0,0 +1,195 @@
+"""Task context documents for the task panel's AI summary and chat.
+
+The task context is split into one section per page (that page's task lines).
+``TaskContextCache`` keeps the formatted sections for one task universe and, on
+a new task index version, re-formats only the pages whose tasks changed. The
+AI insight input is memoized per universe and limits. ``pending_sync`` compares
+section digests with the ones last sent to the vector store, so only changed
+pages are re-embedded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+from zimx.app import config
+from zimx.app.task_universe import TaskUniverse
+
+# Vector store page_ref for the task context; each section is stored under its page path.
+TASK_CONTEXT_REF = "tasks"
+
+
+def format_task_line(task: dict) -> str:
+    """One task as a markdown checkbox line with priority, tags, dates and its page."""
+    status = "- [x]" if task.get("status") == "done" else "- [ ]"
+    text = (task.get("text") or "").strip()
+    priority = "!" * min(max(int(task.get("priority") or 0), 0), 3)
+    tags = " ".join(task.get("tags") or [])
+    due = (task.get("due") or "").strip()
+    starts = (task.get("starts") or task.get("start") or "").strip()
+    date_parts = []
+    if due:
+        date_parts.append(f"<{due}")
+    if starts:
+        date_parts.append(f">{starts}")
+    parts = [status]
+    if text:
+        parts.append(text)
+    if priority:
+        parts.append(priority)
+    if tags:
+        parts.append(tags)
+    if date_parts:
+        parts.append(" ".join(date_parts))
+    line = " ".join(parts).strip()
+    path = (task.get("path") or "").strip()
+    if path:
+        line = f"{line} :: {path}"
+    return line
+
+
+def section_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+@dataclass
+class TaskContextSync:
+    """Vector store changes needed to match the current task sections."""
+
+    upload: dict[str, str] = field(default_factory=dict)  # page path -> section text
+    remove: list[str] = field(default_factory=list)
+    digests: dict[str, str] = field(default_factory=dict)  # page path -> digest of uploaded text
+    # Nothing was recorded as uploaded: clear the whole task scope (and any legacy single document) first.
+    full: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.upload or self.remove)
+
+
+class TaskContextCache:
+    def __init__(self) -> None:
+        self._key: Optional[tuple[int, frozenset[str]]] = None
+        self._sections: dict[str, str] = {}
+        self._digests: dict[str, str] = {}
+        self._insights: dict[tuple, str] = {}
+
+    def clear(self) -> None:
+        self._key = None
+        self._sections = {}
+        self._digests = {}
+        self._insights.clear()
+
+    def sections(self, universe: TaskUniverse) -> dict[str, str]:
+        """Task lines grouped by page path, in page order."""
+        key = (universe.version, universe.non_actionable_tags)
+        if key == self._key:
+            return self._sections
+        pages = None
+        if self._key is not None and self._key[1] == universe.non_actionable_tags:
+            pages = config.task_pages_changed_since(self._key[0])
+        grouped: dict[str, list[str]] = {}
+        for task in universe.tasks:
+            path = task.get("path") or ""
+            if pages is None or path in pages:
+                grouped.setdefault(path, []).append(format_task_line(task))
+        sections = {} if pages is None else dict(self._sections)
+        for path in grouped if pages is None else pages:
+            if path in grouped:
+                sections[path] = "\n".join(grouped[path])
+                self._digests[path] = section_digest(sections[path])
+            else:
+                sections.pop(path, None)
+        self._sections = dict(sorted(sections.items()))
+        self._digests = {path: self._digests[path] for path in self._sections}
+        self._insights.clear()
+        self._key = key
+        return self._sections
+
+    def document(self, universe: TaskUniverse) -> str:
+        return "\n".join(self.sections(universe).values()).strip()
+
+    def pending_sync(self, universe: TaskUniverse, uploaded: dict[str, str]) -> TaskContextSync:
+        """Sections to (re-)upload and pages to drop, given the digests already uploaded."""
+        sections = self.sections(universe)
+        sync = TaskContextSync(full=not uploaded)
+        for path, text in sections.items():
+            digest = self._digests[path]
+            if uploaded.get(path) != digest:
+                sync.upload[path] = text
+                sync.digests[path] = digest
+        sync.remove = sorted(path for path in uploaded if path not in sections)
+        return sync
+
+    def insight_input(
+        self,
+        universe: TaskUniverse,
+        max_lines: int = 200,
+        max_chars: int = 6000,
+        today: Optional[date] = None,
+    ) -> str:
+        """Overview statistics plus the first task lines, as sent with the AI summary prompt."""
+        sections = self.sections(universe)
+        today = today or date.today()
+        key = (max_lines, max_chars, today)
+        cached = self._insights.get(key)
+        if cached is not None:
+            return cached
+        open_mask = universe.open_mask
+        overdue = (universe.due_mask(end=(today - timedelta(days=1)).isoformat()) & open_mask).bit_count()
+        upcoming = (
+            universe.due_mask(today.isoformat(), (today + timedelta(days=7)).isoformat()) & open_mask
+        ).bit_count()
+        future_starts = universe.starts_mask(start=(today + timedelta(days=1)).isoformat()).bit_count()
+        total = len(universe)
+        done = total - open_mask.bit_count()
+        priority_counts = {0: 0, 1: 0, 2: 0, 3: 0}
+        path_counts: dict[str, int] = {}
+        for task in universe.tasks:
+            priority = min(max(int(task.get("priority") or 0), 0), 3)
+            priority_counts[priority] += 1
+            path = (task.get("path") or "").strip()
+            if path:
+                parent = str(Path(path).parent)
+                path_counts[parent] = path_counts.get(parent, 0) + 1
+        tag_counts = universe.stored_tag_counts()
+        lines: list[str] = []
+        lines.append("Task overview:")
+        lines.append(f"Total tasks: {total} (open: {total - done}, done: {done})")
+        lines.append(
+            "Priority counts: "
+            f"!={priority_counts.get(1, 0)}, "
+            f"!!={priority_counts.get(2, 0)}, "
+            f"!!!={priority_counts.get(3, 0)}"
+        )
+        lines.append(f"Overdue open tasks: {overdue}")
+        lines.append(f"Upcoming (next 7 days): {upcoming}")
+        lines.append(f"Future start tasks: {future_starts}")
+        lines.append("")
+        lines.append("Top task areas (by parent path):")
+        for path, count in sorted(path_counts.items(), key=lambda item: item[1], reverse=True)[:12]:
+            lines.append(f"{path}: {count}")
+        lines.append("")
+        lines.append("Tag counts:")
+        if tag_counts:
+            for tag, count in tag_counts[:20]:
+                lines.append(f"{tag}: {count}")
+        else:
+            lines.append("None")
+        lines.append("")
+        lines.append("Tasks (truncated):")
+        used = sum(len(line) + 1 for line in lines)
+        count = 0
+        for line in (line for section in sections.values() for line in section.split("\n")):
+            if count >= max_lines or used + len(line) + 1 > max_chars:
+                lines.append("[truncated]")
+                break
+            lines.append(line)
+            used += len(line) + 1
+            count += 1
+        text = "\n".join(lines).strip()
+        self._insights[key] = text
+        return text
@@ -0,0 +1,355 @@
+"""In-memory task index used by the task panel.
+
+``config.load_task_universe()`` loads every task (with its tags) in one query per
+task index version. Tasks are numbered in (path, line, level) order and each
+filter is a bitset — a Python int whose bit ``i`` stands for task ``i`` — so
+combining status, tag, path and text filters is integer AND/OR, and tag counts
+are popcounts of ``tag_mask & view_mask``.
+
+Priority and due/start dates are also kept as ``array`` columns indexed by task
+position (dates as ``date.toordinal()`` days, parsed once per snapshot and also
+copied onto each task as ``due_day``/``start_day``). Views classify due dates with
+``due_classes`` (three bisects over the sorted due index, then one pass writing
+a class per task) and sort with ``ranks`` (one sort over the whole snapshot
+giving each position its integer rank), both cached per snapshot.
+
+Text queries go through the ``text_matcher`` the universe is built with (the
+``tasks_fts`` search in ``config``), which returns bm25-ranked matches with the
+matched spans of each task's text; plain substring matching is the fallback.
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional, Sequence
+
+from zimx.server.adapters.files import LEGACY_SUFFIX, PAGE_SUFFIX, PAGE_SUFFIXES
+
+JOURNAL_ROOT = "/Journal"
+# Classes written by ``TaskUniverse.due_classes``.
+DUE_NONE, DUE_OVERDUE, DUE_TODAY, DUE_TOMORROW, DUE_LATER = range(5)
+_INLINE_TAG_PATTERN = re.compile(r"@[A-Za-z0-9_]+")
+
+
+def normalize_task_path(path: Optional[str]) -> str:
+    if not path:
+        return ""
+    norm = path.replace("\\", "/")
+    if not norm.startswith("/"):
+        norm = "/" + norm.lstrip("/")
+    if norm.lower().endswith(LEGACY_SUFFIX):
+        norm = norm[: -len(LEGACY_SUFFIX)] + PAGE_SUFFIX
+    return norm
+
+
+def task_folder(path: Optional[str]) -> str:
+    """Folder of a task's page with a trailing slash ("/Projects/Beta/" for "/Projects/Beta/Beta.md")."""
+    norm = normalize_task_path(path)
+    if not norm:
+        return ""
+    return norm.rsplit("/", 1)[0] + "/"
+
+
+@dataclass(frozen=True)
+class TaskTextMatch:
+    """A full-text hit: bm25 ``rank`` (lower is better) and matched ``(start, end)`` spans of the text."""
+
+    rank: float
+    spans: tuple[tuple[int, int], ...] = ()
+
+
+TextMatcher = Callable[[str], Optional[dict[str, TaskTextMatch]]]
+
+
+def day_ordinal(value: Optional[str]) -> int:
+    """``date.toordinal()`` of an ISO date string; 0 when missing or invalid."""
+    if not value:
+        return 0
+    try:
+        return date.fromisoformat(value.strip()).toordinal()
+    except ValueError:
+        return 0
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the set bit positions of ``mask`` in ascending order."""
+    if mask <= 0:
+        return
+    bits = format(mask, "b")[::-1]
+    pos = bits.find("1")
+    while pos != -1:
+        yield pos
+        pos = bits.find("1", pos + 1)
+
+
+class TaskUniverse:
+    """Bitset indexes over one snapshot of the vault's tasks.
+
+    Tasks carrying one of ``non_actionable_tags`` are marked not actionable, as
+    ``config.fetch_tasks`` does. The task dicts are owned by the universe and
+    shared between every view built from it, so callers must treat them as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        tasks: Iterable[dict],
+        version: int = 0,
+        non_actionable_tags: Iterable[str] = (),
+        text_matcher: Optional[TextMatcher] = None,
+    ) -> None:
+        ordered = sorted(tasks, key=lambda t: (t.get("path") or "", t.get("line") or 0, t.get("level") or 0))
+        self.version = version
+        self.non_actionable_tags = frozenset(tag.lower() for tag in non_actionable_tags)
+        self.tasks: tuple[dict, ...] = tuple(ordered)
+        self._pos: dict[str, int] = {task["id"]: pos for pos, task in enumerate(self.tasks)}
+        self._parent: list[int] = [self._pos.get(task.get("parent") or "", -1) for task in self.tasks]
+        self._lowered: list[str] = [(task.get("text") or "").lower() for task in self.tasks]
+        self._text_matcher = text_matcher
+        self._text_matches: dict[str, Optional[dict[str, TaskTextMatch]]] = {}
+        self.all_mask = (1 << len(self.tasks)) - 1
+        self.open_mask = 0
+        # As stored in the index (before non-actionable tags apply); what the SQL filter used.
+        self.stored_actionable_mask = 0
+        self.actionable_mask = 0
+        self._tag_masks: dict[str, int] = {}
+        # Tags from the task_tags table plus inline @tokens, as shown in the tag list.
+        self._count_masks: dict[str, int] = {}
+        count = len(self.tasks)
+        self.priority = array("b", bytes(count))
+        self.due_day = array("l", [0]) * count
+        self.start_day = array("l", [0]) * count
+        self._due_classes: dict[int, array] = {}
+        self._ranks: dict[Hashable, array] = {}
+        page_masks: dict[str, int] = {}
+        due: list[tuple[int, int]] = []
+        starts: list[tuple[int, int]] = []
+        for pos, task in enumerate(self.tasks):
+            bit = 1 << pos
+            due_day = day_ordinal(task.get("due"))
+            start_day = day_ordinal(task.get("starts"))
+            self.priority[pos] = min(max(int(task.get("priority") or 0), 0), 3)
+            self.due_day[pos] = due_day
+            self.start_day[pos] = start_day
+            task["due_day"] = due_day
+            task["start_day"] = start_day
+            if task.get("status") != "done":
+                self.open_mask |= bit
+            tags = task.get("tags") or ()
+            if task.get("actionable"):
+                self.stored_actionable_mask |= bit
+                if self.non_actionable_tags and self.non_actionable_tags.intersection(t.lower() for t in tags):
+                    task["actionable"] = False
+                else:
+                    self.actionable_mask |= bit
+            for tag in tags:
+                self._tag_masks[tag] = self._tag_masks.get(tag, 0) | bit
+            for tag in set(tags).union(_INLINE_TAG_PATTERN.findall(task.get("text") or "")):
+                self._count_masks[tag] = self._count_masks.get(tag, 0) | bit
+            page = normalize_task_path(task.get("path"))
+            page_masks[page] = page_masks.get(page, 0) | bit
+            if due_day:
+                due.append((due_day, pos))
+            if start_day:
+                starts.append((start_day, pos))
+        self._page_paths: list[str] = sorted(page_masks)
+        self._page_masks: list[int] = [page_masks[path] for path in self._page_paths]
+        self._due = sorted(due)
+        self._starts = sorted(starts)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def position(self, task_id: Optional[str]) -> int:
+        """Position of a task in ``tasks`` (the index into the columns); -1 when unknown."""
+        return self._pos.get(task_id or "", -1)
+
+    # ---------------------------------------------------------------- columns
+    def due_classes(self, today: int) -> array:
+        """``DUE_*`` class of every task relative to the day ordinal ``today``."""
+        classes = self._due_classes.get(today)
+        if classes is None:
+            classes = array("b", bytes(len(self.tasks)))
+            bounds = [bisect.bisect_left(self._due, (day, -1)) for day in (today, today + 1, today + 2)]
+            for due_class, lo, hi in zip(
+                (DUE_OVERDUE, DUE_TODAY, DUE_TOMORROW, DUE_LATER), [0, *bounds], [*bounds, len(self._due)]
+            ):
+                for _day, pos in self._due[lo:hi]:
+                    classes[pos] = due_class
+            # Only one day is current at a time.
+            self._due_classes = {today: classes}
+        return classes
+
+    def ranks(self, name: Hashable, key: Callable[[int], Any]) -> array:
+        """Rank of every task position in ascending ``key(pos)`` order, ties by position; cached per ``name``."""
+        ranks = self._ranks.get(name)
+        if ranks is None:
+            ranks = array("l", [0]) * len(self.tasks)
+            for rank, pos in enumerate(sorted(range(len(self.tasks)), key=key)):
+                ranks[pos] = rank
+            self._ranks[name] = ranks
+        return ranks
+
+    # ------------------------------------------------------------------ masks
+    def mask_for_ids(self, ids: Iterable[str]) -> int:
+        mask = 0
+        for task_id in ids:
+            pos = self._pos.get(task_id)
+            if pos is not None:
+                mask |= 1 << pos
+        return mask
+
+    def tags_mask(self, tags: Sequence[str]) -> int:
+        """Tasks carrying every tag in ``tags``."""
+        mask = self.all_mask
+        for tag in tags:
+            mask &= self._tag_masks.get(tag, 0)
+        return mask
+
+    def tag_groups_mask(self, groups: Sequence[set[str]]) -> int:
+        """Tasks matching at least one tag of every group."""
+        mask = self.all_mask
+        for group in groups:
+            any_mask = 0
+            for tag in group:
+                any_mask |= self._tag_masks.get(tag, 0)
+            mask &= any_mask
+        return mask
+
+    def text_matches(self, query: str) -> Optional[dict[str, TaskTextMatch]]:
+        """Full-text matches for ``query`` by task id, best first; None without a usable matcher."""
+        query = (query or "").strip()
+        if not query or self._text_matcher is None:
+            return None
+        if query not in self._text_matches:
+            self._text_matches[query] = self._text_matcher(query)
+        return self._text_matches[query]
+
+    def text_mask(self, query: str) -> int:
+        """Tasks matching ``query``: full-text when available, else case-insensitive substring."""
+        needle = (query or "").lower()
+        if not needle:
+            return self.all_mask
+        matches = self.text_matches(query)
+        if matches is not None:
+            return self.mask_for_ids(matches)
+        mask = 0
+        for pos, text in enumerate(self._lowered):
+            if needle in text:
+                mask |= 1 << pos
+        return mask
+
+    def _pages_with_prefix(self, prefix: str) -> int:
+        mask = 0
+        start = bisect.bisect_left(self._page_paths, prefix)
+        for idx in range(start, len(self._page_paths)):
+            if not self._page_paths[idx].startswith(prefix):
+                break
+            mask |= self._page_masks[idx]
+        return mask
+
+    def _page(self, path: str) -> int:
+        idx = bisect.bisect_left(self._page_paths, path)
+        if idx < len(self._page_paths) and self._page_paths[idx] == path:
+            return self._page_masks[idx]
+        return 0
+
+    def path_mask(self, prefix: Optional[str]) -> int:
+        """Tasks on the page ``prefix`` or anywhere below its folder."""
+        prefix = normalize_task_path(prefix)
+        if not prefix:
+            return 0
+        if prefix == "/":
+            return self.all_mask
+        if prefix.endswith(tuple(PAGE_SUFFIXES)):
+            return self._page(prefix)
+        base = prefix.rstrip("/")
+        if not base:
+            return self.all_mask
+        return self._pages_with_prefix(base + "/") | self._page(base + PAGE_SUFFIX)
+
+    def journal_mask(self) -> int:
+        return (
+            self._page(JOURNAL_ROOT)
+            | self._page(JOURNAL_ROOT + PAGE_SUFFIX)
+            | self._page(JOURNAL_ROOT + LEGACY_SUFFIX)
+            | self._pages_with_prefix(JOURNAL_ROOT + "/")
+        )
+
+    @staticmethod
+    def _date_range(index: list[tuple[int, int]], start: Optional[str], end: Optional[str]) -> int:
+        lo = bisect.bisect_left(index, (day_ordinal(start), -1)) if start else 0
+        hi = bisect.bisect_right(index, (day_ordinal(end), float("inf"))) if end else len(index)
+        mask = 0
+        for _day, pos in index[lo:hi]:
+            mask |= 1 << pos
+        return mask
+
+    def due_mask(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Tasks due within the inclusive ISO date range (open-ended when None)."""
+        return self._date_range(self._due, start, end)
+
+    def starts_mask(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Tasks starting within the inclusive ISO date range (open-ended when None)."""
+        return self._date_range(self._starts, start, end)
+
+    def with_ancestors(self, mask: int, within: Optional[int] = None) -> int:
+        """Add the ancestors of every task in ``mask`` (restricted to ``within``)."""
+        result = mask
+        for pos in iter_bits(mask):
+            parent = self._parent[pos]
+            while parent >= 0 and not (result >> parent) & 1:
+                if within is not None and not (within >> parent) & 1:
+                    break
+                result |= 1 << parent
+                parent = self._parent[parent]
+        return result
+
+    # ------------------------------------------------------------------ views
+    def select(
+        self,
+        query: str = "",
+        tags: Sequence[str] = (),
+        include_done: bool = False,
+        include_ancestors: bool = False,
+        actionable_only: bool = False,
+    ) -> int:
+        """Mask equivalent to ``config.fetch_tasks`` with the same arguments."""
+        mask = self.all_mask
+        if query:
+            mask &= self.text_mask(query)
+        if tags:
+            mask &= self.tags_mask(tags)
+        if not include_done:
+            mask &= self.open_mask
+        if actionable_only:
+            mask &= self.stored_actionable_mask
+        if include_ancestors:
+            mask = self.with_ancestors(mask)
+        if actionable_only:
+            keep = mask & self.actionable_mask
+            mask = self.with_ancestors(keep, within=mask) if include_ancestors else keep
+        return mask
+
+    def tasks_for(self, mask: int) -> list[dict]:
+        return [self.tasks[pos] for pos in iter_bits(mask)]
+
+    def stored_tag_counts(self) -> list[tuple[str, int]]:
+        """(tag, task count) over the task_tags table, sorted by tag."""
+        return sorted((tag, mask.bit_count()) for tag, mask in self._tag_masks.items())
+
+    def tag_counts(self, mask: int, include_done: bool = True) -> list[tuple[str, int]]:
+        """(tag, task count) within ``mask``, sorted by tag."""
+        if not include_done:
+            mask &= self.open_mask
+        counts = []
+        for tag, tag_mask in self._count_masks.items():
+            count = (tag_mask & mask).bit_count()
+            if count:
+                counts.append((tag, count))
+        counts.sort()
+        return counts
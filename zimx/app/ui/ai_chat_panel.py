@@ -40,6 +40,7 @@ from markdown import markdown
 # Use zimx_config for global config storage
 from zimx.app import config, config as zimx_config
 from zimx.ai.manager import AIManager, ContextItem
+from zimx.rag.context import AssembledContext, PageTextCache, assemble_context, get_tokenizer
 from zimx.rag.index import RetrievedChunk
 from .path_utils import path_to_colon
 from zimx.server.adapters.files import LEGACY_SUFFIX, PAGE_SUFFIX, PAGE_SUFFIXES
@@ -99,6 +100,7 @@ class VectorAPIClient:
     ) -> bool:
         if not self.available():
             return False
+        # Always send: the server skips unchanged text by digest, and only it knows what its store holds.
         payload = {
             "page_ref": page_ref,
             "text": text,
@@ -108,6 +110,13 @@ class VectorAPIClient:
         try:
             resp = self._client.post("/vector/add", json=payload, timeout=timeout)
             resp.raise_for_status()
+            stats = resp.json()
+            if stats.get("embedded"):
+                _log_vector(
+                    f"Embedded {stats['embedded']} chunk(s) for {page_ref} "
+                    f"(kept {stats.get('kept', 0)}, removed {stats.get('removed', 0)}, "
+                    f"cpu {stats.get('embed_cpu', 0.0):.3f}s)"
+                )
             return True
         except (httpx.HTTPError, RuntimeError) as exc:
             _log_vector(f"Failed to index {page_ref}: {exc}")
@@ -159,6 +168,26 @@ class VectorAPIClient:
             _log_vector(f"Failed to query context: {exc}")
             return []
 
+    def retrieve(
+        self,
+        query_text: str,
+        scopes: List[dict],
+        limit: Optional[int] = None,
+        one_per_source: bool = False,
+    ) -> List[RetrievedChunk]:
+        """Run several scoped searches in one request; the server embeds the query once and merges results."""
+        if not self.available() or not scopes:
+            return []
+        payload = {"query_text": query_text, "scopes": scopes, "limit": limit, "one_per_source": one_per_source}
+        try:
+            resp = self._client.post("/vector/retrieve", json=payload)
+            resp.raise_for_status()
+            data = resp.json()
+            return [RetrievedChunk(**item) for item in data.get("chunks", [])]
+        except (httpx.HTTPError, RuntimeError) as exc:
+            _log_vector(f"Failed to retrieve context: {exc}")
+            return []
+
 # Shared config (aligns with slipstream/ask-server/ask-client.py defaults)
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 ASSETS_DIR = PROJECT_ROOT / "assets"
@@ -1140,6 +1169,8 @@ class AIChatPanel(QtWidgets.QWidget):
         self.ai_manager: Optional[AIManager] = None
         self._current_ai_conversation_id: Optional[int] = None
         self._context_items: list[ContextItem] = []
+        self._page_text_cache = PageTextCache()
+        self._last_context: Optional[AssembledContext] = None
         self._page_candidates: List[ContextCandidate] = []
         self._tree_candidates: List[ContextCandidate] = []
         self._attachment_candidates: List[ContextCandidate] = []
@@ -2139,7 +2170,7 @@ class AIChatPanel(QtWidgets.QWidget):
                 pages.add(item.page_ref)
         return sorted(pages)
 
-    def _rag_context_chunks(self, query: str) -> List[RetrievedChunk]:
+    def _rag_context_chunks(self, query: str, limit: int = 4) -> List[RetrievedChunk]:
         if not self._vector_api.available():
             return []
         pages = self._rag_context_pages()
@@ -2155,30 +2186,13 @@ class AIChatPanel(QtWidgets.QWidget):
             f"pages={pages} attachments={attachment_labels or 'none'}"
         )
         try:
-            limit = 4
             attachment_names = [label.split("/")[-1] for label in attachment_labels]
-            deduped: list[RetrievedChunk] = []
-            seen: Set[tuple[str, Optional[str]]] = set()
+            scopes: list[dict] = []
             if attachment_names:
-                attachment_chunks = self._vector_api.query_attachments(query, attachment_names, limit=limit)
-                for chunk in attachment_chunks:
-                    key = (chunk.page_ref, chunk.attachment_name)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    deduped.append(chunk)
-                    if len(deduped) >= limit:
-                        break
-            if len(deduped) < limit:
-                general_chunks = self._vector_api.query(query, page_refs=pages, limit=limit * 2)
-                for chunk in general_chunks:
-                    key = (chunk.page_ref, chunk.attachment_name)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    deduped.append(chunk)
-                    if len(deduped) >= limit:
-                        break
+                scopes.append({"kind": "attachment", "attachment_names": attachment_names, "limit": limit})
+            scopes.append({"kind": "page", "page_refs": pages, "limit": limit * 2})
+            # Several chunks per page may be kept; assemble_context dedupes and enforces the budget.
+            deduped = self._vector_api.retrieve(query, scopes, limit=limit)
             if deduped:
                 _log_vector(f"Retrieved {len(deduped)} context chunks for query.")
                 for chunk in deduped:
@@ -2190,22 +2204,36 @@ class AIChatPanel(QtWidgets.QWidget):
             _log_vector(f"Failed to query context: {exc}")
             return []
 
+    def _page_context_chunks(self) -> List[RetrievedChunk]:
+        """Whole text of the current and explicitly added pages, for when vector search is unavailable."""
+        pages: List[str] = [self.current_page_path] if self.current_page_path else []
+        for item in self._context_items:
+            if item.kind == "page" and item.page_ref and item.page_ref not in pages:
+                pages.append(item.page_ref)
+        chunks = []
+        for page in pages:
+            text = self._read_page_text(page)
+            if text.strip():
+                chunks.append(RetrievedChunk(page_ref=page, content=text))
+        return chunks
+
     def _build_context_prompt(self, query: str) -> Optional[str]:
-        chunks = self._rag_context_chunks(query)
+        budget = config.load_ai_context_token_budget()
+        tokenizer = get_tokenizer(config.load_ai_context_tokenizer())
+        # Chunks are at most ~256 tokens, so this asks for enough candidates to fill the budget.
+        chunks = self._rag_context_chunks(query, limit=max(4, min(32, budget // 256)))
+        if not chunks and not self._vector_api.available():
+            chunks = self._page_context_chunks()
         if not chunks:
+            self._last_context = None
+            return None
+        context = assemble_context(chunks, budget, tokenizer)
+        self._last_context = context
+        _log_vector(f"context {context.summary()}")
+        if not context.text:
             return None
-        lines: List[str] = ["Vault context relevant to the query:"]
-        for chunk in chunks:
-            snippet = re.sub(r"\s+", " ", chunk.content.strip())
-            if len(snippet) > 2000:
-                snippet = snippet[:2000].rstrip() + "…"
-            label = chunk.page_ref
-            if chunk.attachment_name:
-                label += f" ({chunk.attachment_name})"
-            lines.append(f"{label}: {snippet}")
-        prompt_text = "\n".join(lines)
-        _log_vector(f"rag retrieved:\n{prompt_text}")
-        return "\n".join(lines)
+        _log_vector(f"rag retrieved:\n{context.text}")
+        return context.text
 
     def _record_chat_history(self, content: str) -> None:
         if not content:
@@ -2418,17 +2446,14 @@ class AIChatPanel(QtWidgets.QWidget):
                 page_path = candidate_txt
             else:
                 return ""
-        try:
-            return page_path.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            return ""
+        return self._page_text_cache.read(page_path)
 
     def _extract_attachment_text(self, page_ref: str, attachment_name: str) -> str:
         path = self._attachment_path(page_ref, attachment_name)
         if not path or not path.exists():
             return ""
         _log_vector(f"Extracting text from attachment {path}")
-        return extract_attachment_text(path)
+        return extract_attachment_text(path, Path(self.vault_root))
 
     def _attachment_path(self, page_ref: str, attachment_name: str) -> Optional[Path]:
         if not self.vault_root:
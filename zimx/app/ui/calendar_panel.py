@@ -42,6 +42,7 @@ from shiboken6 import Shiboken
 
 from zimx.server.adapters.files import LEGACY_SUFFIX, PAGE_SUFFIX, PAGE_SUFFIXES
 from zimx.app import config
+from zimx.app.agenda import AgendaRange
 from .path_utils import path_to_colon
 from markdown import markdown as render_markdown
 from .ai_chat_panel import ApiWorker, ServerManager
@@ -241,6 +242,8 @@ class CalendarPanel(QWidget):
         self._suppress_next_click = False
         self._pending_shift_click = False
         self.multi_selected_dates: set[QDate] = {self.calendar.selectedDate()}
+        # Journal/task-density formats keyed by julian day, restored under the selection highlight.
+        self._base_date_formats: dict[int, QTextCharFormat] = {}
         
         # Create custom delegate for multi-selection highlighting
         self.calendar_delegate = MultiSelectCalendarDelegate(calendar_widget=self.calendar)
@@ -554,6 +557,7 @@ class CalendarPanel(QWidget):
     def set_vault_root(self, vault_root: Optional[str]) -> None:
         """Set vault root for calendar and tree data."""
         self.vault_root = vault_root
+        self._base_date_formats = {}
         self.refresh()
 
     def refresh(self) -> None:
@@ -1152,7 +1156,7 @@ class CalendarPanel(QWidget):
         self._update_insights_from_calendar()
 
     def _update_calendar_dates(self, year: Optional[int] = None, month: Optional[int] = None) -> None:
-        """Bold dates with saved journal entries for the visible month."""
+        """Bold dates with saved journal entries and tint days with open tasks."""
         if not self.vault_root:
             return
 
@@ -1161,31 +1165,49 @@ class CalendarPanel(QWidget):
         month = month or current.month()
 
         journal_path = Path(self.vault_root) / "Journal" / str(year) / f"{month:02d}"
-        days_in_month = QDate(year, month, 1).daysInMonth()
 
-        default_format = QTextCharFormat()
-        bold_format = QTextCharFormat()
         bold_font = QFont()
         bold_font.setBold(True)
         bold_font.setWeight(QFont.Black)
-        bold_format.setFont(bold_font)
-
-        for day in range(1, days_in_month + 1):
-            self.calendar.setDateTextFormat(QDate(year, month, day), default_format)
-
-        if not journal_path.exists():
-            self._apply_multi_selection_formats()
-            return
 
-        for day_dir in journal_path.iterdir():
-            if not day_dir.is_dir() or not day_dir.name.isdigit():
-                continue
-            day_num = int(day_dir.name)
-            day_file = day_dir / f"{day_dir.name}{PAGE_SUFFIX}"
-            if day_file.exists():
-                self.calendar.setDateTextFormat(QDate(year, month, day_num), bold_format)
+        # Base formats cover the shown month plus the adjacent-month preview days.
+        shown = QDate(year, month, 1)
+        visible = AgendaRange(shown.addMonths(-1).toJulianDay(), shown.addMonths(2).addDays(-1).toJulianDay())
+        try:
+            day_counts = config.task_day_counts(visible) if config.has_active_vault() else {}
+        except Exception:
+            day_counts = {}
+        base_formats: dict[int, QTextCharFormat] = {}
+        for jd, (due_count, start_count) in day_counts.items():
+            day_format = QTextCharFormat()
+            day_format.setBackground(self._task_density_color(due_count + start_count))
+            parts = []
+            if due_count:
+                parts.append(f"{due_count} due")
+            if start_count:
+                parts.append(f"{start_count} starting")
+            day_format.setToolTip("Tasks: " + ", ".join(parts))
+            base_formats[jd] = day_format
+
+        if journal_path.exists():
+            for day_dir in journal_path.iterdir():
+                if not day_dir.is_dir() or not day_dir.name.isdigit():
+                    continue
+                day_num = int(day_dir.name)
+                day_file = day_dir / f"{day_dir.name}{PAGE_SUFFIX}"
+                day_date = QDate(year, month, day_num)
+                if day_file.exists() and day_date.isValid():
+                    base_formats.setdefault(day_date.toJulianDay(), QTextCharFormat()).setFont(bold_font)
+        self._base_date_formats = base_formats
         self._apply_multi_selection_formats()
 
+    @staticmethod
+    def _task_density_color(count: int) -> QColor:
+        """Orange tint that deepens with the number of open tasks on a day."""
+        color = QColor("#F57900")
+        color.setAlpha(min(48 + 32 * (count - 1), 176))
+        return color
+
     def _apply_multi_selection_formats(self) -> None:
         """Highlight all currently multi-selected dates."""
         # Update the delegate
@@ -1201,7 +1223,7 @@ class CalendarPanel(QWidget):
         year = self.calendar.yearShown()
         month = self.calendar.monthShown()
         
-        # Clear ALL date formats (including adjacent month previews)
+        # Reset ALL date formats (including adjacent month previews) to the journal/task base formats
         # Go back one month and forward one month to cover all visible dates
         default_format = QTextCharFormat()
         for month_offset in [-1, 0, 1]:
@@ -1212,7 +1234,8 @@ class CalendarPanel(QWidget):
             
             for day in range(1, days_in_month + 1):
                 day_date = QDate(check_year, check_month, day)
-                self.calendar.setDateTextFormat(day_date, default_format)
+                base_format = self._base_date_formats.get(day_date.toJulianDay(), default_format)
+                self.calendar.setDateTextFormat(day_date, base_format)
         
         # Now apply highlighting ONLY to multi-selected dates that match exactly
         for date in self.multi_selected_dates:
@@ -1904,13 +1927,6 @@ class CalendarPanel(QWidget):
             return label, overdue
         return priority, overdue
 
-    @staticmethod
-    def _parse_date(value: str) -> Optional[Date]:
-        try:
-            return Date.fromisoformat(value.strip())
-        except Exception:
-            return None
-
     def _update_due_tasks(self, dates: list[QDate]) -> None:
         """List tasks due on any of the selected dates."""
         self._configure_task_columns()
@@ -1936,33 +1952,17 @@ class CalendarPanel(QWidget):
                 range_end = Date(y, m, last)
         except Exception:
             pass
+        # Respect overdue checkbox: if unchecked, exclude all overdue items
+        show_overdue = bool(getattr(self, "overdue_checkbox", True) and self.overdue_checkbox.isChecked())
         try:
-            tasks = config.fetch_tasks(include_done=False, include_ancestors=False)
+            matches = config.fetch_agenda_tasks(AgendaRange.for_dates(range_start, range_end, overdue=show_overdue))
         except Exception:
-            tasks = []
-        matches: list[dict] = []
-        for task in tasks:
-            path = task.get("path") or ""
-            if not path:
-                continue
-            due_str = (task.get("due") or "").strip()
-            start_str = (task.get("starts") or "").strip()
-            due_dt = self._parse_date(due_str)
-            start_dt_val = self._parse_date(start_str)
-            is_overdue = bool(due_dt and due_dt < range_start)
-            is_due_in_range = bool(due_dt and range_start <= due_dt <= range_end)
-            starts_in_range = bool(start_dt_val and range_start <= start_dt_val <= range_end)
-            # Respect overdue checkbox: if unchecked, exclude all overdue items
-            show_overdue = bool(getattr(self, "overdue_checkbox", True) and self.overdue_checkbox.isChecked())
-            if is_overdue and not show_overdue:
-                continue
-            if is_overdue or is_due_in_range or starts_in_range:
-                matches.append(task)
+            matches = []
         self.tasks_due_list.clear()
         if not matches:
             self._clear_due_tasks("No due tasks for selection")
             return
-        for task in sorted(matches, key=lambda t: (t.get("due") or "", t.get("path") or "", t.get("line") or 0)):
+        for task in matches:
             path = str(task.get("path") or "")
             if not path.startswith("/"):
                 path = "/" + path.lstrip("/")
@@ -0,0 +1,151 @@
+"""Shared Pygments tokenization for fenced code blocks.
+
+Tokens are cached per (language, content hash) in a bounded LRU shared by every
+editor in the process (main window and PageEditorWindow instances alike). Lexing
+runs on a background thread; highlighters apply cached spans and get notified
+through ``tokensReady`` when a pending block has been tokenized.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from PySide6.QtCore import QObject, Signal
+
+logger = logging.getLogger(__name__)
+
+# (lowercased language, content digest)
+CodeKey = tuple[str, str]
+# Spans for one line of a fence: (column, length, pygments token type)
+LineSpans = tuple[tuple[int, int, object], ...]
+
+_CACHE_MAX_ENTRIES = 256
+
+_LEXER_CACHE: dict[str, object] = {}
+_LEXER_LOCK = threading.Lock()
+
+
+def code_block_key(lang: Optional[str], code: str) -> CodeKey:
+    """Return the cache key for a fence body in a given language."""
+    digest = hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+    return ((lang or "").strip().lower(), digest)
+
+
+def _lexer_for_language(lang: str):
+    with _LEXER_LOCK:
+        lexer = _LEXER_CACHE.get(lang)
+        if lexer is not None:
+            return lexer
+        from pygments.lexers import TextLexer, get_lexer_by_name
+
+        try:
+            lexer = get_lexer_by_name(lang) if lang else TextLexer()
+        except Exception:
+            lexer = TextLexer()
+        _LEXER_CACHE[lang] = lexer
+        return lexer
+
+
+def tokenize_code(code: str, lang: Optional[str]) -> tuple[LineSpans, ...]:
+    """Lex a fence body and split the tokens into per-line spans."""
+    from pygments import lex
+
+    lexer = _lexer_for_language((lang or "").strip().lower())
+    line_count = code.count("\n") + 1
+    lines: list[list[tuple[int, int, object]]] = [[] for _ in range(line_count)]
+    line_idx = 0
+    col = 0
+    for token_type, value in lex(code, lexer):
+        remaining = value
+        while remaining and line_idx < line_count:
+            newline = remaining.find("\n")
+            if newline == -1:
+                part = remaining
+                remaining = ""
+            else:
+                part = remaining[:newline]
+                remaining = remaining[newline + 1 :]
+            if part:
+                lines[line_idx].append((col, len(part), token_type))
+                col += len(part)
+            if newline != -1:
+                line_idx += 1
+                col = 0
+    return tuple(tuple(spans) for spans in lines)
+
+
+class CodeTokenizer(QObject):
+    """Bounded LRU of fence tokens with a single background lexing thread."""
+
+    tokensReady = Signal(object)  # CodeKey
+
+    def __init__(self, max_entries: int = _CACHE_MAX_ENTRIES, parent=None) -> None:
+        super().__init__(parent)
+        self._max_entries = max(1, int(max_entries))
+        self._cache: OrderedDict[CodeKey, tuple[LineSpans, ...]] = OrderedDict()
+        self._inflight: set[CodeKey] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def lookup(self, key: CodeKey) -> Optional[tuple[LineSpans, ...]]:
+        with self._lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+            return tokens
+
+    def request(self, key: CodeKey, code: str) -> bool:
+        """Queue a fence for lexing. Returns False when tokens are already cached."""
+        with self._lock:
+            if key in self._cache:
+                return False
+            if key in self._inflight:
+                return True
+            self._inflight.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zimx-code-lexer")
+            executor = self._executor
+        executor.submit(self._lex_job, key, code)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _store(self, key: CodeKey, tokens: tuple[LineSpans, ...]) -> None:
+        with self._lock:
+            self._inflight.discard(key)
+            self._cache[key] = tokens
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+
+    def _lex_job(self, key: CodeKey, code: str) -> None:
+        try:
+            tokens = tokenize_code(code, key[0])
+        except Exception as exc:
+            logger.debug("Pygments lexing failed for %s: %s", key[0] or "plain", exc)
+            # Cache an empty result so a broken lexer isn't retried on every keypress.
+            tokens = ()
+        self._store(key, tokens)
+        try:
+            self.tokensReady.emit(key)
+        except RuntimeError:
+            # Tokenizer torn down during shutdown.
+            pass
+
+
+_SHARED_TOKENIZER: Optional[CodeTokenizer] = None
+
+
+def shared_code_tokenizer() -> CodeTokenizer:
+    """Process-wide tokenizer; first call must happen on the GUI thread."""
+    global _SHARED_TOKENIZER
+    if _SHARED_TOKENIZER is None:
+        _SHARED_TOKENIZER = CodeTokenizer()
+    return _SHARED_TOKENIZER
@@ -0,0 +1,136 @@
+"""Per-rule cost accounting for MarkdownHighlighter.
+
+The highlighter calls ``record`` once per rule per block while profiling is
+enabled; nothing here runs on the hot path when profiling is off.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+HIGHLIGHT_PROFILE_ENABLED = os.getenv("ZIMX_HIGHLIGHT_PROFILE", "0") not in ("0", "false", "False", "", None)
+# When set, each profiled page load is also written as JSON into this directory.
+HIGHLIGHT_PROFILE_DIR = os.getenv("ZIMX_HIGHLIGHT_PROFILE_DIR", "")
+
+# Upper bounds (in characters) of the block-length histogram buckets.
+BLOCK_LENGTH_BUCKETS = (0, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+HIGHLIGHT_RULES = (
+    "code_fence",
+    "code_block",
+    "headings",
+    "lists",
+    "blockquotes",
+    "hr",
+    "tables",
+    "inline_code",
+    "bold_italic",
+    "bold",
+    "italic",
+    "strikethrough",
+    "highlight",
+    "tags",
+    "checkboxes",
+    "display_links",
+    "wiki_links",
+    "camel_links",
+    "colon_links",
+    "file_links",
+    "http_links",
+)
+
+
+def _bucket_label(length: int) -> str:
+    for bound in BLOCK_LENGTH_BUCKETS:
+        if length <= bound:
+            return f"<={bound}"
+    return f">{BLOCK_LENGTH_BUCKETS[-1]}"
+
+
+class HighlightProfiler:
+    """Accumulates rule timings, match counts, block lengths and the slowest blocks."""
+
+    def __init__(self, worst_blocks: int = 20) -> None:
+        self._worst_limit = max(1, worst_blocks)
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = time.time()
+        self.blocks = 0
+        self.total = 0.0
+        self.rule_time: dict[str, float] = {name: 0.0 for name in HIGHLIGHT_RULES}
+        self.rule_calls: dict[str, int] = {name: 0 for name in HIGHLIGHT_RULES}
+        self.rule_matches: dict[str, int] = {name: 0 for name in HIGHLIGHT_RULES}
+        self.length_histogram: dict[str, int] = {}
+        # Min-heap of (seconds, seq, block_number, length, preview)
+        self._worst: list[tuple[float, int, int, int, str]] = []
+        self._seq = 0
+
+    def record(self, rule: str, seconds: float, matches: int = 0) -> None:
+        self.rule_time[rule] = self.rule_time.get(rule, 0.0) + seconds
+        self.rule_calls[rule] = self.rule_calls.get(rule, 0) + 1
+        if matches:
+            self.rule_matches[rule] = self.rule_matches.get(rule, 0) + matches
+
+    def record_block(self, block_number: int, text: str, seconds: float) -> None:
+        self.blocks += 1
+        self.total += seconds
+        label = _bucket_label(len(text))
+        self.length_histogram[label] = self.length_histogram.get(label, 0) + 1
+        self._seq += 1
+        entry = (seconds, self._seq, block_number, len(text), text[:80])
+        if len(self._worst) < self._worst_limit:
+            heapq.heappush(self._worst, entry)
+        elif seconds > self._worst[0][0]:
+            heapq.heapreplace(self._worst, entry)
+
+    def report(self) -> dict:
+        """Return a JSON-serializable snapshot (times in milliseconds)."""
+        rules = []
+        for name in sorted(self.rule_time, key=lambda n: self.rule_time[n], reverse=True):
+            calls = self.rule_calls.get(name, 0)
+            if not calls:
+                continue
+            total_ms = self.rule_time[name] * 1000.0
+            rules.append(
+                {
+                    "rule": name,
+                    "total_ms": round(total_ms, 3),
+                    "calls": calls,
+                    "matches": self.rule_matches.get(name, 0),
+                    "avg_us": round(total_ms * 1000.0 / calls, 2),
+                    "share": round(self.rule_time[name] / self.total, 4) if self.total else 0.0,
+                }
+            )
+        histogram = {
+            label: self.length_histogram[label]
+            for label in [f"<={b}" for b in BLOCK_LENGTH_BUCKETS] + [f">{BLOCK_LENGTH_BUCKETS[-1]}"]
+            if label in self.length_histogram
+        }
+        worst = [
+            {"block": block, "length": length, "ms": round(seconds * 1000.0, 3), "preview": preview}
+            for seconds, _seq, block, length, preview in sorted(self._worst, reverse=True)
+        ]
+        return {
+            "blocks": self.blocks,
+            "total_ms": round(self.total * 1000.0, 3),
+            "avg_block_us": round(self.total * 1e6 / self.blocks, 2) if self.blocks else 0.0,
+            "rules": rules,
+            "block_length_histogram": histogram,
+            "worst_blocks": worst,
+        }
+
+    def to_json(self, *, indent: Optional[int] = None) -> str:
+        return json.dumps(self.report(), indent=indent, ensure_ascii=False)
+
+    def dump(self, path: Path, *, extra: Optional[dict] = None) -> None:
+        """Write the report (plus optional context such as the page path) to disk."""
+        payload = dict(extra or {})
+        payload.update(self.report())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
@@ -0,0 +1,187 @@
+"""Off-thread decoding and caching of inline editor images.
+
+Images are decoded on a small worker pool, scaled to the width they are shown
+at, and kept in a memory-bounded LRU shared by every editor in the process.
+Downscaled results are also written as thumbnails under ``.zimx/thumbnails`` so
+later page opens skip decoding the original. Editors insert a placeholder sized
+from the image header and swap in the decoded image on ``imageReady``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from PySide6.QtCore import QObject, QSize, Signal
+from PySide6.QtGui import QColor, QImage, QImageReader
+
+logger = logging.getLogger(__name__)
+
+# (resolved path, mtime_ns, decode width; 0 means full size)
+ImageKey = tuple[str, int, int]
+
+THUMBNAIL_DIR_NAME = "thumbnails"
+_CACHE_MAX_BYTES = 128 * 1024 * 1024
+_MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_PLACEHOLDER: Optional[QImage] = None
+
+
+def image_key(path: Path, width: int = 0) -> Optional[ImageKey]:
+    """Return the cache key for ``path`` decoded at ``width`` (None if the file is gone)."""
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    return (str(path), mtime_ns, max(0, int(width)))
+
+
+def read_image_size(path: Path) -> QSize:
+    """Read the pixel size from the image header without decoding the image."""
+    reader = QImageReader(str(path))
+    if not reader.canRead():
+        return QSize()
+    return reader.size()
+
+
+def thumbnail_path(cache_dir: Path, key: ImageKey) -> Path:
+    raw = f"{key[0]}\0{key[1]}\0{key[2]}".encode("utf-8", "surrogatepass")
+    return cache_dir / f"{hashlib.blake2b(raw, digest_size=16).hexdigest()}.png"
+
+
+def placeholder_image() -> QImage:
+    """Neutral 1x1 image the text layout stretches to the reserved image size."""
+    global _PLACEHOLDER
+    if _PLACEHOLDER is None:
+        image = QImage(1, 1, QImage.Format_ARGB32)
+        image.fill(QColor(128, 128, 128, 40))
+        _PLACEHOLDER = image
+    return _PLACEHOLDER
+
+
+def decode_image(key: ImageKey, cache_dir: Optional[Path] = None) -> Optional[QImage]:
+    """Decode an image at the key's width, using/populating the on-disk thumbnail cache."""
+    path, _mtime_ns, width = key
+    thumb = thumbnail_path(cache_dir, key) if cache_dir and width else None
+    if thumb is not None and thumb.exists():
+        image = QImage(str(thumb))
+        if not image.isNull():
+            return image
+    reader = QImageReader(path)
+    scaled = False
+    if width:
+        size = reader.size()
+        if size.isValid() and size.width() > width:
+            height = max(1, round(size.height() * width / size.width()))
+            reader.setScaledSize(QSize(width, height))
+            scaled = True
+    image = reader.read()
+    if image.isNull():
+        logger.debug("Failed to decode image %s: %s", path, reader.errorString())
+        return None
+    if thumb is not None and scaled:
+        tmp = thumb.with_name(f"{thumb.stem}.{threading.get_ident()}.tmp.png")
+        try:
+            thumb.parent.mkdir(parents=True, exist_ok=True)
+            if image.save(str(tmp), "PNG"):
+                os.replace(tmp, thumb)
+        except OSError as exc:
+            logger.debug("Failed to write thumbnail %s: %s", thumb, exc)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return image
+
+
+class ImagePipeline(QObject):
+    """Memory-bounded LRU of decoded images with a background decode pool."""
+
+    imageReady = Signal(object, object)  # ImageKey, QImage
+
+    def __init__(self, max_bytes: int = _CACHE_MAX_BYTES, parent=None) -> None:
+        super().__init__(parent)
+        self._max_bytes = max(1, int(max_bytes))
+        self._cache: OrderedDict[ImageKey, QImage] = OrderedDict()
+        self._bytes = 0
+        self._inflight: set[ImageKey] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def cached_bytes(self) -> int:
+        return self._bytes
+
+    def lookup(self, key: ImageKey) -> Optional[QImage]:
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+            return image
+
+    def request(self, key: ImageKey, cache_dir: Optional[Path] = None) -> bool:
+        """Queue an image for decoding. Returns False when it is already cached."""
+        with self._lock:
+            if key in self._cache:
+                return False
+            if key in self._inflight:
+                return True
+            self._inflight.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="zimx-image")
+            executor = self._executor
+        executor.submit(self._decode_job, key, cache_dir)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+
+    def _store(self, key: ImageKey, image: QImage) -> None:
+        cost = image.sizeInBytes()
+        with self._lock:
+            self._inflight.discard(key)
+            # Images larger than the whole budget are handed out but never retained.
+            if cost > self._max_bytes:
+                return
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.sizeInBytes()
+            self._cache[key] = image
+            self._bytes += cost
+            while self._bytes > self._max_bytes and self._cache:
+                _old_key, old_image = self._cache.popitem(last=False)
+                self._bytes -= old_image.sizeInBytes()
+
+    def _decode_job(self, key: ImageKey, cache_dir: Optional[Path]) -> None:
+        try:
+            image = decode_image(key, cache_dir)
+        except Exception as exc:
+            logger.debug("Image decode failed for %s: %s", key[0], exc)
+            image = None
+        if image is None:
+            with self._lock:
+                self._inflight.discard(key)
+            return
+        self._store(key, image)
+        try:
+            self.imageReady.emit(key, image)
+        except RuntimeError:
+            # Pipeline torn down during shutdown.
+            pass
+
+
+_SHARED_PIPELINE: Optional[ImagePipeline] = None
+
+
+def shared_image_pipeline() -> ImagePipeline:
+    """Process-wide pipeline; first call must happen on the GUI thread."""
+    global _SHARED_PIPELINE
+    if _SHARED_PIPELINE is None:
+        _SHARED_PIPELINE = ImagePipeline()
+    return _SHARED_PIPELINE
@@ -385,7 +385,15 @@ from .path_utils import colon_to_path, path_to_colon, ensure_root_colon_link
 from .date_insert_dialog import DateInsertDialog
 from .open_vault_dialog import OpenVaultDialog
 from .page_editor_window import PageEditorWindow
-from .page_load_logger import PageLoadLogger, PAGE_LOGGING_ENABLED
+from .page_save_worker import PageSaveJob, PageSaveResult, PageSaveWorker
+from .page_load_logger import (
+    PageLoadLogger,
+    PAGE_LOGGING_ENABLED,
+    export_chrome_trace,
+    format_stage_summary,
+    parse_server_timing,
+    recent_traces,
+)
 from .mode_window import ModeWindow
 from .find_replace_bar import FindReplaceBar
 from .search_tab import SearchTab
@@ -465,6 +473,8 @@ class VaultTreeView(QTreeView):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self._press_pos: QPoint | None = None
+        # perf_counter() of the last left-button press; seeds the page-load trace.
+        self.last_press_at: Optional[float] = None
         self._dragging: bool = False
         self._drag_src_index: QModelIndex | None = None
         self.setDragEnabled(True)
@@ -534,6 +544,7 @@ class VaultTreeView(QTreeView):
     def mousePressEvent(self, event):  # type: ignore[override]
         if event.button() == Qt.LeftButton:
             self._press_pos = event.pos()
+            self.last_press_at = time.perf_counter()
             self._dragging = False
             # Store the source index for potential reorder operation
             self._drag_src_index = self.indexAt(event.pos())
@@ -753,12 +764,20 @@ class MainWindow(QMainWindow):
             local_auth_token=local_auth_token,
             request_hooks=(_log_request, _log_response),
         )
+        # Autosaves serialize + write on a background thread; self.http is looked up per call
+        # because it is rebuilt when switching to a remote vault.
+        self._page_writer = PageSaveWorker(lambda *args, **kwargs: self.http.post(*args, **kwargs), parent=self)
+        self._page_writer.saved.connect(self._on_background_save_finished)
+        self._page_writer.conflict.connect(self._on_background_save_finished)
+        self._page_writer.failed.connect(self._on_background_save_finished)
         self.vault_root: Optional[str] = None
         self.vault_root_name: Optional[str] = None
         self.current_path: Optional[str] = None
         self._nav_filter_path: Optional[str] = None
         self._full_tree_data: list[dict] = []
         self._skip_next_selection_open: bool = False
+        # When a page open was triggered from the tree, when that interaction started.
+        self._nav_started_at: Optional[float] = None
         self._history_popup: Optional[QWidget] = None
         self._history_popup_label: Optional[QLabel] = None
         self._popup_items: list = []
@@ -928,7 +947,9 @@ class MainWindow(QMainWindow):
         self.autosave_timer = QTimer(self)
         self.autosave_timer.setInterval(30_000)
         self.autosave_timer.setSingleShot(True)
-        self.autosave_timer.timeout.connect(lambda: self._save_current_file(auto=True, reason="autosave timer"))
+        self.autosave_timer.timeout.connect(
+            lambda: self._save_current_file(auto=True, reason="autosave timer", background=True)
+        )
         self.editor.imageSaved.connect(self._on_image_saved)
         self.editor.textChanged.connect(lambda: self.autosave_timer.start())
         self.editor.focusLost.connect(self._on_editor_focus_lost)
@@ -1295,6 +1316,10 @@ class MainWindow(QMainWindow):
         webserver_action.setToolTip("Start local web server to serve vault as HTML")
         webserver_action.triggered.connect(self._open_webserver_dialog)
         tools_menu.addAction(webserver_action)
+        trace_export_action = QAction("Export Page Load Trace…", self)
+        trace_export_action.setToolTip("Save recent page-open timings as Chrome trace JSON")
+        trace_export_action.triggered.connect(self._export_page_load_trace)
+        tools_menu.addAction(trace_export_action)
         self._action_view_vault_disk = view_vault_disk_action
         self._action_zim_import = zim_import_action
         self._action_rebuild_index = rebuild_index_action
@@ -4002,6 +4027,7 @@ class MainWindow(QMainWindow):
             self._debug("Tree selection skipped: already editing this path.")
             return
         try:
+            self._nav_started_at = time.perf_counter()
             self._open_file(open_target)
             if restore_tree_focus:
                 self.tree_view.setFocus(Qt.OtherFocusReason)
@@ -4021,10 +4047,16 @@ class MainWindow(QMainWindow):
             return
         # Remember current cursor before switching pages
         self._remember_history_cursor()
-        tracer = PageLoadLogger(path) if PAGE_LOGGING_ENABLED else None
+        nav_started_at, self._nav_started_at = self._nav_started_at, None
+        tracer = PageLoadLogger(path, started_at=nav_started_at)
+        if nav_started_at is not None:
+            tracer.add_span("tree click", nav_started_at, time.perf_counter())
         # Save current page if dirty before switching
         if self.current_path and path != self.current_path:
-            self._save_dirty_page(reason="page switch")
+            with tracer.span("save previous page"):
+                # Land in-flight autosaves while the previous page is still current.
+                self._flush_background_saves()
+                self._save_dirty_page(reason="page switch")
         
         # Clean up current page if it's an unchanged virtual page
         if self.current_path and self.current_path in self.virtual_pages:
@@ -4048,9 +4080,11 @@ class MainWindow(QMainWindow):
                 # Refresh history buttons
                 self._refresh_history_buttons()
         
+        read_started = time.perf_counter()
         try:
-            resp = self.http.post("/api/file/read", json={"path": path})
-            resp.raise_for_status()
+            with tracer.span("http /api/file/read"):
+                resp = self.http.post("/api/file/read", json={"path": path})
+                resp.raise_for_status()
         except httpx.HTTPStatusError as exc:
             print(f"[UI] Failed to read page {path}: status={exc.response.status_code if exc.response else 'unknown'} body={exc.response.text if exc.response else ''}", file=sys.stderr)
             detail = exc.response.text if exc.response else str(exc)
@@ -4064,6 +4098,11 @@ class MainWindow(QMainWindow):
                 tracer.mark(f"api read failed ({exc})")
             self._alert_api_error(exc, f"Failed to open {path}")
             return
+        # Server-side stages (file read, SQLite rev lookup) arrive as Server-Timing durations.
+        server_offset = read_started
+        for stage, dur_ms in parse_server_timing(resp.headers.get("Server-Timing")):
+            tracer.add_span(f"server {stage}", server_offset, server_offset + dur_ms / 1000.0)
+            server_offset += dur_ms / 1000.0
         payload = resp.json()
         content = payload.get("content", "")
         rev = payload.get("rev")
@@ -4091,7 +4130,8 @@ class MainWindow(QMainWindow):
         self._suspend_cursor_history = True
         self._suspend_dirty_tracking = True
         try:
-            self.editor.set_markdown(content)
+            with tracer.span("editor set_markdown"):
+                self.editor.set_markdown(content)
         finally:
             self._suspend_dirty_tracking = False
             self._suspend_autosave = False
@@ -4105,14 +4145,17 @@ class MainWindow(QMainWindow):
         self._dirty_flag = False
         self._last_saved_content = content
         self._update_dirty_indicator()
-        updated = indexer.index_page(path, content)
+        with tracer.span("index page"):
+            updated = indexer.index_page(path, content)
         if updated:
-            self.right_panel.refresh_tasks()
+            with tracer.span("task panel refresh"):
+                self.right_panel.refresh_tasks()
         if tracer:
             tracer.mark(f"index refresh {'+ tasks' if updated else '(no task changes)'}")
         # Keep Link Navigator in sync when a page is opened or reloaded
-        self.right_panel.refresh_links(path)
-        self._refresh_detached_link_panels(path)
+        with tracer.span("link panel refresh"):
+            self.right_panel.refresh_links(path)
+            self._refresh_detached_link_panels(path)
         if tracer:
             tracer.mark("right panel links refreshed")
         # Persist panel visibility when a page is opened (captures programmatic restores)
@@ -4168,14 +4211,16 @@ class MainWindow(QMainWindow):
         # Always show editing status; vi-mode banner is separate
         display_path = path_to_colon(path) or path
         if hasattr(self, "toc_widget"):
-            root_base = ensure_root_colon_link(display_path) if display_path else ""
-            self.toc_widget.set_base_path(root_base)
-            self.editor.refresh_heading_outline()
+            with tracer.span("toc"):
+                root_base = ensure_root_colon_link(display_path) if display_path else ""
+                self.toc_widget.set_base_path(root_base)
+                self.editor.refresh_heading_outline()
         self.statusBar().showMessage(f"Editing {display_path}")
         self._update_window_title()
         
         # Automatically sync the nav tree to highlight the active page
-        self._sync_nav_tree_to_active_page()
+        with tracer.span("nav tree sync"):
+            self._sync_nav_tree_to_active_page()
         
         # Save the last opened file
         if config.has_active_vault():
@@ -4184,20 +4229,22 @@ class MainWindow(QMainWindow):
             self._update_dirty_indicator()
         
         # Update calendar if this is a journal page
-        self._update_calendar_for_journal_page(path)
+        with tracer.span("calendar refresh"):
+            self._update_calendar_for_journal_page(path)
         
         # Update attachments panel with current page
         from pathlib import Path
-        if path:
-            full_path = Path(self.vault_root) / path.lstrip("/")
-            has_chat = self.right_panel.set_current_page(full_path, path)
-            self.editor.set_ai_chat_available(has_chat, active=self.right_panel.is_active_chat_for_page(path))
-        else:
-            self.right_panel.set_current_page(None, None)
-            self.editor.set_ai_chat_available(False)
+        with tracer.span("right panel page refresh"):
+            if path:
+                full_path = Path(self.vault_root) / path.lstrip("/")
+                has_chat = self.right_panel.set_current_page(full_path, path)
+                self.editor.set_ai_chat_available(has_chat, active=self.right_panel.is_active_chat_for_page(path))
+            else:
+                self.right_panel.set_current_page(None, None)
+                self.editor.set_ai_chat_available(False)
         self._mark_initial_page_loaded()
-        if tracer:
-            tracer.end("ready for edit")
+        tracer.end("ready for edit")
+        if tracer.enabled:
             # Set up a defensive stack dump if the Qt loop does not resume quickly.
             faulthandler.cancel_dump_traceback_later()
             faulthandler.dump_traceback_later(5.0, repeat=False)
@@ -4263,7 +4310,15 @@ class MainWindow(QMainWindow):
             return detail
         return None
 
-    def _finalize_save(self, path: str, content: str, resp_payload: dict, message: str) -> None:
+    def _finalize_save(
+        self,
+        path: str,
+        content: str,
+        resp_payload: dict,
+        message: str,
+        editor_changed: bool = False,
+    ) -> None:
+        """Apply a completed write; ``editor_changed`` keeps the page dirty for edits made after the snapshot."""
         if config.has_active_vault():
             indexer.index_page(path, content)
             self.right_panel.refresh_tasks()
@@ -4275,6 +4330,10 @@ class MainWindow(QMainWindow):
             self._persist_recent_history()
         except Exception:
             pass
+        if editor_changed:
+            display_path = path_to_colon(path) if path else ""
+            self.statusBar().showMessage(f"{message} {display_path}", 2000)
+            return
         try:
             self.editor.document().setModified(False)
         except Exception:
@@ -4369,7 +4428,7 @@ class MainWindow(QMainWindow):
         self._finalize_save(path, merged, resp.json(), message)
         return True
 
-    def _save_current_file(self, auto: bool = False, reason: str = "save") -> None:
+    def _save_current_file(self, auto: bool = False, reason: str = "save", background: bool = False) -> None:
         if getattr(self, "_heading_picker_active", False):
             # Skip saves triggered while the heading picker popup is active (vi 't')
             return
@@ -4420,6 +4479,12 @@ class MainWindow(QMainWindow):
                     self._alert(f"Failed to create folder for {self.current_path}")
                 return
         
+        if background and auto and self.current_path not in self.virtual_pages:
+            self._queue_background_save(self.current_path, reason)
+            return
+        # A synchronous write must not be overtaken by an older queued autosave.
+        self._flush_background_saves(self.current_path)
+
         payload_content = self.editor.to_markdown()
         if os.getenv("ZIMX_DEBUG_EDITOR", "0") not in ("0", "false", "False", ""):
             print(f"[DEBUG save] to_markdown() returned {len(payload_content)} chars, ends_with_newline={payload_content.endswith('\\n')}, last_20_chars={repr(payload_content[-20:])}")
@@ -4494,6 +4559,116 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
+    def _queue_background_save(self, path: str, reason: str) -> None:
+        """Snapshot the editor and hand serialization + write to the page writer thread."""
+        if self._remote_mode and self._page_writer.is_pending(path):
+            # The If-Match revision is only known once the in-flight write lands; retry later.
+            self.autosave_timer.start()
+            return
+        editor = self.editor
+        snapshot = editor.snapshot_markdown()
+
+        def serialize(snap) -> str:
+            content = editor.markdown_from_snapshot(snap)
+            titled = self._ensure_page_title(content, path)
+            job.retitled = titled != content
+            return titled
+
+        job = PageSaveJob(
+            path=path,
+            snapshot=snapshot,
+            serialize=serialize,
+            headers=self._if_match_headers(path),
+            reason=reason,
+        )
+        self._log_write(reason, path, snapshot.text, auto=True)
+        self._page_writer.submit(job)
+        self.autosave_timer.stop()
+
+    def _flush_background_saves(self, path: Optional[str] = None) -> None:
+        """Wait for queued autosaves (optionally for one page) and apply their results now."""
+        for result in self._page_writer.flush(path):
+            self._apply_background_save(result)
+
+    def _on_background_save_finished(self, result: PageSaveResult) -> None:
+        if self._page_writer.claim(result):
+            self._apply_background_save(result)
+
+    def _apply_background_save(self, result: PageSaveResult) -> None:
+        path = result.path
+        job = result.job
+        self._debug(
+            f"Background save {result.status} path={path} reason={job.reason} coalesced={job.coalesced} "
+            f"serialize={result.serialize_ms:.1f}ms write={result.write_ms:.1f}ms"
+        )
+        if path != self.current_path:
+            # Page switches flush first, so this only happens if the page was closed underneath us.
+            if result.status == "saved":
+                self._update_page_revision(path, result.payload)
+                if config.has_active_vault():
+                    indexer.index_page(path, result.content)
+            else:
+                self.statusBar().showMessage(f"Auto-save failed for {path_to_colon(path) or path}", 4000)
+            return
+        editor_changed = self.editor.document().revision() != job.snapshot.revision
+        if result.status == "saved":
+            if job.retitled and not editor_changed:
+                self._apply_saved_content_to_editor(result.content)
+            self._finalize_save(path, result.content, result.payload, "Auto-saved", editor_changed=editor_changed)
+            try:
+                for win in list(getattr(self, "_page_windows", [])):
+                    if getattr(win, "_source_path", None) == path:
+                        win._load_content()
+            except Exception:
+                pass
+            return
+        if result.status == "conflict":
+            detail = result.payload.get("detail") if isinstance(result.payload, dict) else None
+            if isinstance(detail, dict) and "current_content" in detail:
+                local_content = self.editor.to_markdown() if editor_changed else result.content
+                if self._accept_noop_conflict(path, local_content, detail, True):
+                    return
+                self._resolve_conflict_and_save(
+                    path,
+                    local_content,
+                    detail,
+                    True,
+                    reason=f"{job.reason} (conflict merge)",
+                )
+                return
+        if result.status_code == 401 and self._remote_mode:
+            # Login prompts are interactive; retry on the synchronous path.
+            self._save_current_file(auto=True, reason=f"{job.reason} (retry)")
+            return
+        self._debug(f"Background save failed path={path} status={result.status_code} error={result.error[:200]}")
+        self.statusBar().showMessage(f"Auto-save failed for {path_to_colon(path) or path}", 4000)
+        # Still dirty; try again on the next autosave tick.
+        self.autosave_timer.start()
+
+    def _apply_saved_content_to_editor(self, content: str) -> None:
+        """Reload the editor with written content (e.g. an injected title), keeping cursor and scroll."""
+        try:
+            cursor_pos = self.editor.textCursor().position()
+            scroll_pos = self.editor.verticalScrollBar().value()
+        except Exception:
+            cursor_pos = scroll_pos = None
+        self._suspend_autosave = True
+        self._suspend_dirty_tracking = True
+        try:
+            self.editor.set_markdown(content)
+        finally:
+            self._suspend_dirty_tracking = False
+            self._suspend_autosave = False
+        if cursor_pos is None:
+            return
+        try:
+            cursor = self.editor.textCursor()
+            cursor.setPosition(min(cursor_pos, max(0, self.editor.document().characterCount() - 1)))
+            self.editor.setTextCursor(cursor)
+            self.editor.verticalScrollBar().setValue(scroll_pos)
+        except Exception:
+            pass
+
     def _append_text_to_page_from_editor(self, dest_path: str, markdown_text: str) -> bool:
         """Append text to the end of dest_path using the HTTP API.
 
@@ -4757,7 +4932,7 @@ class MainWindow(QMainWindow):
         else:
             # Focus is going elsewhere, save normally
             self._remember_history_cursor()
-            self._save_current_file(auto=True, reason="focus lost")
+            self._save_current_file(auto=True, reason="focus lost", background=True)
 
     def _find_asset(self, name: str) -> Optional[Path]:
         """Locate an asset in development or PyInstaller layouts."""
@@ -6705,6 +6880,7 @@ class MainWindow(QMainWindow):
         if target:
             if target != self.current_path:
                 self._skip_next_selection_open = True
+                self._nav_started_at = self.tree_view.last_press_at or time.perf_counter()
                 self._open_file(target)
             self._focus_editor()
 
@@ -9017,6 +9193,28 @@ class MainWindow(QMainWindow):
         if open_target and open_target != self.current_path:
             QTimer.singleShot(0, lambda p=open_target: self._open_file(p))
 
+    def _export_page_load_trace(self) -> None:
+        """Write the buffered page-open spans as Chrome trace JSON and show per-stage p50/p95."""
+        if not recent_traces():
+            self._alert("No page loads recorded yet.")
+            return
+        default_dir = Path(self.vault_root) if self.vault_root else Path.home()
+        target, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Page Load Trace",
+            str(default_dir / "page-load-trace.json"),
+            "Chrome Trace (*.json)",
+        )
+        if not target:
+            return
+        try:
+            export_chrome_trace(Path(target))
+        except OSError as exc:
+            self._alert(f"Failed to write trace: {exc}")
+            return
+        summary = format_stage_summary(sep="\n")
+        QMessageBox.information(self, "Page Load Trace", f"Saved {target}\n\n{summary}")
+
     def _rebuild_vault_index_from_disk(self) -> None:
         """Drop and rebuild vault index from source files, preserving bookmarks/kv/ai tables."""
         if not self._require_local_mode("Rebuild the vault index from disk"):
@@ -9591,6 +9789,7 @@ class MainWindow(QMainWindow):
             pass
         
         # Save current file and geometry
+        self._flush_background_saves()
         self._save_current_file(auto=True, reason="window close")
         self._save_geometry()
         self._persist_recent_history()
@@ -9600,6 +9799,8 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
         
+        for result in self._page_writer.shutdown():
+            self._apply_background_save(result)
         # Close HTTP client and clean up
         self.http.close()
         config.set_active_vault(None)
@@ -5,6 +5,11 @@ import sys
 import os
 import re
 import itertools
+import math
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Callable
 import httpx
@@ -28,6 +33,7 @@ from PySide6.QtGui import (
     QFont,
     QFontDatabase,
     QImage,
+    QPixmap,
     QTextCharFormat,
     QTextCursor,
     QSyntaxHighlighter,
@@ -61,6 +67,16 @@ from markdown import markdown as render_markdown
 from .path_utils import path_to_colon, colon_to_path, ensure_root_colon_link
 from .heading_utils import heading_slug
 from .page_load_logger import PageLoadLogger
+from .code_token_cache import CodeKey, code_block_key, shared_code_tokenizer
+from .image_cache import (
+    THUMBNAIL_DIR_NAME,
+    ImageKey,
+    image_key,
+    placeholder_image,
+    read_image_size,
+    shared_image_pipeline,
+)
+from .highlight_profiler import HIGHLIGHT_PROFILE_DIR, HIGHLIGHT_PROFILE_ENABLED, HighlightProfiler
 from .ai_actions_data import AI_ACTION_GROUPS
 from .jump_dialog import JumpToPageDialog
 from zimx.app import config
@@ -522,6 +538,60 @@ def heading_level_from_char(char: str) -> int:
         return code
     return 0
 
+@dataclass(frozen=True)
+class MarkdownSnapshot:
+    """Document text plus the markdown of each inline image, captured on the GUI thread."""
+
+    path: Optional[str]
+    text: str
+    # (position of U+FFFC in text, image markdown or None for non-image objects)
+    images: tuple[tuple[int, Optional[str]], ...]
+    revision: int
+
+
+def _snapshot_doc_markdown(snapshot: MarkdownSnapshot) -> str:
+    """Convert a document snapshot to markdown.
+
+    Inline images are round-tripped back into markdown. Trailing newlines are
+    normalized to avoid file bloat from accidental or repeated saves.
+    """
+    text = snapshot.text
+    parts: list[str] = []
+    pos = 0
+    for obj_pos, img_md in snapshot.images:
+        if obj_pos < pos:
+            continue
+        parts.append(text[pos:obj_pos])
+        pos = obj_pos + 1
+        if img_md is None:
+            continue
+        parts.append(img_md)
+        # If the markdown tag is still in the document right after the image
+        # object, skip the duplicate text to keep saves stable.
+        if text.startswith(img_md, pos):
+            pos += len(img_md)
+    parts.append(text[pos:])
+
+    result = "".join(parts).replace("\u2029", "\n")
+
+    # Limit trailing newlines to keep saves stable and prevent runaway growth.
+    max_trailing = 3
+    stripped = result.rstrip("\n")
+    trailing = len(result) - len(stripped)
+    if trailing > max_trailing:
+        result = stripped + ("\n" * max_trailing)
+    return result
+
+
+@dataclass
+class _FenceContext:
+    """Snapshot of one fenced code block as last seen by the highlighter."""
+    start_block: object  # QTextBlock of the opening fence
+    key: CodeKey
+    lines: list[str]
+    block_count: int
+
+
 class MarkdownHighlighter(QSyntaxHighlighter):
     CODE_BLOCK_STATE = 1
 
@@ -538,6 +608,8 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         self._timing_enabled = False
         self._timing_total = 0.0
         self._timing_blocks = 0
+        self._profiling_enabled = False
+        self._profiler = HighlightProfiler()
         self.heading_format = QTextCharFormat()
         self.heading_format.setForeground(QColor("#6cb4ff"))
         self.heading_format.setFontWeight(QFont.Weight.DemiBold)
@@ -626,6 +698,8 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         self.bold_italic_format.setFontWeight(QFont.Weight.Bold)
         self.bold_italic_format.setFontItalic(True)
 
+        self._tokenizer = shared_code_tokenizer()
+        self._tokenizer.tokensReady.connect(self._on_tokens_ready)
         self._reset_code_block_cache()
         self._init_pygments(config.load_pygments_style("monokai"))
 
@@ -647,15 +721,17 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         self.rehighlight()
 
     def _reset_code_block_cache(self) -> None:
-        self._code_block_spans: dict[int, list[tuple[int, int, QTextCharFormat]]] = {}
+        # Per-highlighter formatted spans keyed by the shared token cache key; the
+        # tokens themselves live in the process-wide CodeTokenizer.
+        self._fence_spans: OrderedDict[CodeKey, list[list[tuple[int, int, QTextCharFormat]]]] = OrderedDict()
+        self._fence_ctx: Optional[_FenceContext] = None
+        self._pending_fences: dict[CodeKey, list] = {}
         self._active_code_lang: Optional[str] = None
 
     def _init_pygments(self, style_name: Optional[str] = None) -> None:
         self._pygments_enabled = False
         try:
             from pygments.formatters.html import HtmlFormatter
-            from pygments.lexers import get_lexer_by_name, TextLexer
-            from pygments import lex
         except Exception as exc:
             logger.warning("Pygments unavailable; code fences stay monospace only: %s", exc)
             return
@@ -663,16 +739,12 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         self._pygments_enabled = True
         chosen_style = style_name or "monokai"
         self._pygments_style_name = chosen_style
-        self._pygments_lex = lex
         try:
             self._pygments_formatter = HtmlFormatter(style=chosen_style)
         except Exception:
             self._pygments_formatter = HtmlFormatter(style="monokai")
             self._pygments_style_name = "monokai"
-        self._pygments_get_lexer = get_lexer_by_name
-        self._pygments_text_lexer = TextLexer
         self._pygments_format_cache: dict[str, QTextCharFormat] = {}
-        self._pygments_lexer_cache: dict[str, object] = {}
 
     def set_pygments_style(self, style_name: str) -> None:
         """Update the Pygments style and rehighlight."""
@@ -689,19 +761,6 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         lang = text[3:].strip()
         return lang or None
 
-    def _lexer_for_language(self, lang: Optional[str]):
-        if not self._pygments_enabled:
-            return None
-        cache_key = (lang or "").lower()
-        if cache_key in self._pygments_lexer_cache:
-            return self._pygments_lexer_cache[cache_key]
-        try:
-            lexer = self._pygments_get_lexer(cache_key) if cache_key else self._pygments_text_lexer()
-        except Exception:
-            lexer = self._pygments_text_lexer()
-        self._pygments_lexer_cache[cache_key] = lexer
-        return lexer
-
     def _format_for_token(self, token) -> QTextCharFormat:
         if not self._pygments_enabled:
             return self.code_block
@@ -726,75 +785,115 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         self._pygments_format_cache[key] = fmt
         return fmt
 
-    def _cache_code_block_spans(self, start_block, lang: Optional[str]) -> None:
-        if not self._pygments_enabled:
-            return
-        lexer = self._lexer_for_language(lang)
-        if lexer is None:
-            return
-
-        blocks = []
-        lines = []
-        block = start_block
+    def _build_fence_context(self, fence_block, lang: Optional[str]) -> "_FenceContext":
+        """Collect a fence body and make sure its tokens are cached or being lexed."""
+        lines: list[str] = []
+        block = fence_block.next()
         while block.isValid():
             text = block.text()
             if text.startswith("```"):
                 break
-            blocks.append(block)
             lines.append(text)
             block = block.next()
-
-        if not blocks:
-            return
-
         code = "\n".join(lines)
-        try:
-            tokens = self._pygments_lex(code, lexer)
-        except Exception as exc:
-            logger.debug("Pygments lexing failed for %s: %s", lang or "plain", exc)
-            return
-
-        line_idx = 0
-        col = 0
-        for token_type, value in tokens:
-            remaining = value
-            while remaining:
-                newline = remaining.find("\n")
-                if newline == -1:
-                    part = remaining
-                    remaining = ""
-                else:
-                    part = remaining[:newline]
-                    remaining = remaining[newline + 1 :]
-                if line_idx >= len(blocks):
-                    break
-                if part:
-                    fmt = self._format_for_token(token_type)
-                    block_number = blocks[line_idx].blockNumber()
-                    self._code_block_spans.setdefault(block_number, []).append((col, len(part), fmt))
-                    col += len(part)
-                if newline != -1:
-                    line_idx += 1
-                    col = 0
-
-    def _ensure_code_block_cache(self, block) -> None:
-        """If a rehighlight starts mid-block, rebuild cached spans by scanning backward to the fence."""
-        if not self._pygments_enabled or block.blockNumber() in self._code_block_spans:
-            return
+        key = code_block_key(lang, code)
+        doc = fence_block.document()
+        ctx = _FenceContext(fence_block, key, lines, doc.blockCount() if doc is not None else -1)
+        if self._pygments_enabled and lines and self._tokenizer.request(key, code):
+            pending = self._pending_fences.setdefault(key, [])
+            if not any(existing == fence_block for existing in pending):
+                pending.append(fence_block)
+        return ctx
+
+    def _find_fence_start(self, block):
         fence = block.previous()
         while fence.isValid():
-            text = fence.text()
-            if text.startswith("```"):
-                lang = self._extract_fence_language(text)
-                self._cache_code_block_spans(fence.next(), lang)
-                break
+            if fence.text().startswith("```"):
+                return fence
             fence = fence.previous()
+        return None
 
-    def _apply_inline_code_formatting(self, text: str) -> None:
-        """Hide backticks and apply inline code formatting for a line."""
+    def _fence_line_index(self, ctx: "_FenceContext", block) -> int:
+        idx = block.blockNumber() - ctx.start_block.blockNumber() - 1
+        return idx if 0 <= idx < len(ctx.lines) else -1
+
+    def _formatted_fence_spans(self, key: CodeKey) -> Optional[list[list[tuple[int, int, QTextCharFormat]]]]:
+        spans = self._fence_spans.get(key)
+        if spans is not None:
+            self._fence_spans.move_to_end(key)
+            return spans
+        tokens = self._tokenizer.lookup(key)
+        if tokens is None:
+            return None
+        spans = [
+            [(col, length, self._format_for_token(token_type)) for col, length, token_type in line]
+            for line in tokens
+        ]
+        self._fence_spans[key] = spans
+        while len(self._fence_spans) > 64:
+            self._fence_spans.popitem(last=False)
+        return spans
+
+    def _code_spans_for_block(self, block, text: str):
+        """Return cached Pygments spans for a line inside a fence, if tokens are ready."""
+        if not self._pygments_enabled:
+            return None
+        ctx = self._fence_ctx
+        idx = -1
+        if ctx is not None and ctx.start_block.isValid() and ctx.start_block.text().startswith("```"):
+            idx = self._fence_line_index(ctx, block)
+            doc = block.document()
+            block_count = doc.blockCount() if doc is not None else -1
+            if idx >= 0 and (ctx.lines[idx] != text or ctx.block_count != block_count):
+                # This fence was edited (or lines moved): rebuild only this fence.
+                ctx = self._build_fence_context(
+                    ctx.start_block, self._extract_fence_language(ctx.start_block.text())
+                )
+                self._fence_ctx = ctx
+                idx = self._fence_line_index(ctx, block)
+        if idx < 0:
+            fence = self._find_fence_start(block)
+            if fence is None:
+                return None
+            ctx = self._build_fence_context(fence, self._extract_fence_language(fence.text()))
+            self._fence_ctx = ctx
+            idx = self._fence_line_index(ctx, block)
+            if idx < 0:
+                return None
+        spans = self._formatted_fence_spans(ctx.key)
+        if spans is None or idx >= len(spans):
+            return None
+        return spans[idx]
+
+    def _on_tokens_ready(self, key: CodeKey) -> None:
+        fences = self._pending_fences.pop(key, None)
+        if not fences:
+            return
+        doc = self.document()
+        if doc is None:
+            return
+        for fence in fences:
+            if not fence.isValid() or fence.document() is not doc or not fence.text().startswith("```"):
+                continue
+            ctx = self._build_fence_context(fence, self._extract_fence_language(fence.text()))
+            if ctx.key != key:
+                # Edited again since the request; the newer key is already pending.
+                continue
+            self._fence_ctx = ctx
+            block = fence.next()
+            for _ in ctx.lines:
+                if not block.isValid():
+                    break
+                self.rehighlightBlock(block)
+                block = block.next()
+
+    def _apply_inline_code_formatting(self, text: str) -> int:
+        """Hide backticks and apply inline code formatting for a line; returns the match count."""
+        matches = 0
         iterator = self._code_pattern.globalMatch(text)
         while iterator.hasNext():
             match = iterator.next()
+            matches += 1
             start = match.capturedStart()
             length = match.capturedLength()
 
@@ -812,14 +911,15 @@ class MarkdownHighlighter(QSyntaxHighlighter):
 
                 # Hide closing `
                 self.setFormat(start + length - 1, 1, self.hidden_format)
+        return matches
 
     def highlightBlock(self, text: str) -> None:  # type: ignore[override]
         import time
-        t0 = time.perf_counter() if self._timing_enabled else 0.0
+        perf = time.perf_counter
+        prof = self._profiler if self._profiling_enabled else None
+        t0 = perf() if (self._timing_enabled or prof) else 0.0
 
         block = self.currentBlock()
-        if not block.previous().isValid():
-            self._reset_code_block_cache()
 
         prev_state = self.previousBlockState()
         in_code_block = (prev_state == self.CODE_BLOCK_STATE)
@@ -830,30 +930,31 @@ class MarkdownHighlighter(QSyntaxHighlighter):
                 self._active_code_lang = None
             else:
                 self._active_code_lang = self._extract_fence_language(text)
-                self._cache_code_block_spans(block.next(), self._active_code_lang)
+                self._fence_ctx = self._build_fence_context(block, self._active_code_lang)
             in_code_block = not in_code_block
             self.setCurrentBlockState(self.CODE_BLOCK_STATE if in_code_block else 0)
             self.setFormat(0, len(text), self.code_fence_format)
-            if self._timing_enabled:
-                self._timing_blocks += 1
-                self._timing_total += time.perf_counter() - t0
+            if prof:
+                prof.record("code_fence", perf() - t0, 1)
+            self._finish_block_timing(block, text, t0)
             return
         elif in_code_block:
             self.setCurrentBlockState(self.CODE_BLOCK_STATE)
             self.setFormat(0, len(text), self.code_block)
-            self._ensure_code_block_cache(block)
-            spans = self._code_block_spans.get(block.blockNumber())
+            # Plain code styling stays until the shared tokenizer has spans for this fence.
+            spans = self._code_spans_for_block(block, text)
             if spans:
                 for start, length, fmt in spans:
                     if length > 0 and start < len(text):
                         self.setFormat(start, min(length, len(text) - start), fmt)
-            if self._timing_enabled:
-                self._timing_blocks += 1
-                self._timing_total += time.perf_counter() - t0
+            if prof:
+                prof.record("code_block", perf() - t0, len(spans) if spans else 0)
+            self._finish_block_timing(block, text, t0)
             return
         else:
             self.setCurrentBlockState(0)
 
+        t = perf() if prof else 0.0
         stripped = text.lstrip()
         indent = len(text) - len(stripped)
         level = heading_level_from_char(stripped[0]) if stripped else 0
@@ -870,20 +971,27 @@ class MarkdownHighlighter(QSyntaxHighlighter):
                 self.setFormat(indent + hashes + 1, len(stripped) - hashes - 1, fmt)
                 heading_applied = True
 
+        if prof:
+            prof.record("headings", perf() - t, int(heading_applied))
+
         # If we styled a heading, stop here so later rules (links, tags, etc.) don't override
         # the heading font size/color and leave trailing characters unstyled.
         if heading_applied:
-            self._apply_inline_code_formatting(text)
-            if self._timing_enabled:
-                self._timing_blocks += 1
-                self._timing_total += time.perf_counter() - t0
+            t = perf() if prof else 0.0
+            matches = self._apply_inline_code_formatting(text)
+            if prof:
+                prof.record("inline_code", perf() - t, matches)
+            self._finish_block_timing(block, text, t0)
             return
 
-        is_table = bool(TABLE_ROW_PATTERN.match(text) or TABLE_SEP_PATTERN.match(text))
-
-        if text.strip().startswith(("- ", "* ", "+ ", "• ")):
+        t = perf() if prof else 0.0
+        is_list = text.strip().startswith(("- ", "* ", "+ ", "• "))
+        if is_list:
             self.setFormat(0, len(text), self.list_format)
+        if prof:
+            prof.record("lists", perf() - t, int(is_list))
         
+        t = perf() if prof else 0.0
         # Blockquotes - handle > and >> (nested)
         stripped_for_quote = text.lstrip()
         if stripped_for_quote.startswith(">"):
@@ -903,19 +1011,33 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             remaining_length = len(text) - quote_start - idx
             if remaining_length > 0:
                 self.setFormat(quote_start + idx, remaining_length, self.quote_format)
+        if prof:
+            prof.record("blockquotes", perf() - t, int(stripped_for_quote.startswith(">")))
         
+        t = perf() if prof else 0.0
         stripped_hr = text.strip()
-        if stripped_hr == "---" or stripped_hr == "***" or stripped_hr == "___":
+        is_hr = stripped_hr == "---" or stripped_hr == "***" or stripped_hr == "___"
+        if is_hr:
             self.setFormat(0, len(text), self.hr_format)
+        if prof:
+            prof.record("hr", perf() - t, int(is_hr))
         
         # Apply monospace + compact font to table rows last so pipes align
+        t = perf() if prof else 0.0
+        is_table = bool(TABLE_ROW_PATTERN.match(text) or TABLE_SEP_PATTERN.match(text))
         if is_table:
             self.setFormat(0, len(text), self.table_format)
+        if prof:
+            prof.record("tables", perf() - t, int(is_table))
         
         # Inline code - hide backticks and style content
-        self._apply_inline_code_formatting(text)
+        t = perf() if prof else 0.0
+        matches = self._apply_inline_code_formatting(text)
+        if prof:
+            prof.record("inline_code", perf() - t, matches)
         
         # Bold+Italic (must be checked before bold and italic separately)
+        t = perf() if prof else 0.0
         iterator = self._bold_italic_pattern.globalMatch(text)
         bold_italic_ranges = []
         while iterator.hasNext():
@@ -942,11 +1064,16 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             
             # Hide closing ***
             self.setFormat(start + length - 3, 3, self.hidden_format)
+        if prof:
+            prof.record("bold_italic", perf() - t, len(bold_italic_ranges))
         
         # Bold (skip ranges already formatted as bold+italic)
+        t = perf() if prof else 0.0
+        matches = 0
         iterator = self._bold_pattern.globalMatch(text)
         while iterator.hasNext():
             match = iterator.next()
+            matches += 1
             start = match.capturedStart()
             length = match.capturedLength()
             # Check if this range overlaps with bold+italic
@@ -970,11 +1097,16 @@ class MarkdownHighlighter(QSyntaxHighlighter):
                 
                 # Hide closing **
                 self.setFormat(start + length - 2, 2, self.hidden_format)
+        if prof:
+            prof.record("bold", perf() - t, matches)
         
         # Italic (skip ranges already formatted as bold+italic)
+        t = perf() if prof else 0.0
+        matches = 0
         iterator = self._italic_pattern.globalMatch(text)
         while iterator.hasNext():
             match = iterator.next()
+            matches += 1
             start = match.capturedStart()
             length = match.capturedLength()
             # Check if this range overlaps with bold+italic
@@ -998,11 +1130,16 @@ class MarkdownHighlighter(QSyntaxHighlighter):
                 
                 # Hide closing *
                 self.setFormat(start + length - 1, 1, self.hidden_format)
+        if prof:
+            prof.record("italic", perf() - t, matches)
         
         # Strikethrough
+        t = perf() if prof else 0.0
+        matches = 0
         iterator = self._strikethrough_pattern.globalMatch(text)
         while iterator.hasNext():
             match = iterator.next()
+            matches += 1
             start = match.capturedStart()
             length = match.capturedLength()
             
@@ -1020,11 +1157,16 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             
             # Hide closing ~~
             self.setFormat(start + length - 2, 2, self.hidden_format)
+        if prof:
+            prof.record("strikethrough", perf() - t, matches)
         
         # Highlight
+        t = perf() if prof else 0.0
+        matches = 0
         iterator = self._highlight_pattern.globalMatch(text)
         while iterator.hasNext():
             match = iterator.next()
+            matches += 1
             start = match.capturedStart()
             length = match.capturedLength()
             
@@ -1042,18 +1184,30 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             
             # Hide closing ==
             self.setFormat(start + length - 2, 2, self.hidden_format)
+        if prof:
+            prof.record("highlight", perf() - t, matches)
 
+        t = perf() if prof else 0.0
+        matches = 0
         iterator = TAG_PATTERN.globalMatch(text)
         while iterator.hasNext():
             match = iterator.next()
+            matches += 1
             self.setFormat(match.capturedStart(), match.capturedLength(), self.tag_format)
+        if prof:
+            prof.record("tags", perf() - t, matches)
 
+        t = perf() if prof else 0.0
         stripped2 = text.lstrip()
-        if stripped2.startswith("☐") or stripped2.startswith("☑"):
+        is_checkbox = stripped2.startswith("☐") or stripped2.startswith("☑")
+        if is_checkbox:
             offset = len(text) - len(stripped2)
             self.setFormat(offset, 1, self.checkbox_format)
+        if prof:
+            prof.record("checkboxes", perf() - t, int(is_checkbox))
 
         # Link formatting
+        t = perf() if prof else 0.0
         link_format = QTextCharFormat()
         link_format.setForeground(QColor("#4fa3ff"))
         link_format.setFontUnderline(True)
@@ -1085,8 +1239,11 @@ class MarkdownHighlighter(QSyntaxHighlighter):
                         idx = label_end + 1
                         continue
             idx += 1
+        if prof:
+            prof.record("display_links", perf() - t, len(display_link_spans))
 
         # Wiki-style links in storage format: [link|label]
+        t = perf() if prof else 0.0
         wiki_pattern = r"\[([^\]|]+)\|([^\]]*)\]"
         import re as regex_module
         wiki_spans: list[tuple[int, int]] = []
@@ -1099,11 +1256,16 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             # Highlight the label part
             label_start = start + 1 + len(link) + 1  # After '[link|'
             self.setFormat(label_start, len(label), link_format)
+        if prof:
+            prof.record("wiki_links", perf() - t, len(wiki_spans))
 
         # CamelCase links: +PageName
+        t = perf() if prof else 0.0
+        matches = 0
         camel_iter = CAMEL_LINK_PATTERN.globalMatch(text)
         while camel_iter.hasNext():
             match = camel_iter.next()
+            matches += 1
             start = match.capturedStart()
             end = start + match.capturedLength()
             inside_wiki = any(ws <= start and end <= we for (ws, we) in wiki_spans)
@@ -1111,21 +1273,31 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             if inside_wiki or inside_display:
                 continue
             self.setFormat(start, end - start, link_format)
+        if prof:
+            prof.record("camel_links", perf() - t, matches)
 
         # Plain colon links: :Page:Name
+        t = perf() if prof else 0.0
+        matches = 0
         colon_iter = COLON_LINK_PATTERN.globalMatch(text)
         while colon_iter.hasNext():
             match = colon_iter.next()
+            matches += 1
             s = match.capturedStart(); e = s + match.capturedLength()
             inside_wiki = any(ws <= s and e <= we for (ws, we) in wiki_spans)
             inside_display = any(ds <= s and e <= de for (ds, de) in display_link_spans)
             if not inside_wiki and not inside_display:
                 self.setFormat(s, e - s, link_format)
+        if prof:
+            prof.record("colon_links", perf() - t, matches)
 
         # File links: [text](./file.ext)
+        t = perf() if prof else 0.0
+        matches = 0
         file_iter = WIKI_FILE_LINK_PATTERN.globalMatch(text)
         while file_iter.hasNext():
             fm = file_iter.next()
+            matches += 1
             start = fm.capturedStart(); end = start + fm.capturedLength()
             overlap = any(ws <= start and end <= we for (ws, we) in wiki_spans)
             if overlap:
@@ -1139,22 +1311,36 @@ class MarkdownHighlighter(QSyntaxHighlighter):
             label_end = label_start + label_len
             if end > label_end:
                 self.setFormat(label_end, end - label_end, self.hidden_format)
+        if prof:
+            prof.record("file_links", perf() - t, matches)
 
         # Plain HTTP URLs (not in wiki-style links)
+        t = perf() if prof else 0.0
+        matches = 0
         http_iter = HTTP_URL_PATTERN.globalMatch(text)
         while http_iter.hasNext():
             match = http_iter.next()
+            matches += 1
             s = match.capturedStart(); e = s + match.capturedLength()
             inside_wiki = any(ws <= s and e <= we for (ws, we) in wiki_spans)
             inside_display = any(ds <= s and e <= de for (ds, de) in display_link_spans)
             if not inside_wiki and not inside_display:
                 self.setFormat(s, e - s, link_format)
+        if prof:
+            prof.record("http_links", perf() - t, matches)
 
+        self._finish_block_timing(block, text, t0)
 
-
+    def _finish_block_timing(self, block, text: str, t0: float) -> None:
+        if not (self._timing_enabled or self._profiling_enabled):
+            return
+        import time
+        elapsed = time.perf_counter() - t0
         if self._timing_enabled:
-            self._timing_total += (time.perf_counter() - t0)
+            self._timing_total += elapsed
             self._timing_blocks += 1
+        if self._profiling_enabled:
+            self._profiler.record_block(block.blockNumber(), text, elapsed)
 
     def reset_timing(self):
         self._timing_total = 0.0
@@ -1163,15 +1349,32 @@ class MarkdownHighlighter(QSyntaxHighlighter):
     def enable_timing(self, enabled: bool):
         self._timing_enabled = enabled
 
+    def enable_profiling(self, enabled: bool) -> None:
+        """Record per-rule cost, match counts, block lengths and worst blocks."""
+        self._profiling_enabled = bool(enabled)
+
+    def reset_profiling(self) -> None:
+        self._profiler.reset()
+
+    def profile_report(self) -> dict:
+        return self._profiler.report()
+
+    @property
+    def profiler(self) -> HighlightProfiler:
+        return self._profiler
+
 
 class MarkdownEditor(QTextEdit):
-    def _convert_camelcase_links(self, text: str) -> str:
+    def _convert_camelcase_links(self, text: str, page_path: Optional[str] = None) -> str:
         """Convert +CamelCase links to colon-style links [:Path:Path:Page|+CamelCase] using current page context, but only if not already inside a [link|label]."""
         import re
         from pathlib import Path
         from zimx.server.adapters.files import PAGE_SUFFIX, PAGE_SUFFIXES
         from .path_utils import path_to_colon
-        current_path = self.current_relative_path() if hasattr(self, "current_relative_path") else None
+        if page_path is not None:
+            current_path = page_path
+        else:
+            current_path = self.current_relative_path() if hasattr(self, "current_relative_path") else None
         base_dir: Optional[Path] = None
         if current_path:
             try:
@@ -1291,6 +1494,12 @@ class MarkdownEditor(QTextEdit):
         self._pending_heading_block_num: Optional[int] = None
         self._pending_heading_level: Optional[int] = None
         self._search_engine = SearchEngine(self)
+        # Inline images decode off the GUI thread; resource names waiting on each decode.
+        self._image_pipeline = shared_image_pipeline()
+        self._image_pipeline.imageReady.connect(self._on_image_ready)
+        self._pending_images: dict[ImageKey, set[str]] = {}
+        # Decode width per image resource (0 = full size); shared by every use of that file.
+        self._image_decode_widths: dict[str, int] = {}
         self.setPlaceholderText("Open a Markdown file to begin editing…")
         self.setAcceptRichText(True)
         self.setTabStopDistance(4 * self.fontMetrics().horizontalAdvance(" "))
@@ -1718,6 +1927,9 @@ class MarkdownEditor(QTextEdit):
             self._mark_page_load("convert to display text")
             self.highlighter.enable_timing(True)
             self.highlighter.reset_timing()
+            if HIGHLIGHT_PROFILE_ENABLED:
+                self.highlighter.reset_profiling()
+                self.highlighter.enable_profiling(True)
             type(self)._LOAD_GUARD_DEPTH += 1
             self._display_guard = True
             self.setUpdatesEnabled(False)
@@ -1753,6 +1965,8 @@ class MarkdownEditor(QTextEdit):
                     pass
             blocker = QSignalBlocker(self)
             try:
+                self._pending_images.clear()
+                self._image_decode_widths.clear()
                 self.document().clear()
                 self.textChanged.disconnect(self._enforce_display_symbols)
                 self.textChanged.disconnect(self._schedule_heading_outline)
@@ -1815,6 +2029,17 @@ class MarkdownEditor(QTextEdit):
                 self._pop_paint_block()
             t5 = time.perf_counter()
             self._mark_page_load("outline + margin scheduled")
+            tracer = self._page_load_logger
+            if tracer:
+                # Highlighting runs synchronously inside setPlainText; split it out of that span.
+                highlight_s = min(self.highlighter._timing_total, t3 - t2)
+                tracer.add_span("normalize images", t0, t1)
+                tracer.add_span("display conversion", t1, t2)
+                tracer.add_span("setPlainText", t2, t3 - highlight_s)
+                tracer.add_span(
+                    "highlighting", t3 - highlight_s, t3, blocks=self.highlighter._timing_blocks
+                )
+                tracer.add_span("image loading", t3, t4)
             if _DETAILED_LOGGING:
                 print(f"[TIMING] set_markdown breakdown:")
                 print(f"  normalize_images: {(t1-t0)*1000:.1f}ms")
@@ -1835,12 +2060,30 @@ class MarkdownEditor(QTextEdit):
                     total = self.highlighter._timing_total * 1000.0
                     print(f"[TIMING] Highlighter: blocks={self.highlighter._timing_blocks} total={total:.1f}ms avg={avg:.2f}ms")
             self.highlighter.enable_timing(False)
+            if HIGHLIGHT_PROFILE_ENABLED:
+                self.highlighter.enable_profiling(False)
+                self._emit_highlight_profile()
             self._mark_page_load("editor focus ready")
             self.setFocus()
         finally:
             if self._suppress_paint_depth:
                 self._pop_paint_block()
 
+    def _emit_highlight_profile(self) -> None:
+        """Report the per-rule highlighter profile for the page that was just loaded."""
+        report = self.highlighter.profile_report()
+        if self._page_load_logger and self._page_load_logger.enabled:
+            self._page_load_logger.dump_json("highlighter profile", report)
+        else:
+            print(f"[HighlighterProfile] path={self._current_path} json={json.dumps(report, ensure_ascii=False)}")
+        if HIGHLIGHT_PROFILE_DIR:
+            slug = re.sub(r"[^\w.-]+", "_", (self._current_path or "untitled").strip("/")) or "untitled"
+            target = Path(HIGHLIGHT_PROFILE_DIR) / f"{slug}-{int(time.time() * 1000)}.json"
+            try:
+                self.highlighter.profiler.dump(target, extra={"path": self._current_path})
+            except OSError as exc:
+                logger.warning("Failed to write highlighter profile %s: %s", target, exc)
+
     def unload_for_delete(self) -> None:
         """Clear the document safely when the current page is being deleted."""
         blocker = QSignalBlocker(self)
@@ -1864,16 +2107,37 @@ class MarkdownEditor(QTextEdit):
             del doc_blocker
             del blocker
 
-    def to_markdown(self) -> str:
-        markdown = self._doc_to_markdown()
+    def snapshot_markdown(self) -> MarkdownSnapshot:
+        """Capture what ``to_markdown`` needs from the document (GUI thread, cheap)."""
+        doc = self.document()
+        text = doc.toPlainText()
+        images: list[tuple[int, Optional[str]]] = []
+        cursor = QTextCursor(doc)
+        pos = text.find("\ufffc")
+        while pos != -1:
+            cursor.setPosition(pos)
+            fmt = cursor.charFormat()
+            img_md = self._markdown_from_image_format(fmt.toImageFormat()) if fmt.isImageFormat() else None
+            images.append((pos, img_md))
+            pos = text.find("\ufffc", pos + 1)
+        return MarkdownSnapshot(
+            path=self._current_path,
+            text=text,
+            images=tuple(images),
+            revision=doc.revision(),
+        )
+
+    def markdown_from_snapshot(self, snapshot: MarkdownSnapshot) -> str:
+        """Serialize a snapshot to markdown. Pure string work; safe off the GUI thread."""
+        markdown = _snapshot_doc_markdown(snapshot)
         markdown = self._normalize_markdown_images(markdown)
         # Convert +CamelCase links to colon-style links before saving
-        markdown = self._convert_camelcase_links(markdown)
+        markdown = self._convert_camelcase_links(markdown, page_path=snapshot.path or "")
         result = self._from_display(markdown)
         # Guard against QTextDocument fragment drift: if the doc-derived markdown
         # doesn't match the display-derived markdown, prefer the display path,
         # but never drop image markdown that only exists in the document.
-        baseline = self._from_display(self.toPlainText())
+        baseline = self._from_display(snapshot.text)
         if result != baseline:
             result_images = len(IMAGE_PATTERN.findall(result))
             baseline_images = len(IMAGE_PATTERN.findall(baseline))
@@ -1881,8 +2145,18 @@ class MarkdownEditor(QTextEdit):
                 result = baseline
             elif result_images == baseline_images and len(result) < len(baseline):
                 result = baseline
+        return result
+
+    def _doc_to_markdown(self) -> str:
+        """Convert the document itself to markdown (images restored, trailing newlines capped)."""
+        return _snapshot_doc_markdown(self.snapshot_markdown())
+
+    def to_markdown(self) -> str:
+        snapshot = self.snapshot_markdown()
+        result = self.markdown_from_snapshot(snapshot)
         if sys.platform == "win32" and os.getenv("ZIMX_WIN_TRUNC_DEBUG", "0") not in ("0", "false", "False", ""):
             display_text = self.toPlainText()
+            baseline = self._from_display(snapshot.text)
             def _tail(text: str) -> str:
                 tail = text.replace("\u2029", "\n")
                 return tail[-200:] if len(tail) > 200 else tail
@@ -1902,6 +2176,7 @@ class MarkdownEditor(QTextEdit):
             print(f"[ZimX][WIN_TRUNC_DEBUG] result_tail={_tail(result)!r}")
         if sys.platform == "win32" and os.getenv("ZIMX_WIN_IMAGE_SAVE_DEBUG", "0") not in ("0", "false", "False", ""):
             doc = self.document()
+            baseline = self._from_display(snapshot.text)
             cursor = QTextCursor(doc)
             cursor.setPosition(0)
             doc_end = max(0, doc.characterCount() - 1)
@@ -6347,49 +6622,6 @@ class MarkdownEditor(QTextEdit):
         step = max(1, int(self.fontMetrics().lineSpacing()))
         sb.setValue(sb.value() + step)
 
-    def _doc_to_markdown(self) -> str:
-        """Convert document to markdown.
-
-        Uses QTextDocument blocks/fragments so inline images can be round-tripped
-        back into markdown. Trailing newlines are normalized to avoid file bloat
-        from accidental or repeated saves.
-        """
-        parts: list[str] = []
-        doc = self.document()
-        text = doc.toPlainText()
-        end = len(text)
-        cursor = QTextCursor(doc)
-        pos = 0
-        while pos < end:
-            ch = text[pos]
-            if ch == "\ufffc":
-                cursor.setPosition(pos)
-                fmt = cursor.charFormat()
-                if fmt.isImageFormat():
-                    img_md = self._markdown_from_image_format(fmt.toImageFormat())
-                    # If the markdown tag is still in the document right after the image
-                    # object, skip the duplicate text to keep saves stable.
-                    if text.startswith(img_md, pos + 1):
-                        parts.append(img_md)
-                        pos += 1 + len(img_md)
-                        continue
-                    parts.append(img_md)
-                pos += 1
-                continue
-            parts.append(ch)
-            pos += 1
-
-        result = "".join(parts).replace("\u2029", "\n")
-
-        # Limit trailing newlines to keep saves stable and prevent runaway growth.
-        max_trailing = 3
-        stripped = result.rstrip("\n")
-        trailing = len(result) - len(stripped)
-        if trailing > max_trailing:
-            result = stripped + ("\n" * max_trailing)
-        
-        return result
-
     def _markdown_from_image_format(self, img_fmt: QTextImageFormat) -> str:
         """Return markdown representation for an inline image fragment.
 
@@ -6524,26 +6756,71 @@ class MarkdownEditor(QTextEdit):
         resolved = self._resolve_image_path(raw_path)
         if resolved is None or not resolved.exists():
             return None
-        image = QImage(str(resolved))
-        if image.isNull():
+        # Only the header is read here; pixels are decoded by the shared image pipeline.
+        natural = read_image_size(resolved)
+        if not natural.isValid() or natural.isEmpty():
             return None
         fmt = QTextImageFormat()
         fmt.setName(str(resolved))
         fmt.setProperty(IMAGE_PROP_ALT, alt)
         fmt.setProperty(IMAGE_PROP_ORIGINAL, raw_path)
-        fmt.setProperty(IMAGE_PROP_NATURAL_WIDTH, image.width())
-        fmt.setProperty(IMAGE_PROP_NATURAL_HEIGHT, image.height())
+        fmt.setProperty(IMAGE_PROP_NATURAL_WIDTH, natural.width())
+        fmt.setProperty(IMAGE_PROP_NATURAL_HEIGHT, natural.height())
         width_val = int(width) if width else 0
         if width_val:
             fmt.setWidth(width_val)
-            if image.width():
-                ratio = image.height() / image.width()
-                fmt.setHeight(width_val * ratio)
+            ratio = natural.height() / natural.width()
+            fmt.setHeight(width_val * ratio)
             fmt.setProperty(IMAGE_PROP_WIDTH, width_val)
         else:
+            # Reserve the natural size so the placeholder occupies the final layout.
+            fmt.setWidth(natural.width())
+            fmt.setHeight(natural.height())
             fmt.setProperty(IMAGE_PROP_WIDTH, 0)
+        self._attach_image_resource(resolved, width_val or natural.width(), natural.width())
         return fmt
 
+    def _image_thumbnail_dir(self) -> Optional[Path]:
+        if self._remote_mode:
+            return self._remote_cache_root / THUMBNAIL_DIR_NAME if self._remote_cache_root else None
+        if self._vault_root:
+            return self._vault_root / ".zimx" / THUMBNAIL_DIR_NAME
+        return None
+
+    def _attach_image_resource(self, resolved: Path, display_width: int, natural_width: int) -> None:
+        """Register the decoded image (or a placeholder until it is ready) as a document resource."""
+        dpr = self.devicePixelRatioF() or 1.0
+        target = int(math.ceil(display_width * dpr))
+        decode_width = target if 0 < target < natural_width else 0
+        name = str(resolved)
+        # One resource per file: decode at the largest width any occurrence is shown at.
+        current = self._image_decode_widths.get(name)
+        if current is not None and (current == 0 or (decode_width and decode_width <= current)):
+            return
+        self._image_decode_widths[name] = decode_width
+        key = image_key(resolved, decode_width)
+        if key is None:
+            return
+        image = self._image_pipeline.lookup(key)
+        resource = QPixmap.fromImage(image) if image is not None else placeholder_image()
+        self.document().addResource(QTextDocument.ImageResource, QUrl(name), resource)
+        if image is None:
+            self._pending_images.setdefault(key, set()).add(name)
+            self._image_pipeline.request(key, self._image_thumbnail_dir())
+
+    def _on_image_ready(self, key: ImageKey, image: QImage) -> None:
+        names = self._pending_images.pop(key, None)
+        if not names:
+            return
+        pixmap = QPixmap.fromImage(image)
+        doc = self.document()
+        for name in names:
+            if self._image_decode_widths.get(name) != key[2]:
+                continue  # superseded by a larger decode of the same file
+            doc.addResource(QTextDocument.ImageResource, QUrl(name), pixmap)
+        # Layout already reserved the image size; only a repaint is needed.
+        self.viewport().update()
+
     def _resolve_image_path(self, raw_path: str) -> Optional[Path]:
         if not raw_path:
             return None
@@ -6694,6 +6971,8 @@ class MarkdownEditor(QTextEdit):
             else:
                 img_fmt.setWidth(0)
                 img_fmt.setHeight(0)
+        if natural_w:
+            self._attach_image_resource(Path(img_fmt.name()), int(width or natural_w), int(natural_w))
         
         # Replace the image at cursor position
         img_pos = cursor.position()
@@ -1,35 +1,64 @@
 from __future__ import annotations
 
+import json
+import math
 import os
+import threading
 import time
-from typing import Optional
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
 
 
-PAGE_LOGGING_ENABLED = os.getenv("ZIMX_DETAILED_PAGE_LOGGING", "0") not in (
-    "0",
-    "false",
-    "False",
-    "",
-    None,
-)
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "0") not in ("0", "false", "False", "", None)
+
+
+# main.py documents ZIMX_DETAILED_PAGE_LOG; older scripts use the longer name.
+PAGE_LOGGING_ENABLED = _env_flag("ZIMX_DETAILED_PAGE_LOGGING") or _env_flag("ZIMX_DETAILED_PAGE_LOG")
+# When set, the Chrome trace of recent page loads is rewritten here after every load.
+PAGE_TRACE_FILE = os.getenv("ZIMX_PAGE_TRACE_FILE", "")
+PAGE_TRACE_CAPACITY = 200
+
+# Ring buffer of recent page loads (oldest dropped first).
+_TRACES: deque["PageLoadLogger"] = deque(maxlen=PAGE_TRACE_CAPACITY)
+_TRACES_LOCK = threading.Lock()
+# Chrome trace timestamps are relative to this origin.
+_TRACE_ORIGIN = time.perf_counter()
 
 
 class PageLoadLogger:
-    """Lightweight timing helper for page load + render steps."""
+    """Timing helper for page load + render steps.
+
+    Every page open records structured spans (stage, start, end) into a ring buffer so
+    per-stage p50/p95 can be summarized and exported as Chrome trace JSON. The
+    ``[PageLoadAndRender]`` console lines are still only printed when detailed page
+    logging is enabled.
+    """
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, started_at: Optional[float] = None) -> None:
         self.path = path
         now = time.perf_counter()
-        self._start = now
+        self._start = started_at if started_at is not None else now
         self._last = now
         self.enabled = PAGE_LOGGING_ENABLED
+        # (stage, start, end, depth, args)
+        self.spans: list[tuple[str, float, float, int, dict]] = []
+        self.marks: list[tuple[str, float]] = []
+        self._depth = 0
+        self._finished = False
+        with _TRACES_LOCK:
+            _TRACES.append(self)
         if self.enabled:
             print(f"[PageLoadAndRender] start path={path}")
 
     def mark(self, label: str) -> None:
+        now = time.perf_counter()
+        self.marks.append((label, now))
         if not self.enabled:
+            self._last = now
             return
-        now = time.perf_counter()
         step_ms = (now - self._last) * 1000.0
         total_ms = (now - self._start) * 1000.0
         print(
@@ -37,9 +66,143 @@ class PageLoadLogger:
         )
         self._last = now
 
+    @contextmanager
+    def span(self, stage: str, **args) -> Iterator[dict]:
+        """Time a stage of the open-page path; yields a dict for extra span args."""
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield args
+        finally:
+            self._depth -= 1
+            end = time.perf_counter()
+            self.spans.append((stage, start, end, self._depth, args))
+            if self.enabled:
+                print(f"[PageLoadAndRender] span {stage} {(end - start) * 1000.0:.1f}ms path={self.path}")
+
+    def add_span(self, stage: str, start: float, end: float, **args) -> None:
+        """Record a stage measured elsewhere (e.g. server timings or highlighter totals)."""
+        self.spans.append((stage, start, max(start, end), self._depth + 1, args))
+
+    def dump_json(self, label: str, payload: dict) -> None:
+        """Print a structured payload in the same stream as the timing marks."""
+        if not self.enabled:
+            return
+        print(f"[PageLoadAndRender] {label} path={self.path} json={json.dumps(payload, ensure_ascii=False)}")
+
     def end(self, label: str = "ready") -> None:
         self.mark(label)
+        if not self._finished:
+            self._finished = True
+            self.add_span("total", self._start, time.perf_counter())
+            if PAGE_TRACE_FILE:
+                try:
+                    export_chrome_trace(Path(PAGE_TRACE_FILE))
+                except OSError as exc:
+                    print(f"[PageLoadAndRender] trace export failed: {exc}")
+            if self.enabled:
+                print(f"[PageLoadAndRender] summary {format_stage_summary()}")
 
     def attach_if(self, condition: bool) -> Optional["PageLoadLogger"]:
         """Return self when condition is true, else None (keeps call sites tidy)."""
         return self if condition else None
+
+
+def recent_traces() -> list[PageLoadLogger]:
+    with _TRACES_LOCK:
+        return list(_TRACES)
+
+
+def clear_traces() -> None:
+    with _TRACES_LOCK:
+        _TRACES.clear()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def stage_summary() -> dict[str, dict]:
+    """Return per-stage count/p50/p95/max (ms) across the traces in the ring buffer."""
+    durations: dict[str, list[float]] = {}
+    for trace in recent_traces():
+        for stage, start, end, _depth, _args in list(trace.spans):
+            durations.setdefault(stage, []).append((end - start) * 1000.0)
+    summary: dict[str, dict] = {}
+    for stage, values in durations.items():
+        values.sort()
+        summary[stage] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "max_ms": round(values[-1], 2),
+        }
+    return summary
+
+
+def format_stage_summary(sep: str = "; ") -> str:
+    summary = stage_summary()
+    ordered = sorted(summary.items(), key=lambda item: item[1]["p95_ms"], reverse=True)
+    return sep.join(f"{stage}: p50={s['p50_ms']:.1f}ms p95={s['p95_ms']:.1f}ms" for stage, s in ordered)
+
+
+def chrome_trace() -> dict:
+    """Build a Chrome trace (chrome://tracing / Perfetto) of the buffered page loads."""
+    events: list[dict] = []
+    for tid, trace in enumerate(recent_traces(), start=1):
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": trace.path}})
+        for stage, start, end, depth, args in list(trace.spans):
+            events.append(
+                {
+                    "name": stage,
+                    "cat": "page_load",
+                    "ph": "X",
+                    "ts": round((start - _TRACE_ORIGIN) * 1e6, 1),
+                    "dur": round((end - start) * 1e6, 1),
+                    "pid": 1,
+                    "tid": tid,
+                    "args": dict(args, depth=depth, path=trace.path),
+                }
+            )
+        for label, at in list(trace.marks):
+            events.append(
+                {
+                    "name": label,
+                    "cat": "page_load",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": round((at - _TRACE_ORIGIN) * 1e6, 1),
+                    "pid": 1,
+                    "tid": tid,
+                }
+            )
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"stages": stage_summary()}}
+
+
+def export_chrome_trace(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(chrome_trace(), ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def parse_server_timing(header: Optional[str]) -> list[tuple[str, float]]:
+    """Parse a ``Server-Timing`` header into (name, milliseconds) pairs."""
+    results: list[tuple[str, float]] = []
+    for entry in (header or "").split(","):
+        parts = [p.strip() for p in entry.split(";") if p.strip()]
+        if not parts:
+            continue
+        name = parts[0]
+        duration = 0.0
+        for param in parts[1:]:
+            key, _, value = param.partition("=")
+            if key.strip() == "dur":
+                try:
+                    duration = float(value.strip().strip('"'))
+                except ValueError:
+                    duration = 0.0
+        results.append((name, duration))
+    return results
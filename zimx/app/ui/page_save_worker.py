@@ -0,0 +1,176 @@
+"""Background page writer used by autosave.
+
+The GUI thread only snapshots the document; serialization to markdown and the
+``/api/file/write`` round-trip run on a single writer thread. Saves queued for a
+page that has not been written yet are coalesced into the newest snapshot, and
+outcomes are reported through the ``saved`` / ``conflict`` / ``failed`` signals.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import httpx
+from PySide6.QtCore import QObject, Signal
+
+
+@dataclass
+class PageSaveJob:
+    path: str
+    snapshot: Any
+    # Turns the snapshot into the content to write (runs on the writer thread).
+    serialize: Callable[[Any], str]
+    headers: Optional[dict[str, str]] = None
+    reason: str = "autosave"
+    queued_at: float = field(default_factory=time.perf_counter)
+    coalesced: int = 0
+    # Set by ``serialize`` when it had to inject a page title the editor does not show yet.
+    retitled: bool = False
+
+
+@dataclass
+class PageSaveResult:
+    job: PageSaveJob
+    status: str  # "saved" | "conflict" | "failed"
+    content: str = ""
+    payload: dict = field(default_factory=dict)
+    status_code: Optional[int] = None
+    error: str = ""
+    serialize_ms: float = 0.0
+    write_ms: float = 0.0
+    _claimed: bool = False
+
+    @property
+    def path(self) -> str:
+        return self.job.path
+
+
+class PageSaveWorker(QObject):
+    """Single writer thread with per-page coalescing of queued saves."""
+
+    saved = Signal(object)  # PageSaveResult
+    conflict = Signal(object)  # PageSaveResult
+    failed = Signal(object)  # PageSaveResult
+
+    def __init__(self, post: Callable[..., httpx.Response], parent=None) -> None:
+        super().__init__(parent)
+        self._post = post
+        self._queue: OrderedDict[str, PageSaveJob] = OrderedDict()
+        self._active: Optional[str] = None
+        self._unclaimed: list[PageSaveResult] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, job: PageSaveJob) -> None:
+        with self._cond:
+            previous = self._queue.pop(job.path, None)
+            if previous is not None:
+                # Newer snapshot supersedes one that has not been written yet.
+                job.coalesced = previous.coalesced + 1
+                job.queued_at = previous.queued_at
+            self._queue[job.path] = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="zimx-page-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def is_pending(self, path: Optional[str] = None) -> bool:
+        with self._cond:
+            return self._pending_locked(path)
+
+    def flush(self, path: Optional[str] = None, timeout: float = 10.0) -> list[PageSaveResult]:
+        """Block until queued writes (for ``path`` or all pages) finish.
+
+        Returns the finished results whose signals have not been handled yet; the
+        caller takes ownership of them, so the queued signal handlers skip them.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending_locked(path):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            claimed = [r for r in self._unclaimed if path is None or r.path == path]
+            for result in claimed:
+                result._claimed = True
+            self._unclaimed = [r for r in self._unclaimed if not r._claimed]
+        return claimed
+
+    def claim(self, result: PageSaveResult) -> bool:
+        """Return True for the first caller to handle ``result``."""
+        with self._cond:
+            if result._claimed:
+                return False
+            result._claimed = True
+            try:
+                self._unclaimed.remove(result)
+            except ValueError:
+                pass
+            return True
+
+    def shutdown(self, timeout: float = 10.0) -> list[PageSaveResult]:
+        results = self.flush(timeout=timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        return results
+
+    def _pending_locked(self, path: Optional[str]) -> bool:
+        if path is None:
+            return bool(self._queue) or self._active is not None
+        return path in self._queue or self._active == path
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped and not self._queue:
+                    return
+                _path, job = self._queue.popitem(last=False)
+                self._active = job.path
+            result = self._write(job)
+            with self._cond:
+                self._active = None
+                self._unclaimed.append(result)
+                self._cond.notify_all()
+            signal = {"saved": self.saved, "conflict": self.conflict}.get(result.status, self.failed)
+            try:
+                signal.emit(result)
+            except RuntimeError:
+                # Worker torn down during shutdown.
+                return
+
+    def _write(self, job: PageSaveJob) -> PageSaveResult:
+        t0 = time.perf_counter()
+        try:
+            content = job.serialize(job.snapshot)
+        except Exception as exc:
+            return PageSaveResult(job, "failed", error=f"serialize failed: {exc}")
+        t1 = time.perf_counter()
+        result = PageSaveResult(job, "failed", content=content, serialize_ms=(t1 - t0) * 1000.0)
+        try:
+            resp = self._post("/api/file/write", json={"path": job.path, "content": content}, headers=job.headers)
+        except Exception as exc:
+            result.error = str(exc)
+            result.write_ms = (time.perf_counter() - t1) * 1000.0
+            return result
+        result.write_ms = (time.perf_counter() - t1) * 1000.0
+        result.status_code = resp.status_code
+        try:
+            result.payload = resp.json()
+        except ValueError:
+            result.payload = {}
+        if resp.status_code == 409:
+            result.status = "conflict"
+        elif resp.is_success:
+            result.status = "saved"
+        else:
+            result.error = resp.text
+        return result
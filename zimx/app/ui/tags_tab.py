@@ -301,25 +301,15 @@ class TagsTab(QWidget):
         """Load all tags from the database and create chicklets."""
         try:
             from zimx.app import config
-            conn = config._get_conn()
-            should_close = False
-            if not conn:
-                db_path = config._vault_db_path()
-                if not db_path:
-                    print("[TagsTab] No vault database path available")
-                    return
-                import sqlite3
-                conn = sqlite3.connect(str(db_path), check_same_thread=False)
-                should_close = True
+            if not config.has_active_vault():
+                print("[TagsTab] No vault database path available")
+                return
             rows = config.fetch_tag_summary()
             if self.include_task_tags:
-                task_rows = conn.execute("SELECT DISTINCT tag FROM task_tags").fetchall()
-                task_tags = {row[0] for row in task_rows}
+                task_tags = {tag for tag, _count in config.fetch_task_tags()}
                 existing = {tag for tag, _ in rows}
                 for tag in sorted(task_tags - existing):
                     rows.append((tag, 0))
-            if should_close:
-                conn.close()
             
             print(f"[TagsTab] Query returned {len(rows)} tags from database")
             
@@ -377,35 +367,22 @@ class TagsTab(QWidget):
         
         try:
             from zimx.app import config
-            db_path = config._vault_db_path()
-            if not db_path:
+            if not config.has_active_vault():
                 return
             
-            import sqlite3
-            conn = sqlite3.connect(str(db_path), check_same_thread=False)
-            
-            # Build query to find pages with ALL selected tags (AND logic)
-            placeholders = ','.join('?' * len(self.selected_tags))
-            query = f"""
-                SELECT p.path
-                FROM pages p
-                WHERE (
-                    SELECT COUNT(DISTINCT pt.tag)
-                    FROM page_tags pt
-                    WHERE pt.page = p.path AND pt.tag IN ({placeholders})
-                ) = ?
-                ORDER BY p.path
-            """
-            
-            params = list(self.selected_tags) + [len(self.selected_tags)]
-            rows = conn.execute(query, params).fetchall()
-            conn.close()
+            # Pages with ALL selected tags (AND logic), answered from the tag index
+            selected = sorted(self.selected_tags)
+            paths = config.query_tagged_pages(all_of=selected)
+            related = config.fetch_related_tags(all_of=selected, limit=5) if paths else []
             
             # Display results
-            self._display_results([row[0] for row in rows])
+            self._display_results(paths)
             
-            tag_list = ", ".join(f"@{t}" for t in sorted(self.selected_tags))
-            self.status_label.setText(f"Found {len(rows)} page(s) with tags: {tag_list}")
+            tag_list = ", ".join(f"@{t}" for t in selected)
+            status = f"Found {len(paths)} page(s) with tags: {tag_list}"
+            if related:
+                status += "  •  Related: " + ", ".join(f"@{tag} ({count})" for tag, count in related)
+            self.status_label.setText(status)
             
         except Exception as e:
             import traceback
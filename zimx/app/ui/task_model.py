@@ -0,0 +1,762 @@
+"""Item model backing the task panel's tree view.
+
+Tasks live in a flat slot store (one ``_TaskNode`` per task, children referenced by
+slot number) instead of one ``QTreeWidgetItem`` per row. Display text, colors and
+fonts are computed on first ``data()`` access and cached per row, and brushes/fonts
+are shared module-level instances. Rows read priority, due/start day ordinals and
+due class from the ``TaskUniverse`` columns, and siblings are sorted by the
+universe's integer ranks for the sort column rather than by formatted text.
+Full-text match spans set with ``set_highlights`` are drawn in the task column by
+``TaskHighlightDelegate``. ``set_tasks`` diffs against the current rows so a
+single page save only inserts, removes or repaints that page's tasks.
+"""
+
+from __future__ import annotations
+
+import bisect
+import html
+import math
+import re
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Collection, Hashable, Iterable, Optional, Sequence
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt
+from PySide6.QtGui import QColor, QFont, QPalette, QTextDocument
+from PySide6.QtWidgets import QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from zimx.app.task_universe import (
+    DUE_NONE,
+    DUE_OVERDUE,
+    DUE_TODAY,
+    DUE_TOMORROW,
+    DUE_LATER,
+    TaskTextMatch,
+    TaskUniverse,
+    day_ordinal,
+)
+
+from .path_utils import path_to_colon
+
+COLUMN_PRIORITY = "priority"
+COLUMN_TASK = "task"
+COLUMN_DUE = "due"
+COLUMN_START = "start"
+COLUMN_PATH = "path"
+
+COLUMN_HEADERS = {
+    COLUMN_PRIORITY: "!",
+    COLUMN_TASK: "Task",
+    COLUMN_DUE: "Due",
+    COLUMN_START: "Start",
+    COLUMN_PATH: "Path",
+}
+
+# Above this share of changed rows a model reset is cheaper than row-level signals.
+_RESET_RATIO = 0.25
+_RESET_MIN_CHANGES = 64
+
+_MD_LINK_PATTERN = re.compile(r"\[(?P<label>[^\]]+)\]\((?P<url>https?://[^\s)]+)\)")
+_WIKI_LINK_PATTERN = re.compile(r"\[(?P<link>[^\]|]+)\|(?P<label>[^\]]+)\]")
+
+_MUTED = QColor("#666666")
+_WHITE = QColor("#FFFFFF")
+_BLACK = QColor("#000000")
+_DUE_OVERDUE = (QColor("#FFFFFF"), QColor("#CC0000"))  # white on solid red
+_DUE_TODAY = (QColor("#3A1D00"), QColor("#F57900"))  # dark on orange
+_DUE_TOMORROW = (QColor("#444444"), QColor("#FDD835"))  # dark on yellow
+_PRIORITY_BACKGROUNDS = (QColor("#FFF9C4"), QColor("#F57900"), QColor("#CC0000"))  # ! / !! / !!!
+# Due column colours by ``DUE_*`` class.
+_DUE_CLASS_COLORS = {DUE_OVERDUE: _DUE_OVERDUE, DUE_TODAY: _DUE_TODAY, DUE_TOMORROW: _DUE_TOMORROW}
+
+
+def _partial_font(*, underline: bool = False, strike: bool = False) -> QFont:
+    # Only the explicitly set attributes are merged onto the view font by the delegate.
+    font = QFont()
+    if underline:
+        font.setUnderline(True)
+    if strike:
+        font.setStrikeOut(True)
+    return font
+
+
+_UNDERLINE_FONT = _partial_font(underline=True)
+_STRIKE_FONT = _partial_font(strike=True)
+
+
+def format_task_text(text: str) -> str:
+    """Return plain text with link labels (or URLs) inlined, no markup."""
+    if not text:
+        return ""
+
+    def _replace_md(match: re.Match[str]) -> str:
+        label = (match.group("label") or "").strip()
+        url = (match.group("url") or "").strip()
+        return label or url
+
+    def _replace_wiki(match: re.Match[str]) -> str:
+        link = (match.group("link") or "").strip()
+        label = (match.group("label") or "").strip()
+        return label or link
+
+    rendered = _MD_LINK_PATTERN.sub(_replace_md, text)
+    return _WIKI_LINK_PATTERN.sub(_replace_wiki, rendered)
+
+
+def display_spans(raw: str, display: str, spans: Sequence[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
+    """Map match spans on the raw task text onto its displayed text (links collapse to labels)."""
+    if raw == display:
+        return tuple(spans)
+    lowered = display.lower()
+    mapped = []
+    cursor = 0
+    for start, end in spans:
+        needle = raw[start:end].lower()
+        found = lowered.find(needle, cursor) if needle else -1
+        if found < 0:
+            # Matched inside a collapsed link target; not visible.
+            continue
+        mapped.append((found, found + len(needle)))
+        cursor = found + len(needle)
+    return tuple(mapped)
+
+
+def highlighted_html(text: str, spans: Sequence[tuple[int, int]]) -> str:
+    parts = []
+    cursor = 0
+    for start, end in spans:
+        parts.append(html.escape(text[cursor:start]))
+        parts.append(f"<b>{html.escape(text[start:end])}</b>")
+        cursor = end
+    parts.append(html.escape(text[cursor:]))
+    return "".join(parts)
+
+
+def task_day(task: dict, key: str) -> int:
+    """Day ordinal of a task's ``"due"`` or ``"starts"`` date (0 when unset or invalid)."""
+    precomputed = task.get("due_day" if key == "due" else "start_day")
+    if precomputed is not None:
+        return precomputed
+    if key == "due":
+        return day_ordinal(task.get("due"))
+    return day_ordinal(task.get("starts") or task.get("start"))
+
+
+def relative_day_label(target: date, today: date, prefix: str = "") -> str:
+    return _relative_days_label(target.toordinal() - today.toordinal(), prefix)
+
+
+def _relative_days_label(delta_days: int, prefix: str = "") -> str:
+    if delta_days <= 13:
+        label = f"{max(delta_days, 0)}d"
+    elif delta_days < 56:
+        label = f"{max(1, math.ceil(delta_days / 7))}w"
+    elif delta_days < 365:
+        label = f"{max(1, math.ceil(delta_days / 30))}m"
+    else:
+        label = f"{max(1, math.ceil(delta_days / 365))}y"
+    return f"{prefix}{label}" if label else ""
+
+
+def due_class(due_day: int, today_day: int) -> int:
+    """``DUE_*`` class of one due ordinal; ``TaskUniverse.due_classes`` classifies a whole snapshot."""
+    if not due_day:
+        return DUE_NONE
+    delta_days = due_day - today_day
+    if delta_days < 0:
+        return DUE_OVERDUE
+    if delta_days == 0:
+        return DUE_TODAY
+    if delta_days == 1:
+        return DUE_TOMORROW
+    return DUE_LATER
+
+
+def _priority_time_text(priority_level: int, due_day: int, start_day: int, due_state: int, today_day: int) -> str:
+    priority = "!" * priority_level
+    label = ""
+    if due_state == DUE_OVERDUE:
+        label = "OD"
+    elif due_day:
+        label = _relative_days_label(due_day - today_day)
+    elif start_day > today_day:
+        label = _relative_days_label(start_day - today_day, prefix=">")
+    if label and priority:
+        return f"{label} {priority}"
+    return label or priority
+
+
+def priority_time_label(task: dict, today: date) -> tuple[str, bool]:
+    """Return the "!" column text (relative due/start plus priority bangs) and whether it is overdue."""
+    today_day = today.toordinal()
+    due_day = task_day(task, "due")
+    due_state = due_class(due_day, today_day)
+    priority_level = min(task.get("priority", 0) or 0, 3)
+    text = _priority_time_text(priority_level, due_day, task_day(task, "starts"), due_state, today_day)
+    return text, due_state == DUE_OVERDUE
+
+
+def due_colors(task: dict, today: date) -> Optional[tuple[QColor, QColor]]:
+    """Return (fg, bg) for the due column with red/orange/yellow emphasis."""
+    return _DUE_CLASS_COLORS.get(due_class(task_day(task, "due"), today.toordinal()))
+
+
+def column_sort_key(
+    universe: TaskUniverse, column: str, today_day: int, present_path: Callable[[str], str]
+) -> tuple[Hashable, Callable[[int], Any]]:
+    """Cache name and per-position sort key of ``column`` for ``TaskUniverse.ranks``.
+
+    Date columns sort by day ordinal (undated first). The "!" column sorts by the
+    day its label counts to (due date, else a future start), then by priority,
+    highest first.
+    """
+    if column == COLUMN_PRIORITY:
+        due, start, priority = universe.due_day, universe.start_day, universe.priority
+
+        def priority_key(pos: int) -> tuple[int, int]:
+            day = due[pos] or (start[pos] if start[pos] > today_day else 0)
+            return (day, -priority[pos])
+
+        return (column, today_day), priority_key
+    if column == COLUMN_DUE:
+        return column, universe.due_day.__getitem__
+    if column == COLUMN_START:
+        return column, universe.start_day.__getitem__
+    tasks = universe.tasks
+    if column == COLUMN_TASK:
+        return column, lambda pos: format_task_text(tasks[pos].get("text") or "")
+    if column == COLUMN_PATH:
+        presented: dict[str, str] = {}
+
+        def path_key(pos: int) -> str:
+            path = tasks[pos].get("path") or ""
+            if path not in presented:
+                presented[path] = present_path(path)
+            return presented[path]
+
+        return (column, present_path), path_key
+    return column, lambda pos: 0
+
+
+def contrast_text_color(bg: QColor) -> QColor:
+    """Return a readable text color for the given background."""
+    return _WHITE if bg.lightness() < 128 else _BLACK
+
+
+def priority_colors(level: int) -> Optional[tuple[QColor, QColor]]:
+    """Return (fg, bg) for a priority level (three levels: yellow/orange/red)."""
+    if level <= 0:
+        return None
+    bg = _PRIORITY_BACKGROUNDS[min(level - 1, len(_PRIORITY_BACKGROUNDS) - 1)]
+    return contrast_text_color(bg), bg
+
+
+@dataclass(slots=True)
+class TaskRowDisplay:
+    texts: tuple[str, ...]
+    tooltip: str
+    foreground: tuple[Optional[QColor], ...]
+    background: tuple[Optional[QColor], ...]
+    fonts: tuple[Optional[QFont], ...]
+
+
+class TaskRowFormatter:
+    """Turns a task dict into the cells of one row for a given column layout.
+
+    With a ``universe``, rows given their position read priority, dates and due
+    class from its columns; otherwise they are derived from the task dict.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        today: Optional[date] = None,
+        present_path: Callable[[str], str] = path_to_colon,
+        universe: Optional[TaskUniverse] = None,
+    ) -> None:
+        self.columns = tuple(columns)
+        self.today = today or date.today()
+        self._present_path = present_path
+        self._today_day = self.today.toordinal()
+        self.universe = universe
+        self._due_classes = universe.due_classes(self._today_day) if universe is not None else None
+
+    def _attributes(self, task: dict, pos: int) -> tuple[int, int, int, int]:
+        """(priority level, due day, start day, due class) of a row."""
+        if self._due_classes is not None and pos >= 0:
+            universe = self.universe
+            return universe.priority[pos], universe.due_day[pos], universe.start_day[pos], self._due_classes[pos]
+        due_day = task_day(task, "due")
+        priority_level = min(max(task.get("priority", 0) or 0, 0), 3)
+        return priority_level, due_day, task_day(task, "starts"), due_class(due_day, self._today_day)
+
+    def text(self, task: dict, column: str, pos: int = -1) -> str:
+        if column == COLUMN_PRIORITY:
+            return _priority_time_text(*self._attributes(task, pos), self._today_day)
+        if column == COLUMN_TASK:
+            return format_task_text(task.get("text") or "")
+        if column == COLUMN_DUE:
+            return task.get("due") or ""
+        if column == COLUMN_START:
+            return (task.get("starts") or task.get("start") or "").strip()
+        if column == COLUMN_PATH:
+            return self._present_path(task.get("path") or "")
+        return ""
+
+    def format(self, task: dict, pos: int = -1) -> TaskRowDisplay:
+        count = len(self.columns)
+        texts = [""] * count
+        fg: list[Optional[QColor]] = [None] * count
+        bg: list[Optional[QColor]] = [None] * count
+        fonts: list[Optional[QFont]] = [None] * count
+        priority_level, due_day, start_day, due_state = self._attributes(task, pos)
+        for col, name in enumerate(self.columns):
+            if name == COLUMN_PRIORITY:
+                texts[col] = _priority_time_text(priority_level, due_day, start_day, due_state, self._today_day)
+                colors = priority_colors(priority_level)
+                if colors:
+                    fg[col], bg[col] = colors
+                if due_state == DUE_OVERDUE:
+                    fonts[col] = _UNDERLINE_FONT
+            else:
+                texts[col] = self.text(task, name, pos)
+                if name == COLUMN_DUE:
+                    colors = _DUE_CLASS_COLORS.get(due_state)
+                    if colors:
+                        fg[col], bg[col] = colors
+        if task.get("status") == "done":
+            fonts = [_STRIKE_FONT] * count
+        elif not task.get("actionable", True):
+            fg = [_MUTED] * count
+        return TaskRowDisplay(tuple(texts), task.get("text") or "", tuple(fg), tuple(bg), tuple(fonts))
+
+
+class _TaskNode:
+    __slots__ = ("task", "parent", "row", "pos", "children", "display")
+
+    def __init__(self, task: dict, parent: int, pos: int) -> None:
+        self.task = task
+        self.parent = parent  # slot of the parent node, -1 for top level
+        self.row = 0  # position within the parent's children
+        self.pos = pos  # position in the model's TaskUniverse (index into its columns)
+        self.children: list[int] = []
+        self.display: Optional[TaskRowDisplay] = None
+
+
+_ROOT = -1
+
+
+class TaskTreeModel(QAbstractItemModel):
+    """Hierarchical task model over a flat slot store.
+
+    ``QModelIndex.internalId()`` holds the parent's slot + 1 (0 for top-level rows),
+    so indexes stay valid while unrelated rows are inserted or removed. Children
+    are ordered by the sort column's ``TaskUniverse.ranks``, gathered once per
+    sort into an ``array`` indexed by slot.
+    """
+
+    TaskRole = Qt.UserRole
+    # Match spans within the task column's display text.
+    HighlightRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None, present_path: Callable[[str], str] = path_to_colon) -> None:
+        super().__init__(parent)
+        self._present_path = present_path
+        self._universe = TaskUniverse(())
+        self._formatter = TaskRowFormatter(
+            (COLUMN_PRIORITY, COLUMN_TASK, COLUMN_DUE), present_path=present_path, universe=self._universe
+        )
+        self._nodes: list[Optional[_TaskNode]] = []
+        self._free: list[int] = []
+        self._slot_by_id: dict[str, int] = {}
+        self._root: list[int] = []
+        # Parents whose children have not been sorted since they were (re)built.
+        self._unsorted: set[int] = set()
+        self._sort_column = 0
+        self._sort_order = Qt.AscendingOrder
+        # Sort rank of every slot's task; None until the next sort needs it.
+        self._slot_ranks: Optional[array] = None
+        self._highlights: dict[str, TaskTextMatch] = {}
+        self.last_refresh_stats: dict[str, int] = {}
+
+    # ----------------------------------------------------------------- structure
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return self._formatter.columns
+
+    def set_columns(self, columns: Sequence[str]) -> None:
+        columns = tuple(columns)
+        if columns == self._formatter.columns:
+            return
+        self.beginResetModel()
+        self._formatter = TaskRowFormatter(columns, present_path=self._present_path, universe=self._universe)
+        self._sort_column = min(self._sort_column, len(columns) - 1)
+        self._slot_ranks = None
+        for node in self._nodes:
+            if node is not None:
+                node.display = None
+        self._unsorted = {_ROOT, *(slot for slot, node in enumerate(self._nodes) if node is not None)}
+        self.endResetModel()
+
+    def set_highlights(self, matches: Optional[dict[str, TaskTextMatch]]) -> None:
+        """Full-text matches (by task id) whose spans the task column should emphasise."""
+        self._highlights = matches or {}
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._reset_store()
+        self.endResetModel()
+
+    def task_count(self) -> int:
+        return len(self._slot_by_id)
+
+    def _reset_store(self) -> None:
+        self._nodes = []
+        self._free = []
+        self._slot_by_id = {}
+        self._root = []
+        self._unsorted = set()
+        self._slot_ranks = None
+
+    def _children(self, slot: int) -> list[int]:
+        children = self._root if slot == _ROOT else self._nodes[slot].children
+        if slot in self._unsorted:
+            self._unsorted.discard(slot)
+            children.sort(key=self._ranks_by_slot().__getitem__, reverse=self._sort_order == Qt.DescendingOrder)
+            self._renumber(children, 0)
+        return children
+
+    def _column_ranks(self) -> array:
+        if not self.columns:
+            return array("l", [0]) * len(self._universe)
+        name, key = column_sort_key(
+            self._universe, self.columns[self._sort_column], self._formatter.today.toordinal(), self._present_path
+        )
+        return self._universe.ranks(name, key)
+
+    def _ranks_by_slot(self) -> array:
+        if self._slot_ranks is None:
+            ranks = self._column_ranks()
+            self._slot_ranks = array(
+                "l", (ranks[node.pos] if node is not None and node.pos >= 0 else 0 for node in self._nodes)
+            )
+        return self._slot_ranks
+
+    def _renumber(self, children: list[int], start: int) -> None:
+        nodes = self._nodes
+        for row in range(start, len(children)):
+            nodes[children[row]].row = row
+
+    def _slot_of(self, index: QModelIndex) -> int:
+        if not index.isValid():
+            return _ROOT
+        return self._children(int(index.internalId()) - 1)[index.row()]
+
+    def _index_of_slot(self, slot: int, column: int = 0) -> QModelIndex:
+        if slot == _ROOT:
+            return QModelIndex()
+        node = self._nodes[slot]
+        self._children(node.parent)
+        return self.createIndex(node.row, column, node.parent + 1)
+
+    def _display(self, node: _TaskNode) -> TaskRowDisplay:
+        if node.display is None:
+            node.display = self._formatter.format(node.task, node.pos)
+        return node.display
+
+    # --------------------------------------------------------- QAbstractItemModel
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if column < 0 or column >= len(self.columns) or row < 0:
+            return QModelIndex()
+        if parent.isValid() and parent.column() != 0:
+            return QModelIndex()
+        parent_slot = self._slot_of(parent)
+        if row >= len(self._children(parent_slot)):
+            return QModelIndex()
+        return self.createIndex(row, column, parent_slot + 1)
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:  # type: ignore[override]
+        if not index.isValid():
+            return QModelIndex()
+        parent_slot = int(index.internalId()) - 1
+        if parent_slot == _ROOT:
+            return QModelIndex()
+        return self._index_of_slot(parent_slot)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid() and parent.column() != 0:
+            return 0
+        slot = self._slot_of(parent)
+        return len(self._root) if slot == _ROOT else len(self._nodes[slot].children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.columns)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return self.rowCount(parent) > 0
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(self.columns):
+            return COLUMN_HEADERS.get(self.columns[section], "")
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        node = self._nodes[self._slot_of(index)]
+        if role == self.TaskRole:
+            return node.task
+        col = index.column()
+        if role == Qt.DisplayRole:
+            return self._display(node).texts[col]
+        if role == Qt.ToolTipRole:
+            return self._display(node).tooltip if self.columns[col] == COLUMN_TASK else None
+        if role == Qt.ForegroundRole:
+            return self._display(node).foreground[col]
+        if role == Qt.BackgroundRole:
+            return self._display(node).background[col]
+        if role == Qt.FontRole:
+            return self._display(node).fonts[col]
+        if role == self.HighlightRole:
+            match = self._highlights.get(node.task.get("id"))
+            if match is None or not match.spans or self.columns[col] != COLUMN_TASK:
+                return None
+            return display_spans(node.task.get("text") or "", self._display(node).texts[col], match.spans)
+        return None
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        if column < 0 or column >= len(self.columns):
+            return
+        if column == self._sort_column and order == self._sort_order and not self._unsorted:
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        tracked = [(self._slot_of(idx), idx.column()) for idx in persistent]
+        self._sort_column = column
+        self._sort_order = order
+        self._slot_ranks = None
+        self._unsorted = {_ROOT, *(slot for slot, node in enumerate(self._nodes) if node is not None)}
+        self.changePersistentIndexList(
+            persistent, [self._index_of_slot(slot, col) for slot, col in tracked]
+        )
+        self.layoutChanged.emit()
+
+    # --------------------------------------------------------------- lookups
+    def task_at(self, index: QModelIndex) -> Optional[dict]:
+        if not index.isValid():
+            return None
+        return self._nodes[self._slot_of(index)].task
+
+    def index_for_task(self, task_id: Optional[str]) -> QModelIndex:
+        slot = self._slot_by_id.get(task_id) if task_id else None
+        return self._index_of_slot(slot) if slot is not None else QModelIndex()
+
+    def find_task(self, predicate: Callable[[dict], bool]) -> QModelIndex:
+        for slot, node in enumerate(self._nodes):
+            if node is not None and predicate(node.task):
+                return self._index_of_slot(slot)
+        return QModelIndex()
+
+    def iter_tasks(self) -> Iterable[dict]:
+        return (node.task for node in self._nodes if node is not None)
+
+    # --------------------------------------------------------------- refresh
+    def set_tasks(
+        self,
+        tasks: Sequence[dict],
+        changed_ids: Optional[Collection[str]] = None,
+        universe: Optional[TaskUniverse] = None,
+    ) -> bool:
+        """Show ``tasks`` (in fetch order); returns True when the model was reset.
+
+        A task nests under its parent when the parent is shown and comes earlier
+        in ``tasks``; otherwise it is a top-level row. ``changed_ids`` (from
+        ``config.task_changes_since``) limits the field comparison to those ids;
+        other rows only pick up their new task dict. ``tasks`` should come from
+        ``universe``, whose columns the rows read; without one the model indexes
+        ``tasks`` itself.
+        """
+        if universe is None:
+            universe = TaskUniverse(tasks)
+        new_order = {task["id"]: pos for pos, task in enumerate(tasks)}
+        new_by_id = {task["id"]: task for task in tasks}
+
+        def new_parent(task: dict) -> Optional[str]:
+            parent_id = task.get("parent")
+            if parent_id and parent_id in new_order and new_order[parent_id] < new_order[task["id"]]:
+                return parent_id
+            return None
+
+        formatter = TaskRowFormatter(self.columns, present_path=self._present_path, universe=universe)
+        day_changed = formatter.today != self._formatter.today
+        removed = [tid for tid in self._slot_by_id if tid not in new_by_id]
+        added = [tid for tid in new_by_id if tid not in self._slot_by_id]
+        relocate: list[str] = []
+        repaint: list[str] = []
+        if self.columns:
+            column = self.columns[self._sort_column]
+            today_day = formatter.today.toordinal()
+            _name, old_key = column_sort_key(self._universe, column, today_day, self._present_path)
+            _name, new_key = column_sort_key(universe, column, today_day, self._present_path)
+        for tid, slot in self._slot_by_id.items():
+            node = self._nodes[slot]
+            task = new_by_id.get(tid)
+            old_pos = node.pos
+            node.pos = universe.position(tid) if task is not None else -1
+            if task is None:
+                continue
+            parent_id = self._nodes[node.parent].task["id"] if node.parent != _ROOT else None
+            if new_parent(task) != parent_id:
+                relocate.append(tid)
+            elif day_changed or (
+                task is not node.task and (changed_ids is None or tid in changed_ids) and task != node.task
+            ):
+                node.task = task
+                node.display = formatter.format(task, node.pos)
+                if self.columns and old_key(old_pos) != new_key(node.pos):
+                    relocate.append(tid)
+                else:
+                    repaint.append(tid)
+            else:
+                node.task = task
+        self._universe = universe
+        self._formatter = formatter
+        self._slot_ranks = None
+
+        changes = len(removed) + len(added) + len(relocate)
+        total = max(len(tasks), len(self._slot_by_id))
+        if not self._slot_by_id or changes > max(_RESET_MIN_CHANGES, int(total * _RESET_RATIO)) or day_changed:
+            self._rebuild(tasks, new_parent)
+            self.last_refresh_stats = {"reset": 1, "rows": len(tasks)}
+            return True
+
+        for tid in repaint:
+            slot = self._slot_by_id[tid]
+            last = len(self.columns) - 1
+            self.dataChanged.emit(self._index_of_slot(slot, 0), self._index_of_slot(slot, last))
+
+        reinsert: set[str] = set()
+        for tid in sorted(removed + relocate, key=lambda t: self._depth(self._slot_by_id[t])):
+            if tid in self._slot_by_id:
+                reinsert.update(self._remove_subtree(self._slot_by_id[tid]))
+        pending = [tid for tid in set(added) | set(relocate) | reinsert if tid in new_by_id]
+        for tid in sorted(pending, key=new_order.__getitem__):
+            task = new_by_id[tid]
+            parent_id = new_parent(task)
+            parent_slot = self._slot_by_id.get(parent_id, _ROOT) if parent_id else _ROOT
+            self._insert(task, parent_slot)
+        self.last_refresh_stats = {
+            "reset": 0,
+            "inserted": len(pending),
+            "removed": len(removed),
+            "repainted": len(repaint),
+        }
+        return False
+
+    def _rebuild(self, tasks: Sequence[dict], new_parent: Callable[[dict], Optional[str]]) -> None:
+        self.beginResetModel()
+        self._reset_store()
+        for task in tasks:
+            parent_id = new_parent(task)
+            parent_slot = self._slot_by_id[parent_id] if parent_id else _ROOT
+            slot = len(self._nodes)
+            self._nodes.append(_TaskNode(task, parent_slot, self._universe.position(task["id"])))
+            self._slot_by_id[task["id"]] = slot
+            (self._root if parent_slot == _ROOT else self._nodes[parent_slot].children).append(slot)
+        self._unsorted = {_ROOT, *range(len(self._nodes))}
+        self.endResetModel()
+
+    def _depth(self, slot: int) -> int:
+        depth = 0
+        while self._nodes[slot].parent != _ROOT:
+            slot = self._nodes[slot].parent
+            depth += 1
+        return depth
+
+    def _remove_subtree(self, slot: int) -> list[str]:
+        """Remove a row and its descendants; returns the ids of every removed task."""
+        node = self._nodes[slot]
+        siblings = self._children(node.parent)
+        row = node.row
+        self.beginRemoveRows(self._index_of_slot(node.parent), row, row)
+        del siblings[row]
+        self._renumber(siblings, row)
+        removed_ids: list[str] = []
+        stack = [slot]
+        while stack:
+            current = stack.pop()
+            current_node = self._nodes[current]
+            stack.extend(current_node.children)
+            removed_ids.append(current_node.task["id"])
+            del self._slot_by_id[current_node.task["id"]]
+            self._nodes[current] = None
+            self._unsorted.discard(current)
+            self._free.append(current)
+        self.endRemoveRows()
+        return removed_ids
+
+    def _insert(self, task: dict, parent_slot: int) -> None:
+        node = _TaskNode(task, parent_slot, self._universe.position(task["id"]))
+        node.display = self._formatter.format(task, node.pos)
+        siblings = self._children(parent_slot)
+        ranks = self._ranks_by_slot()
+        if self._free:
+            slot = self._free.pop()
+            self._nodes[slot] = node
+            ranks[slot] = self._column_ranks()[node.pos]
+        else:
+            slot = len(self._nodes)
+            self._nodes.append(node)
+            ranks.append(self._column_ranks()[node.pos])
+        key = ranks[slot]
+        keys = [ranks[s] for s in siblings]
+        if self._sort_order == Qt.DescendingOrder:
+            row = len(keys) - bisect.bisect_left(list(reversed(keys)), key)
+        else:
+            row = bisect.bisect_right(keys, key)
+        self.beginInsertRows(self._index_of_slot(parent_slot), row, row)
+        siblings.insert(row, slot)
+        self._slot_by_id[task["id"]] = slot
+        self._renumber(siblings, row)
+        self.endInsertRows()
+
+
+class TaskHighlightDelegate(QStyledItemDelegate):
+    """Draws match spans from ``TaskTreeModel.HighlightRole`` in bold; other cells paint as usual."""
+
+    def paint(self, painter, option, index: QModelIndex) -> None:
+        spans = index.data(TaskTreeModel.HighlightRole)
+        if not spans:
+            super().paint(painter, option, index)
+            return
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        text = opt.text
+        opt.text = ""
+        widget = opt.widget
+        style = widget.style() if widget is not None else None
+        if style is None:
+            super().paint(painter, option, index)
+            return
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, widget)
+        rect = style.subElementRect(QStyle.SE_ItemViewItemText, opt, widget)
+        if opt.state & QStyle.State_Selected:
+            color = opt.palette.color(QPalette.HighlightedText)
+        else:
+            color = index.data(Qt.ForegroundRole) or opt.palette.color(QPalette.Text)
+        doc = QTextDocument()
+        doc.setDocumentMargin(0)
+        doc.setDefaultFont(opt.font)
+        doc.setDefaultStyleSheet(f"body {{ color: {QColor(color).name()}; }}")
+        doc.setHtml(f"<body>{highlighted_html(text, spans)}</body>")
+        painter.save()
+        painter.setClipRect(rect)
+        painter.translate(rect.left(), rect.top() + max(0, (rect.height() - doc.size().height()) / 2))
+        doc.drawContents(painter)
+        painter.restore()
@@ -1,15 +1,14 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
-import math
 import html
 import os
 import re
 from pathlib import Path
 from typing import Iterable, Optional
 
-from PySide6.QtCore import QEvent, Qt, Signal, QSize, QTimer, QByteArray, QUrl
-from PySide6.QtGui import QColor, QIcon, QPainter, QPixmap, QDesktopServices
+from PySide6.QtCore import QEvent, QModelIndex, Qt, Signal, QSize, QTimer, QByteArray, QUrl
+from PySide6.QtGui import QIcon, QPainter, QPixmap, QDesktopServices
 from PySide6.QtSvg import QSvgRenderer
 from PySide6.QtWidgets import (
     QAbstractItemView,
@@ -23,9 +22,7 @@ from PySide6.QtWidgets import (
     QStackedWidget,
     QSplitter,
     QHBoxLayout,
-    QTreeWidget,
-    QTreeWidgetItem,
-    QTreeWidgetItemIterator,
+    QTreeView,
     QVBoxLayout,
     QWidget,
     QLabel,
@@ -35,9 +32,20 @@ from PySide6.QtWidgets import (
 
 from markdown import markdown as render_markdown
 from zimx.app import config
+from zimx.app.task_context import TASK_CONTEXT_REF, TaskContextCache
+from zimx.app.task_universe import TaskUniverse, normalize_task_path
 from zimx.server.adapters.files import LEGACY_SUFFIX, PAGE_SUFFIX, PAGE_SUFFIXES
 from .ai_chat_panel import AIChatPanel, ApiWorker, ServerManager, VectorAPIClient
 from .path_utils import colon_to_path, path_to_colon
+from .task_model import (
+    COLUMN_DUE,
+    COLUMN_PATH,
+    COLUMN_PRIORITY,
+    COLUMN_START,
+    COLUMN_TASK,
+    TaskHighlightDelegate,
+    TaskTreeModel,
+)
 
 TAG_PATTERN = re.compile(r"(?<![\w.+-])@([A-Za-z0-9_]+)")
 TAG_PREFIX_PATTERN = re.compile(r"(?<![\w.+-])@[\w_]*$")
@@ -62,8 +70,8 @@ def _should_suspend_nav_for_tag(text: str, cursor: int, available_tags: set[str]
     return not any(candidate.startswith(tag) for candidate in available_tags)
 
 
-class DebugTaskTree(QTreeWidget):
-    """QTreeWidget that logs mouse events for debugging."""
+class DebugTaskTree(QTreeView):
+    """QTreeView that logs mouse events for debugging."""
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         from PySide6.QtCore import QTimer
@@ -76,16 +84,16 @@ class DebugTaskTree(QTreeWidget):
         debug = os.getenv("ZIMX_DEBUG_TASKS", "0") not in ("0", "false", "False", "")
         if debug:
             print(f"[DEBUG_TREE] mouseDoubleClickEvent: button={event.button()}, pos={event.pos()}")
-        item = self.itemAt(event.pos())
+        index = self.indexAt(event.pos())
         column = self.columnAt(event.pos().x())
         if debug:
             print(f"[DEBUG_TREE] Column at click: {column}")
         
-        if item and event.button() == Qt.LeftButton:
-            if debug:
-                print(f"[DEBUG_TREE] Item at pos: {item.text(1)[:50]}")
-            # Extract task data immediately before item might become invalid
-            task_data = item.data(0, Qt.UserRole)
+        if index.isValid() and event.button() == Qt.LeftButton:
+            # Extract task data immediately before the row might be removed by a refresh
+            task_data = index.data(Qt.UserRole)
+            if debug and task_data:
+                print(f"[DEBUG_TREE] Item at pos: {(task_data.get('text') or '')[:50]}")
             if task_data:
                 if debug:
                     print(f"[DEBUG_TREE] Task data: {task_data.get('path')}:{task_data.get('line')}")
@@ -168,6 +176,7 @@ class TaskPanel(QWidget):
         self._ai_markdown_view = None
         self._ai_title_label = None
         self._task_context_dirty = True
+        self._task_context = TaskContextCache()
         self._task_index_version = config.get_task_index_version()
         self._task_context_initialized = False
         self._ai_progress = None
@@ -239,6 +248,11 @@ class TaskPanel(QWidget):
         )
 
         self.task_tree = DebugTaskTree()
+        self.task_model = TaskTreeModel(self.task_tree, present_path=self._present_path)
+        self.task_tree.setModel(self.task_model)
+        self.task_tree.setItemDelegate(TaskHighlightDelegate(self.task_tree))
+        self.task_tree.setUniformRowHeights(True)
+        self.task_model.rowsInserted.connect(self._on_task_rows_inserted)
         self._show_task_start_column = False
         self._show_task_page_column = False
         self._configure_task_columns(force=True)
@@ -252,24 +266,24 @@ class TaskPanel(QWidget):
         base_color = palette.color(QPalette.Base)
         alt_color = base_color.darker(105) if base_color.lightness() > 128 else base_color.lighter(110)
         self.task_tree.setStyleSheet(
-            "QTreeWidget::item:selected {"
+            "QTreeView::item:selected {"
             " background: palette(highlight);"
             " color: palette(highlighted-text);"
             "}"
-            "QTreeWidget::item:selected:active {"
+            "QTreeView::item:selected:active {"
             " background: palette(highlight);"
             " color: palette(highlighted-text);"
             "}"
-            "QTreeWidget::item:selected:!active {"
+            "QTreeView::item:selected:!active {"
             " background: palette(inactive, highlight);"
             " color: palette(inactive, highlighted-text);"
             "}"
-            f"QTreeWidget::item:alternate {{ background: {alt_color.name()}; }}"
+            f"QTreeView::item:alternate {{ background: {alt_color.name()}; }}"
         )
-        self.task_tree.itemActivated.connect(self._on_task_activated)
-        self.task_tree.itemDoubleClicked.connect(self._on_task_double_clicked)
-        self.task_tree.itemActivated.connect(lambda *_: QTimer.singleShot(0, self._reset_horizontal_scroll))
-        self.task_tree.itemDoubleClicked.connect(lambda *_: QTimer.singleShot(0, self._reset_horizontal_scroll))
+        self.task_tree.activated.connect(self._on_task_activated)
+        self.task_tree.doubleClicked.connect(self._on_task_double_clicked)
+        self.task_tree.activated.connect(lambda *_: QTimer.singleShot(0, self._reset_horizontal_scroll))
+        self.task_tree.doubleClicked.connect(lambda *_: QTimer.singleShot(0, self._reset_horizontal_scroll))
         self.task_tree.setSortingEnabled(True)
         self.sort_column = 0
         self.sort_order = Qt.AscendingOrder
@@ -290,8 +304,8 @@ class TaskPanel(QWidget):
         
         # Debug: Log when tree signals fire (if enabled)
         if os.getenv("ZIMX_DEBUG_TASKS", "0") not in ("0", "false", "False", ""):
-            self.task_tree.itemActivated.connect(lambda item: print(f"[TASK_TREE] itemActivated signal fired"))
-            self.task_tree.itemDoubleClicked.connect(lambda item, col: print(f"[TASK_TREE] itemDoubleClicked signal fired, col={col}"))
+            self.task_tree.activated.connect(lambda index: print(f"[TASK_TREE] activated signal fired"))
+            self.task_tree.doubleClicked.connect(lambda index: print(f"[TASK_TREE] doubleClicked signal fired, col={index.column()}"))
         
         saved_header = config.load_header_state(self._header_state_key)
         if saved_header:
@@ -393,7 +407,8 @@ class TaskPanel(QWidget):
         self._nav_filter_enabled = True
         self._include_journal = True
         self._visible_tasks: list[dict] = []
-        self._tag_source_tasks: Optional[list[dict]] = None
+        self._tag_source_mask: Optional[int] = None
+        self._task_universe: Optional[TaskUniverse] = None
         self._last_keyboard_task_id: Optional[str] = None
         self._last_keyboard_task_path: Optional[str] = None
         self._last_keyboard_task_line: Optional[int] = None
@@ -401,33 +416,6 @@ class TaskPanel(QWidget):
         self._update_filter_indicator()
         self._apply_font_size()
 
-    def _format_task_text(self, text: str) -> str:
-        """Return plain text with link labels (or URLs) inlined, no markup."""
-        if not text:
-            return ""
-
-        def _replace_md(match: re.Match[str]) -> str:
-            label = (match.group("label") or "").strip()
-            url = (match.group("url") or "").strip()
-            return label or url
-
-        def _replace_wiki(match: re.Match[str]) -> str:
-            link = (match.group("link") or "").strip()
-            label = (match.group("label") or "").strip()
-            return label or link
-
-        rendered = re.sub(
-            r"\[(?P<label>[^\]]+)\]\((?P<url>https?://[^\s)]+)\)",
-            _replace_md,
-            text,
-        )
-        rendered = re.sub(
-            r"\[(?P<link>[^\]|]+)\|(?P<label>[^\]]+)\]",
-            _replace_wiki,
-            rendered,
-        )
-        return rendered
-
     def _setup_focus_defaults(self) -> None:
         """Ensure sensible default focus inside the Tasks tab."""
         self.search.setFocusPolicy(Qt.StrongFocus)
@@ -532,13 +520,12 @@ class TaskPanel(QWidget):
             return
         self._show_task_start_column = show_start
         self._show_task_page_column = show_page
-        headers = ["!", "Task", "Due"]
+        columns = [COLUMN_PRIORITY, COLUMN_TASK, COLUMN_DUE]
         if show_start:
-            headers.append("Start")
+            columns.append(COLUMN_START)
         if show_page:
-            headers.append("Path")
-        self.task_tree.setColumnCount(len(headers))
-        self.task_tree.setHeaderLabels(headers)
+            columns.append(COLUMN_PATH)
+        self.task_model.set_columns(columns)
         self.task_tree.setColumnWidth(0, 70)
         header = self.task_tree.header()
         try:
@@ -557,49 +544,6 @@ class TaskPanel(QWidget):
         except Exception:
             pass
 
-    def _relative_day_label(self, target: date, prefix: str = "") -> str:
-        today = date.today()
-        delta_days = (target - today).days
-        if delta_days <= 13:
-            label = f"{max(delta_days, 0)}d"
-        elif delta_days < 56:
-            label = f"{max(1, math.ceil(delta_days / 7))}w"
-        elif delta_days < 365:
-            label = f"{max(1, math.ceil(delta_days / 30))}m"
-        else:
-            label = f"{max(1, math.ceil(delta_days / 365))}y"
-        return f"{prefix}{label}" if label else ""
-
-    def _priority_time_label(self, task: dict) -> tuple[str, bool]:
-        priority_level = min(task.get("priority", 0) or 0, 3)
-        priority = "!" * priority_level
-        due_str = (task.get("due") or "").strip()
-        start_str = (task.get("starts") or task.get("start") or "").strip()
-        label = ""
-        overdue = False
-        if due_str:
-            try:
-                due_dt = date.fromisoformat(due_str)
-                if due_dt < date.today():
-                    label = "OD"
-                    overdue = True
-                else:
-                    label = self._relative_day_label(due_dt)
-            except Exception:
-                label = ""
-        elif start_str:
-            try:
-                start_dt = date.fromisoformat(start_str)
-                if start_dt > date.today():
-                    label = self._relative_day_label(start_dt, prefix=">")
-            except Exception:
-                label = ""
-        if label and priority:
-            return f"{label} {priority}", overdue
-        if label:
-            return label, overdue
-        return priority, overdue
-
     def _apply_font_size(self) -> None:
         font = self.font()
         font.setPointSize(self._font_size)
@@ -945,152 +889,8 @@ class TaskPanel(QWidget):
         else:
             self._ai_chat_panel.setToolTip("Initialize task AI to enable chat.")
 
-    def _build_task_context_text(self) -> str:
-        tasks = config.fetch_tasks(
-            "",
-            [],
-            include_done=True,
-            include_ancestors=True,
-            actionable_only=False,
-        )
-        lines: list[str] = []
-        for task in tasks:
-            status = "- [x]" if task.get("status") == "done" else "- [ ]"
-            text = (task.get("text") or "").strip()
-            priority = "!" * min(max(int(task.get("priority") or 0), 0), 3)
-            tags = " ".join(task.get("tags") or [])
-            due = (task.get("due") or "").strip()
-            starts = (task.get("starts") or task.get("start") or "").strip()
-            date_parts = []
-            if due:
-                date_parts.append(f"<{due}")
-            if starts:
-                date_parts.append(f">{starts}")
-            date_str = " ".join(date_parts)
-            parts = [status]
-            if text:
-                parts.append(text)
-            if priority:
-                parts.append(priority)
-            if tags:
-                parts.append(tags)
-            if date_str:
-                parts.append(date_str)
-            line = " ".join(parts).strip()
-            path = (task.get("path") or "").strip()
-            if path:
-                line = f"{line} :: {path}"
-            lines.append(line)
-        return "\n".join(lines).strip()
-
     def _build_task_insight_input(self, max_lines: int = 200, max_chars: int = 6000) -> str:
-        tasks = config.fetch_tasks(
-            "",
-            [],
-            include_done=True,
-            include_ancestors=True,
-            actionable_only=False,
-        )
-        tag_counts = config.fetch_task_tags()
-        today = date.today()
-        overdue = 0
-        upcoming = 0
-        future_starts = 0
-        done = 0
-        priority_counts = {0: 0, 1: 0, 2: 0, 3: 0}
-        path_counts: dict[str, int] = {}
-        for task in tasks:
-            status = task.get("status") or ""
-            if status == "done":
-                done += 1
-            priority = min(max(int(task.get("priority") or 0), 0), 3)
-            priority_counts[priority] = priority_counts.get(priority, 0) + 1
-            path = (task.get("path") or "").strip()
-            if path:
-                parent = str(Path(path).parent)
-                path_counts[parent] = path_counts.get(parent, 0) + 1
-            due_str = (task.get("due") or "").strip()
-            if due_str:
-                try:
-                    due_dt = date.fromisoformat(due_str)
-                    if status != "done":
-                        if due_dt < today:
-                            overdue += 1
-                        elif due_dt <= today + timedelta(days=7):
-                            upcoming += 1
-                except ValueError:
-                    pass
-            start_str = (task.get("starts") or task.get("start") or "").strip()
-            if start_str:
-                try:
-                    start_dt = date.fromisoformat(start_str)
-                    if start_dt > today:
-                        future_starts += 1
-                except ValueError:
-                    pass
-        total = len(tasks)
-        todo = total - done
-        lines: list[str] = []
-        lines.append("Task overview:")
-        lines.append(f"Total tasks: {total} (open: {todo}, done: {done})")
-        lines.append(
-            "Priority counts: "
-            f"!={priority_counts.get(1, 0)}, "
-            f"!!={priority_counts.get(2, 0)}, "
-            f"!!!={priority_counts.get(3, 0)}"
-        )
-        lines.append(f"Overdue open tasks: {overdue}")
-        lines.append(f"Upcoming (next 7 days): {upcoming}")
-        lines.append(f"Future start tasks: {future_starts}")
-        lines.append("")
-        lines.append("Top task areas (by parent path):")
-        for path, count in sorted(path_counts.items(), key=lambda item: item[1], reverse=True)[:12]:
-            lines.append(f"{path}: {count}")
-        lines.append("")
-        lines.append("Tag counts:")
-        if tag_counts:
-            for tag, count in tag_counts[:20]:
-                lines.append(f"{tag}: {count}")
-        else:
-            lines.append("None")
-        lines.append("")
-        lines.append("Tasks (truncated):")
-        count = 0
-        for task in tasks:
-            if count >= max_lines:
-                lines.append("[truncated]")
-                break
-            status = "- [x]" if task.get("status") == "done" else "- [ ]"
-            text = (task.get("text") or "").strip()
-            priority = "!" * min(max(int(task.get("priority") or 0), 0), 3)
-            tags = " ".join(task.get("tags") or [])
-            due = (task.get("due") or "").strip()
-            starts = (task.get("starts") or task.get("start") or "").strip()
-            date_parts = []
-            if due:
-                date_parts.append(f"<{due}")
-            if starts:
-                date_parts.append(f">{starts}")
-            date_str = " ".join(date_parts)
-            parts = [status]
-            if text:
-                parts.append(text)
-            if priority:
-                parts.append(priority)
-            if tags:
-                parts.append(tags)
-            if date_str:
-                parts.append(date_str)
-            line = " ".join(parts).strip()
-            path = (task.get("path") or "").strip()
-            if path:
-                line = f"{line} :: {path}"
-            if sum(len(l) + 1 for l in lines) + len(line) + 1 > max_chars:
-                lines.append("[truncated]")
-                break
-            lines.append(line)
-            count += 1
-        return "\n".join(lines).strip()
+        return self._task_context.insight_input(config.load_task_universe(), max_lines, max_chars)
 
     def _ensure_task_context_indexed(self, force: bool) -> bool:
         if not config.has_active_vault():
@@ -1099,10 +899,25 @@ class TaskPanel(QWidget):
             return False
         if not force and not self._task_context_dirty:
             return True
-        text = self._build_task_context_text()
-        if not text:
+        universe = config.load_task_universe()
+        if not self._task_context.sections(universe):
             return False
-        ok = self._vector_api.index_text("tasks", text, "page", timeout=60.0)
+        # Only pages whose task section changed since the last upload are re-embedded.
+        sync = self._task_context.pending_sync(universe, config.load_task_context_digests())
+        if sync.full:
+            self._vector_api.delete_text(TASK_CONTEXT_REF, "page", timeout=60.0)
+        recorded: dict[str, Optional[str]] = {}
+        ok = True
+        for path, text in sync.upload.items():
+            if not self._vector_api.index_text(TASK_CONTEXT_REF, text, "page", attachment=path, timeout=60.0):
+                ok = False
+                break
+            recorded[path] = sync.digests[path]
+        if ok:
+            for path in sync.remove:
+                if self._vector_api.delete_text(TASK_CONTEXT_REF, "page", attachment=path, timeout=60.0):
+                    recorded[path] = None
+        config.save_task_context_digests(recorded)
         if ok:
             self._task_context_dirty = False
             self._task_context_initialized = True
@@ -1294,63 +1109,16 @@ class TaskPanel(QWidget):
 
     @staticmethod
     def _normalize_task_path(path: Optional[str]) -> str:
-        if not path:
-            return ""
-        norm = path.replace("\\", "/")
-        if not norm.startswith("/"):
-            norm = "/" + norm.lstrip("/")
-        if norm.lower().endswith(LEGACY_SUFFIX):
-            norm = norm[: -len(LEGACY_SUFFIX)] + PAGE_SUFFIX
-        return norm
-
-    def _task_matches_filter(self, task_path: str, prefix: str) -> bool:
-        if not task_path or not prefix:
-            return False
-        if prefix == "/":
-            return True
-        if prefix.endswith(tuple(PAGE_SUFFIXES)):
-            return task_path == prefix
-        base = prefix.rstrip("/")
-        if not base:
-            return True
-        if task_path.startswith(base + "/"):
-            return True
-        file_target = base + PAGE_SUFFIX
-        return task_path == file_target
-
-    def _is_journal_path(self, task_path: str) -> bool:
-        if not task_path:
-            return False
-        norm = task_path
-        journal_root = "/Journal"
-        if norm == journal_root:
-            return True
-        if norm in (journal_root + PAGE_SUFFIX, journal_root + LEGACY_SUFFIX):
-            return True
-        return norm.startswith(journal_root + "/")
+        return normalize_task_path(path)
 
-    def _apply_nav_filter(self, tasks: list[dict]) -> list[dict]:
-        if not tasks:
-            return []
+    def _nav_filter_mask(self, universe: TaskUniverse) -> int:
+        """Mask of tasks inside the navigation filter (plus Journal when included)."""
         if not self._nav_filter_prefix or not self._nav_filter_enabled:
-            return tasks
-        prefix = self._normalize_task_path(self._nav_filter_prefix)
-        include_journal = self._include_journal
-        filtered: list[dict] = []
-        seen_ids: set = set()
-        for task in tasks:
-            task_path = self._normalize_task_path(task.get("path"))
-            task_id = task.get("id") or task_path
-            if self._task_matches_filter(task_path, prefix):
-                if task_id not in seen_ids:
-                    filtered.append(task)
-                    seen_ids.add(task_id)
-                continue
-            if include_journal and self._is_journal_path(task_path):
-                if task_id not in seen_ids:
-                    filtered.append(task)
-                    seen_ids.add(task_id)
-        return filtered
+            return universe.all_mask
+        mask = universe.path_mask(self._nav_filter_prefix)
+        if self._include_journal:
+            mask |= universe.journal_mask()
+        return mask
 
     def focusInEvent(self, event):  # type: ignore[override]
         super().focusInEvent(event)
@@ -1382,7 +1150,7 @@ class TaskPanel(QWidget):
             ):
                 return super().eventFilter(obj, event)
             if obj is self.task_tree and event.text() == "@":
-                if self.task_tree.currentItem():
+                if self.task_tree.currentIndex().isValid():
                     # Reset other filters before jumping into tag search
                     self.active_tags.clear()
                     self.search.clear()
@@ -1400,8 +1168,8 @@ class TaskPanel(QWidget):
 
     def keyPressEvent(self, event):
         if event.key() in (Qt.Key_Return, Qt.Key_Enter):
-            current = self.task_tree.currentItem()
-            if current:
+            current = self.task_tree.currentIndex()
+            if current.isValid():
                 self._mark_activation_source("keyboard")
                 self._emit_task_activation(current)
                 event.accept()
@@ -1447,30 +1215,30 @@ class TaskPanel(QWidget):
 
     def _cycle_task_selection(self, direction: int) -> None:
         """Move selection up/down with wrap-around in the task list."""
-        items = self._visible_items()
-        if not items:
-            return
-        current_item = self.task_tree.currentItem()
-        if current_item not in items:
-            target_index = 0 if direction > 0 else len(items) - 1
-        else:
-            current_index = items.index(current_item)
-            target_index = (current_index + direction) % len(items)
-        target_item = items[target_index]
-        if target_item:
-            self.task_tree.setCurrentItem(target_item)
-            self.task_tree.scrollToItem(target_item)
-            self.task_tree.setFocus(Qt.OtherFocusReason)
-
-    def _visible_items(self) -> list[QTreeWidgetItem]:
-        items: list[QTreeWidgetItem] = []
-        iterator = QTreeWidgetItemIterator(self.task_tree, QTreeWidgetItemIterator.All)
-        while iterator.value():
-            item = iterator.value()
-            if not item.isHidden():
-                items.append(item)
-            iterator += 1
-        return items
+        tree = self.task_tree
+        current = tree.currentIndex()
+        target = QModelIndex()
+        if current.isValid():
+            current = current.siblingAtColumn(0)
+            target = tree.indexBelow(current) if direction > 0 else tree.indexAbove(current)
+        if not target.isValid():
+            # Wrap around (or start) at the first/last visible row
+            target = self._edge_task_index(last=direction < 0)
+        if target.isValid():
+            tree.setCurrentIndex(target)
+            tree.scrollTo(target)
+            tree.setFocus(Qt.OtherFocusReason)
+
+    def _edge_task_index(self, last: bool) -> QModelIndex:
+        model = self.task_model
+        if model.rowCount() == 0:
+            return QModelIndex()
+        if not last:
+            return model.index(0, 0)
+        index = model.index(model.rowCount() - 1, 0)
+        while model.rowCount(index) and self.task_tree.isExpanded(index):
+            index = model.index(model.rowCount(index) - 1, 0, index)
+        return index
 
     def _parse_search_tags(self, text: str) -> tuple[str, list[str]]:
         """Extract @tags (including the active partial tag) and return (query_without_tags, tokens)."""
@@ -1546,9 +1314,10 @@ class TaskPanel(QWidget):
     def clear(self) -> None:
         self.active_tags.clear()
         self.tag_list.clear()
-        self.task_tree.clear()
+        self.task_model.clear()
         self._visible_tasks = []
-        self._tag_source_tasks = None
+        self._tag_source_mask = None
+        self._task_universe = None
         self._nav_filter_prefix = None
         self._nav_filter_enabled = True
         self._include_journal = True
@@ -1563,40 +1332,12 @@ class TaskPanel(QWidget):
         self.tag_list.blockSignals(True)
         self.tag_list.clear()
         include_done = self.show_completed.isChecked()
-
-        def _count_tags(tasks: list[dict]) -> list[tuple[str, int]]:
-            counts: dict[str, int] = {}
-            for task in tasks:
-                if not include_done and task.get("status") == "done":
-                    continue
-                tag_set = set(task.get("tags", []))
-                text = task.get("text", "") or ""
-                for token in re.findall(r"@[A-Za-z0-9_]+", text):
-                    tag_set.add(token)
-                for tag in tag_set:
-                    counts[tag] = counts.get(tag, 0) + 1
-            return sorted(counts.items())
-
-        if self._tag_source_tasks is not None:
-            tag_items = _count_tags(self._tag_source_tasks)
-        elif self._nav_filter_prefix and self._nav_filter_enabled:
-            tag_items = _count_tags(self._visible_tasks)
+        universe = self._task_universe or config.load_task_universe()
+        if self._tag_source_mask is not None:
+            source_mask = self._tag_source_mask
         else:
-            try:
-                all_tasks = config.fetch_tasks(
-                    "",
-                    [],
-                    include_done=include_done,
-                    include_ancestors=True,
-                    actionable_only=False,
-                )
-                tag_items = _count_tags(list(all_tasks))
-            except Exception:
-                tag_items = [
-                    (tag, count)
-                    for tag, count in config.fetch_task_tags()
-                    if include_done or count > 0
-                ]
+            source_mask = universe.select(include_done=include_done, include_ancestors=True)
+        tag_items = universe.tag_counts(source_mask, include_done=include_done)
         self._available_tags = {tag for tag, _ in tag_items}
         # Drop active tags that are no longer available in the current view
         if self.active_tags:
@@ -1622,7 +1363,7 @@ class TaskPanel(QWidget):
         self._configure_task_columns()
         raw_text = self.search.text().strip()
         query, tokens = self._parse_search_tags(raw_text)
-        self._tag_source_tasks = None
+        self._tag_source_mask = None
         tag_groups, matched_tags, missing_tokens = self._resolve_tag_groups(tokens)
         tokens_present = bool(tokens)
         has_matches = bool(tag_groups)
@@ -1641,10 +1382,18 @@ class TaskPanel(QWidget):
         use_sql_tags = bool(effective_tag_groups) and all(len(group) == 1 for group in effective_tag_groups)
         sql_tags = sorted(next(iter(group)) for group in effective_tag_groups) if use_sql_tags else []
         impossible_tag_filter = any(len(group) == 0 for group in effective_tag_groups)
+        # All three views (main list, done-inclusive extras, tag counts) come from one in-memory snapshot.
+        previous = self._task_universe
+        universe = config.load_task_universe()
+        self._task_universe = universe
+        # Tasks that changed since the previous snapshot; None means compare every row.
+        changed_ids = None
+        if previous is not None and universe.non_actionable_tags == previous.non_actionable_tags:
+            changed_ids = set() if universe is previous else config.task_changes_since(previous.version)
         if impossible_tag_filter:
-            tasks = []
+            task_mask = 0
         else:
-            tasks = config.fetch_tasks(
+            task_mask = universe.select(
                 query,
                 sql_tags,
                 include_done=include_done,
@@ -1653,141 +1402,55 @@ class TaskPanel(QWidget):
                 # unless the user is explicitly filtering/searching.
                 actionable_only=actionable_toggle or (not include_done and not searching),
             )
-            tasks = self._apply_nav_filter(tasks)
+            task_mask &= self._nav_filter_mask(universe)
             if effective_tag_groups and not use_sql_tags:
-                tasks = self._filter_tasks_to_tag_groups(tasks, effective_tag_groups)
+                task_mask = self._filter_mask_to_tag_groups(universe, task_mask, effective_tag_groups)
 
-        if include_done:
-            self._tag_source_tasks = list(tasks)
+        if include_done or impossible_tag_filter:
+            self._tag_source_mask = task_mask
         else:
-            if impossible_tag_filter:
-                self._tag_source_tasks = []
-                extra_tasks = []
-            else:
-                extra_tasks = config.fetch_tasks(
-                    query,
-                    sql_tags,
-                    include_done=True,
-                    include_ancestors=True,
-                    actionable_only=False,
-                )
-                if self._nav_filter_prefix and self._nav_filter_enabled:
-                    extra_tasks = self._apply_nav_filter(extra_tasks)
-                if effective_tag_groups and not use_sql_tags:
-                    extra_tasks = self._filter_tasks_to_tag_groups(extra_tasks, effective_tag_groups)
-                self._tag_source_tasks = []
-            if not self._tag_source_tasks:
-                tag_source_map = {task.get("id") or task.get("path"): task for task in extra_tasks}
-                for task in tasks:
-                    tag_source_map.setdefault(task.get("id") or task.get("path"), task)
-                self._tag_source_tasks = list(tag_source_map.values())
-
-        self.task_tree.clear()
+            extra_mask = universe.select(
+                query,
+                sql_tags,
+                include_done=True,
+                include_ancestors=True,
+                actionable_only=False,
+            )
+            extra_mask &= self._nav_filter_mask(universe)
+            if effective_tag_groups and not use_sql_tags:
+                extra_mask = self._filter_mask_to_tag_groups(universe, extra_mask, effective_tag_groups)
+            self._tag_source_mask = extra_mask | task_mask
         self._visible_tasks = []
-        if not tasks:
+        self.task_model.set_highlights(universe.text_matches(query) if query else None)
+        self.task_tree.viewport().update()
+        if not task_mask:
+            self.task_model.set_tasks([])
             self._refresh_tags()
             return
-        task_map = {task["id"]: task for task in tasks}
-        visible_ids: set[str] = set()
-
-        def _mark_visible(task_id: str) -> None:
-            if task_id in visible_ids:
-                return
-            visible_ids.add(task_id)
-            parent_id = task_map.get(task_id, {}).get("parent")
-            if parent_id and parent_id in task_map:
-                _mark_visible(parent_id)
-
-        for task in tasks:
-            if self.show_future.isChecked() or not self._is_future_task(task):
-                _mark_visible(task["id"])
-
-        items_by_id: dict[str, QTreeWidgetItem] = {}
-        visible_tasks: list[dict] = []
-        for task in sorted(tasks, key=self._task_sort_key):
-            if task["id"] not in visible_ids:
-                continue
-            visible_tasks.append(task)
-            priority_level = min(task.get("priority", 0) or 0, 3)
-            due = task.get("due", "") or ""
-            start = (task.get("starts") or task.get("start") or "").strip()
-            text = task["text"]
-            display_text = self._format_task_text(text)
-            display_path = self._present_path(task["path"])
-            priority_text, due_overdue = self._priority_time_label(task)
-            due_idx = 2
-            start_idx = 3 if self._show_task_start_column else None
-            path_idx = 3 if (not self._show_task_start_column and self._show_task_page_column) else 4
-            row = [""] * self.task_tree.columnCount()
-            row[0] = priority_text
-            row[1] = display_text
-            row[due_idx] = due
-            if self._show_task_start_column and start_idx is not None:
-                row[start_idx] = start
-            if self._show_task_page_column:
-                row[path_idx] = display_path
-            item = QTreeWidgetItem(row)
-            item.setToolTip(1, text)
-            item.setData(0, Qt.UserRole, task)
-            item.setToolTip(1, text)
-            due_fg_bg = self._due_colors(task)
-            if due_fg_bg:
-                fg, bg = due_fg_bg
-                if bg:
-                    item.setBackground(due_idx, bg)
-                if fg:
-                    item.setForeground(due_idx, fg)
-            pri_brush = self._priority_brush(priority_level)
-            if pri_brush:
-                item.setBackground(0, pri_brush["bg"])
-                item.setForeground(0, pri_brush["fg"])
-            if due_overdue:
-                font = item.font(0)
-                font.setUnderline(True)
-                item.setFont(0, font)
-            if task.get("status") == "done":
-                font = item.font(1)
-                font.setStrikeOut(True)
-                for col in range(item.columnCount()):
-                    item.setFont(col, font)
-            elif not task.get("actionable", True):
-                muted = QColor("#666666")
-                for col in range(item.columnCount()):
-                    item.setForeground(col, muted)
-            parent_id = task.get("parent")
-            if parent_id and parent_id in items_by_id:
-                items_by_id[parent_id].addChild(item)
-            else:
-                self.task_tree.addTopLevelItem(item)
-            items_by_id[task["id"]] = item
+        if self.show_future.isChecked():
+            visible_mask = task_mask
+        else:
+            # Hide tasks starting after today, but keep ancestors of the remaining ones.
+            tomorrow = (date.today() + timedelta(days=1)).isoformat()
+            current_mask = task_mask & ~universe.starts_mask(start=tomorrow)
+            visible_mask = universe.with_ancestors(current_mask, within=task_mask)
+        visible_tasks = universe.tasks_for(visible_mask)
         self._visible_tasks = visible_tasks
-        self.task_tree.expandAll()
-        self.task_tree.sortItems(self.sort_column, self.sort_order)
-        self._restore_last_keyboard_selection(items_by_id)
+        # Rows are diffed against the current model, so saving one page only touches its tasks.
+        if self.task_model.set_tasks(visible_tasks, changed_ids=changed_ids, universe=universe):
+            self.task_tree.expandAll()
+        self._restore_last_keyboard_selection()
         self._refresh_tags()
         QTimer.singleShot(0, self._reset_horizontal_scroll)
 
-    def _filter_tasks_to_tag_groups(self, tasks: list[dict], tag_groups: list[set[str]]) -> list[dict]:
-        """Apply tag filtering for OR-within-prefix semantics."""
-        if not tasks or not tag_groups:
-            return tasks
-        tasks_by_id = {task.get("id"): task for task in tasks if task.get("id")}
-        matching_ids: set[str] = set()
-        for task in tasks:
-            tag_set = set(task.get("tags") or [])
-            if all(any(tag in tag_set for tag in group) for group in tag_groups):
-                task_id = task.get("id")
-                if task_id:
-                    matching_ids.add(task_id)
-        if not matching_ids:
-            return []
-        keep_ids = set(matching_ids)
-        for task_id in list(matching_ids):
-            current = tasks_by_id.get(task_id, {}).get("parent")
-            while current and current not in keep_ids:
-                keep_ids.add(current)
-                current = tasks_by_id.get(current, {}).get("parent")
-        return [task for task in tasks if task.get("id") in keep_ids]
+    def _filter_mask_to_tag_groups(self, universe: TaskUniverse, mask: int, tag_groups: list[set[str]]) -> int:
+        """Apply tag filtering for OR-within-prefix semantics, keeping ancestors of matches."""
+        if not mask or not tag_groups:
+            return mask
+        matching = universe.tag_groups_mask(tag_groups) & mask
+        if not matching:
+            return 0
+        return universe.with_ancestors(matching, within=mask)
 
     def _handle_header_click(self, column: int) -> None:
         if column == self.sort_column:
@@ -1795,8 +1458,7 @@ class TaskPanel(QWidget):
         else:
             self.sort_column = column
             self.sort_order = Qt.AscendingOrder
-        self.task_tree.header().setSortIndicator(self.sort_column, self.sort_order)
-        self.task_tree.sortItems(self.sort_column, self.sort_order)
+        self.task_tree.sortByColumn(self.sort_column, self.sort_order)
 
     def set_active_tags(self, tags: Iterable[str]) -> None:
         self.active_tags = set(tags)
@@ -1816,48 +1478,8 @@ class TaskPanel(QWidget):
             self._refresh_tasks()
         self._last_activation_source: Optional[str] = None
 
-    def _due_colors(self, task: dict) -> Optional[tuple[QColor | None, QColor | None]]:
-        """Return (fg, bg) for due column with red/orange/yellow emphasis."""
-        due_str = (task.get("due") or "").strip()
-        if not due_str:
-            return None
-        try:
-            due_dt = date.fromisoformat(due_str)
-        except ValueError:
-            return None
-        today_dt = date.today()
-        if due_dt < today_dt:
-            return QColor("#FFFFFF"), QColor("#CC0000")  # Overdue: white on solid red
-        if due_dt == today_dt:
-            return QColor("#3A1D00"), QColor("#F57900")  # Today: dark on orange
-        if due_dt == today_dt + timedelta(days=1):
-            return QColor("#444444"), QColor("#FDD835")  # Tomorrow: dark on yellow
-        return None
-
-    def _priority_brush(self, level: int) -> Optional[dict]:
-        """Return background/foreground for priority level."""
-        if level <= 0:
-            return None
-        # Three levels only, matching red/orange/yellow backgrounds
-        colors = [
-            {"bg": QColor("#FFF9C4")},  # !
-            {"bg": QColor("#F57900")},  # !!
-            {"bg": QColor("#CC0000")},  # !!!
-        ]
-        idx = min(level - 1, len(colors) - 1)
-        bg = colors[idx]["bg"]
-        return {"bg": bg, "fg": self._contrast_text_color(bg)}
-
-    def _contrast_text_color(self, bg: QColor) -> QColor:
-        """Return a readable text color for the given background."""
-        return QColor("#FFFFFF") if bg.lightness() < 128 else QColor("#000000")
-
-    def _task_sort_key(self, task: dict) -> tuple:
-        """Sort tasks to ensure parents are created before children."""
-        return (task.get("path") or "", task.get("line") or 0, task.get("level") or 0)
-
-    def _emit_task_activation(self, item: QTreeWidgetItem) -> None:
-        task = item.data(0, Qt.UserRole)
+    def _emit_task_activation(self, index: QModelIndex) -> None:
+        task = self.task_model.task_at(index)
         if not task:
             if os.getenv("ZIMX_DEBUG_TASKS", "0") not in ("0", "false", "False", ""):
                 print(f"[TASK_PANEL] _emit_task_activation: no task data on item")
@@ -1870,15 +1492,22 @@ class TaskPanel(QWidget):
             self._last_activation_source = "unknown"
         self.taskActivated.emit(task["path"], task.get("line") or 1)
 
-    def _on_task_double_clicked(self, item: QTreeWidgetItem, col: int) -> None:
+    def _on_task_double_clicked(self, index: QModelIndex) -> None:
         self._mark_activation_source("mouse")
-        self._emit_task_activation(item)
+        self._emit_task_activation(index)
 
-    def _on_task_activated(self, item: QTreeWidgetItem) -> None:
-        # itemActivated can fire for mouse or keyboard; default to unknown unless set elsewhere
+    def _on_task_activated(self, index: QModelIndex) -> None:
+        # activated can fire for mouse or keyboard; default to unknown unless set elsewhere
         if not self._last_activation_source:
             self._last_activation_source = "unknown"
-        self._emit_task_activation(item)
+        self._emit_task_activation(index)
+
+    def _on_task_rows_inserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        """Keep rows added by an incremental refresh expanded like the rest of the tree."""
+        if parent.isValid():
+            self.task_tree.expand(parent)
+        for row in range(first, last + 1):
+            self.task_tree.expandRecursively(self.task_model.index(row, 0, parent))
 
     def _mark_activation_source(self, source: str) -> None:
         self._last_activation_source = source
@@ -1898,24 +1527,23 @@ class TaskPanel(QWidget):
         except Exception:
             self._last_keyboard_task_line = None
 
-    def _restore_last_keyboard_selection(self, items_by_id: dict[str, QTreeWidgetItem]) -> None:
+    def _restore_last_keyboard_selection(self) -> None:
         """Re-select the last keyboard-activated task if it is still visible."""
         if not (self._last_keyboard_task_id or self._last_keyboard_task_path):
             return
-        target = items_by_id.get(self._last_keyboard_task_id) if self._last_keyboard_task_id else None
-        if not target and self._last_keyboard_task_path:
+        target = self.task_model.index_for_task(self._last_keyboard_task_id)
+        if not target.isValid() and self._last_keyboard_task_path:
             desired_line = self._last_keyboard_task_line
-            for item in items_by_id.values():
-                task = item.data(0, Qt.UserRole) or {}
+
+            def _matches(task: dict) -> bool:
                 if task.get("path") != self._last_keyboard_task_path:
-                    continue
-                if desired_line and task.get("line") and task.get("line") != desired_line:
-                    continue
-                target = item
-                break
-        if target:
-            self.task_tree.setCurrentItem(target)
-            self.task_tree.scrollToItem(target)
+                    return False
+                return not (desired_line and task.get("line") and task.get("line") != desired_line)
+
+            target = self.task_model.find_task(_matches)
+        if target.isValid():
+            self.task_tree.setCurrentIndex(target)
+            self.task_tree.scrollTo(target)
 
     def _present_path(self, path: str) -> str:
         return path_to_colon(path)
@@ -1924,6 +1552,7 @@ class TaskPanel(QWidget):
         """Set vault root for task filtering preferences."""
         self.vault_root = vault_root
         self._apply_show_future_preference()
+        self._task_context.clear()
         self._task_context_dirty = True
         self._task_context_initialized = False
         self._set_ai_chat_enabled(False)
@@ -1961,17 +1590,6 @@ class TaskPanel(QWidget):
             config.save_show_future_tasks(checked)
         self._refresh_tasks()
 
-    def _is_future_task(self, task: dict) -> bool:
-        """Return True if task has a start date in the future."""
-        start_str = (task.get("starts") or "").strip()
-        if not start_str:
-            return False
-        try:
-            start_dt = date.fromisoformat(start_str)
-        except ValueError:
-            return False
-        return start_dt > date.today()
-
     def _apply_show_future_preference(self) -> None:
         """Sync the checkbox with saved preference and refresh the list."""
         if not config.has_active_vault():
@@ -1,43 +1,352 @@
+"""Text extraction from attachments (PDF, DOCX, images via OCR, plain text).
+
+``AttachmentTextService`` runs the extractors in a process pool, so parsing
+does not hold the caller's interpreter. It keeps a content-addressed cache of
+the extracted text under ``<vault>/.zimx/attachment_text``, keyed by the file's
+hash, the extractor used and ``EXTRACTOR_VERSION``. Re-adding an unchanged file
+(or a copy of it elsewhere in the vault) reads the cache instead of parsing.
+Bump the version when extractor output changes.
+
+PDFs are split into batches of pages that are extracted in parallel and
+yielded in order by ``iter_pages``, so callers can start on the first pages of
+a long document. Every extraction is bounded by ``ExtractionLimits``: file
+size, page count, character count and a wall-clock timeout. Results cut short
+by a limit are returned but not cached. A failed extraction (extractor error,
+crashed worker or timeout) raises ``ExtractionError`` and is never cached, so
+it is retried next time. A timed-out job cannot be cancelled inside its
+worker, so the whole pool is terminated and recreated on next use.
+"""
+
 from __future__ import annotations
 
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Dict, Iterable, Iterator, Optional
+
+EXTRACTOR_VERSION = 1
+CACHE_DIR = "attachment_text"
+PAGE_BREAK = "\f"
+_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".tiff")
+_PDF_BATCH_PAGES = 8
+
+
+class ExtractionError(RuntimeError):
+    """Text could not be extracted (extractor failure, worker crash or timeout)."""
+
 
-from docx import Document
-from PIL import Image
-import pytesseract
-from pdfminer.high_level import extract_text as extract_pdf_text
+# The extractor libraries are imported where they are used: they load in the
+# worker processes, not in every process that merely imports this module.
 
 
 def _extract_text_from_image(image_path: Path) -> str:
-    try:
-        with Image.open(image_path) as img:
-            return pytesseract.image_to_string(img)
-    except Exception as exc:  # pragma: no cover - external tooling
-        print(f"[Chroma] Failed to OCR {image_path}: {exc}")
-        return ""
+    from PIL import Image
+    import pytesseract
+
+    with Image.open(image_path) as img:
+        return pytesseract.image_to_string(img)
 
 
 def _extract_docx_text(doc_path: Path) -> str:
-    try:
-        doc = Document(str(doc_path))
-        return "\n".join(p.text for p in doc.paragraphs if p.text)
-    except Exception as exc:  # pragma: no cover - external tooling
-        print(f"[Chroma] Failed to parse {doc_path}: {exc}")
-        return ""
+    from docx import Document
+
+    doc = Document(str(doc_path))
+    return "\n".join(p.text for p in doc.paragraphs if p.text)
 
 
-def extract_attachment_text(path: Path) -> str:
-    """Extract readable text from an attachment for indexing."""
+def _extractor(path: Path) -> str:
     suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        return "pdf"
+    if suffix == ".docx":
+        return "docx"
+    if suffix in _IMAGE_SUFFIXES:
+        return "ocr"
+    return "text"
+
+
+def _extract_part(path: str, extractor: str, first_page: int = 0, last_page: int = 0) -> Optional[list[str]]:
+    """Worker-side extraction; page texts (one item for non-paged formats), or None if it failed."""
+    file_path = Path(path)
+    try:
+        if extractor == "pdf":
+            from pdfminer.high_level import extract_text as extract_pdf_text
+
+            text = extract_pdf_text(path, page_numbers=range(first_page, last_page))
+            pages = text.split(PAGE_BREAK)
+            # pdfminer ends every page with a form feed, leaving one empty tail.
+            return pages[:-1] if len(pages) > 1 else pages
+        if extractor == "docx":
+            return [_extract_docx_text(file_path)]
+        if extractor == "ocr":
+            return [_extract_text_from_image(file_path)]
+        return [file_path.read_text(encoding="utf-8", errors="ignore")]
+    except Exception as exc:
+        print(f"[Chroma] Failed to extract {path}: {exc}")
+        return None
+
+
+def _pdf_page_count(path: Path) -> int:
+    from pdfminer.pdfpage import PDFPage
+
+    with path.open("rb") as handle:
+        return sum(1 for _page in PDFPage.get_pages(handle))
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class ExtractionLimits:
+    max_bytes: int = 200 * 1024 * 1024
+    max_pages: int = 1000
+    max_chars: int = 5_000_000
+    timeout: float = 300.0  # seconds for one file, all pages included
+
+    @classmethod
+    def from_env(cls) -> "ExtractionLimits":
+        return cls(timeout=_env_number("ZIMX_EXTRACT_TIMEOUT", cls.timeout))
+
+
+class AttachmentTextService:
+    """Cached, parallel attachment text extraction for one cache directory (``None`` disables the cache)."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_workers: Optional[int] = None,
+        limits: Optional[ExtractionLimits] = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.limits = limits or ExtractionLimits.from_env()
+        workers = max_workers or int(_env_number("ZIMX_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+        self.max_workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # (path, mtime_ns, size) -> content digest, so unchanged files are not re-hashed.
+        self._digests: Dict[tuple[str, int, int], str] = {}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the parent's threads (Qt, the server) half-initialized.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _reset_pool(self, terminate: bool = False) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        if terminate:
+            # Cancelling a future does not stop a job a worker already runs; kill the workers instead.
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        self._reset_pool()
+
+    def _digest(self, path: Path) -> str:
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(key)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            with path.open("rb") as handle:
+                for block in iter(lambda: handle.read(1 << 20), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            self._digests[key] = digest
+        return digest
+
+    def cache_key(self, path: Path) -> str:
+        return f"{self._digest(path)}-{_extractor(path)}-v{EXTRACTOR_VERSION}"
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / key[:2] / f"{key}.txt"
+
+    def cached_text(self, path: Path) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        cache_path = self._cache_path(self.cache_key(path))
+        if cache_path is None or not cache_path.exists():
+            return None
+        try:
+            return cache_path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def _store(self, key: str, text: str) -> None:
+        cache_path = self._cache_path(key)
+        if cache_path is None:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            partial = cache_path.with_suffix(".part")
+            partial.write_text(text, encoding="utf-8")
+            partial.replace(cache_path)
+        except OSError as exc:
+            print(f"[Chroma] Could not cache extracted text for {key}: {exc}")
+
+    def extract(self, path: Path) -> str:
+        """Whole text of ``path``; PDF pages are separated by form feeds as pdfminer does.
+
+        Raises ``ExtractionError`` if extraction failed.
+        """
+        return PAGE_BREAK.join(self.iter_pages(path))
+
+    def extract_many(self, paths: Iterable[Path]) -> Dict[Path, str]:
+        """Extract several files, running the non-paged ones concurrently; failed files map to ""."""
+        paths = list(paths)
+        results: Dict[Path, str] = {}
+        pending: Dict[Path, Future] = {}
+        for path in paths:
+            if _extractor(path) in ("docx", "ocr") and self._usable(path) and self.cached_text(path) is None:
+                pending[path] = self._executor().submit(_extract_part, str(path), _extractor(path))
+        for path in paths:
+            future = pending.get(path)
+            if future is None:
+                try:
+                    results[path] = self.extract(path)
+                except ExtractionError:
+                    results[path] = ""
+                continue
+            started = time.monotonic()
+            pages = self._await(future, path, started + self.limits.timeout)
+            results[path] = "" if pages is None else self._finish(path, PAGE_BREAK.join(pages))
+        return results
+
+    def _usable(self, path: Path) -> bool:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return False
+        if size > self.limits.max_bytes:
+            print(f"[Chroma] Skipping {path}: {size} bytes exceeds the extraction limit")
+            return False
+        return True
+
+    def _await(self, future: Future, path: Path, deadline: float) -> Optional[list[str]]:
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            print(f"[Chroma] Extraction of {path} timed out after {self.limits.timeout:.0f}s")
+            self._reset_pool(terminate=True)
+        except BrokenProcessPool as exc:
+            print(f"[Chroma] Extraction worker for {path} died: {exc}")
+            self._reset_pool()
+        except CancelledError:
+            # The pool was terminated for another file's timeout.
+            print(f"[Chroma] Extraction of {path} was cancelled")
+        return None
+
+    def _finish(self, path: Path, text: str) -> str:
+        """Cache a successful extraction (unless cut short by ``max_chars``) and return its text."""
+        if len(text) > self.limits.max_chars:
+            return text[: self.limits.max_chars]
+        if self.cache_dir is not None:
+            self._store(self.cache_key(path), text)
+        return text
+
+    def iter_pages(self, path: Path) -> Iterator[str]:
+        """Yield the text of ``path`` page by page (one item for non-PDF files) as it is extracted.
+
+        Raises ``ExtractionError`` (possibly after some pages) if extraction fails.
+        """
+        if not self._usable(path):
+            return
+        extractor = _extractor(path)
+        if extractor == "text":
+            # Plain text is cheaper to read than to cache.
+            pages = _extract_part(str(path), extractor)
+            if pages is None:
+                raise ExtractionError(f"Could not read {path}")
+            yield pages[0][: self.limits.max_chars]
+            return
+        cached = self.cached_text(path)
+        if cached is not None:
+            yield from cached.split(PAGE_BREAK)
+            return
+        deadline = time.monotonic() + self.limits.timeout
+        if extractor != "pdf":
+            pages = self._await(self._executor().submit(_extract_part, str(path), extractor), path, deadline)
+            if pages is None:
+                raise ExtractionError(f"Could not extract text from {path}")
+            yield self._finish(path, PAGE_BREAK.join(pages))
+            return
+        yield from self._iter_pdf_pages(path, deadline)
+
+    def _iter_pdf_pages(self, path: Path, deadline: float) -> Iterator[str]:
+        try:
+            page_count = _pdf_page_count(path)
+        except Exception as exc:
+            print(f"[Chroma] Failed to read {path}: {exc}")
+            raise ExtractionError(f"Could not read {path}") from exc
+        complete = page_count <= self.limits.max_pages
+        page_count = min(page_count, self.limits.max_pages)
+        executor = self._executor()
+        futures = [
+            executor.submit(_extract_part, str(path), "pdf", start, min(start + _PDF_BATCH_PAGES, page_count))
+            for start in range(0, page_count, _PDF_BATCH_PAGES)
+        ]
+        collected: list[str] = []
+        room = self.limits.max_chars
+        try:
+            for future in futures:
+                pages = self._await(future, path, deadline)
+                if pages is None:
+                    raise ExtractionError(f"Could not extract text from {path}")
+                for page in pages:
+                    if len(page) > room:
+                        complete = False
+                        yield page[:room]
+                        return
+                    room -= len(page)
+                    collected.append(page)
+                    yield page
+        finally:
+            for future in futures:
+                future.cancel()
+        if complete and self.cache_dir is not None:
+            self._store(self.cache_key(path), PAGE_BREAK.join(collected))
+
+
+_SERVICES: Dict[str, AttachmentTextService] = {}
+_SERVICES_LOCK = threading.Lock()
+
+
+def attachment_text_service(vault_root: Optional[Path] = None) -> AttachmentTextService:
+    """Shared service for a vault (cached under its ``.zimx``), or an uncached one without a vault."""
+    key = str(Path(vault_root).resolve()) if vault_root else ""
+    with _SERVICES_LOCK:
+        service = _SERVICES.get(key)
+        if service is None:
+            cache_dir = Path(key) / ".zimx" / CACHE_DIR if key else None
+            service = AttachmentTextService(cache_dir)
+            _SERVICES[key] = service
+        return service
+
+
+def extract_attachment_text(path: Path, vault_root: Optional[Path] = None) -> str:
+    """Extract readable text from an attachment for indexing ("" if extraction failed)."""
     try:
-        if suffix == ".pdf":
-            return extract_pdf_text(str(path))
-        if suffix == ".docx":
-            return _extract_docx_text(path)
-        if suffix in (".png", ".jpg", ".jpeg", ".bmp", ".tiff"):  # images
-            return _extract_text_from_image(path)
-        return path.read_text(encoding="utf-8", errors="ignore")
+        return attachment_text_service(vault_root).extract(path)
     except Exception as exc:
         print(f"[Chroma] Failed to extract {path}: {exc}")
         return ""
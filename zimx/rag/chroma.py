@@ -1,20 +1,80 @@
+"""Chroma-backed vector store for page, attachment and task context text.
+
+``index_text`` is incremental: every chunk is stored under an id derived from
+its content hash, so re-indexing a page embeds only chunks whose text is new,
+deletes only chunks that disappeared and leaves the rest untouched. The digest
+of the whole text is kept per scope (in memory and in chunk metadata), and an
+unchanged text returns before touching the collection. Text is split by the
+markdown-aware ``chunk_markdown``, whose section-aligned, content-defined
+boundaries keep most chunk hashes stable under local edits.
+
+Queries are embedded once per ``retrieve`` call, whatever the number of scoped
+searches, and query embeddings are kept in a process-wide LRU keyed by model and
+whitespace-normalized text, so repeated questions skip the embedding model.
+"""
+
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from threading import Lock
+from typing import Any, Optional, Sequence
 
 from chromadb import PersistentClient
 from chromadb.config import Settings
 from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
 from zimx.rag import telemetry
-from zimx.rag.index import RetrievedChunk
+from zimx.rag.chunker import MarkdownChunk, chunk_markdown
+from zimx.rag.index import (
+    IndexTextStats,
+    QueryScope,
+    RetrievedChunk,
+    cached_query_embedding,
+    chunk_document,
+    chunk_ids,
+    content_hash,
+    doc_id,
+)
+
+
+_SHARED_EMBEDDING_FUNCTION: Any = None
+_SHARED_EMBEDDING_LOCK = Lock()
+
+
+def shared_embedding_function() -> Any:
+    """The default embedding function, created once per process and shared by every vault's store.
+
+    Its ONNX model is loaded on first use, so the model is loaded once per process.
+    """
+    global _SHARED_EMBEDDING_FUNCTION
+    with _SHARED_EMBEDDING_LOCK:
+        if _SHARED_EMBEDDING_FUNCTION is None:
+            _SHARED_EMBEDDING_FUNCTION = DefaultEmbeddingFunction()
+        return _SHARED_EMBEDDING_FUNCTION
+
+
+@dataclass
+class _IndexPlan:
+    """Collection changes that bring one scope in line with its new text."""
+
+    base_id: str
+    kind: str
+    digest: str
+    stats: IndexTextStats = field(default_factory=IndexTextStats)
+    stale: list[str] = field(default_factory=list)
+    kept_ids: list[str] = field(default_factory=list)
+    kept_meta: list[dict] = field(default_factory=list)
+    new_ids: list[str] = field(default_factory=list)
+    new_docs: list[str] = field(default_factory=list)
+    new_meta: list[dict] = field(default_factory=list)
 
 
 @dataclass
 class ChromaRAG:
     vault_root: str
     collection_name: str = "vault-context"
+    embedding_function: Any = field(default_factory=shared_embedding_function)
 
     def __post_init__(self) -> None:
         base = Path(self.vault_root) / ".zimx" / "chroma"
@@ -35,6 +95,13 @@ class ChromaRAG:
             settings=settings,
         )
         self.collection = self._ensure_collection()
+        # Digest of the text last indexed per scope (base doc id); filled from chunk metadata on first use.
+        self._digests: dict[str, str] = {}
+        self.embed_cpu_total = 0.0
+
+    def embed_query(self, query_text: str) -> list[float]:
+        """Embedding of ``query_text``, served from the shared query LRU when the same text was asked before."""
+        return cached_query_embedding(self.embedding_function, query_text)
 
     def query(
         self,
@@ -43,40 +110,7 @@ class ChromaRAG:
         limit: int = 4,
         kind: Optional[str] = None,
     ) -> list[RetrievedChunk]:
-        if not query_text.strip():
-            return []
-        where: dict | None = None
-        if page_refs and kind:
-            where = {"$and": [{"page_ref": {"$in": page_refs}}, {"kind": kind}]}
-        elif page_refs:
-            where = {"page_ref": {"$in": page_refs}}
-        elif kind:
-            where = {"kind": kind}
-        try:
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=limit,
-                include=["documents", "metadatas", "distances"],
-                where=where,
-            )
-        except Exception as exc:
-            print(f"[Chroma] Query failed: {exc}")
-            return []
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
-        chunks: list[RetrievedChunk] = []
-        for idx, doc in enumerate(documents):
-            metadata = metadatas[idx] if idx < len(metadatas) else {}
-            distance = distances[idx] if idx < len(distances) else None
-            chunk = RetrievedChunk(
-                page_ref=metadata.get("page_ref", ""),
-                content=doc or "",
-                score=distance,
-                attachment_name=metadata.get("attachment_name"),
-            )
-            chunks.append(chunk)
-        return chunks
+        return self.retrieve(query_text, [QueryScope(kind=kind, page_refs=page_refs, limit=limit)])
 
     def query_attachments(
         self,
@@ -85,25 +119,75 @@ class ChromaRAG:
         limit: int = 4,
         kind: Optional[str] = None,
     ) -> list[RetrievedChunk]:
-        if not query_text.strip() or not attachment_names:
+        if not attachment_names:
+            return []
+        return self.retrieve(
+            query_text, [QueryScope(kind=kind, attachment_names=attachment_names, limit=limit)]
+        )
+
+    def retrieve(
+        self,
+        query_text: str,
+        scopes: Sequence[QueryScope],
+        limit: Optional[int] = None,
+        one_per_source: bool = False,
+    ) -> list[RetrievedChunk]:
+        """Run several scoped searches for one query, embedding it once.
+
+        Results keep scope order (each scope sorted by distance), a chunk found by
+        two scopes is returned once, and ``one_per_source`` keeps only the first
+        chunk of each page or attachment. ``limit`` caps the merged list.
+        """
+        if not query_text.strip() or not scopes:
+            return []
+        try:
+            embedding = self.embed_query(query_text)
+        except Exception as exc:
+            print(f"[Chroma] Query embedding failed: {exc}")
             return []
-        where: dict = {"attachment_name": {"$in": attachment_names}}
-        if kind:
-            where = {"$and": [where, {"kind": kind}]}
+        merged: list[RetrievedChunk] = []
+        seen_ids: set[str] = set()
+        seen_sources: set[tuple[str, Optional[str]]] = set()
+        for scope in scopes:
+            for chunk_id, chunk in self._search(embedding, scope):
+                source = (chunk.page_ref, chunk.attachment_name)
+                if chunk_id in seen_ids or (one_per_source and source in seen_sources):
+                    continue
+                seen_ids.add(chunk_id)
+                seen_sources.add(source)
+                merged.append(chunk)
+                if limit is not None and len(merged) >= limit:
+                    return merged
+        return merged
+
+    def _search(self, embedding: list[float], scope: QueryScope) -> list[tuple[str, RetrievedChunk]]:
+        clauses: list[dict] = []
+        if scope.page_refs:
+            clauses.append({"page_ref": {"$in": list(scope.page_refs)}})
+        if scope.attachment_names:
+            clauses.append({"attachment_name": {"$in": list(scope.attachment_names)}})
+        if scope.kind:
+            clauses.append({"kind": scope.kind})
+        where: dict | None = None
+        if len(clauses) == 1:
+            where = clauses[0]
+        elif clauses:
+            where = {"$and": clauses}
         try:
             results = self.collection.query(
-                query_texts=[query_text],
-                n_results=limit,
+                query_embeddings=[embedding],
+                n_results=scope.limit,
                 include=["documents", "metadatas", "distances"],
                 where=where,
             )
         except Exception as exc:
-            print(f"[Chroma] Attachment query failed: {exc}")
+            print(f"[Chroma] Query failed: {exc}")
             return []
+        ids = results.get("ids", [[]])[0]
         documents = results.get("documents", [[]])[0]
         metadatas = results.get("metadatas", [[]])[0]
         distances = results.get("distances", [[]])[0]
-        chunks: list[RetrievedChunk] = []
+        hits: list[tuple[str, RetrievedChunk]] = []
         for idx, doc in enumerate(documents):
             metadata = metadatas[idx] if idx < len(metadatas) else {}
             distance = distances[idx] if idx < len(distances) else None
@@ -112,68 +196,143 @@ class ChromaRAG:
                 content=doc or "",
                 score=distance,
                 attachment_name=metadata.get("attachment_name"),
+                heading_path=metadata.get("heading_path") or None,
             )
-            chunks.append(chunk)
-        return chunks
+            hits.append((ids[idx] if idx < len(ids) else f"#{idx}", chunk))
+        return hits
+
     def _ensure_collection(self):
-        if self.collection_name in [c.name for c in self.client.list_collections()]:
-            return self.client.get_collection(name=self.collection_name)
-        return self.client.create_collection(
+        return self.client.get_or_create_collection(
             name=self.collection_name,
-            embedding_function=DefaultEmbeddingFunction(),
+            embedding_function=self.embedding_function,
         )
 
     def _doc_id(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> str:
-        if kind == "attachment" and attachment:
-            return f"{page_ref}:{attachment}"
-        return f"{page_ref}:{kind}"
+        return doc_id(page_ref, kind, attachment)
 
-    def _chunk_text(self, text: str, max_chars: int = 1200, overlap: int = 200) -> list[str]:
-        cleaned = (text or "").strip()
-        if not cleaned:
-            return []
-        chunks: list[str] = []
-        start = 0
-        length = len(cleaned)
-        while start < length:
-            end = min(start + max_chars, length)
-            chunk = cleaned[start:end]
-            if chunk.strip():
-                chunks.append(chunk)
-            if end >= length:
-                break
-            start = max(0, end - overlap)
-        return chunks
+    def _chunk_text(self, text: str, max_tokens: int = 256) -> list[MarkdownChunk]:
+        return chunk_markdown((text or "").strip(), max_tokens=max_tokens)
 
-    def _delete_scope(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> None:
+    @staticmethod
+    def _chunk_document(chunk: MarkdownChunk) -> str:
+        return chunk_document(chunk)
+
+    def _scope_where(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> dict:
         where = {"$and": [{"page_ref": page_ref}, {"kind": kind}]}
         if attachment:
             where["$and"].append({"attachment_name": attachment})
+        return where
+
+    def _delete_scope(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> None:
+        where = self._scope_where(page_ref, kind, attachment)
+        if attachment:
+            self._digests.pop(self._doc_id(page_ref, kind, attachment), None)
+        else:
+            # The scope covers every attachment/section of the page.
+            prefix = f"{page_ref}:"
+            self._digests = {key: value for key, value in self._digests.items() if not key.startswith(prefix)}
         try:
             self.collection.delete(where=where)
             print(f"[Chroma] Delete request for {page_ref} ({kind})")
         except Exception as exc:
             print(f"[Chroma] Failed to delete {page_ref} ({kind}): {exc}")
 
-    def index_text(self, page_ref: str, text: str, kind: str, attachment: Optional[str] = None) -> None:
-        if not text.strip():
-            print(f"[Chroma] Skipping empty text for {page_ref}")
-            return
-        self._delete_scope(page_ref, kind, attachment)
+    def _chunk_ids(self, base_id: str, documents: list[str]) -> list[tuple[str, str]]:
+        return chunk_ids(base_id, documents)
+
+    def index_text(self, page_ref: str, text: str, kind: str, attachment: Optional[str] = None) -> IndexTextStats:
+        return self.index_texts([(page_ref, text, kind, attachment)])[0]
+
+    def index_texts(self, items: Sequence[tuple[str, str, str, Optional[str]]]) -> list[IndexTextStats]:
+        """Index several (page_ref, text, kind, attachment) scopes, embedding their new chunks in one batch."""
+        plans = [self._plan_index(*item) for item in items]
+        new_docs = [doc for plan in plans for doc in plan.new_docs]
+        embeddings: list = []
+        embed_cpu = 0.0
+        if new_docs:
+            started = time.process_time()
+            embeddings = list(self.embedding_function(new_docs))
+            embed_cpu = time.process_time() - started
+            self.embed_cpu_total += embed_cpu
+        offset = 0
+        for plan in plans:
+            if plan.stats.skipped:
+                continue
+            if plan.stale:
+                self.collection.delete(ids=plan.stale)
+            if plan.kept_ids:
+                # Positions and the page digest may have moved; metadata updates do not re-embed.
+                self.collection.update(ids=plan.kept_ids, metadatas=plan.kept_meta)
+            if plan.new_ids:
+                count = len(plan.new_ids)
+                self.collection.upsert(
+                    ids=plan.new_ids,
+                    embeddings=embeddings[offset : offset + count],
+                    documents=plan.new_docs,
+                    metadatas=plan.new_meta,
+                )
+                offset += count
+                plan.stats.embed_cpu = embed_cpu * count / len(new_docs)
+            self._digests[plan.base_id] = plan.digest
+            stats = plan.stats
+            print(
+                f"[Chroma] Indexed {plan.kind} context {plan.base_id} chunks={stats.chunks} "
+                f"embedded={stats.embedded} kept={stats.kept} removed={stats.removed} "
+                f"embed_cpu={stats.embed_cpu:.3f}s"
+            )
+        return [plan.stats for plan in plans]
+
+    def _plan_index(self, page_ref: str, text: str, kind: str, attachment: Optional[str] = None) -> _IndexPlan:
         base_id = self._doc_id(page_ref, kind, attachment)
-        metadata = {"page_ref": page_ref, "kind": kind}
+        plan = _IndexPlan(base_id=base_id, kind=kind, digest=content_hash(text or ""))
+        stats = plan.stats
+        if not (text or "").strip():
+            print(f"[Chroma] Skipping empty text for {page_ref}")
+            stats.skipped = True
+            return plan
+        if self._digests.get(base_id) == plan.digest:
+            stats.skipped = True
+            return plan
+        existing = self.collection.get(where=self._scope_where(page_ref, kind, attachment), include=["metadatas"])
+        existing_ids = existing.get("ids") or []
+        existing_meta = dict(zip(existing_ids, existing.get("metadatas") or []))
+        if existing_ids and all((meta or {}).get("page_digest") == plan.digest for meta in existing_meta.values()):
+            self._digests[base_id] = plan.digest
+            stats.skipped = True
+            stats.kept = len(existing_ids)
+            return plan
+        metadata = {"page_ref": page_ref, "kind": kind, "page_digest": plan.digest}
         if attachment:
             metadata["attachment_name"] = attachment
         chunks = self._chunk_text(text)
-        if not chunks:
-            return
-        ids = [f"{base_id}:{idx}" for idx in range(len(chunks))]
-        metadatas = [dict(metadata, chunk_index=idx) for idx in range(len(chunks))]
-        self.collection.upsert(ids=ids, documents=chunks, metadatas=metadatas)
-        print(f"[Chroma] Indexed {kind} context {base_id} chunks={len(chunks)}")
+        documents = [self._chunk_document(chunk) for chunk in chunks]
+        chunk_ids = self._chunk_ids(base_id, documents)
+        wanted = {chunk_id for chunk_id, _hash in chunk_ids}
+        plan.stale = [chunk_id for chunk_id in existing_ids if chunk_id not in wanted]
+        for idx, ((chunk_id, chunk_hash), chunk, document) in enumerate(zip(chunk_ids, chunks, documents)):
+            chunk_meta = dict(
+                metadata,
+                chunk_index=idx,
+                content_hash=chunk_hash,
+                heading_path=chunk.heading,
+                line=chunk.line,
+            )
+            if chunk_id in existing_meta:
+                plan.kept_ids.append(chunk_id)
+                plan.kept_meta.append(chunk_meta)
+            else:
+                plan.new_ids.append(chunk_id)
+                plan.new_docs.append(document)
+                plan.new_meta.append(chunk_meta)
+        stats.chunks = len(chunks)
+        stats.embedded = len(plan.new_ids)
+        stats.kept = len(plan.kept_ids)
+        stats.removed = len(plan.stale)
+        return plan
 
     def delete_text(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> None:
         self._delete_scope(page_ref, kind, attachment)
 
     def close(self) -> None:
-        self.client.persist()
+        """Release the client's database handles (the embedding function stays shared)."""
+        self.client.close()
@@ -0,0 +1,219 @@
+"""Markdown-aware chunking for the vector store.
+
+Pages are split into blocks (headings, paragraphs, list/task items with their
+nested lines, and fenced code), and blocks are packed into chunks of at most
+``max_tokens``. A heading always starts a new chunk, so an edit only disturbs
+chunks of its own section.
+Inside a section a chunk also ends after any block whose content hash hits
+``1 / boundary_divisor`` (once the chunk has ``min_tokens``). Boundaries then
+depend on the blocks' content, not their offsets, and inserting a paragraph
+leaves the chunks after the next boundary unchanged. This lets ``ChromaRAG``
+reuse their embeddings.
+
+Token counts are estimated as words plus punctuation marks. That is close
+enough for size limits and needs no tokenizer dependency.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+_HEADING_PATTERN = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_PATTERN = re.compile(r"^\s{0,3}(`{3,}|~{3,})")
+_LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*+]|\d+[.)]|[☐☑])\s")
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+HEADING_SEPARATOR = " > "
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+@dataclass(frozen=True)
+class MarkdownChunk:
+    text: str
+    heading_path: tuple[str, ...] = ()
+    line: int = 0  # first line of the chunk in the source text (0-based)
+
+    @property
+    def heading(self) -> str:
+        return HEADING_SEPARATOR.join(self.heading_path)
+
+
+@dataclass
+class _Block:
+    lines: list[str]
+    line: int
+    heading_path: tuple[str, ...]
+    kind: str = "text"  # "text", "list", "code" or "heading"
+
+    @property
+    def is_heading(self) -> bool:
+        return self.kind == "heading"
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def _blocks(text: str) -> list[_Block]:
+    blocks: list[_Block] = []
+    path: list[tuple[int, str]] = []
+    current: list[str] = []
+    start = 0
+    kind = ""
+    fence = ""
+    item_indent = 0
+
+    def heading_path() -> tuple[str, ...]:
+        return tuple(title for _level, title in path)
+
+    def flush() -> None:
+        nonlocal current, kind
+        if current:
+            blocks.append(_Block(current, start, heading_path(), kind or "text"))
+        current = []
+        kind = ""
+
+    for number, line in enumerate(text.splitlines()):
+        if fence:
+            current.append(line)
+            if line.strip().startswith(fence):
+                fence = ""
+                flush()
+            continue
+        fence_match = _FENCE_PATTERN.match(line)
+        if fence_match:
+            flush()
+            current, start, kind, fence = [line], number, "code", fence_match.group(1)
+            continue
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, heading.group(2)))
+            blocks.append(_Block([line], number, heading_path(), "heading"))
+            continue
+        if not line.strip():
+            flush()
+            continue
+        indent = len(line) - len(line.lstrip())
+        if _LIST_ITEM_PATTERN.match(line):
+            # Each item is its own block; nested items and continuation lines stay with it.
+            if current and not (kind == "list" and indent > item_indent):
+                flush()
+            if not current:
+                item_indent = indent
+            line_kind = "list"
+        elif kind == "list" and indent > item_indent:
+            line_kind = "list"
+        else:
+            line_kind = "text"
+        if current and line_kind != kind:
+            flush()
+        if not current:
+            start = number
+        current.append(line)
+        kind = line_kind
+    flush()
+    return blocks
+
+
+def _split_long_line(line: str, max_tokens: int) -> list[str]:
+    words = line.split(" ")
+    pieces: list[str] = []
+    piece: list[str] = []
+    tokens = 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if piece and tokens + cost > max_tokens:
+            pieces.append(" ".join(piece))
+            piece, tokens = [], 0
+        piece.append(word)
+        tokens += cost
+    if piece:
+        pieces.append(" ".join(piece))
+    return pieces
+
+
+def _split_block(block: _Block, max_tokens: int) -> list[_Block]:
+    """Break a block larger than ``max_tokens`` at line (then word) boundaries."""
+    parts: list[_Block] = []
+    lines: list[str] = []
+    tokens = 0
+    start = block.line
+    for offset, line in enumerate(block.lines):
+        cost = estimate_tokens(line)
+        if cost > max_tokens:
+            if lines:
+                parts.append(_Block(lines, start, block.heading_path, block.kind))
+                lines, tokens = [], 0
+            for piece in _split_long_line(line, max_tokens):
+                parts.append(_Block([piece], block.line + offset, block.heading_path, block.kind))
+            start = block.line + offset + 1
+            continue
+        if lines and tokens + cost > max_tokens:
+            parts.append(_Block(lines, start, block.heading_path, block.kind))
+            lines, tokens = [], 0
+        if not lines:
+            start = block.line + offset
+        lines.append(line)
+        tokens += cost
+    if lines:
+        parts.append(_Block(lines, start, block.heading_path, block.kind))
+    return parts
+
+
+def _is_boundary(block: _Block, divisor: int) -> bool:
+    digest = hashlib.blake2b(block.text.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % divisor == 0
+
+
+def chunk_markdown(
+    text: str,
+    max_tokens: int = 256,
+    min_tokens: int = 48,
+    boundary_divisor: int = 4,
+) -> list[MarkdownChunk]:
+    """Split markdown into section-aligned chunks of at most ``max_tokens`` estimated tokens."""
+    chunks: list[MarkdownChunk] = []
+    pending: list[_Block] = []
+    pending_tokens = 0
+
+    def emit() -> None:
+        nonlocal pending, pending_tokens
+        if pending:
+            parts = [pending[0].text]
+            for previous, block in zip(pending, pending[1:]):
+                # Items of one list stay a list; other blocks keep their paragraph break.
+                parts.append("\n" if previous.kind == block.kind == "list" else "\n\n")
+                parts.append(block.text)
+            body = "".join(parts).strip()
+            if body:
+                chunks.append(MarkdownChunk(body, pending[0].heading_path, pending[0].line))
+        pending, pending_tokens = [], 0
+
+    for block in _blocks(text or ""):
+        if block.is_heading:
+            emit()
+        tokens = estimate_tokens(block.text)
+        parts = _split_block(block, max_tokens) if tokens > max_tokens else [block]
+        for part in parts:
+            cost = estimate_tokens(part.text) if len(parts) > 1 else tokens
+            if pending and pending_tokens + cost > max_tokens:
+                emit()
+            pending.append(part)
+            pending_tokens += cost
+            if (
+                not part.is_heading
+                and pending_tokens >= min_tokens
+                and _is_boundary(part, boundary_divisor)
+            ):
+                emit()
+    emit()
+    return chunks
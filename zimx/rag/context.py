@@ -0,0 +1,200 @@
+"""Token-budgeted assembly of retrieved chunks into a chat context prompt.
+
+``assemble_context`` walks chunks in rank order and packs each one that still
+fits into the token budget. A chunk too large for the space left is cut at a
+word boundary when at least ``MIN_FRAGMENT_TOKENS`` remain; otherwise it is
+dropped and smaller, lower-ranked chunks may still fill the gap. A chunk whose
+text repeats one already packed for the same source is skipped, and
+``max_per_source`` optionally caps the chunks taken from one source. Tokens are
+counted with a pluggable tokenizer: ``estimate`` (the chunker's word/punctuation
+count, no dependency) is built in, ``tiktoken`` is used when installed, and
+``register_tokenizer`` adds others. The result reports the tokens each source
+(page or attachment) contributed.
+
+``PageTextCache`` keeps page text keyed by file mtime and size, so context
+pages are read from disk only after they change.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Optional, Sequence
+
+from zimx.rag.chunker import estimate_tokens
+from zimx.rag.index import RetrievedChunk
+
+Tokenizer = Callable[[str], int]
+
+DEFAULT_TOKENIZER = "estimate"
+CONTEXT_HEADER = "Vault context relevant to the query:"
+MIN_FRAGMENT_TOKENS = 64
+ELLIPSIS = "…"
+
+_TOKENIZERS: Dict[str, Tokenizer] = {DEFAULT_TOKENIZER: estimate_tokens}
+
+
+def _tiktoken_counter() -> Optional[Tokenizer]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def register_tokenizer(name: str, tokenizer: Tokenizer) -> None:
+    """Make ``tokenizer`` (text -> token count) selectable by ``name``."""
+    _TOKENIZERS[name] = tokenizer
+
+
+def get_tokenizer(name: Optional[str] = None) -> Tokenizer:
+    """Tokenizer registered as ``name``; unknown or unavailable ones fall back to ``estimate``."""
+    key = name or DEFAULT_TOKENIZER
+    tokenizer = _TOKENIZERS.get(key)
+    if tokenizer is None and key == "tiktoken":
+        tokenizer = _tiktoken_counter()
+        if tokenizer is not None:
+            _TOKENIZERS[key] = tokenizer
+    if tokenizer is None:
+        print(f"[Context] Tokenizer {key!r} unavailable; using {DEFAULT_TOKENIZER}")
+        return _TOKENIZERS[DEFAULT_TOKENIZER]
+    return tokenizer
+
+
+@dataclass
+class ContextSource:
+    """Tokens one page or attachment contributed to an assembled context."""
+
+    label: str
+    tokens: int = 0
+    chunks: int = 0
+    truncated: int = 0
+    dropped: int = 0
+    duplicates: int = 0
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    tokens: int
+    budget: int
+    sources: list[ContextSource] = field(default_factory=list)
+
+    @property
+    def dropped(self) -> int:
+        return sum(source.dropped for source in self.sources)
+
+    def summary(self) -> str:
+        parts = [f"{source.label}={source.tokens}" for source in self.sources if source.chunks]
+        dropped = f", {self.dropped} chunk(s) over budget" if self.dropped else ""
+        return f"{self.tokens}/{self.budget} tokens{dropped}: " + (", ".join(parts) or "none")
+
+
+def chunk_label(chunk: RetrievedChunk) -> str:
+    if chunk.attachment_name:
+        return f"{chunk.page_ref} ({chunk.attachment_name})"
+    return chunk.page_ref
+
+
+def _fit_words(prefix: str, snippet: str, room: int, tokenizer: Tokenizer) -> Optional[str]:
+    """Longest word prefix of ``snippet`` such that the line costs at most ``room`` tokens."""
+    words = snippet.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if tokenizer(prefix + " ".join(words[:middle]) + ELLIPSIS) <= room:
+            low = middle
+        else:
+            high = middle - 1
+    if not low:
+        return None
+    return prefix + " ".join(words[:low]).rstrip() + ELLIPSIS
+
+
+def assemble_context(
+    chunks: Sequence[RetrievedChunk],
+    budget: int,
+    tokenizer: Optional[Tokenizer] = None,
+    header: str = CONTEXT_HEADER,
+    max_per_source: Optional[int] = None,
+) -> AssembledContext:
+    """Pack ``chunks`` (highest ranked first) into at most ``budget`` tokens, header included."""
+    count = tokenizer or get_tokenizer()
+    lines = [header]
+    used = count(header)
+    sources: "OrderedDict[str, ContextSource]" = OrderedDict()
+    seen: set[tuple[str, str]] = set()
+    for chunk in chunks:
+        label = chunk_label(chunk)
+        source = sources.setdefault(label, ContextSource(label))
+        snippet = re.sub(r"\s+", " ", chunk.content.strip())
+        if not snippet:
+            continue
+        if (label, snippet) in seen:
+            source.duplicates += 1
+            continue
+        if max_per_source is not None and source.chunks >= max_per_source:
+            source.dropped += 1
+            continue
+        seen.add((label, snippet))
+        prefix = f"{label}: "
+        line = prefix + snippet
+        cost = count(line)
+        room = budget - used
+        if cost > room:
+            line = _fit_words(prefix, snippet, room, count) if room >= MIN_FRAGMENT_TOKENS else None
+            if line is None:
+                source.dropped += 1
+                continue
+            source.truncated += 1
+            cost = count(line)
+        lines.append(line)
+        used += cost
+        source.tokens += cost
+        source.chunks += 1
+    if len(lines) == 1:
+        return AssembledContext("", 0, budget, list(sources.values()))
+    return AssembledContext("\n".join(lines), used, budget, list(sources.values()))
+
+
+class PageTextCache:
+    """Text of recently used pages, re-read only when the file's mtime or size changes."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[int, int, str]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, path: Path) -> str:
+        try:
+            stat = path.stat()
+        except OSError:
+            return ""
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            return ""
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,53 @@
+"""Reciprocal-rank fusion of vector and full-text page results.
+
+Vector search ranks chunks; FTS5 bm25 ranks whole pages. A chunk's fused score
+is ``1 / (k + vector rank)`` plus ``1 / (k + lexical rank)`` of its page, so
+chunks of pages that also match the query's words move up. A lexical hit whose
+page has no retrieved chunk containing a query word is added as its own snippet
+chunk, which is how exact terms the embedding model misses still reach the
+context.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Optional, Sequence
+
+from zimx.rag.index import RetrievedChunk
+
+RRF_K = 60
+
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def _query_words(query_text: str) -> set[str]:
+    return {word.lower() for word in _WORD_PATTERN.findall(query_text or "")}
+
+
+def fuse_ranked(
+    query_text: str,
+    vector_chunks: Sequence[RetrievedChunk],
+    lexical_chunks: Sequence[RetrievedChunk],
+    limit: Optional[int] = None,
+    k: int = RRF_K,
+) -> list[RetrievedChunk]:
+    """Merge vector chunks (best first) with per-page lexical snippets (best first) by reciprocal rank."""
+    lexical_rank = {chunk.page_ref: rank for rank, chunk in enumerate(lexical_chunks, 1)}
+    words = _query_words(query_text)
+    covered: set[str] = set()
+    scored: list[tuple[float, int, RetrievedChunk]] = []
+    for rank, chunk in enumerate(vector_chunks, 1):
+        score = 1.0 / (k + rank)
+        page_rank = lexical_rank.get(chunk.page_ref)
+        if page_rank is not None and not chunk.attachment_name:
+            score += 1.0 / (k + page_rank)
+            if any(word in chunk.content.lower() for word in words):
+                covered.add(chunk.page_ref)
+        scored.append((score, len(scored), chunk))
+    for rank, chunk in enumerate(lexical_chunks, 1):
+        if chunk.page_ref in covered:
+            continue
+        scored.append((1.0 / (k + rank), len(scored), chunk))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    fused = [chunk for _score, _order, chunk in scored]
+    return fused[:limit] if limit is not None else fused
@@ -1,6 +1,24 @@
+"""Backend-neutral retrieval types, chunk identity helpers and the ``VaultIndex`` interface.
+
+Nothing here imports ``chromadb`` or ``numpy``; the Chroma store
+(``zimx.rag.chroma``) and the local store (``zimx.rag.local_index``) build on it.
+"""
+
 from __future__ import annotations
 
+import hashlib
+from collections import OrderedDict
 from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Optional, Sequence
+
+from zimx.rag.chunker import MarkdownChunk
+
+_QUERY_EMBEDDING_CACHE_SIZE = 256
+# (embedding model, normalized query text) -> query embedding, shared by every vault's store.
+_QUERY_EMBEDDINGS: "OrderedDict[tuple[str, str], list[float]]" = OrderedDict()
+_QUERY_EMBEDDINGS_LOCK = Lock()
 
 
 @dataclass
@@ -9,27 +27,155 @@ class RetrievedChunk:
     content: str
     score: float | None = None
     attachment_name: str | None = None
+    heading_path: str | None = None  # "Heading > Subheading" of the chunk's section
+
+
+@dataclass
+class IndexTextStats:
+    """What one ``index_text`` call did; ``embed_cpu`` is process CPU seconds spent embedding."""
+
+    chunks: int = 0
+    embedded: int = 0
+    kept: int = 0
+    removed: int = 0
+    skipped: bool = False
+    embed_cpu: float = 0.0
+
+
+@dataclass
+class QueryScope:
+    """One search of a ``retrieve`` call: chunks of ``kind`` within the given pages and/or attachments."""
+
+    kind: Optional[str] = None
+    page_refs: Optional[list[str]] = None
+    attachment_names: Optional[list[str]] = None
+    limit: int = 4
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def normalize_query(text: str) -> str:
+    """Query text as embedded and cached: surrounding and repeated whitespace collapsed."""
+    return " ".join((text or "").split())
+
+
+def embedding_model_key(embedding_function: Any) -> str:
+    cls = type(embedding_function)
+    model = getattr(embedding_function, "model_name", None) or ""
+    return f"{cls.__module__}.{cls.__qualname__}:{model}"
+
+
+def cached_query_embedding(embedding_function: Any, query_text: str) -> list[float]:
+    """Embedding of ``query_text``, served from the shared query LRU when the same text was asked before."""
+    key = (embedding_model_key(embedding_function), normalize_query(query_text))
+    with _QUERY_EMBEDDINGS_LOCK:
+        cached = _QUERY_EMBEDDINGS.get(key)
+        if cached is not None:
+            _QUERY_EMBEDDINGS.move_to_end(key)
+            return cached
+    embed = getattr(embedding_function, "embed_query", embedding_function)
+    embedding = [float(value) for value in embed([key[1]])[0]]
+    with _QUERY_EMBEDDINGS_LOCK:
+        _QUERY_EMBEDDINGS[key] = embedding
+        _QUERY_EMBEDDINGS.move_to_end(key)
+        while len(_QUERY_EMBEDDINGS) > _QUERY_EMBEDDING_CACHE_SIZE:
+            _QUERY_EMBEDDINGS.popitem(last=False)
+    return embedding
+
+
+def doc_id(page_ref: str, kind: str, attachment: Optional[str] = None) -> str:
+    """Base id of one indexed scope; its chunks are stored as ``<base id>:<content hash>``."""
+    if kind == "attachment" and attachment:
+        return f"{page_ref}:{attachment}"
+    if attachment:
+        # Page-kind text split into named sections (e.g. task context per source page).
+        return f"{page_ref}:{kind}:{attachment}"
+    return f"{page_ref}:{kind}"
+
+
+def chunk_document(chunk: MarkdownChunk) -> str:
+    """Chunk text as embedded; chunks continuing a section get its heading path as context."""
+    if chunk.heading_path and not chunk.text.lstrip().startswith("#"):
+        return f"{chunk.heading}\n\n{chunk.text}"
+    return chunk.text
+
+
+def chunk_ids(base_id: str, documents: list[str]) -> list[tuple[str, str]]:
+    """(chunk id, content hash) per chunk; repeated chunks get an occurrence suffix."""
+    seen: dict[str, int] = {}
+    ids = []
+    for document in documents:
+        digest = content_hash(document)
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        suffix = f".{occurrence}" if occurrence else ""
+        ids.append((f"{base_id}:{digest}{suffix}", digest))
+    return ids
 
 
 class VaultIndex:
-    """Placeholder for a vault-level vector index."""
+    """Interface of a vault-level vector index backend.
+
+    Backends implement ``index_texts``, ``delete_text``, ``retrieve`` and
+    ``close``; the page/attachment methods are written in terms of them.
+    ``ChromaRAG`` offers the same store-level operations, and
+    ``VectorIndexManager`` works with either.
+    """
 
     def __init__(self, vault_id: str, base_path: str) -> None:
         self.vault_id = vault_id
         self.base_path = base_path
 
+    def index_texts(self, items: Sequence[tuple[str, str, str, Optional[str]]]) -> list[IndexTextStats]:
+        raise NotImplementedError
+
+    def delete_text(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def retrieve(
+        self,
+        query_text: str,
+        scopes: Sequence[QueryScope],
+        limit: Optional[int] = None,
+        one_per_source: bool = False,
+    ) -> list[RetrievedChunk]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def index_text(self, page_ref: str, text: str, kind: str, attachment: Optional[str] = None) -> IndexTextStats:
+        return self.index_texts([(page_ref, text, kind, attachment)])[0]
+
+    def query_attachments(
+        self,
+        query_text: str,
+        attachment_names: list[str],
+        limit: int = 4,
+        kind: Optional[str] = None,
+    ) -> list[RetrievedChunk]:
+        if not attachment_names:
+            return []
+        return self.retrieve(query_text, [QueryScope(kind=kind, attachment_names=attachment_names, limit=limit)])
+
     def index_page(self, page_ref: str, markdown_text: str) -> None:
-        raise NotImplementedError("Chroma integration not yet implemented")
+        self.index_text(page_ref, markdown_text, kind="page")
 
     def delete_page(self, page_ref: str) -> None:
-        raise NotImplementedError("Chroma integration not yet implemented")
+        self.delete_text(page_ref, kind="page")
 
     def index_attachment(self, page_ref: str, attachment_path: str) -> None:
-        raise NotImplementedError("Chroma integration not yet implemented")
+        from zimx.rag.attachment_text import extract_attachment_text
+
+        path = Path(attachment_path)
+        text = extract_attachment_text(path, Path(self.base_path))
+        self.index_text(page_ref, text, kind="attachment", attachment=path.name)
 
     def delete_attachment(self, page_ref: str, attachment_name: str) -> None:
-        raise NotImplementedError("Chroma integration not yet implemented")
+        self.delete_text(page_ref, kind="attachment", attachment=attachment_name)
 
     def query(self, scope: dict, query_text: str, limit: int = 8) -> list[RetrievedChunk]:
-        raise NotImplementedError("Chroma integration not yet implemented")
-
+        """Search within ``scope`` (``kind``, ``page_refs`` and/or ``attachment_names``)."""
+        return self.retrieve(query_text, [QueryScope(limit=limit, **scope)])
@@ -0,0 +1,519 @@
+"""In-process vector index backend: a memory-mapped float32 matrix plus SQLite metadata.
+
+``LocalVaultIndex`` is an alternative to ``ChromaRAG`` that needs only NumPy and
+the embedding function (``ZIMX_VECTOR_BACKEND=local``). Its files live in
+``<vault>/.zimx/vectors``:
+
+* ``vectors.f32`` holds unit-normalized embeddings, one row per chunk. The file
+  doubles in size as it fills, and rows of deleted chunks are reused.
+* ``lists.i32`` holds the IVF cell of every row (-1 before training).
+* ``index.db`` stores chunk metadata (page, kind, attachment, text, heading)
+  keyed by row. Page, kind and attachment are also kept in memory as integer
+  code arrays, so scope filters are NumPy masks rather than SQL scans.
+* ``centroids.npy`` holds the IVF centroids, once trained.
+
+Indexing is incremental in the same way as in ``ChromaRAG``. Chunks are
+identified by content hash, so re-indexing embeds only new chunks. A query
+scores candidate rows with one matrix product and takes the top k with
+``argpartition``. Small candidate sets are scanned exactly. Large ones,
+filtered or not, are first narrowed to the nearest IVF cells. Only scopes
+naming a few pages look their rows up in SQL. Cells are trained (spherical k-means) once the index holds ``ivf_threshold``
+chunks, and retrained whenever it has doubled since.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import RLock
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from zimx.rag.chunker import chunk_markdown
+from zimx.rag.index import (
+    IndexTextStats,
+    QueryScope,
+    RetrievedChunk,
+    VaultIndex,
+    cached_query_embedding,
+    chunk_document,
+    chunk_ids,
+    content_hash,
+    doc_id,
+    embedding_model_key,
+)
+
+INDEX_DIR = "vectors"
+_MIN_CAPACITY = 1024
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_PER_LIST = 64
+_ASSIGN_BLOCK = 65536
+# Scopes naming at most this many pages fetch their rows through the page_ref index.
+_SQL_PAGE_REFS = 32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks(
+    row INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    base_id TEXT NOT NULL,
+    page_ref TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    attachment_name TEXT,
+    page_digest TEXT NOT NULL,
+    content TEXT NOT NULL,
+    heading_path TEXT,
+    line INTEGER NOT NULL DEFAULT 0,
+    chunk_index INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_base ON chunks(base_id);
+CREATE INDEX IF NOT EXISTS idx_chunks_page ON chunks(page_ref);
+CREATE INDEX IF NOT EXISTS idx_chunks_attachment ON chunks(attachment_name);
+CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@dataclass
+class _LocalPlan:
+    """Rows to drop, metadata to refresh and chunks to embed for one scope."""
+
+    base_id: str
+    digest: str
+    page_ref: str
+    kind: str
+    attachment: Optional[str]
+    stats: IndexTextStats = field(default_factory=IndexTextStats)
+    stale_rows: list[int] = field(default_factory=list)
+    kept: list[tuple] = field(default_factory=list)  # (page_digest, heading_path, line, chunk_index, row)
+    new: list[tuple] = field(default_factory=list)  # (chunk_id, document, heading_path, line, chunk_index)
+
+
+def _code(codes: dict[str, int], value: Optional[str]) -> int:
+    """Integer code of ``value`` in ``codes``, assigning the next one if new; 0 stands for None."""
+    if value is None:
+        return 0
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(codes) + 1
+    return code
+
+
+def _resized(values: np.ndarray, length: int) -> np.ndarray:
+    grown = np.zeros(length, dtype=values.dtype)
+    grown[: len(values)] = values[:length]
+    return grown
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVaultIndex(VaultIndex):
+    def __init__(
+        self,
+        vault_root: str,
+        embedding_function: Any = None,
+        ivf_threshold: int = 50_000,
+        nprobe: Optional[int] = None,
+    ) -> None:
+        super().__init__(vault_id=vault_root, base_path=vault_root)
+        self.directory = Path(vault_root) / ".zimx" / INDEX_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._embedding_function = embedding_function
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.directory / "index.db"), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # Digest of the text last indexed per scope (base doc id); filled from chunk metadata on first use.
+        self._digests: dict[str, str] = {}
+        self.embed_cpu_total = 0.0
+        self.dim = int(self._get_meta("dim") or 0)
+        self._high_water = int(self._get_meta("rows") or 0)
+        self._matrix: Optional[np.memmap] = None
+        self._lists: Optional[np.memmap] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._live = np.zeros(0, dtype=bool)
+        # Per-row codes of page_ref, kind and attachment_name (see ``_code``), for scope masks.
+        self._page_codes: dict[str, int] = {}
+        self._kind_codes: dict[str, int] = {}
+        self._attachment_codes: dict[str, int] = {}
+        self._row_pages = np.zeros(0, dtype=np.int32)
+        self._row_kinds = np.zeros(0, dtype=np.int16)
+        self._row_attachments = np.zeros(0, dtype=np.int32)
+        self._free: list[int] = []
+        if self.dim:
+            self._open_files(self._high_water)
+        self._load_rows()
+
+    # ------------------------------------------------------------- storage
+    @property
+    def embedding_function(self) -> Any:
+        if self._embedding_function is None:
+            from zimx.rag.chroma import shared_embedding_function
+
+            self._embedding_function = shared_embedding_function()
+        return self._embedding_function
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)", (key, value))
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    def _open_files(self, min_rows: int) -> None:
+        vectors = self.directory / "vectors.f32"
+        lists = self.directory / "lists.i32"
+        existing = vectors.stat().st_size // (4 * self.dim) if vectors.exists() else 0
+        assigned = lists.stat().st_size // 4 if lists.exists() else 0
+        capacity = max(existing, _MIN_CAPACITY)
+        while capacity < min_rows:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._lists.flush()
+        for path, width in ((vectors, 4 * self.dim), (lists, 4)):
+            with path.open("ab") as handle:
+                if handle.tell() < capacity * width:
+                    handle.truncate(capacity * width)
+        self._matrix = np.memmap(vectors, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._lists = np.memmap(lists, dtype=np.int32, mode="r+", shape=(capacity,))
+        if assigned < capacity:
+            self._lists[assigned:] = -1
+        live = np.zeros(capacity, dtype=bool)
+        live[: len(self._live)] = self._live[:capacity]
+        self._live = live
+        self._row_pages = _resized(self._row_pages, capacity)
+        self._row_kinds = _resized(self._row_kinds, capacity)
+        self._row_attachments = _resized(self._row_attachments, capacity)
+        centroids = self.directory / "centroids.npy"
+        if self._centroids is None and centroids.exists():
+            self._centroids = np.load(centroids)
+
+    def _load_rows(self) -> None:
+        entries = self._conn.execute("SELECT row, page_ref, kind, attachment_name FROM chunks").fetchall()
+        rows = [row for row, _page, _kind, _attachment in entries]
+        if rows and self._matrix is not None:
+            self._live[np.asarray(rows, dtype=np.int64)] = True
+            self._set_codes(rows, [entry[1:] for entry in entries])
+        used = set(rows)
+        self._free = [row for row in range(self._high_water - 1, -1, -1) if row not in used]
+
+    def _set_codes(self, rows: list[int], entries: Sequence[tuple]) -> None:
+        """Record the codes of ``rows`` from their (page_ref, kind, attachment_name) entries."""
+        index = np.asarray(rows, dtype=np.int64)
+        self._row_pages[index] = [_code(self._page_codes, page_ref) for page_ref, _kind, _attachment in entries]
+        self._row_kinds[index] = [_code(self._kind_codes, kind) for _page_ref, kind, _attachment in entries]
+        self._row_attachments[index] = [
+            _code(self._attachment_codes, attachment) for _page_ref, _kind, attachment in entries
+        ]
+
+    def _ensure_dim(self, dim: int) -> None:
+        if self.dim == dim:
+            return
+        if self.dim:
+            raise ValueError(f"Embedding size {dim} does not match the index ({self.dim}); rebuild the index")
+        self.dim = dim
+        self._set_meta("dim", str(dim))
+        self._set_meta("model", embedding_model_key(self.embedding_function))
+        self._open_files(0)
+
+    # ------------------------------------------------------------ indexing
+    def index_texts(self, items: Sequence[tuple[str, str, str, Optional[str]]]) -> list[IndexTextStats]:
+        """Index several (page_ref, text, kind, attachment) scopes, embedding their new chunks in one batch."""
+        with self._lock:
+            plans = [self._plan(*item) for item in items]
+            new_docs = [entry[1] for plan in plans for entry in plan.new]
+            embeddings = np.zeros((0, self.dim or 1), dtype=np.float32)
+            embed_cpu = 0.0
+            if new_docs:
+                started = time.process_time()
+                embeddings = _normalize_rows(np.asarray(self.embedding_function(new_docs), dtype=np.float32))
+                embed_cpu = time.process_time() - started
+                self.embed_cpu_total += embed_cpu
+                self._ensure_dim(embeddings.shape[1])
+            offset = 0
+            for plan in plans:
+                if plan.stats.skipped:
+                    continue
+                self._apply(plan, embeddings[offset : offset + len(plan.new)])
+                if plan.new:
+                    plan.stats.embed_cpu = embed_cpu * len(plan.new) / len(new_docs)
+                offset += len(plan.new)
+                self._digests[plan.base_id] = plan.digest
+                stats = plan.stats
+                print(
+                    f"[LocalIndex] Indexed {plan.kind} context {plan.base_id} chunks={stats.chunks} "
+                    f"embedded={stats.embedded} kept={stats.kept} removed={stats.removed} "
+                    f"embed_cpu={stats.embed_cpu:.3f}s"
+                )
+            self._set_meta("rows", str(self._high_water))
+            self._conn.commit()
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._lists.flush()
+            self._maybe_train()
+            return [plan.stats for plan in plans]
+
+    def _plan(self, page_ref: str, text: str, kind: str, attachment: Optional[str] = None) -> _LocalPlan:
+        base_id = doc_id(page_ref, kind, attachment)
+        plan = _LocalPlan(base_id, content_hash(text or ""), page_ref, kind, attachment)
+        stats = plan.stats
+        if not (text or "").strip():
+            stats.skipped = True
+            return plan
+        if self._digests.get(base_id) == plan.digest:
+            stats.skipped = True
+            return plan
+        existing = {
+            chunk_id: (row, page_digest)
+            for chunk_id, row, page_digest in self._conn.execute(
+                "SELECT chunk_id, row, page_digest FROM chunks WHERE base_id = ?", (base_id,)
+            )
+        }
+        if existing and all(page_digest == plan.digest for _row, page_digest in existing.values()):
+            self._digests[base_id] = plan.digest
+            stats.skipped = True
+            stats.kept = len(existing)
+            return plan
+        chunks = chunk_markdown((text or "").strip(), max_tokens=256)
+        documents = [chunk_document(chunk) for chunk in chunks]
+        wanted = chunk_ids(base_id, documents)
+        wanted_ids = {chunk_id for chunk_id, _hash in wanted}
+        plan.stale_rows = [row for chunk_id, (row, _digest) in existing.items() if chunk_id not in wanted_ids]
+        for idx, ((chunk_id, _hash), chunk, document) in enumerate(zip(wanted, chunks, documents)):
+            if chunk_id in existing:
+                plan.kept.append((plan.digest, chunk.heading, chunk.line, idx, existing[chunk_id][0]))
+            else:
+                plan.new.append((chunk_id, document, chunk.heading, chunk.line, idx))
+        stats.chunks = len(chunks)
+        stats.embedded = len(plan.new)
+        stats.kept = len(plan.kept)
+        stats.removed = len(plan.stale_rows)
+        return plan
+
+    def _apply(self, plan: _LocalPlan, embeddings: np.ndarray) -> None:
+        self._drop_rows(plan.stale_rows)
+        if plan.kept:
+            # Positions and the page digest may have moved; metadata updates do not re-embed.
+            self._conn.executemany(
+                "UPDATE chunks SET page_digest = ?, heading_path = ?, line = ?, chunk_index = ? WHERE row = ?",
+                plan.kept,
+            )
+        if not plan.new:
+            return
+        rows = self._take_rows(len(plan.new))
+        row_index = np.asarray(rows, dtype=np.int64)
+        self._matrix[row_index] = embeddings
+        self._lists[row_index] = self._nearest_lists(embeddings)
+        self._live[row_index] = True
+        self._set_codes(rows, [(plan.page_ref, plan.kind, plan.attachment)] * len(rows))
+        self._conn.executemany(
+            """
+            INSERT INTO chunks(row, chunk_id, base_id, page_ref, kind, attachment_name, page_digest,
+                               content, heading_path, line, chunk_index)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (row, chunk_id, plan.base_id, plan.page_ref, plan.kind, plan.attachment, plan.digest,
+                 document, heading, line, idx)
+                for row, (chunk_id, document, heading, line, idx) in zip(rows, plan.new)
+            ],
+        )
+
+    def _take_rows(self, count: int) -> list[int]:
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        fresh = list(range(self._high_water, self._high_water + count - len(reused)))
+        self._high_water += len(fresh)
+        if self._high_water > self.capacity:
+            self._open_files(self._high_water)
+        return reused + fresh
+
+    def _drop_rows(self, rows: list[int]) -> None:
+        if not rows:
+            return
+        self._conn.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in rows])
+        self._live[np.asarray(rows, dtype=np.int64)] = False
+        self._free.extend(rows)
+
+    def delete_text(self, page_ref: str, kind: str, attachment: Optional[str] = None) -> None:
+        with self._lock:
+            sql = "SELECT row FROM chunks WHERE page_ref = ? AND kind = ?"
+            params: list = [page_ref, kind]
+            if attachment:
+                sql += " AND attachment_name = ?"
+                params.append(attachment)
+                self._digests.pop(doc_id(page_ref, kind, attachment), None)
+            else:
+                # The scope covers every attachment/section of the page.
+                prefix = f"{page_ref}:"
+                self._digests = {key: value for key, value in self._digests.items() if not key.startswith(prefix)}
+            self._drop_rows([row for (row,) in self._conn.execute(sql, params)])
+            self._conn.commit()
+
+    # ------------------------------------------------------------------ IVF
+    def _nearest_lists(self, embeddings: np.ndarray) -> np.ndarray:
+        if self._centroids is None or not len(embeddings):
+            return np.full(len(embeddings), -1, dtype=np.int32)
+        return np.argmax(embeddings @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _maybe_train(self) -> None:
+        live = int(self._live.sum())
+        trained = int(self._get_meta("ivf_trained_rows") or 0)
+        if live < self.ivf_threshold or (self._centroids is not None and live < 2 * trained):
+            return
+        self.train_ivf()
+
+    def train_ivf(self, seed: int = 0) -> None:
+        """(Re)build the IVF cells with spherical k-means over a sample of the live rows."""
+        with self._lock:
+            rows = np.flatnonzero(self._live)
+            if not len(rows):
+                return
+            nlist = int(min(4096, max(16, math.sqrt(len(rows)))))
+            nlist = min(nlist, len(rows))
+            rng = np.random.default_rng(seed)
+            sample_rows = rng.choice(rows, size=min(len(rows), nlist * _KMEANS_SAMPLE_PER_LIST), replace=False)
+            sample = np.asarray(self._matrix[np.sort(sample_rows)])
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(_KMEANS_ITERATIONS):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, sample)
+                empty = np.flatnonzero(np.bincount(assign, minlength=nlist) == 0)
+                sums[empty] = sample[rng.choice(len(sample), size=len(empty))]
+                centroids = _normalize_rows(sums)
+            self._centroids = centroids.astype(np.float32)
+            np.save(self.directory / "centroids.npy", self._centroids)
+            for start in range(0, len(rows), _ASSIGN_BLOCK):
+                block = rows[start : start + _ASSIGN_BLOCK]
+                self._lists[block] = self._nearest_lists(np.asarray(self._matrix[block]))
+            self._lists.flush()
+            self._set_meta("ivf_trained_rows", str(len(rows)))
+            self._conn.commit()
+            print(f"[LocalIndex] Trained {nlist} IVF lists over {len(rows)} chunks")
+
+    # --------------------------------------------------------------- search
+    def embed_query(self, query_text: str) -> list[float]:
+        return cached_query_embedding(self.embedding_function, query_text)
+
+    def retrieve(
+        self,
+        query_text: str,
+        scopes: Sequence[QueryScope],
+        limit: Optional[int] = None,
+        one_per_source: bool = False,
+    ) -> list[RetrievedChunk]:
+        """Same contract as ``ChromaRAG.retrieve``; scores are cosine distances (lower is closer)."""
+        if not query_text.strip() or not scopes:
+            return []
+        with self._lock:
+            if self._matrix is None or not self._live.any():
+                return []
+            query = _normalize_rows(np.asarray([self.embed_query(query_text)], dtype=np.float32))[0]
+            merged: list[RetrievedChunk] = []
+            seen_rows: set[int] = set()
+            seen_sources: set[tuple[str, Optional[str]]] = set()
+            for scope in scopes:
+                for row, chunk in self._search(query, scope):
+                    source = (chunk.page_ref, chunk.attachment_name)
+                    if row in seen_rows or (one_per_source and source in seen_sources):
+                        continue
+                    seen_rows.add(row)
+                    seen_sources.add(source)
+                    merged.append(chunk)
+                    if limit is not None and len(merged) >= limit:
+                        return merged
+            return merged
+
+    def _scope_rows(self, scope: QueryScope) -> np.ndarray:
+        """Live rows matching the scope's page, attachment and kind filters."""
+        if scope.page_refs and len(scope.page_refs) <= _SQL_PAGE_REFS:
+            rows = np.asarray(
+                [
+                    row
+                    for (row,) in self._conn.execute(
+                        "SELECT row FROM chunks WHERE page_ref IN (SELECT value FROM json_each(?))",
+                        (json.dumps(list(scope.page_refs)),),
+                    )
+                ],
+                dtype=np.int64,
+            )
+        else:
+            rows = np.flatnonzero(self._live[: self._high_water])
+            if scope.page_refs:
+                codes = [self._page_codes[ref] for ref in scope.page_refs if ref in self._page_codes]
+                rows = rows[np.isin(self._row_pages[rows], codes)]
+        if scope.attachment_names:
+            codes = [self._attachment_codes[name] for name in scope.attachment_names if name in self._attachment_codes]
+            rows = rows[np.isin(self._row_attachments[rows], codes)]
+        if scope.kind:
+            rows = rows[self._row_kinds[rows] == self._kind_codes.get(scope.kind, -1)]
+        return rows
+
+    def _candidates(self, query: np.ndarray, scope: QueryScope) -> np.ndarray:
+        rows = self._scope_rows(scope)
+        if self._centroids is None or len(rows) < self.ivf_threshold:
+            return rows
+        nprobe = self.nprobe or max(8, len(self._centroids) // 16)
+        cells = np.argpartition(-(self._centroids @ query), min(nprobe, len(self._centroids)) - 1)[:nprobe]
+        probed = rows[np.isin(self._lists[rows], cells)]
+        # A narrow filter can leave the probed cells short of hits; score the whole filtered set then.
+        return probed if len(probed) >= scope.limit else rows
+
+    def _search(self, query: np.ndarray, scope: QueryScope) -> list[tuple[int, RetrievedChunk]]:
+        rows = self._candidates(query, scope)
+        if not len(rows) or scope.limit <= 0:
+            return []
+        if len(rows) * 4 > self._high_water:
+            # Scoring the contiguous prefix beats gathering most of its rows one by one.
+            similarities = (self._matrix[: self._high_water] @ query)[rows]
+        else:
+            similarities = np.asarray(self._matrix[rows]) @ query
+        k = min(scope.limit, len(rows))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        picked = [int(row) for row in rows[top]]
+        metadata = {
+            row: (page_ref, content, attachment, heading)
+            for row, page_ref, content, attachment, heading in self._conn.execute(
+                "SELECT row, page_ref, content, attachment_name, heading_path FROM chunks "
+                "WHERE row IN (SELECT value FROM json_each(?))",
+                (json.dumps(picked),),
+            )
+        }
+        hits: list[tuple[int, RetrievedChunk]] = []
+        for row, similarity in zip(picked, similarities[top]):
+            if row not in metadata:
+                continue
+            page_ref, content, attachment, heading = metadata[row]
+            chunk = RetrievedChunk(
+                page_ref=page_ref,
+                content=content,
+                score=float(1.0 - similarity),
+                attachment_name=attachment,
+                heading_path=heading or None,
+            )
+            hits.append((row, chunk))
+        return hits
+
+    def close(self) -> None:
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._lists.flush()
+            self._matrix = None
+            self._lists = None
+            self._conn.close()
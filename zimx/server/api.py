@@ -19,15 +19,18 @@ except ImportError:
 # --- end fix ---
 
 import copy
+from contextlib import asynccontextmanager
 import re
+from dataclasses import asdict
 from datetime import date as Date
 from datetime import datetime, timedelta
 import os
 import shutil
+import time
 import traceback
 from pathlib import Path
 import secrets
-from typing import List, Literal, Optional
+from typing import Any, List, Literal, Mapping, Optional
 from urllib.parse import quote, unquote, urlparse
 
 import httpx
@@ -49,8 +52,11 @@ from zimx.server import search_index
 from zimx.server.adapters import files
 from zimx.server.adapters.files import FileAccessError
 from zimx.server.state import vault_state
+from zimx.server.attachment_index import attachment_indexers
+from zimx.server.embedding import embedding_services, iter_page_refs
 from zimx.server.vector import vector_manager
-from zimx.rag.index import RetrievedChunk
+from zimx.rag.hybrid import fuse_ranked
+from zimx.rag.index import QueryScope, RetrievedChunk
 from zimx.app import config
 
 _ANSI_BLUE = "\033[94m"
@@ -65,7 +71,7 @@ _LOCAL_FILE_OPS_ENABLED = os.getenv("ATTACHMENTS_LOCAL_FILE_OPS", "0") not in (
 )
 
 _LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
-_TASKS_CACHE: dict[tuple[str, tuple[str, ...], Optional[str]], list[dict]] = {}
+_TASKS_CACHE: dict[tuple[str, tuple[str, ...], Optional[str], Optional[str], bool], list[Mapping[str, Any]]] = {}
 _TASK_CACHE_VERSION: int = -1
 
 _TREE_CACHE: dict[tuple[str, str, bool, bool], dict[str, object]] = {}
@@ -392,13 +398,19 @@ def _normalize_status(status: Optional[str]) -> Optional[str]:
     raise HTTPException(status_code=400, detail="Status must be one of: todo, done, all")
 
 
-def _fetch_tasks(query: str, tags: tuple[str, ...], status: Optional[str]) -> list[dict]:
+def _fetch_tasks(
+    query: str,
+    tags: tuple[str, ...],
+    status: Optional[str],
+    path_prefix: Optional[str] = None,
+    exclude_journal: bool = False,
+) -> list[Mapping[str, Any]]:
     global _TASK_CACHE_VERSION
     current_version = config.get_task_index_version()
     if _TASK_CACHE_VERSION != current_version:
         _clear_task_cache()
         _TASK_CACHE_VERSION = current_version
-    cache_key = (query, tags, status)
+    cache_key = (query, tags, status, path_prefix, exclude_journal)
     if cache_key in _TASKS_CACHE:
         return _TASKS_CACHE[cache_key]
     include_done = status != "todo"
@@ -407,6 +419,8 @@ def _fetch_tasks(query: str, tags: tuple[str, ...], status: Optional[str]) -> li
         tags=tags,
         include_done=include_done,
         include_ancestors=False,
+        path_prefix=path_prefix,
+        exclude_journal=exclude_journal,
     )
     if status == "done":
         tasks_from_db = [task for task in tasks_from_db if (task.get("status") or "").lower() == "done"]
@@ -416,7 +430,7 @@ def _fetch_tasks(query: str, tags: tuple[str, ...], status: Optional[str]) -> li
     return tasks_from_db
 
 
-def _serialize_task(task: dict) -> dict:
+def _serialize_task(task: Mapping[str, Any]) -> dict:
     status = (task.get("status") or "todo").lower()
     done = status == "done"
     return {
@@ -433,6 +447,9 @@ def _serialize_task(task: dict) -> dict:
         "level": task.get("level") or 0,
         "tags": task.get("tags") or [],
         "actionable": task.get("actionable", not done),
+        # Full-text query hits only: bm25 rank (lower is better) and matched (start, end) spans of "text".
+        "rank": task.get("rank"),
+        "highlights": [list(span) for span in task.get("highlights") or ()],
     }
 
 
@@ -511,6 +528,11 @@ class VectorRemovePayload(BaseModel):
     attachment_name: Optional[str] = None
 
 
+class VectorEmbedPayload(BaseModel):
+    path: str = Field("/", description="Page or folder to embed; the whole vault by default")
+    cpu_share: Optional[float] = Field(None, gt=0, le=1)
+
+
 class VectorQueryPayload(BaseModel):
     query_text: str
     kind: Literal["page", "attachment"] = "page"
@@ -519,13 +541,35 @@ class VectorQueryPayload(BaseModel):
     limit: int = 4
 
 
+class VectorScopePayload(BaseModel):
+    kind: Literal["page", "attachment"] = "page"
+    page_refs: Optional[List[str]] = None
+    attachment_names: Optional[List[str]] = None
+    limit: int = 4
+
+
+class VectorRetrievePayload(BaseModel):
+    query_text: str
+    scopes: List[VectorScopePayload]
+    limit: Optional[int] = Field(None, description="Cap on the merged result list")
+    one_per_source: bool = Field(False, description="Keep only the best chunk per page or attachment")
+
+
 class ChatPayload(BaseModel):
     messages: List[dict]
     max_tokens: Optional[int] = None
     temperature: Optional[float] = 0.2
 
 
-app = FastAPI(title="ZimX Local API", version="0.1.0")
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    yield
+    # Let background workers finish their batch and close their queues before the process exits.
+    embedding_services.stop_all()
+    attachment_indexers.stop_all()
+
+
+app = FastAPI(title="ZimX Local API", version="0.1.0", lifespan=_lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -754,6 +798,10 @@ def select_vault(payload: VaultSelectPayload) -> dict:
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to initialize vault: {exc}") from exc
     _clear_task_cache()
+    # Workers of the previous vault stop; the selected vault's embedder resumes its queue.
+    embedding_services.stop_all()
+    embedding_services.resume(root)
+    attachment_indexers.resume(root)
     return {"root": str(root)}
 
 
@@ -792,9 +840,10 @@ def vault_stats() -> dict:
 
 
 @app.post("/api/file/read")
-def file_read(payload: FilePathPayload) -> dict:
+def file_read(payload: FilePathPayload, response: Response) -> dict:
     root = vault_state.get_root()
     file_path = root / payload.path.lstrip("/")
+    t0 = time.perf_counter()
     try:
         content = files.read_file(root, payload.path)
     except FileNotFoundError as exc:
@@ -806,6 +855,7 @@ def file_read(payload: FilePathPayload) -> dict:
         mtime_ns = file_path.stat().st_mtime_ns
     except OSError:
         mtime_ns = None
+    t1 = time.perf_counter()
     rev = None
     db_path = config._vault_db_path()
     if db_path:
@@ -816,6 +866,11 @@ def file_read(payload: FilePathPayload) -> dict:
             rev = row[0] if row else 0
         finally:
             conn.close()
+    t2 = time.perf_counter()
+    # Lets the desktop page-load tracer attribute time spent inside the server.
+    response.headers["Server-Timing"] = (
+        f"file-read;dur={(t1 - t0) * 1000.0:.2f}, rev-lookup;dur={(t2 - t1) * 1000.0:.2f}"
+    )
     return {"content": content, "rev": rev, "mtime_ns": mtime_ns}
 
 
@@ -992,6 +1047,7 @@ def file_write(
     
     try:
         files.write_file(root, payload.path, payload.content)
+        embedding_services.notify_changed(root, [payload.path])
         try:
             mtime_ns = file_path.stat().st_mtime_ns
         except OSError:
@@ -1049,12 +1105,21 @@ def api_tasks(
     query: Optional[str] = None,
     tags: Optional[List[str]] = Query(None),
     status: Optional[str] = None,
+    path: Optional[str] = None,
+    exclude_journal: bool = False,
+    sort: Optional[str] = None,
 ) -> dict:
     _get_vault_root()
     normalized_query = (query or "").strip()
     normalized_tags = _normalize_tags(tags)
     normalized_status = _normalize_status(status)
-    task_rows = _fetch_tasks(normalized_query, normalized_tags, normalized_status)
+    path_prefix = (path or "").strip() or None
+    if sort not in (None, "", "path", "rank"):
+        raise HTTPException(status_code=400, detail="Sort must be one of: path, rank")
+    task_rows = _fetch_tasks(normalized_query, normalized_tags, normalized_status, path_prefix, exclude_journal)
+    if sort == "rank" and normalized_query:
+        # Best full-text matches first; stable, so ties keep page order.
+        task_rows = sorted(task_rows, key=lambda task: task.get("rank", float("inf")))
     return {"items": [_serialize_task(task) for task in task_rows]}
 
 
@@ -1062,32 +1127,62 @@ def api_tasks(
 def api_search(
     q: Optional[str] = None,
     subtree: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    kind: Literal["page", "attachment", "all"] = "page",
 ) -> dict:
-    """Full-text search across all pages using FTS5."""
+    """Full-text search across pages and/or extracted attachment text using FTS5.
+
+    Results carry ``kind``; attachment results also name the ``attachment``, and
+    their ``path`` is the page it belongs to. ``facets`` counts results per kind.
+    """
     subtree_str = f" subtree={subtree}" if subtree else ""
-    print(f"{_ANSI_BLUE}[API] GET /api/search q={q}{subtree_str} limit={limit}{_ANSI_RESET}")
+    print(f"{_ANSI_BLUE}[API] GET /api/search q={q}{subtree_str} kind={kind} limit={limit}{_ANSI_RESET}")
     
     if not q or not q.strip():
-        return {"results": []}
+        return {"results": [], "facets": {}}
     
     db_path = config._vault_db_path()
     if not db_path:
-        return {"results": []}
+        return {"results": [], "facets": {}}
     
     try:
         import sqlite3
         conn = sqlite3.connect(db_path, check_same_thread=False)
-        results = search_index.search_pages(conn, q, subtree, limit)
+        results: list[dict] = []
+        facets: dict[str, int] = {}
+        if kind in ("page", "all"):
+            pages = [dict(item, kind="page") for item in search_index.search_pages(conn, q, subtree, limit)]
+            facets["page"] = len(pages)
+            results.extend(pages)
+        if kind in ("attachment", "all"):
+            attachments = [
+                dict(item, kind="attachment", line=0, pos=-1)
+                for item in search_index.search_attachments(conn, q, subtree, limit)
+            ]
+            facets["attachment"] = len(attachments)
+            results.extend(attachments)
+        if kind == "all":
+            # Interleave by bm25 (lower is better); the two tables' scores are close enough to compare.
+            results.sort(key=lambda item: item.get("rank") or 0)
+            results = results[:limit]
         preview = [item.get("path") for item in results[:5]]
         print(
-            f"{_ANSI_BLUE}[API] /api/search q={q} results={len(results)} sample={preview}{_ANSI_RESET}"
+            f"{_ANSI_BLUE}[API] /api/search q={q} results={len(results)} facets={facets} sample={preview}{_ANSI_RESET}"
         )
         conn.close()
-        return {"results": results}
+        return {"results": results, "facets": facets}
     except Exception as e:
         print(f"[API] Search error: {e}")
-        return {"results": []}
+        return {"results": [], "facets": {}}
+
+
+@app.get("/api/search/attachments/status")
+def api_search_attachment_status() -> dict:
+    root = _get_vault_root()
+    return attachment_indexers.get(root).status()
+
+
+config.add_attachment_listener(attachment_indexers.on_attachment_changed)
 
 
 # ===== Web Sync API Endpoints =====
@@ -1183,29 +1278,33 @@ def get_recent_pages(
 
 
 @app.get("/tags")
-def get_all_tags(user: AuthModels.UserInfo = Depends(get_current_user)) -> dict:
-    """Get all tags with page counts."""
+def get_all_tags(
+    selected: Optional[List[str]] = Query(None),
+    mode: str = "and",
+    related_limit: int = 10,
+    user: AuthModels.UserInfo = Depends(get_current_user),
+) -> dict:
+    """Get all tags with page counts.
+
+    With ``selected`` tags, also return the pages carrying all of them (or any
+    of them with ``mode=or``) and the related tags found on those pages.
+    """
     db_path = config._vault_db_path()
     if not db_path:
         raise HTTPException(status_code=400, detail="No vault selected")
-    
-    import sqlite3
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    try:
-        rows = conn.execute(
-            """
-            SELECT tag, COUNT(DISTINCT page) as count
-            FROM page_tags
-            WHERE page IN (SELECT path FROM pages WHERE deleted = 0)
-            GROUP BY tag
-            ORDER BY tag
-            """
-        ).fetchall()
-        
-        tags = [{"tag": row[0], "count": row[1]} for row in rows]
-        return {"tags": tags}
-    finally:
-        conn.close()
+    if mode not in ("and", "or"):
+        raise HTTPException(status_code=400, detail="mode must be 'and' or 'or'")
+
+    tags = [{"tag": tag, "count": count} for tag, count in config.fetch_tag_summary()]
+    result: dict = {"tags": tags}
+    if selected:
+        all_of, any_of = (selected, []) if mode == "and" else ([], selected)
+        result["pages"] = config.query_tagged_pages(all_of, any_of)
+        result["related"] = [
+            {"tag": tag, "count": count}
+            for tag, count in config.fetch_related_tags(all_of, any_of, max(0, related_limit))
+        ]
+    return result
 
 
 @app.get("/pages/{page_id}/links")
@@ -1364,6 +1463,7 @@ def file_rename(payload: RenameMovePayload) -> dict:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except FileAccessError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _notify_moved_pages(root, result)
     return {"ok": True, **result}
 
 
@@ -1383,6 +1483,7 @@ def file_move(payload: RenameMovePayload) -> dict:
     except FileAccessError as exc:
         print(f"{_ANSI_BLUE}[API] /api/file/move error: {exc}{_ANSI_RESET}")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _notify_moved_pages(root, result)
     return {"ok": True, **result}
 
 
@@ -1392,15 +1493,23 @@ def file_delete(payload: FileDeletePayload) -> dict:
     ok, reason = file_ops.preflight(root, "delete", payload.path)
     if not ok:
         raise HTTPException(status_code=400, detail=reason or "Preflight failed")
+    deleted_pages = list(iter_page_refs(root, payload.path))
     try:
         result = file_ops.delete_folder(root, payload.path)
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     except FileAccessError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # Queued pages that no longer exist have their vectors dropped.
+    embedding_services.notify_changed(root, deleted_pages)
     return {"ok": True, **result}
 
 
+def _notify_moved_pages(root: Path, result: dict) -> None:
+    page_map = result.get("page_map") or {}
+    embedding_services.notify_changed(root, [*page_map.keys(), *page_map.values()])
+
+
 @app.post("/api/tree/reorder")
 def tree_reorder(payload: ReorderPayload) -> dict:
     """Reorder pages within a parent folder without moving files."""
@@ -1475,11 +1584,14 @@ def vector_add(payload: VectorAddPayload) -> dict:
     if not payload.text.strip():
         raise HTTPException(status_code=400, detail="Text must not be empty")
     try:
-        vector_manager.index_text(root, payload.page_ref, payload.text, payload.kind, payload.attachment_name)
-        _log_vector(f"Added vector entry for {payload.page_ref} ({payload.kind})")
+        stats = vector_manager.index_text(root, payload.page_ref, payload.text, payload.kind, payload.attachment_name)
+        _log_vector(
+            f"Added vector entry for {payload.page_ref} ({payload.kind}) "
+            f"embedded={stats.embedded} kept={stats.kept} removed={stats.removed} embed_cpu={stats.embed_cpu:.3f}s"
+        )
     except Exception as exc:
         _handle_vector_exception("indexing vector data", exc)
-    return {"ok": True}
+    return {"ok": True, **asdict(stats)}
 
 
 @app.post("/vector/remove")
@@ -1499,9 +1611,28 @@ def _chunk_to_dict(chunk: RetrievedChunk) -> dict:
         "content": chunk.content,
         "score": chunk.score,
         "attachment_name": chunk.attachment_name,
+        "heading_path": chunk.heading_path,
     }
 
 
+@app.post("/vector/embed")
+def vector_embed(payload: VectorEmbedPayload) -> dict:
+    """Queue every page under ``path`` for background embedding; later saves are followed automatically."""
+    root = _get_vault_root()
+    service = embedding_services.get(root)
+    if payload.cpu_share is not None:
+        service.set_cpu_share(payload.cpu_share)
+    queued = service.embed_tree(_vault_relative_path(payload.path))
+    _log_vector(f"Queued {queued} page(s) under {payload.path} for background embedding")
+    return {"queued": queued, **service.status()}
+
+
+@app.get("/vector/embed/status")
+def vector_embed_status() -> dict:
+    root = _get_vault_root()
+    return embedding_services.get(root).status()
+
+
 @app.post("/vector/query")
 def vector_query(payload: VectorQueryPayload) -> dict:
     root = _get_vault_root()
@@ -1534,48 +1665,94 @@ def vector_query(payload: VectorQueryPayload) -> dict:
     except Exception as exc:
         _handle_vector_exception("querying vector data", exc)
     if payload.kind != "attachment":
-        chunks = _apply_exact_match_fallback(root, payload, chunks)
+        chunks = _hybrid_page_chunks(payload.query_text, payload.page_refs or [], chunks, limit=payload.limit)
     return {"chunks": [_chunk_to_dict(chunk) for chunk in chunks]}
 
 
-def _apply_exact_match_fallback(
-    root: Path,
-    payload: VectorQueryPayload,
-    chunks: list[RetrievedChunk],
-) -> list[RetrievedChunk]:
-    query = (payload.query_text or "").strip()
-    if not query or " " in query:
-        return chunks
-    lowered = query.lower()
-    if any(lowered in (chunk.content or "").lower() for chunk in chunks):
-        return chunks
-    if not payload.page_refs:
-        return chunks
-    matches: list[RetrievedChunk] = []
-    for page_ref in payload.page_refs:
-        try:
-            content = files.read_file(root, page_ref)
-        except Exception:
-            continue
-        lines = []
-        for line in content.splitlines():
-            if lowered in line.lower():
-                lines.append(line.strip())
-        if not lines:
-            continue
-        snippet = "\n".join(lines[:6])
-        matches.append(
-            RetrievedChunk(
-                page_ref=page_ref,
-                content=snippet,
-                score=0.0,
-                attachment_name=None,
+@app.post("/vector/retrieve")
+def vector_retrieve(payload: VectorRetrievePayload) -> dict:
+    """Run page- and attachment-scoped searches for one query, embedding it once, and merge the results.
+
+    Chunks keep scope order and are deduplicated server-side. Page chunks follow
+    attachment chunks and are fused with FTS5 results over the scopes' pages.
+    """
+    root = _get_vault_root()
+    scopes: list[QueryScope] = []
+    page_refs: list[str] = []
+    for scope in payload.scopes:
+        if scope.kind == "attachment" and not scope.attachment_names:
+            raise HTTPException(status_code=400, detail="Attachment names required for attachment scope")
+        scopes.append(
+            QueryScope(
+                kind=scope.kind,
+                page_refs=scope.page_refs,
+                attachment_names=scope.attachment_names if scope.kind == "attachment" else None,
+                limit=scope.limit,
             )
         )
-    if matches:
-        _log_vector(f"Exact-match fallback added {len(matches)} chunk(s) for {query!r}")
-        return matches + chunks
-    return chunks
+        if scope.kind == "page":
+            page_refs.extend(ref for ref in scope.page_refs or [] if ref not in page_refs)
+    try:
+        chunks = vector_manager.retrieve(
+            root,
+            payload.query_text,
+            scopes,
+            one_per_source=payload.one_per_source,
+        )
+        _log_vector(
+            f"Retrieved {len(chunks)} chunk(s) from {len(scopes)} scope(s) "
+            f"limit={payload.limit or 'none'} one_per_source={payload.one_per_source}"
+        )
+    except Exception as exc:
+        _handle_vector_exception("retrieving vector data", exc)
+    attachment_chunks = [chunk for chunk in chunks if chunk.attachment_name]
+    page_chunks = _hybrid_page_chunks(
+        payload.query_text, page_refs, [chunk for chunk in chunks if not chunk.attachment_name]
+    )
+    chunks = attachment_chunks + page_chunks
+    if payload.one_per_source:
+        # Fusion can put a page's full-text snippet next to its vector chunk; keep the better-ranked one.
+        unique: list[RetrievedChunk] = []
+        seen: set[tuple[str, Optional[str]]] = set()
+        for chunk in chunks:
+            source = (chunk.page_ref, chunk.attachment_name)
+            if source not in seen:
+                seen.add(source)
+                unique.append(chunk)
+        chunks = unique
+    if payload.limit is not None:
+        chunks = chunks[: payload.limit]
+    return {"chunks": [_chunk_to_dict(chunk) for chunk in chunks]}
+
+
+def _lexical_page_chunks(query_text: str, page_refs: list[str], limit: int) -> list[RetrievedChunk]:
+    """bm25-ranked FTS5 snippets of ``page_refs`` for ``query_text``, from the search index only."""
+    db_path = config._vault_db_path()
+    if not db_path or not page_refs:
+        return []
+    import sqlite3
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        hits = search_index.search_page_snippets(conn, query_text, page_refs, limit=limit)
+    finally:
+        conn.close()
+    return [RetrievedChunk(page_ref=hit["path"], content=hit["snippet"]) for hit in hits]
+
+
+def _hybrid_page_chunks(
+    query_text: str,
+    page_refs: list[str],
+    chunks: list[RetrievedChunk],
+    limit: Optional[int] = None,
+) -> list[RetrievedChunk]:
+    """Fuse vector page chunks with FTS5 results over the same pages (reciprocal-rank fusion)."""
+    lexical = _lexical_page_chunks(query_text, page_refs, limit=max(limit or 0, len(chunks), 4))
+    if not lexical:
+        return chunks[:limit] if limit is not None else chunks
+    fused = fuse_ranked(query_text, chunks, lexical, limit=limit)
+    _log_vector(f"Hybrid retrieval fused {len(chunks)} vector and {len(lexical)} full-text result(s)")
+    return fused
 
 
 def _sort_tree_nodes(nodes: list[dict], order_map: dict[str, int]) -> None:
@@ -1949,6 +2126,9 @@ def get_app() -> FastAPI:
 
 
 if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()
     import uvicorn
     import argparse
     
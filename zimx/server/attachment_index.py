@@ -0,0 +1,229 @@
+"""Background full-text indexing of attachment text.
+
+Attachments listed in the vault's ``attachments`` table get their extracted
+text (from the content-addressed ``AttachmentTextService`` cache) stored in
+the ``attachments_search_fts`` table, which ``/api/search`` queries with
+``kind=attachment``. Each attachment's ``attachments_search_state`` row
+remembers the cache key of the text it holds and the file's mtime and size, so
+an unchanged attachment is never extracted or rewritten twice, and reconcile
+only hashes files whose mtime or size changed.
+
+A worker thread per vault drains an in-memory queue fed by the
+``upsert_attachment_entry`` listener. The index itself is the durable state:
+when a vault is selected, ``reconcile`` queues attachments without an indexed
+row (or with a stale one) and drops rows of attachments that are gone.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import stat
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from zimx.rag.attachment_text import AttachmentTextService, attachment_text_service
+from zimx.server import search_index
+
+# Attachment types with extractable text; anything else (archives, audio, ...) is not indexed.
+SEARCHABLE_SUFFIXES = frozenset(
+    {".pdf", ".docx", ".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".txt", ".md", ".csv", ".json", ".log", ".xml", ".html"}
+)
+_IDLE_WAIT = 5.0
+
+
+class AttachmentSearchIndexer:
+    """Worker thread that keeps one vault's attachment full-text index current."""
+
+    def __init__(self, root: Path, text_service: Optional[AttachmentTextService] = None) -> None:
+        self.root = root
+        self.db_path = root / ".zimx" / "settings.db"
+        self._text = text_service or attachment_text_service(root)
+        self._queue: deque[str] = deque()
+        self._queued: set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+        self._reconcile_requested = False
+        self.indexed = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), check_same_thread=False)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zimx-attachment-index", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, attachment_paths: Iterable[str]) -> int:
+        count = 0
+        with self._lock:
+            for path in attachment_paths:
+                if path not in self._queued:
+                    self._queued.add(path)
+                    self._queue.append(path)
+                    count += 1
+        if count:
+            self.start()
+            self._wake.set()
+        return count
+
+    def request_reconcile(self) -> None:
+        """Run ``reconcile`` on the worker thread, which hashes every attachment."""
+        self._reconcile_requested = True
+        self.start()
+        self._wake.set()
+
+    def reconcile(self) -> int:
+        """Queue attachments whose indexed text is missing or stale."""
+        return self.enqueue(self.stale_attachments())
+
+    def stale_attachments(self) -> list[str]:
+        """Attachments not indexed or changed on disk since; rows of removed attachments are dropped."""
+        conn = self._connect()
+        try:
+            listed = [row[0] for row in conn.execute("SELECT attachment_path FROM attachments").fetchall()]
+            indexed = search_index.indexed_attachments(conn)
+            for path in set(indexed) - set(listed):
+                search_index.delete_attachment_text(conn, path)
+                self.removed += 1
+        except sqlite3.Error as exc:
+            print(f"[AttachmentIndex] Could not read the attachment index: {exc}")
+            return []
+        finally:
+            conn.close()
+        stale = []
+        for path in listed:
+            file_path = self.root / path.lstrip("/")
+            if file_path.suffix.lower() not in SEARCHABLE_SUFFIXES:
+                continue
+            try:
+                info = file_path.stat()
+            except OSError:
+                continue
+            if not stat.S_ISREG(info.st_mode):
+                continue
+            entry = indexed.get(path)
+            # Unchanged mtime and size: trust the indexed text without hashing the file.
+            if entry is None or (entry.mtime_ns, entry.size) != (info.st_mtime_ns, info.st_size):
+                stale.append(path)
+        return stale
+
+    def status(self) -> dict:
+        with self._lock:
+            pending = len(self._queue)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "busy": self._busy,
+            "pending": pending,
+            "reconciling": self._reconcile_requested,
+            "indexed": self.indexed,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    # ---------------------------------------------------------------- worker
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._reconcile_requested:
+                self._reconcile_requested = False
+                self.reconcile()
+            with self._lock:
+                path = self._queue.popleft() if self._queue else None
+                if path is not None:
+                    self._queued.discard(path)
+            if path is None:
+                self._wake.wait(_IDLE_WAIT)
+                self._wake.clear()
+                continue
+            self._busy = True
+            try:
+                self.process(path)
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                print(f"[AttachmentIndex] Indexing {path} failed: {exc}")
+            finally:
+                self._busy = False
+
+    def process(self, attachment_path: str) -> None:
+        """Bring the indexed text of one attachment in line with its file (or remove it)."""
+        file_path = self.root / attachment_path.lstrip("/")
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT page_path FROM attachments WHERE attachment_path = ?", (attachment_path,)
+            ).fetchone()
+            if row is None or not file_path.is_file() or file_path.suffix.lower() not in SEARCHABLE_SUFFIXES:
+                search_index.delete_attachment_text(conn, attachment_path)
+                self.removed += 1
+                return
+            info = file_path.stat()
+            key = self._text.cache_key(file_path)
+            entry = search_index.indexed_attachment(conn, attachment_path)
+            if entry is not None and entry.text_key == key:
+                if (entry.mtime_ns, entry.size) != (info.st_mtime_ns, info.st_size):
+                    search_index.touch_attachment_text(conn, attachment_path, info.st_mtime_ns, info.st_size)
+                self.unchanged += 1
+                return
+            text = self._text.extract(file_path)
+            search_index.upsert_attachment_text(
+                conn, attachment_path, str(row[0]), key, text, info.st_mtime_ns, info.st_size
+            )
+            self.indexed += 1
+            print(f"[AttachmentIndex] Indexed {attachment_path} ({len(text)} chars)")
+        finally:
+            conn.close()
+
+
+class AttachmentIndexManager:
+    """One ``AttachmentSearchIndexer`` per vault root, created on first use."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._indexers: Dict[str, AttachmentSearchIndexer] = {}
+
+    def get(self, root: Path) -> AttachmentSearchIndexer:
+        key = str(Path(root).resolve())
+        with self._lock:
+            indexer = self._indexers.get(key)
+            if indexer is None:
+                indexer = AttachmentSearchIndexer(Path(key))
+                self._indexers[key] = indexer
+            return indexer
+
+    def on_attachment_changed(self, root: str, attachment_path: str, removed: bool) -> None:
+        """``config`` attachment listener; deletions already dropped their row, uploads are queued."""
+        if not removed:
+            self.get(Path(root)).enqueue([attachment_path])
+
+    def resume(self, root: Path) -> None:
+        self.get(root).request_reconcile()
+
+    def stop_all(self) -> None:
+        with self._lock:
+            indexers = list(self._indexers.values())
+            self._indexers.clear()
+        for indexer in indexers:
+            indexer.stop(timeout=5.0)
+
+
+attachment_indexers = AttachmentIndexManager()
@@ -0,0 +1,364 @@
+"""Background embedding of vault pages into the vector store.
+
+Pages waiting to be embedded sit in a small SQLite queue at
+``.zimx/embed_queue.db``, one row per page, so pending work survives a restart
+and the service picks it up again when the vault is selected. A worker thread
+takes pages in batches and hands them to ``ChromaRAG.index_texts``, which embeds
+all of a batch's new chunks in one call. Pages that no longer exist have their
+vectors removed.
+
+After each batch the worker sleeps in proportion to the process CPU time the
+batch used (the embedder runs inference on its own thread pool, so the
+worker thread's own clock would undercount it). Embedding thus stays near the
+configured CPU share (``ZIMX_EMBED_CPU_SHARE``, default 0.5). The service is off for a vault until someone asks to embed it
+(``POST /vector/embed``). After that, page saves and deletes queue their pages
+automatically.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from zimx.server.adapters.files import LEGACY_SUFFIX, PAGE_SUFFIX, PAGE_SUFFIXES
+from zimx.server.vector import VectorIndexManager, vector_manager
+
+QUEUE_FILE = "embed_queue.db"
+# Jobs failing this many times stay in the queue (visible in the status) but are not retried.
+_MAX_ATTEMPTS = 3
+_THROUGHPUT_WINDOW = 60.0
+_IDLE_WAIT = 5.0
+_MAX_THROTTLE_SLEEP = 30.0
+
+
+def _default_cpu_share() -> float:
+    try:
+        share = float(os.getenv("ZIMX_EMBED_CPU_SHARE", "0.5"))
+    except ValueError:
+        share = 0.5
+    return min(max(share, 0.05), 1.0)
+
+
+def iter_page_refs(root: Path, subtree: str = "/") -> Iterable[str]:
+    """Vault-relative paths of every page under ``subtree``, skipping ``.zimx``."""
+    folder = root / subtree.strip("/")
+    if folder.is_file():
+        yield "/" + folder.relative_to(root).as_posix()
+        return
+    if not folder.is_dir():
+        return
+    for suffix in PAGE_SUFFIXES:
+        for page_file in sorted(folder.rglob(f"*{suffix}")):
+            if ".zimx" in page_file.relative_to(root).parts:
+                continue
+            if suffix == LEGACY_SUFFIX and page_file.with_suffix(PAGE_SUFFIX).exists():
+                continue
+            yield "/" + page_file.relative_to(root).as_posix()
+
+
+class EmbeddingQueue:
+    """Persistent set of pages waiting to be embedded, oldest first."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embed_jobs(
+                page_ref TEXT PRIMARY KEY,
+                queued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embed_meta(key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def enqueue(self, page_refs: Iterable[str]) -> int:
+        now = time.time()
+        rows = [(page_ref, now) for page_ref in dict.fromkeys(page_refs)]
+        with self._lock:
+            # Re-queuing resets the retry count and moves the page to the back.
+            self._conn.executemany(
+                """
+                INSERT INTO embed_jobs(page_ref, queued_at) VALUES(?, ?)
+                ON CONFLICT(page_ref) DO UPDATE SET queued_at = excluded.queued_at, attempts = 0, last_error = NULL
+                """,
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def take(self, limit: int) -> list[tuple[str, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT page_ref, queued_at FROM embed_jobs WHERE attempts < ? ORDER BY queued_at, page_ref LIMIT ?",
+                (_MAX_ATTEMPTS, limit),
+            ).fetchall()
+
+    def complete(self, jobs: Iterable[tuple[str, float]]) -> None:
+        with self._lock:
+            # A page saved again while its batch ran keeps its newer row.
+            self._conn.executemany("DELETE FROM embed_jobs WHERE page_ref = ? AND queued_at = ?", list(jobs))
+            self._conn.commit()
+
+    def fail(self, jobs: Iterable[tuple[str, float]], error: str) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE embed_jobs SET attempts = attempts + 1, last_error = ? WHERE page_ref = ? AND queued_at = ?",
+                [(error, page_ref, queued_at) for page_ref, queued_at in jobs],
+            )
+            self._conn.commit()
+
+    def counts(self) -> tuple[int, int]:
+        """(pending, failed) job counts."""
+        with self._lock:
+            pending, failed = self._conn.execute(
+                "SELECT COALESCE(SUM(attempts < ?), 0), COALESCE(SUM(attempts >= ?), 0) FROM embed_jobs",
+                (_MAX_ATTEMPTS, _MAX_ATTEMPTS),
+            ).fetchone()
+        return int(pending), int(failed)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM embed_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO embed_meta(key, value) VALUES(?, ?)", (key, value))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class EmbeddingMetrics:
+    pages_indexed: int = 0
+    pages_unchanged: int = 0
+    pages_removed: int = 0
+    chunks_embedded: int = 0
+    embed_cpu: float = 0.0
+    throttle_sleep: float = 0.0
+    batches: int = 0
+    errors: int = 0
+    last_error: Optional[str] = None
+    last_batch_at: Optional[float] = None
+    # (finished at, pages, chunks) per batch within the throughput window.
+    recent: deque = field(default_factory=deque)
+
+    def record(self, pages: int, chunks: int) -> None:
+        now = time.time()
+        self.batches += 1
+        self.last_batch_at = now
+        self.recent.append((now, pages, chunks))
+        while self.recent and self.recent[0][0] < now - _THROUGHPUT_WINDOW:
+            self.recent.popleft()
+
+    def throughput(self) -> tuple[float, float]:
+        """(pages, chunks) per minute over the last window."""
+        cutoff = time.time() - _THROUGHPUT_WINDOW
+        recent = [item for item in self.recent if item[0] >= cutoff]
+        scale = 60.0 / _THROUGHPUT_WINDOW
+        return sum(item[1] for item in recent) * scale, sum(item[2] for item in recent) * scale
+
+
+class EmbeddingService:
+    """Worker thread that drains one vault's embedding queue."""
+
+    def __init__(
+        self,
+        root: Path,
+        manager: VectorIndexManager,
+        batch_size: int = 16,
+        cpu_share: Optional[float] = None,
+    ) -> None:
+        self.root = root
+        self._manager = manager
+        self.batch_size = batch_size
+        self.queue = EmbeddingQueue(root / ".zimx" / QUEUE_FILE)
+        stored_share = self.queue.get_meta("cpu_share")
+        self.cpu_share = cpu_share or (float(stored_share) if stored_share else _default_cpu_share())
+        self.metrics = EmbeddingMetrics()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.queue.get_meta("enabled") == "1"
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zimx-embedding", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self.queue.close()
+
+    def embed_tree(self, subtree: str = "/") -> int:
+        """Queue every page under ``subtree`` and keep following page changes from now on."""
+        self.queue.set_meta("enabled", "1")
+        count = self.queue.enqueue(iter_page_refs(self.root, subtree))
+        self.start()
+        self._wake.set()
+        return count
+
+    def notify_changed(self, page_refs: Iterable[str]) -> int:
+        """Queue saved, moved or deleted pages; ignored until the vault has been embedded once."""
+        if not self.enabled:
+            return 0
+        count = self.queue.enqueue(ref for ref in page_refs if ref.endswith(tuple(PAGE_SUFFIXES)))
+        if count:
+            self.start()
+            self._wake.set()
+        return count
+
+    def set_cpu_share(self, share: float) -> None:
+        self.cpu_share = min(max(share, 0.05), 1.0)
+        self.queue.set_meta("cpu_share", str(self.cpu_share))
+
+    def status(self) -> dict:
+        pending, failed = self.queue.counts()
+        pages_per_minute, chunks_per_minute = self.metrics.throughput()
+        metrics = self.metrics
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "busy": self._busy,
+            "pending": pending,
+            "failed": failed,
+            "cpu_share": self.cpu_share,
+            "batch_size": self.batch_size,
+            "pages_indexed": metrics.pages_indexed,
+            "pages_unchanged": metrics.pages_unchanged,
+            "pages_removed": metrics.pages_removed,
+            "chunks_embedded": metrics.chunks_embedded,
+            "embed_cpu": round(metrics.embed_cpu, 3),
+            "throttle_sleep": round(metrics.throttle_sleep, 3),
+            "batches": metrics.batches,
+            "errors": metrics.errors,
+            "last_error": metrics.last_error,
+            "last_batch_at": metrics.last_batch_at,
+            "pages_per_minute": round(pages_per_minute, 1),
+            "chunks_per_minute": round(chunks_per_minute, 1),
+        }
+
+    # ---------------------------------------------------------------- worker
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            jobs = self.queue.take(self.batch_size)
+            if not jobs:
+                self._wake.wait(_IDLE_WAIT)
+                self._wake.clear()
+                continue
+            # Process time, not thread time: the embedder's inference threads do most of the work.
+            started = time.process_time()
+            self._busy = True
+            try:
+                self.process(jobs)
+            finally:
+                self._busy = False
+            busy = time.process_time() - started
+            # Sleep so that busy / (busy + sleep) stays at the configured CPU share.
+            pause = min(busy * (1.0 - self.cpu_share) / self.cpu_share, _MAX_THROTTLE_SLEEP)
+            if pause > 0:
+                self.metrics.throttle_sleep += pause
+                self._stop.wait(pause)
+
+    def process(self, jobs: list[tuple[str, float]]) -> None:
+        """Embed (or drop the vectors of) one batch of queued pages."""
+        items = []
+        removed = []
+        for page_ref, _queued_at in jobs:
+            page_file = self.root / page_ref.lstrip("/")
+            if not page_file.is_file():
+                removed.append(page_ref)
+                continue
+            try:
+                text = page_file.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as exc:
+                print(f"[Embedding] Skipping unreadable page {page_ref}: {exc}")
+                removed.append(page_ref)
+                continue
+            items.append((page_ref, text, "page", None))
+        try:
+            stats = self._manager.index_texts(self.root, items) if items else []
+            for page_ref in removed:
+                self._manager.delete_text(self.root, page_ref, kind="page")
+        except Exception as exc:
+            self.metrics.errors += 1
+            self.metrics.last_error = f"{type(exc).__name__}: {exc}"
+            print(f"[Embedding] Batch of {len(jobs)} page(s) failed: {exc}")
+            self.queue.fail(jobs, self.metrics.last_error)
+            return
+        embedded = sum(item.embedded for item in stats)
+        self.metrics.pages_indexed += sum(1 for item in stats if not item.skipped)
+        self.metrics.pages_unchanged += sum(1 for item in stats if item.skipped)
+        self.metrics.pages_removed += len(removed)
+        self.metrics.chunks_embedded += embedded
+        self.metrics.embed_cpu += sum(item.embed_cpu for item in stats)
+        self.metrics.record(len(jobs), embedded)
+        self.queue.complete(jobs)
+
+
+class EmbeddingServiceManager:
+    """One ``EmbeddingService`` per vault root, created on first use."""
+
+    def __init__(self, manager: VectorIndexManager) -> None:
+        self._manager = manager
+        self._lock = threading.RLock()
+        self._services: Dict[str, EmbeddingService] = {}
+
+    def get(self, root: Path) -> EmbeddingService:
+        key = str(root.resolve())
+        with self._lock:
+            service = self._services.get(key)
+            if service is None:
+                service = EmbeddingService(Path(key), self._manager)
+                self._services[key] = service
+            return service
+
+    def resume(self, root: Path) -> None:
+        """Restart the worker for a vault that was embedded before, picking up its queue."""
+        if not (root / ".zimx" / QUEUE_FILE).exists():
+            return
+        service = self.get(root)
+        if service.enabled:
+            service.start()
+
+    def notify_changed(self, root: Path, page_refs: Iterable[str]) -> None:
+        if not (root / ".zimx" / QUEUE_FILE).exists():
+            return
+        try:
+            self.get(root).notify_changed(page_refs)
+        except sqlite3.Error as exc:
+            print(f"[Embedding] Could not queue changed pages: {exc}")
+
+    def stop_all(self) -> None:
+        with self._lock:
+            services = list(self._services.values())
+            self._services.clear()
+        for service in services:
+            service.stop(timeout=5.0)
+
+
+embedding_services = EmbeddingServiceManager(vector_manager)
@@ -1,8 +1,9 @@
 """Full-text search index management using SQLite FTS5."""
 
+import json
 import re
 import sqlite3
-from typing import Optional
+from typing import NamedTuple, Optional
 
 
 def init_search_db(conn: sqlite3.Connection) -> None:
@@ -300,3 +301,189 @@ def search_pages(
     except sqlite3.OperationalError as e:
         print(f"[SearchIndex] Search failed for query '{query}': {e}")
         return []
+
+
+_TERM_PATTERN = re.compile(r"[^\W_]+")
+_MAX_QUERY_TERMS = 16
+
+
+def _any_term_query(query: str) -> str:
+    """FTS5 query matching pages that contain any word of ``query`` (as a prefix); bm25 ranks by how many and how rare."""
+    terms: list[str] = []
+    for term in _TERM_PATTERN.findall(query or ""):
+        term = term.lower()
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(f'"{term}"*' for term in terms[:_MAX_QUERY_TERMS])
+
+
+def search_page_snippets(
+    conn: sqlite3.Connection,
+    query: str,
+    page_refs: list[str],
+    limit: int = 8,
+    snippet_tokens: int = 48,
+) -> list[dict]:
+    """
+    Rank the given pages against a natural-language query with FTS5 bm25.
+
+    Unlike ``search_pages`` every word is optional, so a chat question still
+    matches pages that mention only some of its terms. Snippets come from the
+    indexed content; nothing is read from disk.
+
+    Returns:
+        List of dicts with keys: path, snippet, rank (best match first)
+    """
+    fts_query = _any_term_query(query)
+    if not fts_query or not page_refs:
+        return []
+    try:
+        rows = conn.execute(
+            """
+            SELECT
+                p.path,
+                snippet(pages_search_fts, 0, '', '', '...', ?) AS snippet,
+                bm25(pages_search_fts) AS rank
+            FROM pages_search_fts fts
+            JOIN pages_search_index p ON p.id = fts.rowid
+            WHERE pages_search_fts MATCH ?
+                AND p.path IN (SELECT value FROM json_each(?))
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (snippet_tokens, fts_query, json.dumps(list(page_refs)), limit),
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        print(f"[SearchIndex] Snippet search failed for query '{query}': {e}")
+        return []
+    return [{"path": path, "snippet": snippet, "rank": rank} for path, snippet, rank in rows]
+
+
+class IndexedAttachment(NamedTuple):
+    """State of an indexed attachment: the extraction it came from and the file's mtime/size then."""
+
+    text_key: str
+    mtime_ns: int
+    size: int
+
+
+def _delete_attachment_rows(conn: sqlite3.Connection, attachment_path: str) -> None:
+    conn.execute(
+        "DELETE FROM attachments_search_fts WHERE rowid = "
+        "(SELECT fts_rowid FROM attachments_search_state WHERE attachment_path = ?)",
+        (attachment_path,),
+    )
+    conn.execute("DELETE FROM attachments_search_state WHERE attachment_path = ?", (attachment_path,))
+
+
+def upsert_attachment_text(
+    conn: sqlite3.Connection,
+    attachment_path: str,
+    page_path: str,
+    text_key: str,
+    content: str,
+    mtime_ns: int = 0,
+    size: int = 0,
+) -> None:
+    """Replace the searchable text of an attachment; ``text_key`` identifies the extraction it came from."""
+    try:
+        _delete_attachment_rows(conn, attachment_path)
+        cursor = conn.execute(
+            "INSERT INTO attachments_search_fts(attachment_path, page_path, text_key, content) VALUES (?, ?, ?, ?)",
+            (attachment_path, page_path, text_key, content),
+        )
+        conn.execute(
+            "INSERT INTO attachments_search_state(attachment_path, text_key, fts_rowid, mtime_ns, size) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (attachment_path, text_key, cursor.lastrowid, mtime_ns, size),
+        )
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f"[SearchIndex] Failed to index attachment {attachment_path}: {e}")
+
+
+def touch_attachment_text(conn: sqlite3.Connection, attachment_path: str, mtime_ns: int, size: int) -> None:
+    """Record a new mtime/size for an attachment whose content (and indexed text) did not change."""
+    try:
+        conn.execute(
+            "UPDATE attachments_search_state SET mtime_ns = ?, size = ? WHERE attachment_path = ?",
+            (mtime_ns, size, attachment_path),
+        )
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f"[SearchIndex] Failed to update attachment {attachment_path}: {e}")
+
+
+def delete_attachment_text(conn: sqlite3.Connection, attachment_path: str) -> None:
+    """Remove an attachment's text from the search index."""
+    try:
+        _delete_attachment_rows(conn, attachment_path)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f"[SearchIndex] Failed to delete attachment {attachment_path}: {e}")
+
+
+def indexed_attachment(conn: sqlite3.Connection, attachment_path: str) -> Optional[IndexedAttachment]:
+    """Index state of one attachment, or None if its text is not indexed."""
+    try:
+        row = conn.execute(
+            "SELECT text_key, mtime_ns, size FROM attachments_search_state WHERE attachment_path = ?",
+            (attachment_path,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return IndexedAttachment(*row) if row else None
+
+
+def indexed_attachments(conn: sqlite3.Connection) -> dict[str, IndexedAttachment]:
+    """Map of indexed attachment path -> its index state."""
+    try:
+        rows = conn.execute("SELECT attachment_path, text_key, mtime_ns, size FROM attachments_search_state").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {path: IndexedAttachment(key, mtime_ns, size) for path, key, mtime_ns, size in rows}
+
+
+def search_attachments(
+    conn: sqlite3.Connection,
+    query: str,
+    subtree: Optional[str] = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Search extracted attachment text using FTS5 full-text search.
+
+    Accepts the same query syntax as ``search_pages`` (without @tag filters).
+    ``subtree`` limits results to attachments of pages under that path.
+
+    Returns:
+        List of dicts with keys: path (the owning page), attachment, snippet, rank
+    """
+    fts_query = re.sub(r'@(\w+)', '', query or '').strip()
+    if not fts_query:
+        return []
+    fts_query = _prepare_fts_query(fts_query)
+    sql = """
+        SELECT
+            page_path,
+            attachment_path,
+            snippet(attachments_search_fts, 3, '[', ']', '...', 10) AS snippet,
+            bm25(attachments_search_fts) AS rank
+        FROM attachments_search_fts
+        WHERE attachments_search_fts MATCH ?
+    """
+    params: list = [fts_query]
+    if subtree:
+        sql += " AND (page_path = ? OR page_path LIKE ?)"
+        params.extend([subtree.rstrip('/'), subtree.rstrip('/') + '/%'])
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        print(f"[SearchIndex] Attachment search failed for query '{query}': {e}")
+        return []
+    return [
+        {"path": page, "attachment": attachment, "snippet": snippet, "rank": rank}
+        for page, attachment, snippet, rank in rows
+    ]
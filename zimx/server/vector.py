@@ -1,35 +1,120 @@
+"""Per-vault vector stores behind a lazily imported backend boundary.
+
+Importing this module does not import ``chromadb``. The backend module is
+loaded the first time a vault's store is needed, so servers that never use AI
+features skip its import time and memory. ``ZIMX_VECTOR_BACKEND`` selects the
+store: ``chroma`` (default) or ``local`` (``zimx.rag.local_index``, NumPy and
+SQLite in-process). All stores share one embedding function (and its ONNX
+model) per process. A store unused for ``ZIMX_VECTOR_IDLE_SECONDS`` (default
+900) is closed and rebuilt on next use.
+"""
+
 from __future__ import annotations
 
+import os
+import time
 from pathlib import Path
 from threading import RLock
-from typing import Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+from zimx.rag.index import IndexTextStats, QueryScope, RetrievedChunk
+
+if TYPE_CHECKING:
+    from zimx.rag.chroma import ChromaRAG
+    from zimx.rag.local_index import LocalVaultIndex
+
+BACKENDS = ("chroma", "local")
+
 
-from zimx.rag.chroma import ChromaRAG
-from zimx.rag.index import RetrievedChunk
+def _default_idle_timeout() -> float:
+    try:
+        return float(os.getenv("ZIMX_VECTOR_IDLE_SECONDS", "900"))
+    except ValueError:
+        return 900.0
+
+
+def _default_backend() -> str:
+    backend = os.getenv("ZIMX_VECTOR_BACKEND", "chroma").strip().lower()
+    if backend not in BACKENDS:
+        print(f"[Vector] Unknown vector backend {backend!r}; using chroma")
+        return "chroma"
+    return backend
 
 
 class VectorIndexManager:
-    def __init__(self) -> None:
+    def __init__(self, idle_timeout: Optional[float] = None, backend: Optional[str] = None) -> None:
         self._lock = RLock()
-        self._instances: Dict[str, ChromaRAG] = {}
+        # Serializes writes so request handlers and the background embedder never interleave on a scope.
+        self._write_lock = RLock()
+        self._instances: Dict[str, ChromaRAG | LocalVaultIndex] = {}
+        self._last_used: Dict[str, float] = {}
+        self.idle_timeout = _default_idle_timeout() if idle_timeout is None else idle_timeout
+        self.backend = backend or _default_backend()
 
     def _key(self, root: Path) -> str:
         return str(root.resolve())
 
-    def _get(self, root: Path) -> ChromaRAG:
+    def _get(self, root: Path) -> ChromaRAG | LocalVaultIndex:
         key = self._key(root)
         with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now, keep=key)
             client = self._instances.get(key)
             if client is None:
-                client = ChromaRAG(key)
+                client = self._open(key)
                 self._instances[key] = client
+            self._last_used[key] = now
             return client
 
-    def index_text(self, root: Path, page_ref: str, text: str, kind: str, attachment: Optional[str] = None) -> None:
-        self._get(root).index_text(page_ref, text, kind=kind, attachment=attachment)
+    def _open(self, key: str) -> ChromaRAG | LocalVaultIndex:
+        if self.backend == "local":
+            from zimx.rag.local_index import LocalVaultIndex
+
+            return LocalVaultIndex(key)
+        from zimx.rag.chroma import ChromaRAG
+
+        return ChromaRAG(key)
+
+    def _evict_idle(self, now: float, keep: Optional[str] = None) -> None:
+        for key, last_used in list(self._last_used.items()):
+            if key != keep and now - last_used >= self.idle_timeout:
+                self._release(key)
+
+    def _release(self, key: str) -> None:
+        client = self._instances.pop(key, None)
+        self._last_used.pop(key, None)
+        if client is None:
+            return
+        print(f"[Vector] Closing idle vector store for {key}")
+        try:
+            client.close()
+        except Exception as exc:
+            print(f"[Vector] Failed to close vector store for {key}: {exc}")
+
+    def is_loaded(self, root: Path) -> bool:
+        with self._lock:
+            return self._key(root) in self._instances
+
+    def close_all(self) -> None:
+        with self._write_lock, self._lock:
+            for key in list(self._instances):
+                self._release(key)
+
+    def index_text(
+        self, root: Path, page_ref: str, text: str, kind: str, attachment: Optional[str] = None
+    ) -> IndexTextStats:
+        with self._write_lock:
+            return self._get(root).index_text(page_ref, text, kind=kind, attachment=attachment)
+
+    def index_texts(
+        self, root: Path, items: Sequence[tuple[str, str, str, Optional[str]]]
+    ) -> List[IndexTextStats]:
+        with self._write_lock:
+            return self._get(root).index_texts(items)
 
     def delete_text(self, root: Path, page_ref: str, kind: str, attachment: Optional[str] = None) -> None:
-        self._get(root).delete_text(page_ref, kind=kind, attachment=attachment)
+        with self._write_lock:
+            self._get(root).delete_text(page_ref, kind=kind, attachment=attachment)
 
     def query(
         self,
@@ -39,12 +124,8 @@ class VectorIndexManager:
         limit: int = 4,
         kind: Optional[str] = None,
     ) -> List[RetrievedChunk]:
-        return self._get(root).query(
-            query_text,
-            page_refs=list(page_refs) if page_refs else None,
-            limit=limit,
-            kind=kind,
-        )
+        scope = QueryScope(kind=kind, page_refs=list(page_refs) if page_refs else None, limit=limit)
+        return self._get(root).retrieve(query_text, [scope])
 
     def query_attachments(
         self,
@@ -56,5 +137,15 @@ class VectorIndexManager:
     ) -> List[RetrievedChunk]:
         return self._get(root).query_attachments(query_text, list(attachment_names), limit=limit, kind=kind)
 
+    def retrieve(
+        self,
+        root: Path,
+        query_text: str,
+        scopes: Sequence[QueryScope],
+        limit: Optional[int] = None,
+        one_per_source: bool = False,
+    ) -> List[RetrievedChunk]:
+        return self._get(root).retrieve(query_text, scopes, limit=limit, one_per_source=one_per_source)
+
 
 vector_manager = VectorIndexManager()